@@ -5,10 +5,12 @@ from loguru import logger
 
 from backend.db import get_db
 from backend.models.dtos.user_dto import AuthUserDTO
-from backend.models.postgis.task import Task
 from backend.models.postgis.task_annotation import TaskAnnotation
 from backend.services.project_service import ProjectService
-from backend.services.task_annotations_service import TaskAnnotationsService
+from backend.services.task_annotations_service import (
+    InvalidTaskIdError,
+    TaskAnnotationsService,
+)
 from backend.services.users.authentication_service import login_required
 
 router = APIRouter(
@@ -86,6 +88,9 @@ async def post_annotations(
           required: true
           type: string
           default: application/json
+          enum:
+            - application/json
+            - application/x-ndjson
         - name: project_id
           in: path
           description: Unique project ID
@@ -104,7 +109,9 @@ async def post_annotations(
         - in: body
           name: body
           required: true
-          description: JSON object for creating draft project
+          description: >-
+            JSON object of task annotations, or with application/x-ndjson one task
+            annotation object per line, streamed and written in chunks
           schema:
             projectId:
                 type: integer
@@ -136,33 +143,28 @@ async def post_annotations(
         500:
             description: Internal Server Error
     """
-    try:
-        annotations = await request.json() or {}
-    except Exception as e:
-        logger.error(f"Error validating request: {str(e)}")
-
     await ProjectService.exists(project_id, db)
 
-    task_ids = [t["taskId"] for t in annotations["tasks"]]
-
-    tasks = await Task.get_tasks(project_id, task_ids, db)
-    tasks_ids_db = [t.id for t in tasks]
-    if len(task_ids) != len(tasks_ids_db):
-        return JSONResponse(content={"Error": "Invalid task id"}, status_code=500)
-
-    for annotation in annotations["tasks"]:
-        try:
-            await TaskAnnotationsService.add_or_update_annotation(
-                annotation, project_id, annotation_type, db
+    try:
+        if request.headers.get("Content-Type", "").startswith("application/x-ndjson"):
+            await TaskAnnotationsService.add_or_update_annotations_stream(
+                request.stream(), project_id, annotation_type, db
             )
-        except Exception as e:
-            logger.error(f"Error creating annotations: {str(e)}")
-            return JSONResponse(
-                content={
-                    "Error": "Error creating annotations",
-                    "SubCode": "InvalidData",
-                },
-                status_code=400,
+        else:
+            annotations = await request.json() or {}
+            await TaskAnnotationsService.add_or_update_annotations(
+                annotations["tasks"], project_id, annotation_type, db
             )
+    except InvalidTaskIdError:
+        return JSONResponse(content={"Error": "Invalid task id"}, status_code=500)
+    except Exception as e:
+        logger.error(f"Error creating annotations: {str(e)}")
+        return JSONResponse(
+            content={
+                "Error": "Error creating annotations",
+                "SubCode": "InvalidData",
+            },
+            status_code=400,
+        )
 
     return project_id
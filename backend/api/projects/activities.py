@@ -1,13 +1,16 @@
+import asyncio
+import json
 from typing import Optional
 from backend.models.dtos.user_dto import AuthUserDTO
 from backend.models.postgis.statuses import ProjectStatus
 from backend.services.users.authentication_service import login_required_optional
 from databases import Database
 from fastapi import APIRouter, Depends, Request, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from backend.db import get_db
 from backend.services.project_service import ProjectService
 from backend.services.stats_service import StatsService
+from backend.services.task_event_service import task_event_hub
 
 router = APIRouter(
     prefix="/projects",
@@ -15,11 +18,17 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Comment sent on idle streams so proxies don't close them
+STREAM_KEEPALIVE_SECONDS = 15
+
 
 @router.get("/{project_id}/activities/")
 async def get_activities(
     project_id: int,
     page: int = Query(1, description="Page of results user requested", ge=1),
+    cursor: Optional[str] = Query(
+        None, description="Cursor of the page requested, empty for the first page"
+    ),
     user: Optional[AuthUserDTO] = Depends(login_required_optional),
     db: Database = Depends(get_db),
 ):
@@ -41,6 +50,11 @@ async def get_activities(
           name: page
           description: Page of results user requested
           type: integer
+        - in: query
+          name: cursor
+          description: Opt in to cursor pagination, empty for the first page then the
+                       nextCursor of the previous page. Ignores page when supplied.
+          type: string
     responses:
         200:
             description: Project activity
@@ -78,7 +92,7 @@ async def get_activities(
                 },
                 status_code=403,
             )
-    activity = await StatsService.get_latest_activity(project_id, page, db)
+    activity = await StatsService.get_latest_activity(project_id, page, db, cursor)
     return activity
 
 
@@ -86,6 +100,7 @@ async def get_activities(
 async def get_latest_activities(
     request: Request,
     project_id: int,
+    since: Optional[int] = Query(None, ge=0),
     user: Optional[AuthUserDTO] = Depends(login_required_optional),
     db: Database = Depends(get_db),
 ):
@@ -102,6 +117,10 @@ async def get_latest_activities(
           required: true
           type: integer
           default: 1
+        - in: query
+          name: since
+          description: Only return tasks changed after this project version
+          type: integer
     responses:
         200:
             description: Project activity
@@ -139,5 +158,84 @@ async def get_latest_activities(
                 },
                 status_code=403,
             )
-    activity = await StatsService.get_last_activity(project_id, db)
+    activity = await StatsService.get_last_activity(project_id, db, since)
     return activity
+
+
+@router.get("/{project_id}/activities/stream/")
+async def stream_activities(
+    request: Request,
+    project_id: int,
+    user: Optional[AuthUserDTO] = Depends(login_required_optional),
+    db: Database = Depends(get_db),
+):
+    """
+    Stream task lock and status changes of the project as Server-Sent Events
+    ---
+    tags:
+      - projects
+    produces:
+      - text/event-stream
+    parameters:
+        - name: project_id
+          in: path
+          required: true
+          type: integer
+          default: 1
+    responses:
+        200:
+            description: One event per task change, with the projectId, taskId,
+                         taskStatus and lockedBy of the task. Events with resync set
+                         ask the client to reload the project tasks.
+        403:
+            description: User not permitted to view the project
+        500:
+            description: Internal Server Error
+    """
+
+    is_private, status = await ProjectService.get_project_privacy_and_status(
+        project_id, db
+    )
+    # If private or draft, enforce login + permission
+    if is_private or status == ProjectStatus.DRAFT.value:
+        user_id = user.id if user else None
+        if user is None:
+            return JSONResponse(
+                content={
+                    "Error": "User not permitted: Private Project",
+                    "SubCode": "PrivateProject",
+                },
+                status_code=403,
+            )
+
+        project_dto = await ProjectService.get_project_dto_for_mapper(
+            project_id,
+            user_id,
+            db,
+        )
+        if not project_dto:
+            return JSONResponse(
+                content={
+                    "Error": "User not permitted: Private Project",
+                    "SubCode": "PrivateProject",
+                },
+                status_code=403,
+            )
+
+    async def event_stream():
+        async with task_event_hub.subscribe(project_id) as queue:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -8,7 +8,7 @@ from fastapi import APIRouter, Depends, Request, Query, Path
 from fastapi.responses import JSONResponse, StreamingResponse, Response
 from loguru import logger
 
-from backend.db import get_db
+from backend.db import db_connection, get_db
 from backend.models.dtos.project_dto import (
     DraftProjectDTO,
     ProjectDTO,
@@ -883,11 +883,21 @@ async def get_projects(
         if search_dto.download_as_csv:
             if user:
                 user = user.id
-            all_results_csv = await ProjectSearchService.search_projects_as_csv(
-                search_dto, user, db, True
+            query, params, header = await ProjectSearchService.create_csv_query(
+                search_dto, user, db
             )
+
+            async def _csv_gen():
+                # The request connection is released once the response starts,
+                # so the export holds its own connection while streaming.
+                async with db_connection.database.connection() as conn:
+                    async for chunk in ProjectSearchService.search_projects_as_csv(
+                        query, params, header, conn
+                    ):
+                        yield chunk
+
             return StreamingResponse(
-                iter([all_results_csv]),
+                _csv_gen(),
                 media_type="text/csv",
                 headers={"Content-Disposition": "attachment; filename=data.csv"},
             )
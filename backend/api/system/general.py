@@ -1,11 +1,12 @@
 from datetime import datetime
 
-import requests
+import httpx
 from databases import Database
 from fastapi import APIRouter, Body, Depends, Request
 from fastapi.responses import JSONResponse
 
 from backend.db import get_db
+from backend.http_client import http_client
 from backend.models.postgis.release_version import ReleaseVersion
 from backend.services.messaging.smtp_service import SMTPService
 from backend.services.settings_service import SettingsService
@@ -254,10 +255,10 @@ async def release(db: Database = Depends(get_db)):
       500:
         description: Internal server error
     """
-    response = requests.get(
-        "https://api.github.com/repos/hotosm/tasking-manager/releases/latest"
-    )
     try:
+        response = await http_client.get(
+            "https://api.github.com/repos/hotosm/tasking-manager/releases/latest"
+        )
         tag_name = response.json()["tag_name"]
         published_date = response.json()["published_at"]
         published_date = datetime.strptime(
@@ -280,7 +281,7 @@ async def release(db: Database = Depends(get_db)):
             },
             status_code=200,
         )
-    except KeyError:
+    except (KeyError, ValueError, httpx.RequestError):
         return JSONResponse(
             content={
                 "Error": "Couldn't fetch latest release from github",
@@ -1,10 +1,10 @@
 import json
 
-import requests
 from fastapi import APIRouter, Body, Depends, Request
 from fastapi.responses import JSONResponse
 
 from backend.config import settings
+from backend.http_client import http_client
 from backend.models.dtos.user_dto import AuthUserDTO
 from backend.services.users.authentication_service import login_required
 
@@ -92,8 +92,10 @@ async def post_image(
         url = "{}?filename={}".format(
             settings.IMAGE_UPLOAD_API_URL, data.get("filename")
         )
-        result = requests.post(url, headers=headers, data=json.dumps({"image": data}))
-        if result.ok:
+        result = await http_client.post(
+            url, headers=headers, content=json.dumps({"image": data})
+        )
+        if result.is_success:
             return JSONResponse(content=result.json(), status_code=201)
         else:
             return JSONResponse(content=result.json(), status_code=400)
@@ -1,8 +1,14 @@
 from databases import Database
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
 
+from backend.cache import cache
 from backend.db import get_db
+from backend.http_client import http_client
+from backend.models.dtos.user_dto import AuthUserDTO
 from backend.services.stats_service import StatsService
+from backend.services.users.authentication_service import login_required
+from backend.services.users.user_service import UserService
 
 router = APIRouter(
     prefix="/system",
@@ -40,3 +46,80 @@ async def get_statistics(
     """
     stats = await StatsService.get_homepage_stats(abbreviated, db)
     return stats.model_dump(by_alias=True)
+
+
+@router.get("/cache/statistics/")
+async def get_cache_statistics(
+    user: AuthUserDTO = Depends(login_required),
+    db: Database = Depends(get_db),
+):
+    """
+    Get the hit, miss, eviction and invalidation counters of each cache key family
+    ---
+    tags:
+      - system
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: Authorization
+        description: Base64 encoded session token
+        required: true
+        type: string
+        default: Token sessionTokenHere==
+    responses:
+        200:
+            description: Counters of the worker serving the request
+        403:
+            description: User is not an admin
+        500:
+            description: Internal Server Error
+    """
+    if not await UserService.is_user_an_admin(user.id, db):
+        return JSONResponse(
+            content={
+                "Error": "User not permitted",
+                "SubCode": "UserNotPermitted",
+            },
+            status_code=403,
+        )
+    return cache.get_stats()
+
+
+@router.get("/http/statistics/")
+async def get_http_statistics(
+    user: AuthUserDTO = Depends(login_required),
+    db: Database = Depends(get_db),
+):
+    """
+    Get the request, failure and rejection counters, average latency and circuit state
+    of each external host called
+    ---
+    tags:
+      - system
+    produces:
+      - application/json
+    parameters:
+      - in: header
+        name: Authorization
+        description: Base64 encoded session token
+        required: true
+        type: string
+        default: Token sessionTokenHere==
+    responses:
+        200:
+            description: Counters of the worker serving the request
+        403:
+            description: User is not an admin
+        500:
+            description: Internal Server Error
+    """
+    if not await UserService.is_user_an_admin(user.id, db):
+        return JSONResponse(
+            content={
+                "Error": "User not permitted",
+                "SubCode": "UserNotPermitted",
+            },
+            status_code=403,
+        )
+    return http_client.get_stats()
@@ -1,4 +1,3 @@
-import io
 import json
 from typing import Optional
 
@@ -9,7 +8,7 @@ from fastapi.responses import JSONResponse, Response, StreamingResponse
 from loguru import logger
 from starlette.authentication import requires
 
-from backend.db import get_db
+from backend.db import db_connection, get_db
 from backend.models.dtos.grid_dto import GridDTO
 from backend.models.postgis.statuses import ProjectStatus, UserRole
 from backend.models.postgis.utils import InvalidGeoJson
@@ -77,6 +76,7 @@ async def get_project_tasks(
     project_id: int,
     tasks: str = Query(default=None),
     as_file: bool = Query(default=False, alias="as_file"),
+    since: Optional[int] = Query(default=None, ge=0),
     user: Optional[AuthUserDTO] = Depends(login_required_optional),
     db: Database = Depends(get_db),
 ):
@@ -104,6 +104,11 @@ async def get_project_tasks(
             type: boolean
             description: Set to true if file download preferred
             default: True
+        - in: query
+            name: since
+            type: integer
+            description: Only return tasks changed after this project version, along
+                         with the current version. Use 0 to get all tasks and a version.
     responses:
         200:
             description: Project found
@@ -144,7 +149,9 @@ async def get_project_tasks(
                     status_code=403,
                 )
 
-        tasks_json = await ProjectService.get_project_tasks(db, project_id, tasks)
+        tasks_json = await ProjectService.get_project_tasks(
+            db, project_id, tasks, since=since
+        )
         if as_file:
             tasks_str = json.dumps(tasks_json, indent=4)
             return Response(
@@ -272,18 +279,23 @@ async def get_tasks_xml(
         500:
             description: Internal Server Error
     """
-    xml = await MappingService.generate_osm_xml(project_id, tasks, db)
+    task_ids = await MappingService.get_export_task_ids(project_id, tasks, db)
 
-    if as_file:
-        return StreamingResponse(
-            io.BytesIO(xml),
-            media_type="text/xml",
-            headers={
-                "Content-Disposition": f"attachment; filename=HOT-project-{project_id}.osm"
-            },
-        )
+    async def _xml_gen():
+        # The request connection is released once the response starts,
+        # so the export holds its own connection while streaming.
+        async with db_connection.database.connection() as conn:
+            async for chunk in MappingService.stream_osm_xml(
+                project_id, task_ids, conn
+            ):
+                yield chunk
 
-    return Response(content=xml, media_type="text/xml", status_code=200)
+    headers = None
+    if as_file:
+        headers = {
+            "Content-Disposition": f"attachment; filename=HOT-project-{project_id}.osm"
+        }
+    return StreamingResponse(_xml_gen(), media_type="text/xml", headers=headers)
 
 
 @router.get("/{project_id}/tasks/queries/gpx/")
@@ -327,18 +339,21 @@ async def get_tasks_gpx(
         500:
             description: Internal Server Error
     """
-    xml = await MappingService.generate_gpx(project_id, tasks, db)
+    task_ids = await MappingService.get_export_task_ids(project_id, tasks, db)
 
-    if as_file:
-        return StreamingResponse(
-            io.BytesIO(xml),
-            media_type="text/xml",
-            headers={
-                "Content-Disposition": f"attachment; filename=HOT-project-{project_id}.gpx"
-            },
-        )
+    async def _gpx_gen():
+        # The request connection is released once the response starts,
+        # so the export holds its own connection while streaming.
+        async with db_connection.database.connection() as conn:
+            async for chunk in MappingService.stream_gpx(project_id, task_ids, conn):
+                yield chunk
 
-    return Response(content=xml, media_type="text/xml", status_code=200)
+    headers = None
+    if as_file:
+        headers = {
+            "Content-Disposition": f"attachment; filename=HOT-project-{project_id}.gpx"
+        }
+    return StreamingResponse(_gpx_gen(), media_type="text/xml", headers=headers)
 
 
 @router.put("/{project_id}/tasks/queries/aoi/")
@@ -1,7 +1,6 @@
 from datetime import date, timedelta, datetime
 from typing import Optional
 
-import httpx
 from databases import Database
 from fastapi import APIRouter, Depends, Request, Query, HTTPException
 from fastapi.responses import JSONResponse
@@ -9,6 +8,7 @@ from fastapi.responses import JSONResponse
 from backend.api.utils import validate_date_input
 from backend.config import settings
 from backend.db import get_db
+from backend.http_client import http_client
 from backend.models.dtos.user_dto import AuthUserDTO, UserNextLevelDTO
 from backend.services.interests_service import InterestService
 from backend.services.stats_service import StatsService
@@ -217,9 +217,8 @@ async def get_ohsome_stats(
         params["hashtag"] = hashtag
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(base_url, params=params, headers=headers)
-            response.raise_for_status()
+        response = await http_client.get(base_url, params=params, headers=headers)
+        response.raise_for_status()
 
         json_data = response.json()
 
@@ -0,0 +1,274 @@
+import pickle
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from backend.config import settings
+
+# Tag of the entries derived from the whole set of projects
+PROJECTS_TAG = "projects"
+# Redis tag sets outlive the entries they point to, stale members are harmless
+REDIS_TAG_TTL = 24 * 60 * 60
+
+
+def project_tag(project_id: int) -> str:
+    """Tag of the entries derived from the project and its tasks"""
+    return f"project:{project_id}"
+
+
+def project_cache_tags(func, *args, **kwargs) -> List[str]:
+    """Tag builder of functions taking the project id as first argument"""
+    return [project_tag(kwargs.get("project_id", args[0] if args else None))]
+
+
+def projects_cache_tags(func, *args, **kwargs) -> List[str]:
+    """Tag builder of functions reading across all projects"""
+    return [PROJECTS_TAG]
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU cache bounded to maxsize entries. Every worker holds its own copy,
+    so invalidation only reaches the entries of the process it runs in.
+    """
+
+    shared = False
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self.key_tags: Dict[str, Set[str]] = {}
+        self.tag_keys: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return False, None
+        self.entries.move_to_end(key)
+        return True, value
+
+    async def set(
+        self, key: str, value: Any, ttl: int, tags: Iterable[str]
+    ) -> List[str]:
+        """Stores the value, returning the keys evicted to stay within maxsize"""
+        self._remove(key)
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.key_tags[key] = set(tags)
+        for tag in self.key_tags[key]:
+            self.tag_keys.setdefault(tag, set()).add(key)
+
+        evicted = []
+        while len(self.entries) > self.maxsize:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            evicted.append(oldest)
+        return evicted
+
+    async def invalidate(self, tags: Iterable[str]) -> List[str]:
+        """Removes the entries carrying any of the tags, returning their keys"""
+        keys = set()
+        for tag in tags:
+            keys.update(self.tag_keys.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        return list(keys)
+
+    async def clear(self):
+        self.entries.clear()
+        self.key_tags.clear()
+        self.tag_keys.clear()
+
+    def _remove(self, key: str):
+        self.entries.pop(key, None)
+        for tag in self.key_tags.pop(key, ()):
+            keys = self.tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tag_keys[tag]
+
+
+class RedisCacheBackend:
+    """
+    Cache shared by every worker, stored in Redis or any server speaking its protocol.
+    Takes a redis.asyncio compatible client so a local stand-in can replace the server.
+    Redis evicts entries itself, so evictions are not counted with this backend.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix: str = "tm:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str):
+        # Only needed when the Redis backend is configured
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url))
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            return False, None
+        return True, pickle.loads(value)
+
+    async def set(
+        self, key: str, value: Any, ttl: int, tags: Iterable[str]
+    ) -> List[str]:
+        await self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl)
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            await self.client.sadd(tag_key, key)
+            await self.client.expire(tag_key, max(ttl, REDIS_TAG_TTL))
+        return []
+
+    async def invalidate(self, tags: Iterable[str]) -> List[str]:
+        keys = set()
+        tag_keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+        for tag_key in tag_keys:
+            keys.update(
+                key.decode() if isinstance(key, bytes) else key
+                for key in await self.client.smembers(tag_key)
+            )
+        if tag_keys:
+            await self.client.delete(*[self.prefix + key for key in keys], *tag_keys)
+        return list(keys)
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+class Cache:
+    """
+    Caches results of expensive reads by key family, with tag based invalidation fired
+    from the write paths and hit, miss, eviction and invalidation counters per family.
+    Keys are prefixed with their family so counters can be attributed on eviction.
+    """
+
+    COUNTERS = ("hits", "misses", "evictions", "invalidations")
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def cached(
+        self,
+        family: str,
+        ttl: int,
+        key_builder: Callable[..., str],
+        tags: Optional[Callable[..., Iterable[str]]] = None,
+        shared_only: bool = False,
+    ):
+        """
+        Decorates a coroutine to cache its result for ttl seconds. The key and tag
+        builders receive the function and the arguments it is called with.
+        With shared_only the result is only cached when the backend is shared by all
+        workers, for values that must not outlive a write made by another worker.
+        """
+
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if shared_only and not self.backend.shared:
+                    return await func(*args, **kwargs)
+                key = f"{family}:{key_builder(func, *args, **kwargs)}"
+                found, value = await self.backend.get(key)
+                if found:
+                    self._count(family, "hits")
+                    return value
+
+                self._count(family, "misses")
+                value = await func(*args, **kwargs)
+                entry_tags = tags(func, *args, **kwargs) if tags else ()
+                evicted = await self.backend.set(key, value, ttl, entry_tags)
+                for evicted_key in evicted:
+                    self._count(evicted_key.split(":", 1)[0], "evictions")
+                return value
+
+            return wrapper
+
+        return decorator
+
+    async def get_many(
+        self,
+        family: str,
+        keys: Iterable[Hashable],
+        load: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        ttl: int,
+        key_builder: Callable[[Hashable], str] = str,
+        tags: Optional[Callable[[Hashable], Iterable[str]]] = None,
+    ) -> Dict[Hashable, Any]:
+        """
+        Returns the values of several keys, loading all the missing ones with a single
+        call to load. load receives the missing keys and returns their values by key;
+        keys it leaves out are not cached.
+        """
+        values = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            found, value = await self.backend.get(f"{family}:{key_builder(key)}")
+            if found:
+                self._count(family, "hits")
+                values[key] = value
+            else:
+                self._count(family, "misses")
+                missing.append(key)
+
+        if missing:
+            loaded = await load(missing)
+            for key, value in loaded.items():
+                evicted = await self.backend.set(
+                    f"{family}:{key_builder(key)}",
+                    value,
+                    ttl,
+                    tags(key) if tags else (),
+                )
+                for evicted_key in evicted:
+                    self._count(evicted_key.split(":", 1)[0], "evictions")
+            values.update(loaded)
+        return values
+
+    async def invalidate(self, *tags: str):
+        """Drops every entry carrying any of the tags"""
+        for key in await self.backend.invalidate(tags):
+            self._count(key.split(":", 1)[0], "invalidations")
+
+    async def clear(self):
+        await self.backend.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters of each key family since the process started"""
+        return {family: dict(counters) for family, counters in self.stats.items()}
+
+    def _count(self, family: str, counter: str):
+        counters = self.stats.setdefault(family, dict.fromkeys(self.COUNTERS, 0))
+        counters[counter] += 1
+
+
+def get_cache_backend():
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend.from_url(settings.CACHE_REDIS_URL)
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+cache = Cache(get_cache_backend())
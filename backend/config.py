@@ -122,6 +122,46 @@ class Settings(BaseSettings):
     # Time to wait until task auto-unlock (e.g. '2h' or '7d' or '30m' or '1h30m')
     TASK_AUTOUNLOCK_AFTER: str = os.getenv("TM_TASK_AUTOUNLOCK_AFTER", "2h")
 
+    # Backend of the task event push channel: 'postgres' shares events between workers
+    # through LISTEN/NOTIFY, 'memory' only reaches subscribers of the worker that
+    # published them, so it only suits a single worker.
+    TASK_EVENTS_BACKEND: str = os.getenv("TM_TASK_EVENTS_BACKEND", "postgres")
+
+    # Mapping levels, badges, licenses, interests and issue categories are kept in
+    # memory. 'postgres' reloads them in every worker after a write through
+    # LISTEN/NOTIFY, 'memory' only in the worker that wrote, so it only suits a single
+    # worker.
+    REFERENCE_DATA_BACKEND: str = os.getenv("TM_REFERENCE_DATA_BACKEND", "postgres")
+
+    # Cache of expensive reads: 'memory' keeps up to CACHE_MAX_ENTRIES entries in
+    # each worker, 'redis' shares them between workers through CACHE_REDIS_URL
+    CACHE_BACKEND: str = os.getenv("TM_CACHE_BACKEND", "memory")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("TM_CACHE_MAX_ENTRIES", 1024))
+    CACHE_REDIS_URL: str = os.getenv("TM_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Shared clients of the external HTTP services: each host gets up to
+    # HTTP_MAX_CONNECTIONS_PER_HOST connections and is skipped for
+    # HTTP_CIRCUIT_RESET_SECONDS after HTTP_CIRCUIT_FAILURES consecutive failures
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("TM_HTTP_TIMEOUT_SECONDS", 10))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(
+        os.getenv("TM_HTTP_MAX_CONNECTIONS_PER_HOST", 10)
+    )
+    HTTP_CIRCUIT_FAILURES: int = int(os.getenv("TM_HTTP_CIRCUIT_FAILURES", 5))
+    HTTP_CIRCUIT_RESET_SECONDS: float = float(
+        os.getenv("TM_HTTP_CIRCUIT_RESET_SECONDS", 30)
+    )
+
+    # Outbound emails are queued in the email_outbox table. 'inline' drains it in the
+    # background of each API worker, 'cron' leaves it to the cron jobs. The rate is
+    # per draining process.
+    EMAIL_QUEUE_WORKER: str = os.getenv("TM_EMAIL_QUEUE_WORKER", "inline")
+    EMAIL_QUEUE_BATCH_SIZE: int = int(os.getenv("TM_EMAIL_QUEUE_BATCH_SIZE", 50))
+    EMAIL_QUEUE_RATE_PER_SECOND: float = float(
+        os.getenv("TM_EMAIL_QUEUE_RATE_PER_SECOND", 20)
+    )
+    EMAIL_QUEUE_MAX_ATTEMPTS: int = int(os.getenv("TM_EMAIL_QUEUE_MAX_ATTEMPTS", 6))
+    EMAIL_QUEUE_POLL_SECONDS: int = int(os.getenv("TM_EMAIL_QUEUE_POLL_SECONDS", 10))
+
     # Configuration for sending emails
     MAIL_SERVER: Optional[str] = os.getenv("TM_SMTP_HOST", "smtp.gmail.com")
     MAIL_PORT: str = os.getenv("TM_SMTP_PORT", "587")
@@ -1,121 +1,120 @@
 import argparse
 import asyncio
 import datetime
+import time
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from loguru import logger
 
+from backend.config import settings
 from backend.db import db_connection
+from backend.http_client import http_client
+from backend.models.postgis.global_stats import GlobalStats
+from backend.models.postgis.project import Project
 from backend.models.postgis.task import Task
+from backend.models.postgis.user import User
+from backend.services.messaging.email_queue_service import EmailQueueService
+
+# Upper bound for each statement of the project stats refresh
+STATS_REFRESH_TIMEOUT = "10min"
 
 
 async def auto_unlock_tasks():
     logger.info("Started auto-unlock_tasks")
+    started = time.perf_counter()
     try:
         async with db_connection.database.connection() as conn:
-            two_hours_ago = datetime.datetime.utcnow() - datetime.timedelta(minutes=120)
-            projects_query = """
-            SELECT DISTINCT project_id
-            FROM task_history
-            WHERE action_date > :two_hours_ago
-            """
-            projects = await conn.fetch_all(
-                query=projects_query, values={"two_hours_ago": two_hours_ago}
-            )
-            for project in projects:
-                project_id = project["project_id"]
-                logger.info(f"Processing project_id: {project_id}")
-                await Task.auto_unlock_tasks(project_id, conn)
+            unlocked = await Task.auto_unlock_all_tasks(conn)
+        logger.info(
+            f"Auto-unlocked {unlocked['tasks']} tasks in {unlocked['projects']} projects "
+            f"({unlocked['history_rows']} expired lock actions) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
     except Exception as e:
         logger.error(f"Error in auto_unlock_tasks: {e}")
     finally:
         logger.info("Finished auto-unlock_tasks")
 
 
-async def update_all_project_stats():
+async def refresh_project_stats(updated_since=None, dry_run=False):
+    """
+    Recomputes project task counters and users' mapped projects with set-based
+    statements, within STATS_REFRESH_TIMEOUT. A dry run only reports the drift.
+    """
+    started = time.perf_counter()
     async with db_connection.database.connection() as conn:
-        logger.info("Started updating project stats.")
-        # await conn.execute("UPDATE users SET projects_mapped = NULL;")
-        projects_query = "SELECT DISTINCT id FROM projects;"
-        projects = await conn.fetch_all(query=projects_query)
-        for project in projects:
-            project_id = project["id"]
-            logger.info(f"Processing project ID: {project_id}")
+        async with conn.transaction():
             await conn.execute(
-                """
-                UPDATE projects
-                SET total_tasks = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id),
-                    tasks_mapped = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id AND task_status = 2),
-                    tasks_validated = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id AND task_status = 4),
-                    tasks_bad_imagery = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id AND task_status = 6)
-                WHERE id = :project_id;
-                """,
-                {"project_id": project_id},
+                f"SET LOCAL statement_timeout = '{STATS_REFRESH_TIMEOUT}'"
             )
-            await conn.execute(
-                """
-                UPDATE users
-                SET projects_mapped =
-                    CASE
-                        WHEN :project_id = ANY(projects_mapped) THEN projects_mapped
-                        ELSE array_append(projects_mapped, :project_id)
-                    END
-                WHERE id IN (
-                    SELECT DISTINCT user_id
-                    FROM task_history
-                    WHERE action = 'STATE_CHANGE' AND project_id = :project_id
-                );
-                """,
-                {"project_id": project_id},
+            drifted = await Project.refresh_task_counters(
+                conn, updated_since=updated_since, dry_run=dry_run
             )
-        logger.info("Finished updating project stats.")
+            users = await User.refresh_projects_mapped(
+                conn, updated_since=updated_since, dry_run=dry_run
+            )
+    for row in drifted:
+        logger.info(
+            f"Project {row['project_id']} counters "
+            f"stored total/mapped/validated/bad imagery "
+            f"{row['stored_total_tasks']}/{row['stored_tasks_mapped']}/"
+            f"{row['stored_tasks_validated']}/{row['stored_tasks_bad_imagery']}, "
+            f"actual {row['total_tasks']}/{row['tasks_mapped']}/"
+            f"{row['tasks_validated']}/{row['tasks_bad_imagery']}"
+        )
+    logger.info(
+        f"{'Found' if dry_run else 'Fixed'} drift in {len(drifted)} projects and "
+        f"{users} users' mapped projects in {time.perf_counter() - started:.2f}s"
+    )
+
 
+async def update_all_project_stats(dry_run=False):
+    logger.info("Started updating project stats.")
+    await refresh_project_stats(dry_run=dry_run)
+    logger.info("Finished updating project stats.")
 
-async def update_recent_updated_project_stats():
+
+async def update_recent_updated_project_stats(dry_run=False):
+    logger.info("Started updating recently updated projects' project stats.")
+    one_week_ago = datetime.datetime.utcnow() - datetime.timedelta(days=7)
+    await refresh_project_stats(updated_since=one_week_ago, dry_run=dry_run)
+    logger.info("Finished updating project stats.")
+
+
+async def reconcile_global_stats(dry_run=False):
+    """Corrects drift of the homepage totals maintained by triggers"""
+    logger.info("Started reconciling global stats.")
+    started = time.perf_counter()
     async with db_connection.database.connection() as conn:
-        logger.info("Started updating recently updated projects' project stats.")
-        one_week_ago = datetime.datetime.utcnow() - datetime.timedelta(days=7)
-        projects_query = """
-        SELECT DISTINCT id
-        FROM projects
-        WHERE last_updated > :one_week_ago;
-        """
-        projects = await conn.fetch_all(
-            query=projects_query, values={"one_week_ago": one_week_ago}
-        )
-        for project in projects:
-            project_id = project["id"]
-            logger.info(f"Processing project ID: {project_id}")
+        async with conn.transaction():
             await conn.execute(
-                """
-                UPDATE projects
-                SET total_tasks = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id),
-                    tasks_mapped = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id AND task_status = 2),
-                    tasks_validated = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id AND task_status = 4),
-                    tasks_bad_imagery = (SELECT COUNT(*) FROM tasks WHERE project_id = :project_id AND task_status = 6)
-                WHERE id = :project_id;
-                """,
-                {"project_id": project_id},
+                f"SET LOCAL statement_timeout = '{STATS_REFRESH_TIMEOUT}'"
             )
-            await conn.execute(
-                """
-                UPDATE users
-                SET projects_mapped =
-                    CASE
-                        WHEN :project_id = ANY(projects_mapped) THEN projects_mapped
-                        ELSE array_append(projects_mapped, :project_id)
-                    END
-                WHERE id IN (
-                    SELECT DISTINCT user_id
-                    FROM task_history
-                    WHERE action = 'STATE_CHANGE' AND project_id = :project_id
-                );
-                """,
-                {"project_id": project_id},
+            drift = await GlobalStats.reconcile(conn, dry_run=dry_run)
+    for counter, (stored, actual) in drift.items():
+        logger.info(f"Global stats {counter} stored {stored}, actual {actual}")
+    logger.info(
+        f"{'Found' if dry_run else 'Fixed'} drift in {len(drift)} global stats "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+
+async def send_queued_emails():
+    """Sends the due emails of the outbox, alongside or instead of the API workers"""
+    started = time.perf_counter()
+    try:
+        async with db_connection.database.connection() as conn:
+            counts = await EmailQueueService.drain(conn)
+        if any(counts.values()):
+            logger.info(
+                f"Sent {counts['sent']} queued emails, rescheduled {counts['retried']} "
+                f"and gave up {counts['failed']} "
+                f"in {time.perf_counter() - started:.2f}s"
             )
-        logger.info("Finished updating project stats.")
+    except Exception as e:
+        logger.error(f"Error in send_queued_emails: {e}")
 
 
 async def setup_cron_jobs():
@@ -141,6 +140,20 @@ async def setup_cron_jobs():
         misfire_grace_time=3600,
         replace_existing=True,
     )
+    scheduler.add_job(
+        reconcile_global_stats,
+        CronTrigger(hour=1, minute=0),
+        misfire_grace_time=3600,
+        id="reconcile_global_stats",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        send_queued_emails,
+        IntervalTrigger(seconds=settings.EMAIL_QUEUE_POLL_SECONDS),
+        misfire_grace_time=60,
+        id="send_queued_emails",
+        replace_existing=True,
+    )
     scheduler.start()
     logger.info("Scheduler initialized and jobs scheduled.")
     logger.info(f"Scheduled jobs: {scheduler.get_jobs()}")
@@ -153,6 +166,11 @@ async def main():
         action="store_true",
         help="Exit immediately after jobs finish",
     )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report project and global stats drift without updating anything, then exit",
+    )
     args = parser.parse_args()
 
     try:
@@ -161,11 +179,16 @@ async def main():
         await db_connection.database.connect()
         logger.info("Database connection established.")
 
-        if args.immediate_exit:
+        if args.dry_run:
+            await update_all_project_stats(dry_run=True)
+            await reconcile_global_stats(dry_run=True)
+        elif args.immediate_exit:
             # Run each job once, and that's it
             await auto_unlock_tasks()
             await update_all_project_stats()
             await update_recent_updated_project_stats()
+            await reconcile_global_stats()
+            await send_queued_emails()
         else:
             # Set up a scheduler and run it indefinitely
             await setup_cron_jobs()
@@ -178,6 +201,7 @@ async def main():
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
     finally:
+        await http_client.close()
         # Close the connection pool
         logger.info("Disconnecting from the database...")
         await db_connection.database.disconnect()
@@ -0,0 +1,187 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from backend.config import settings
+
+HTTP_COUNTERS = ("requests", "failures", "rejected")
+
+
+class CircuitOpenError(httpx.RequestError):
+    """Raised instead of calling a host that failed too many times in a row"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a host after `threshold` consecutive failures. Once `reset_after`
+    seconds have passed a single trial request goes through, closing the circuit if
+    it succeeds and opening it again otherwise.
+    """
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class HTTPClientPool:
+    """
+    Shared async HTTP clients for calls to external services, one per host so each
+    host gets its own connection limit and circuit breaker. Transport errors and 5xx
+    responses count as failures. Request, failure, rejection and latency counters are
+    kept per host. Clients are created on first use and closed with the application.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        max_connections_per_host: int,
+        circuit_threshold: int,
+        circuit_reset_after: float,
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_connections_per_host,
+        )
+        self.circuit_threshold = circuit_threshold
+        self.circuit_reset_after = circuit_reset_after
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.clients_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats: Dict[str, dict] = {}
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a request through the client of the url's host, see httpx.request"""
+        async with self._call(url) as (client, result):
+            response = await client.request(method, url, **kwargs)
+            result["status_code"] = response.status_code
+            return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("HEAD", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, url: str, **kwargs
+    ) -> AsyncIterator[httpx.Response]:
+        """Streams a response through the client of the url's host, see httpx.stream"""
+        async with self._call(url) as (client, result):
+            async with client.stream(method, url, **kwargs) as response:
+                result["status_code"] = response.status_code
+                yield response
+
+    def set_connection_limit(self, max_connections_per_host: int):
+        """
+        Changes the connection limit of the clients created from now on, for batch
+        scripts that fan out more requests per host than the API process does
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_connections_per_host,
+        )
+
+    async def close(self):
+        clients, self.clients = self.clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Counters and circuit state of each host since the process started"""
+        return {
+            host: {
+                **counters,
+                "circuit": self.breakers[host].state,
+                "average_seconds": round(
+                    counters["seconds"] / max(counters["requests"], 1), 3
+                ),
+            }
+            for host, counters in self.stats.items()
+        }
+
+    @asynccontextmanager
+    async def _call(self, url: str):
+        host = httpx.URL(url).host
+        breaker = self.breakers.setdefault(
+            host, CircuitBreaker(self.circuit_threshold, self.circuit_reset_after)
+        )
+        counters = self.stats.setdefault(
+            host, {**dict.fromkeys(HTTP_COUNTERS, 0), "seconds": 0.0}
+        )
+        if not breaker.allow():
+            counters["rejected"] += 1
+            raise CircuitOpenError(f"Circuit open for {host}, not calling {url}")
+
+        if self.clients_loop is not asyncio.get_running_loop():
+            # Connections can't outlive their event loop, e.g. between test runs
+            self.clients = {}
+            self.clients_loop = asyncio.get_running_loop()
+        client = self.clients.get(host)
+        if client is None:
+            client = self.clients[host] = httpx.AsyncClient(
+                timeout=self.timeout, limits=self.limits
+            )
+        result = {"status_code": None}
+        counters["requests"] += 1
+        started = time.perf_counter()
+        transport_failed = False
+        try:
+            yield client, result
+        except httpx.TransportError:
+            transport_failed = True
+            raise
+        finally:
+            counters["seconds"] += time.perf_counter() - started
+            status_code = result["status_code"]
+            if transport_failed or (status_code is not None and status_code >= 500):
+                counters["failures"] += 1
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+
+http_client = HTTPClientPool(
+    timeout=settings.HTTP_TIMEOUT_SECONDS,
+    max_connections_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+    circuit_threshold=settings.HTTP_CIRCUIT_FAILURES,
+    circuit_reset_after=settings.HTTP_CIRCUIT_RESET_SECONDS,
+)
@@ -13,7 +13,11 @@ from starlette.middleware.authentication import AuthenticationMiddleware
 from backend.config import settings
 from backend.db import db_connection
 from backend.exceptions import BadRequest, Conflict, Forbidden, NotFound, Unauthorized
+from backend.http_client import http_client
+from backend.reference_data import reference_data
 from backend.routes import add_api_end_points
+from backend.services.messaging.email_queue_service import email_queue_worker
+from backend.services.task_event_service import task_event_hub
 from backend.services.users.authentication_service import TokenAuthBackend
 
 
@@ -23,7 +27,15 @@ def get_application() -> FastAPI:
     @asynccontextmanager
     async def lifespan(app):
         await db_connection.connect()
+        await task_event_hub.start()
+        await reference_data.start(db_connection.database)
+        if settings.EMAIL_QUEUE_WORKER == "inline":
+            await email_queue_worker.start()
         yield
+        await email_queue_worker.stop()
+        await reference_data.stop()
+        await task_event_hub.stop()
+        await http_client.close()
         await db_connection.disconnect()
 
     _app = FastAPI(
@@ -1,5 +1,5 @@
 from datetime import date
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -82,10 +82,20 @@ class Pagination(BaseModel):
         )
 
 
+class CursorPagination(BaseModel):
+    """Pagination of a feed read with an opaque cursor instead of page numbers"""
+
+    has_next: Optional[bool] = Field(serialization_alias="hasNext", default=False)
+    next_cursor: Optional[str] = Field(serialization_alias="nextCursor", default=None)
+    per_page: Optional[int] = Field(serialization_alias="perPage", default=None)
+    # Cached count, may lag behind the feed by a few minutes
+    total: Optional[int] = None
+
+
 class ProjectActivityDTO(BaseModel):
     """DTO to hold all project activity"""
 
-    pagination: Optional[Pagination] = None
+    pagination: Optional[Union[Pagination, CursorPagination]] = None
     activity: Optional[List[TaskHistoryDTO]] = None
 
 
@@ -93,6 +103,8 @@ class ProjectLastActivityDTO(BaseModel):
     """DTO to hold latest status from project activity"""
 
     activity: Optional[List[TaskStatusDTO]] = Field(default_factory=list)
+    # Project version to poll from next, see Task.version
+    version: Optional[int] = None
 
 
 class OrganizationProjectsStatsDTO(BaseModel):
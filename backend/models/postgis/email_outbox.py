@@ -0,0 +1,180 @@
+import datetime
+from typing import List, Tuple
+
+from databases import Database
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, text
+
+from backend.db import Base
+from backend.models.postgis.statuses import EmailOutboxStatus
+from backend.models.postgis.utils import timestamp
+
+PENDING = EmailOutboxStatus.PENDING.value
+# A claimed email is offered again after this long if its worker never reports back
+EMAIL_CLAIM_LEASE = datetime.timedelta(minutes=10)
+EMAIL_RETRY_BASE_SECONDS = 30
+EMAIL_RETRY_MAX_SECONDS = 6 * 60 * 60
+
+
+def email_retry_delay(attempts: int) -> datetime.timedelta:
+    """Exponential backoff before retrying an email that failed attempts times"""
+    seconds = EMAIL_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return datetime.timedelta(seconds=min(seconds, EMAIL_RETRY_MAX_SECONDS))
+
+
+class EmailOutbox(Base):
+    """
+    Emails waiting to be sent. Requests only insert rows, which the email queue worker
+    claims in batches and delivers over a shared SMTP connection, retrying failures.
+    """
+
+    __tablename__ = "email_outbox"
+
+    id = Column(BigInteger, primary_key=True)
+    to_address = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_body = Column(String, nullable=False)
+    text_body = Column(String, nullable=False)
+    status = Column(Integer, nullable=False, default=PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=timestamp)
+    last_error = Column(String)
+    created = Column(DateTime, nullable=False, default=timestamp)
+    sent_date = Column(DateTime)
+
+    __table_args__ = (
+        Index(
+            "idx_email_outbox_pending",
+            "next_attempt_at",
+            postgresql_where=text(f"status = {PENDING}"),
+        ),
+    )
+
+    @staticmethod
+    async def enqueue(emails: List[dict], db: Database):
+        """
+        Queues emails given as dicts of to_address, subject, html_body and text_body
+        in a single statement
+        """
+        if not emails:
+            return
+
+        query = """
+            INSERT INTO email_outbox (
+                to_address, subject, html_body, text_body,
+                status, attempts, next_attempt_at, created
+            )
+            SELECT
+                email.to_address, email.subject, email.html_body, email.text_body,
+                :pending, 0, :now, :now
+            FROM unnest(
+                CAST(:to_addresses AS text[]),
+                CAST(:subjects AS text[]),
+                CAST(:html_bodies AS text[]),
+                CAST(:text_bodies AS text[])
+            ) AS email(to_address, subject, html_body, text_body)
+        """
+        await db.execute(
+            query,
+            values={
+                "pending": PENDING,
+                "now": timestamp(),
+                "to_addresses": [email["to_address"] for email in emails],
+                "subjects": [email["subject"] for email in emails],
+                "html_bodies": [email["html_body"] for email in emails],
+                "text_bodies": [email["text_body"] for email in emails],
+            },
+        )
+
+    @staticmethod
+    async def claim_batch(batch_size: int, db: Database) -> list:
+        """
+        Claims up to batch_size due emails, counting the attempt and leasing them so
+        concurrent workers skip them until the lease expires
+        """
+        now = timestamp()
+        query = """
+            UPDATE email_outbox
+            SET attempts = attempts + 1, next_attempt_at = :lease_until
+            WHERE id IN (
+                SELECT id FROM email_outbox
+                WHERE status = :pending AND next_attempt_at <= :now
+                ORDER BY next_attempt_at, id
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, to_address, subject, html_body, text_body, attempts
+        """
+        rows = await db.fetch_all(
+            query,
+            values={
+                "pending": PENDING,
+                "now": now,
+                "lease_until": now + EMAIL_CLAIM_LEASE,
+                "batch_size": batch_size,
+            },
+        )
+        return sorted(rows, key=lambda row: row["id"])
+
+    @staticmethod
+    async def mark_sent(email_ids: List[int], db: Database):
+        if not email_ids:
+            return
+
+        query = """
+            UPDATE email_outbox
+            SET status = :sent, sent_date = :now, last_error = NULL
+            WHERE id = ANY(:email_ids)
+        """
+        await db.execute(
+            query,
+            values={
+                "sent": EmailOutboxStatus.SENT.value,
+                "now": timestamp(),
+                "email_ids": email_ids,
+            },
+        )
+
+    @staticmethod
+    async def mark_failed(
+        failures: List[Tuple[dict, str]], max_attempts: int, db: Database
+    ):
+        """
+        Records the error of each failed (email, error) pair, scheduling another attempt
+        with exponential backoff or giving up once max_attempts is reached
+        """
+        if not failures:
+            return
+
+        now = timestamp()
+        query = """
+            UPDATE email_outbox
+            SET status = failure.status,
+                next_attempt_at = failure.next_attempt_at,
+                last_error = failure.error
+            FROM unnest(
+                CAST(:email_ids AS bigint[]),
+                CAST(:statuses AS integer[]),
+                CAST(:next_attempts AS timestamp[]),
+                CAST(:errors AS text[])
+            ) AS failure(id, status, next_attempt_at, error)
+            WHERE email_outbox.id = failure.id
+        """
+        await db.execute(
+            query,
+            values={
+                "email_ids": [email["id"] for email, _ in failures],
+                "statuses": [
+                    (
+                        EmailOutboxStatus.FAILED.value
+                        if email["attempts"] >= max_attempts
+                        else PENDING
+                    )
+                    for email, _ in failures
+                ],
+                "next_attempts": [
+                    now + email_retry_delay(email["attempts"])
+                    for email, _ in failures
+                ],
+                "errors": [error for _, error in failures],
+            },
+        )
@@ -0,0 +1,319 @@
+from typing import Dict
+
+from databases import Database
+from sqlalchemy import DDL, BigInteger, Column, Float, SmallInteger, event
+
+from backend.db import Base
+from backend.models.postgis.project import Project
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import Task
+from backend.models.postgis.user import User
+
+# Counters are spread over slots picked by backend pid, so concurrent transactions
+# changing tasks rarely wait on each other's counter row
+GLOBAL_STATS_SLOTS = 16
+GLOBAL_STATS_COUNTERS = (
+    "total_projects",
+    "total_mappers",
+    "total_validators",
+    "tasks_mapped",
+    "tasks_validated",
+    "total_area",
+    "total_mapped_area",
+    "total_validated_area",
+)
+MAPPED = TaskStatus.MAPPED.value
+VALIDATED = TaskStatus.VALIDATED.value
+
+
+class GlobalStats(Base):
+    """
+    Site wide totals shown on the homepage, kept up to date by triggers on tasks,
+    projects and users and reconciled periodically from the full tables. The totals
+    are the sum of all slots; areas add up the stored geodesic areas, in km².
+    """
+
+    __tablename__ = "global_stats"
+
+    slot = Column(SmallInteger, primary_key=True, autoincrement=False)
+    total_projects = Column(BigInteger, nullable=False, default=0)
+    total_mappers = Column(BigInteger, nullable=False, default=0)
+    total_validators = Column(BigInteger, nullable=False, default=0)
+    tasks_mapped = Column(BigInteger, nullable=False, default=0)
+    tasks_validated = Column(BigInteger, nullable=False, default=0)
+    total_area = Column(Float, nullable=False, default=0)
+    total_mapped_area = Column(Float, nullable=False, default=0)
+    total_validated_area = Column(Float, nullable=False, default=0)
+
+    @staticmethod
+    async def get(db: Database):
+        """
+        Gets the totals along with the number of mappers holding a lock, which is
+        counted live from the few locked tasks
+        """
+        query = f"""
+            SELECT {GlobalStats._sums()},
+                (
+                    SELECT COUNT(DISTINCT locked_by) FROM tasks
+                    WHERE locked_by IS NOT NULL
+                ) AS mappers_online
+            FROM global_stats
+        """
+        return await db.fetch_one(query)
+
+    @staticmethod
+    async def reconcile(db: Database, dry_run: bool = False) -> Dict[str, tuple]:
+        """
+        Recomputes the totals from the full tables and adds the drift to the first
+        slot, unless it is a dry run. Stored and actual totals are read by a single
+        statement so they share a snapshot and concurrent changes are not lost.
+        :return: (stored, actual) values of each counter that drifted
+        """
+        actual_columns = ", ".join(
+            f"actual.{counter} AS actual_{counter}" for counter in GLOBAL_STATS_COUNTERS
+        )
+        query = f"""
+            WITH stored AS (
+                SELECT {GlobalStats._sums()} FROM global_stats
+            ),
+            actual AS (
+                SELECT
+                    (SELECT COUNT(*) FROM projects) AS total_projects,
+                    (SELECT COUNT(*) FROM users) AS total_mappers,
+                    COUNT(DISTINCT validated_by) FILTER (
+                        WHERE task_status = {VALIDATED}
+                    ) AS total_validators,
+                    COUNT(*) AS tasks_mapped,
+                    COUNT(*) FILTER (WHERE task_status = {VALIDATED}) AS tasks_validated,
+                    (
+                        SELECT COALESCE(SUM(area_km2), 0) FROM projects
+                    ) AS total_area,
+                    COALESCE(SUM(area_km2) FILTER (
+                        WHERE task_status = {MAPPED}
+                    ), 0) AS total_mapped_area,
+                    COALESCE(SUM(area_km2) FILTER (
+                        WHERE task_status = {VALIDATED}
+                    ), 0) AS total_validated_area
+                FROM tasks
+                WHERE task_status IN ({MAPPED}, {VALIDATED})
+            )
+            SELECT stored.*, {actual_columns}
+            FROM stored, actual
+        """
+        row = await db.fetch_one(query)
+        drift = {
+            counter: (row[counter], row[f"actual_{counter}"])
+            for counter in GLOBAL_STATS_COUNTERS
+            if not GlobalStats._matches(row[counter], row[f"actual_{counter}"])
+        }
+        if drift and not dry_run:
+            assignments = ", ".join(
+                f"{counter} = {counter} + :{counter}" for counter in drift
+            )
+            await db.execute(
+                f"UPDATE global_stats SET {assignments} WHERE slot = 0",
+                values={
+                    counter: actual - stored
+                    for counter, (stored, actual) in drift.items()
+                },
+            )
+        return drift
+
+    @staticmethod
+    def _sums() -> str:
+        return ", ".join(
+            f"CAST(SUM({counter}) AS {GlobalStats.__table__.c[counter].type}) AS {counter}"
+            for counter in GLOBAL_STATS_COUNTERS
+        )
+
+    @staticmethod
+    def _matches(stored, actual) -> bool:
+        if isinstance(actual, float):
+            # Summing areas in a different order gives slightly different floats
+            return abs(stored - actual) < 0.001
+        return stored == actual
+
+
+def counter_trigger_function(name: str, delta_queries: Dict[str, str], update: str):
+    """
+    Builds a statement level trigger function applying the changes of the rows in the
+    transition tables to the slot of the current backend. delta_queries gives, per
+    operation, the query returning the changed rows with a sign of 1 for new values and
+    -1 for old ones; update is the UPDATE of global_stats g run against them.
+    """
+    branches = "\n".join(
+        f"""
+            {'IF' if index == 0 else 'ELSIF'} TG_OP = '{operation}' THEN
+                delta_query := $q${query}$q$;"""
+        for index, (operation, query) in enumerate(delta_queries.items())
+    )
+    return f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+            {branches}
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q${update}
+                AND g.slot = mod(pg_backend_pid(), {GLOBAL_STATS_SLOTS})$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+
+def counter_triggers(table: str, function: str, operations: tuple) -> list:
+    transition_tables = {
+        "INSERT": f"NEW TABLE AS new_{table}",
+        "UPDATE": f"OLD TABLE AS old_{table} NEW TABLE AS new_{table}",
+        "DELETE": f"OLD TABLE AS old_{table}",
+    }
+    return [
+        f"""
+        CREATE TRIGGER {table}_global_stats_{operation.lower()}
+        AFTER {operation} ON {table}
+        REFERENCING {transition_tables[operation]}
+        FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+        """
+        for operation in operations
+    ]
+
+
+TASKS_GLOBAL_STATS_FUNCTION = counter_trigger_function(
+    "tasks_global_stats",
+    {
+        "INSERT": "SELECT 1 AS sign, task_status, validated_by, area_km2 FROM new_tasks",
+        "DELETE": "SELECT -1 AS sign, task_status, validated_by, area_km2 FROM old_tasks",
+        "UPDATE": """
+            SELECT d.*
+            FROM new_tasks n
+            JOIN old_tasks o ON o.id = n.id AND o.project_id = n.project_id
+            CROSS JOIN LATERAL (
+                VALUES
+                    (1, n.task_status, n.validated_by, n.area_km2),
+                    (-1, o.task_status, o.validated_by, o.area_km2)
+            ) AS d(sign, task_status, validated_by, area_km2)
+            WHERE n.task_status IS DISTINCT FROM o.task_status
+            OR n.validated_by IS DISTINCT FROM o.validated_by
+            OR n.area_km2 IS DISTINCT FROM o.area_km2
+        """,
+    },
+    f"""
+        , changes AS (
+            SELECT * FROM delta WHERE task_status IN ({MAPPED}, {VALIDATED})
+        ),
+        validators AS (
+            SELECT validated_by AS user_id, SUM(sign) AS change
+            FROM changes
+            WHERE task_status = {VALIDATED} AND validated_by IS NOT NULL
+            GROUP BY validated_by
+        ),
+        validator_change AS (
+            -- Users going from none to some validated tasks or back
+            SELECT COALESCE(SUM(
+                (c.validated > 0)::integer - (c.validated - v.change > 0)::integer
+            ), 0) AS change
+            FROM validators v
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*) AS validated FROM tasks t
+                WHERE t.validated_by = v.user_id AND t.task_status = {VALIDATED}
+            ) c
+        ),
+        totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS tasks_mapped,
+                COALESCE(SUM(sign) FILTER (
+                    WHERE task_status = {VALIDATED}
+                ), 0) AS tasks_validated,
+                COALESCE(SUM(sign * area_km2) FILTER (
+                    WHERE task_status = {MAPPED}
+                ), 0) AS mapped_area,
+                COALESCE(SUM(sign * area_km2) FILTER (
+                    WHERE task_status = {VALIDATED}
+                ), 0) AS validated_area
+            FROM changes
+        )
+        UPDATE global_stats g
+        SET tasks_mapped = g.tasks_mapped + totals.tasks_mapped,
+            tasks_validated = g.tasks_validated + totals.tasks_validated,
+            total_mapped_area = g.total_mapped_area + totals.mapped_area,
+            total_validated_area = g.total_validated_area + totals.validated_area,
+            total_validators = g.total_validators + validator_change.change
+        FROM totals, validator_change
+        WHERE EXISTS (SELECT 1 FROM changes)
+    """,
+)
+
+PROJECTS_GLOBAL_STATS_FUNCTION = counter_trigger_function(
+    "projects_global_stats",
+    {
+        "INSERT": "SELECT 1 AS sign, area_km2 FROM new_projects",
+        "DELETE": "SELECT -1 AS sign, area_km2 FROM old_projects",
+        "UPDATE": """
+            SELECT d.*
+            FROM new_projects n
+            JOIN old_projects o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (1, n.area_km2), (-1, o.area_km2)
+            ) AS d(sign, area_km2)
+            WHERE n.area_km2 IS DISTINCT FROM o.area_km2
+        """,
+    },
+    """
+        , totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS projects,
+                COALESCE(SUM(sign * area_km2), 0) AS area
+            FROM delta
+        )
+        UPDATE global_stats g
+        SET total_projects = g.total_projects + totals.projects,
+            total_area = g.total_area + totals.area
+        FROM totals
+        WHERE EXISTS (SELECT 1 FROM delta)
+    """,
+)
+
+USERS_GLOBAL_STATS_FUNCTION = counter_trigger_function(
+    "users_global_stats",
+    {
+        "INSERT": "SELECT 1 AS sign FROM new_users",
+        "DELETE": "SELECT -1 AS sign FROM old_users",
+    },
+    """
+        UPDATE global_stats g
+        SET total_mappers = g.total_mappers + (SELECT SUM(sign) FROM delta)
+        WHERE EXISTS (SELECT 1 FROM delta)
+    """,
+)
+
+GLOBAL_STATS_TRIGGERS = {
+    GlobalStats.__table__: [
+        f"""
+        INSERT INTO global_stats (
+            slot, {", ".join(GLOBAL_STATS_COUNTERS)}
+        )
+        SELECT slot, {", ".join("0" for _ in GLOBAL_STATS_COUNTERS)}
+        FROM generate_series(0, {GLOBAL_STATS_SLOTS - 1}) AS slot
+        """,
+    ],
+    Task.__table__: [
+        TASKS_GLOBAL_STATS_FUNCTION,
+        *counter_triggers(
+            "tasks", "tasks_global_stats", ("INSERT", "UPDATE", "DELETE")
+        ),
+    ],
+    Project.__table__: [
+        PROJECTS_GLOBAL_STATS_FUNCTION,
+        *counter_triggers(
+            "projects", "projects_global_stats", ("INSERT", "UPDATE", "DELETE")
+        ),
+    ],
+    User.__table__: [
+        USERS_GLOBAL_STATS_FUNCTION,
+        *counter_triggers("users", "users_global_stats", ("INSERT", "DELETE")),
+    ],
+}
+for table, statements in GLOBAL_STATS_TRIGGERS.items():
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement))
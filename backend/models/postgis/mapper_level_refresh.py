@@ -0,0 +1,116 @@
+from typing import List, Optional
+
+from databases import Database
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from backend.db import Base
+from backend.models.postgis.utils import timestamp
+
+
+class MapperLevelRefreshRun(Base):
+    """
+    Progress of a mapper level refresh over all users. Users are processed in id
+    order and the run is checkpointed after each batch, so an interrupted run can be
+    resumed after the last user it committed. Users whose stats couldn't be fetched
+    are kept on the run and retried before it finishes.
+    """
+
+    __tablename__ = "mapper_level_refresh_runs"
+
+    id = Column(Integer, primary_key=True)
+    only_missing = Column(Boolean, nullable=False, default=False)
+    started = Column(DateTime, nullable=False, default=timestamp)
+    checkpointed = Column(DateTime, nullable=False, default=timestamp)
+    finished = Column(DateTime)
+    # Id of the last user of the last committed batch
+    last_user_id = Column(BigInteger, nullable=False, default=0)
+    users_processed = Column(Integer, nullable=False, default=0)
+    users_failed = Column(Integer, nullable=False, default=0)
+    # Users of the committed batches whose stats couldn't be fetched yet
+    failed_user_ids = Column(ARRAY(BigInteger), nullable=False, default=[])
+
+    @staticmethod
+    async def start(only_missing: bool, db: Database):
+        """Starts a run from the first user"""
+        now = timestamp()
+        query = """
+            INSERT INTO mapper_level_refresh_runs (
+                only_missing, started, checkpointed, last_user_id,
+                users_processed, users_failed, failed_user_ids
+            )
+            VALUES (:only_missing, :now, :now, 0, 0, 0, '{}')
+            RETURNING *
+        """
+        return await db.fetch_one(
+            query, values={"only_missing": only_missing, "now": now}
+        )
+
+    @staticmethod
+    async def get_unfinished(only_missing: bool, db: Database) -> Optional[dict]:
+        """Gets the latest run of the same kind that didn't finish, if any"""
+        query = """
+            SELECT * FROM mapper_level_refresh_runs
+            WHERE finished IS NULL AND only_missing = :only_missing
+            ORDER BY id DESC
+            LIMIT 1
+        """
+        return await db.fetch_one(query, values={"only_missing": only_missing})
+
+    @staticmethod
+    async def checkpoint(
+        run_id: int,
+        last_user_id: int,
+        processed: int,
+        failed_user_ids: List[int],
+        db: Database,
+    ):
+        """Records a committed batch, to be called in the batch's transaction"""
+        query = """
+            UPDATE mapper_level_refresh_runs
+            SET last_user_id = :last_user_id,
+                users_processed = users_processed + :processed,
+                users_failed = users_failed + :failed,
+                failed_user_ids = failed_user_ids || CAST(:failed_user_ids AS bigint[]),
+                checkpointed = :now
+            WHERE id = :run_id
+        """
+        await db.execute(
+            query,
+            values={
+                "run_id": run_id,
+                "last_user_id": last_user_id,
+                "processed": processed,
+                "failed": len(failed_user_ids),
+                "failed_user_ids": failed_user_ids,
+                "now": timestamp(),
+            },
+        )
+
+    @staticmethod
+    async def record_retry(run_id: int, failed_user_ids: List[int], db: Database):
+        """Replaces the failed users by those still failing after their retry"""
+        query = """
+            UPDATE mapper_level_refresh_runs
+            SET users_failed = users_failed
+                    - cardinality(failed_user_ids) + :failed,
+                failed_user_ids = CAST(:failed_user_ids AS bigint[]),
+                checkpointed = :now
+            WHERE id = :run_id
+        """
+        await db.execute(
+            query,
+            values={
+                "run_id": run_id,
+                "failed": len(failed_user_ids),
+                "failed_user_ids": failed_user_ids,
+                "now": timestamp(),
+            },
+        )
+
+    @staticmethod
+    async def finish(run_id: int, db: Database):
+        await db.execute(
+            "UPDATE mapper_level_refresh_runs SET finished = :now WHERE id = :run_id",
+            values={"run_id": run_id, "now": timestamp()},
+        )
@@ -1,10 +1,9 @@
+import datetime
 import json
-import os
 import re
-from typing import Optional
+from typing import Dict, List, Optional
 
 import geojson
-import requests
 from cachetools import TTLCache
 from databases import Database
 from fastapi import HTTPException
@@ -14,16 +13,19 @@ from loguru import logger
 from shapely import wkb
 from shapely.geometry import shape
 from sqlalchemy import (
+    DDL,
     BigInteger,
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
     Index,
     Integer,
     String,
     Table,
     delete,
+    event,
     func,
     inspect,
     orm,
@@ -36,6 +38,7 @@ from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import backref, relationship
 
+from backend.cache import PROJECTS_TAG, cache, project_tag
 from backend.config import settings
 from backend.db import Base
 from backend.exceptions import NotFound
@@ -59,8 +62,10 @@ from backend.models.postgis.custom_editors import CustomEditor
 from backend.models.postgis.interests import Interest, project_interests
 from backend.models.postgis.organisation import Organisation
 from backend.models.postgis.priority_area import PriorityArea, project_priority_areas
+from backend.models.postgis.project_activity_rollup import ProjectActivityRollup
 from backend.models.postgis.project_chat import ProjectChat
 from backend.models.postgis.project_info import ProjectInfo
+from backend.models.postgis.reverse_geocode import ReverseGeocode
 from backend.models.postgis.statuses import (
     Editors,
     MappingPermission,
@@ -76,7 +81,7 @@ from backend.models.postgis.statuses import (
 from backend.models.postgis.task import Task
 from backend.models.postgis.team import Team
 from backend.models.postgis.user import User
-from backend.models.postgis.utils import timestamp
+from backend.models.postgis.utils import geodesic_area_triggers, timestamp
 from backend.services.grid.grid_service import GridService
 
 # Secondary table defining many-to-many join for projects that were favorited by users.
@@ -124,6 +129,9 @@ class ProjectTeams(Base):
 
 # cache mapper counts for 30 seconds
 active_mappers_cache = TTLCache(maxsize=1024, ttl=30)
+# Titles only change with project updates, which invalidate them. The memory cache
+# backend only drops them in the worker making the update, so others can lag by this
+PROJECT_TITLE_CACHE_TTL = 5 * 60
 
 
 class Project(Base):
@@ -191,6 +199,8 @@ class Project(Base):
     license_id = Column(Integer, ForeignKey("licenses.id", name="fk_licenses"))
     geometry = Column(Geometry("MULTIPOLYGON", srid=4326), nullable=False)
     centroid = Column(Geometry("POINT", srid=4326), nullable=False)
+    # Geodesic area of the AOI, maintained by a trigger
+    area_km2 = Column(Float)
     country = Column(ARRAY(String), default=[])
     task_creation_mode = Column(
         Integer, default=TaskCreationMode.GRID.value, nullable=False
@@ -326,7 +336,7 @@ class Project(Base):
             else f"{default_comment}-{self.id}"
         )
 
-    def set_country_info(self):
+    async def set_country_info(self, db: Database):
         """Sets the default country based on centroid"""
         if not self.centroid:
             logger.debug("Skipping country lookup due to missing centroid")
@@ -349,30 +359,9 @@ class Project(Base):
         centroid = WKTElement(centroid_wkt, srid=4326)
         centroid = to_shape(centroid)
         lat, lng = (centroid.y, centroid.x)
-        url = "{0}/reverse?format=jsonv2&lat={1}&lon={2}&accept-language=en".format(
-            settings.OSM_NOMINATIM_SERVER_URL, lat, lng
-        )
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/58.0.3029.110 Safari/537.3"
-            ),
-            "Referer": os.environ.get("TM_APP_BASE_URL", "https://example.com"),
-        }
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            country_info = response.json()  # returns a dict
-            if country_info["address"].get("country") is not None:
-                self.country = [country_info["address"]["country"]]
-        except (
-            KeyError,
-            AttributeError,
-            requests.exceptions.ConnectionError,
-            requests.exceptions.HTTPError,
-        ) as e:
-            logger.debug(e, exc_info=True)
+        country = await ReverseGeocode.get_country(lat, lng, db)
+        if country is not None:
+            self.country = [country]
 
     async def create(self, project_name: str, db: Database):
         """Creates and saves the current model to the DB"""
@@ -404,20 +393,8 @@ class Project(Base):
             .values(changeset_comment=self.changeset_comment)
         )
 
-        for task in self.tasks:
-            await db.execute(
-                Task.__table__.insert().values(
-                    id=task.id,
-                    project_id=project,
-                    x=task.x,
-                    y=task.y,
-                    zoom=task.zoom,
-                    is_square=task.is_square,
-                    task_status=TaskStatus.READY.value,
-                    extra_properties=task.extra_properties,
-                    geometry=task.geometry,
-                )
-            )
+        await Task.insert_tasks(project, self.tasks, db)
+        await cache.invalidate(PROJECTS_TAG)
 
         return project
 
@@ -430,20 +407,8 @@ class Project(Base):
             Project.__table__.update().where(Project.id == self.id).values(**columns)
         )
 
-        for task in self.tasks:
-            await db.execute(
-                Task.__table__.insert().values(
-                    id=task.id,
-                    project_id=self.id,
-                    x=task.x,
-                    y=task.y,
-                    zoom=task.zoom,
-                    is_square=task.is_square,
-                    task_status=TaskStatus.READY.value,
-                    extra_properties=task.extra_properties,
-                    geometry=task.geometry,
-                )
-            )
+        await Task.insert_tasks(self.id, self.tasks, db)
+        await cache.invalidate(project_tag(self.id), PROJECTS_TAG)
 
     @staticmethod
     async def clone(
@@ -890,7 +855,7 @@ class Project(Base):
 
         # try to update country info if that information is not present
         if not self.country:
-            self.set_country_info()
+            await self.set_country_info(db)
 
         columns = {
             c.key: getattr(self, c.key) for c in inspect(self).mapper.column_attrs
@@ -905,11 +870,14 @@ class Project(Base):
         await db.execute(
             self.__table__.update().where(Project.id == self.id).values(**columns)
         )
+        await cache.invalidate(project_tag(self.id), PROJECTS_TAG)
 
     async def delete(self, db: Database):
         """Deletes the current project and related records from the database using raw SQL."""
         # List of tables to delete from, in the order required to satisfy foreign key constraints
         related_tables = [
+            "project_contributors",
+            "project_activity_rollup",
             "project_favorites",
             "campaign_projects",
             "project_custom_editors",
@@ -944,6 +912,7 @@ class Project(Base):
             await db.execute(
                 "DELETE FROM projects WHERE id = :project_id", {"project_id": self.id}
             )
+        await cache.invalidate(project_tag(self.id), PROJECTS_TAG)
 
     @staticmethod
     async def exists(project_id: int, db: Database) -> bool:
@@ -1146,8 +1115,7 @@ class Project(Base):
         stats_dto = ProjectUserStatsDTO()
 
         total_mapping_query = """
-            SELECT
-                SUM(TO_TIMESTAMP(action_text, 'HH24:MI:SS')::TIME - '00:00:00'::TIME) AS total_time
+            SELECT SUM(duration_seconds) AS total_time
             FROM task_history
             WHERE action IN ('LOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_MAPPING')
             AND project_id = :project_id
@@ -1158,7 +1126,7 @@ class Project(Base):
         )
 
         total_mapping_time = (
-            total_mapping_result["total_time"].total_seconds()
+            total_mapping_result["total_time"]
             if total_mapping_result and total_mapping_result["total_time"]
             else 0
         )
@@ -1166,8 +1134,7 @@ class Project(Base):
         stats_dto.total_time_spent += total_mapping_time
 
         total_validation_query = """
-            SELECT
-                SUM(TO_TIMESTAMP(action_text, 'HH24:MI:SS')::TIME - '00:00:00'::TIME) AS total_time
+            SELECT SUM(duration_seconds) AS total_time
             FROM task_history
             WHERE action IN ('LOCKED_FOR_VALIDATION', 'AUTO_UNLOCKED_FOR_VALIDATION')
             AND project_id = :project_id
@@ -1178,7 +1145,7 @@ class Project(Base):
         )
 
         total_validation_time = (
-            total_validation_result["total_time"].total_seconds()
+            total_validation_result["total_time"]
             if total_validation_result and total_validation_result["total_time"]
             else 0
         )
@@ -1193,7 +1160,7 @@ class Project(Base):
         project_stats.project_id = project_id
         project_query = """
             SELECT
-                ST_Area(geometry, TRUE) / 1000000 AS area,
+                area_km2 AS area,
                 ST_AsGeoJSON(centroid) AS centroid_geojson,
                 tasks_mapped,
                 tasks_validated,
@@ -1264,61 +1231,21 @@ class Project(Base):
         project_stats.average_mapping_time = 0
         project_stats.average_validation_time = 0
 
-        # Query total mapping time and tasks
-        total_mapping_query = """
-            SELECT
-                SUM(TO_TIMESTAMP(action_text, 'HH24:MI:SS')::TIME - '00:00:00'::TIME) AS total_time,
-                COUNT(action) AS total_tasks
-            FROM task_history
-            WHERE action IN ('LOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_MAPPING')
-            AND project_id = :project_id
-        """
-        total_mapping_result = await database.fetch_one(
-            total_mapping_query, values={"project_id": project_id}
-        )
-        total_mapping_time, total_mapping_tasks = (
-            (total_mapping_result["total_time"], total_mapping_result["total_tasks"])
-            if total_mapping_result
-            else (0, 0)
-        )
-
-        if total_mapping_tasks > 0:
-            total_mapping_time = total_mapping_time.total_seconds()
+        # Mapping and validation time come from the activity rollup of the project
+        rollup = await ProjectActivityRollup.get(project_id, database)
+        if rollup and rollup["mapping_count"] > 0:
+            total_mapping_time = rollup["mapping_seconds"]
             project_stats.total_mapping_time = total_mapping_time
             project_stats.average_mapping_time = (
-                total_mapping_time / total_mapping_tasks
+                total_mapping_time / rollup["mapping_count"]
             )
             project_stats.total_time_spent += total_mapping_time
 
-        # Query total validation time and tasks
-        total_validation_query = """
-            SELECT
-                SUM(TO_TIMESTAMP(action_text, 'HH24:MI:SS')::TIME - '00:00:00'::TIME) AS total_time,
-                COUNT(action) AS total_tasks
-            FROM task_history
-            WHERE action IN ('LOCKED_FOR_VALIDATION', 'AUTO_UNLOCKED_FOR_VALIDATION')
-            AND project_id = :project_id
-        """
-        total_validation_result = await database.fetch_one(
-            total_validation_query, values={"project_id": project_id}
-        )
-
-        # Safely unpack the results, or default to (0, 0) if the query returns no results
-        total_validation_time, total_validation_tasks = (
-            (
-                total_validation_result["total_time"],
-                total_validation_result["total_tasks"],
-            )
-            if total_validation_result
-            else (0, 0)
-        )
-
-        # If there are validation tasks, convert the time to total seconds and update project stats
-        if total_validation_tasks > 0:
-            total_validation_time = total_validation_time.total_seconds()
+        if rollup and rollup["validation_count"] > 0:
+            total_validation_time = rollup["validation_seconds"]
             project_stats.total_validation_time = total_validation_time
             project_stats.average_validation_time = (
-                total_validation_time / total_validation_tasks
+                total_validation_time / rollup["validation_count"]
             )
             project_stats.total_time_spent += total_validation_time
 
@@ -1618,16 +1545,83 @@ class Project(Base):
 
     @staticmethod
     async def get_project_total_contributions(project_id: int, db) -> int:
-        query = """
-            SELECT COUNT(DISTINCT user_id)
-            FROM task_history
-            WHERE project_id = :project_id AND action != 'COMMENT'
-        """
+        totals = await ProjectActivityRollup.get_total_contributors([project_id], db)
+        return totals[project_id]
 
-        result = await db.fetch_one(query=query, values={"project_id": project_id})
+    @staticmethod
+    async def get_total_contributions_for_projects(
+        project_ids: List[int], db: Database
+    ) -> Dict[int, int]:
+        """Count distinct contributors of several projects in a single query"""
+        return await ProjectActivityRollup.get_total_contributors(project_ids, db)
 
-        # fetch_one returns a single record, use index [0] to get the first column value
-        return result[0] if result else 0
+    @staticmethod
+    async def refresh_task_counters(
+        db: Database,
+        updated_since: Optional[datetime.datetime] = None,
+        dry_run: bool = False,
+    ) -> List[dict]:
+        """
+        Recomputes the stored task counters of all projects, or of the projects updated
+        since the supplied date, with a single grouped aggregate over tasks.
+        :param dry_run: only report the drift, leave the stored counters untouched
+        :return: projects whose stored counters differed, with stored and true values
+        """
+        project_filter = (
+            "WHERE p.last_updated > :updated_since" if updated_since else ""
+        )
+        drift_query = f"""
+            WITH counts AS (
+                SELECT
+                    p.id AS project_id,
+                    COUNT(t.id) AS total_tasks,
+                    COUNT(t.id) FILTER (WHERE t.task_status = :mapped) AS tasks_mapped,
+                    COUNT(t.id) FILTER (WHERE t.task_status = :validated) AS tasks_validated,
+                    COUNT(t.id) FILTER (WHERE t.task_status = :bad_imagery) AS tasks_bad_imagery
+                FROM projects p
+                LEFT JOIN tasks t ON t.project_id = p.id
+                {project_filter}
+                GROUP BY p.id
+            ),
+            drift AS (
+                SELECT
+                    c.*,
+                    p.total_tasks AS stored_total_tasks,
+                    p.tasks_mapped AS stored_tasks_mapped,
+                    p.tasks_validated AS stored_tasks_validated,
+                    p.tasks_bad_imagery AS stored_tasks_bad_imagery
+                FROM counts c
+                JOIN projects p ON p.id = c.project_id
+                WHERE (p.total_tasks, p.tasks_mapped, p.tasks_validated, p.tasks_bad_imagery)
+                    IS DISTINCT FROM
+                    (c.total_tasks, c.tasks_mapped, c.tasks_validated, c.tasks_bad_imagery)
+            )
+        """
+        if dry_run:
+            query = drift_query + "SELECT * FROM drift ORDER BY project_id"
+        else:
+            query = (
+                drift_query
+                + """
+                UPDATE projects p
+                SET total_tasks = d.total_tasks,
+                    tasks_mapped = d.tasks_mapped,
+                    tasks_validated = d.tasks_validated,
+                    tasks_bad_imagery = d.tasks_bad_imagery
+                FROM drift d
+                WHERE p.id = d.project_id
+                RETURNING d.*
+            """
+            )
+        values = {
+            "mapped": TaskStatus.MAPPED.value,
+            "validated": TaskStatus.VALIDATED.value,
+            "bad_imagery": TaskStatus.BADIMAGERY.value,
+        }
+        if updated_since:
+            values["updated_since"] = updated_since
+        rows = await db.fetch_all(query, values=values)
+        return [dict(row) for row in rows]
 
     @staticmethod
     async def get_aoi_geometry_as_geojson(project_id: int, db: Database) -> dict:
@@ -1666,11 +1660,54 @@ class Project(Base):
     #     return project_info.name
 
     @staticmethod
-    async def get_project_title(db: Database, project_id: int, preferred_locale):
-        project_info = await ProjectInfo.get_dto_for_locale(
-            db, project_id, preferred_locale
+    async def get_project_title(
+        db: Database, project_id: int, preferred_locale: Optional[str] = None
+    ) -> Optional[str]:
+        """Gets the title of the project, see get_project_titles"""
+        titles = await Project.get_project_titles(db, [project_id], preferred_locale)
+        return titles.get(project_id)
+
+    @staticmethod
+    async def get_project_titles(
+        db: Database, project_ids: List[int], preferred_locale: Optional[str] = None
+    ) -> Dict[int, Optional[str]]:
+        """
+        Gets the titles of several projects in the preferred locale, falling back to
+        the default locale of each project when the title is not translated. Titles
+        are cached per project and locale until the project is updated.
+        :param preferred_locale: Locale requested by the user, the default locale of
+                                 each project when not set
+        :return: Dict of project_id to title, None for projects without a title
+        """
+
+        async def load(keys: List[tuple]) -> Dict[tuple, Optional[str]]:
+            query = """
+                SELECT p.id, COALESCE(NULLIF(requested.name, ''), fallback.name) AS name
+                FROM projects p
+                LEFT JOIN project_info requested
+                    ON requested.project_id = p.id AND requested.locale = :locale
+                LEFT JOIN project_info fallback
+                    ON fallback.project_id = p.id AND fallback.locale = p.default_locale
+                WHERE p.id = ANY(:project_ids)
+            """
+            rows = await db.fetch_all(
+                query,
+                values={
+                    "project_ids": [project_id for project_id, _ in keys],
+                    "locale": preferred_locale,
+                },
+            )
+            return {(row["id"], preferred_locale): row["name"] for row in rows}
+
+        titles = await cache.get_many(
+            "project_title",
+            [(project_id, preferred_locale) for project_id in project_ids],
+            load,
+            ttl=PROJECT_TITLE_CACHE_TTL,
+            key_builder=lambda key: f"{key[0]}:{key[1]}",
+            tags=lambda key: [project_tag(key[0])],
         )
-        return project_info.name
+        return {project_id: title for (project_id, _), title in titles.items()}
 
     @staticmethod
     async def get_active_mappers(project_id: int, database: Database) -> int:
@@ -1695,6 +1732,33 @@ class Project(Base):
         # Handle the case where count might be None
         return count or 0
 
+    @staticmethod
+    async def get_active_mappers_for_projects(
+        project_ids: List[int], database: Database
+    ) -> Dict[int, int]:
+        """Get count of active mappers of several projects in a single query"""
+        if not project_ids:
+            return {}
+
+        query = """
+            SELECT project_id, COUNT(*) AS active_mappers
+            FROM (
+                SELECT DISTINCT project_id, locked_by
+                FROM tasks
+                WHERE task_status IN (:locked_for_mapping, :locked_for_validation)
+                AND project_id = ANY(:project_ids)
+            ) AS active_mappers
+            GROUP BY project_id
+        """
+        values = {
+            "project_ids": project_ids,
+            "locked_for_mapping": TaskStatus.LOCKED_FOR_MAPPING.value,
+            "locked_for_validation": TaskStatus.LOCKED_FOR_VALIDATION.value,
+        }
+        rows = await database.fetch_all(query, values)
+        counts = {row["project_id"]: row["active_mappers"] for row in rows}
+        return {project_id: counts.get(project_id, 0) for project_id in project_ids}
+
     @staticmethod
     async def get_project_and_base_dto(project_id: int, db: Database) -> ProjectDTO:
         """Populates a project DTO with properties common to all roles"""
@@ -1951,9 +2015,10 @@ class Project(Base):
         order_by: Optional[str] = None,
         order_by_type: str = "ASC",
         status: Optional[int] = None,
+        since: Optional[int] = None,
     ):
         return await Task.get_tasks_as_geojson_feature_collection(
-            db, project_id, task_ids_str, order_by, order_by_type, status
+            db, project_id, task_ids_str, order_by, order_by_type, status, since
         )
 
     @staticmethod
@@ -2039,6 +2104,29 @@ class Project(Base):
         campaign_list = [ListCampaignDTO(**row) for row in rows]
         return campaign_list
 
+    @staticmethod
+    async def get_campaigns_for_projects(
+        project_ids: List[int], db: Database
+    ) -> Dict[int, List[ListCampaignDTO]]:
+        """Get the campaigns of several projects in a single query"""
+        if not project_ids:
+            return {}
+
+        query = """
+            SELECT cp.project_id, c.id, c.name
+            FROM campaign_projects cp
+            JOIN campaigns c ON cp.campaign_id = c.id
+            WHERE cp.project_id = ANY(:project_ids)
+        """
+        rows = await db.fetch_all(query=query, values={"project_ids": project_ids})
+
+        campaigns = {project_id: [] for project_id in project_ids}
+        for row in rows:
+            campaigns[row["project_id"]].append(
+                ListCampaignDTO(id=row["id"], name=row["name"])
+            )
+        return campaigns
+
     @staticmethod
     async def clear_existing_priority_areas(db: Database, project_id: int):
         """Clear existing priority area links and delete the corresponding priority areas for the given project ID."""
@@ -2085,3 +2173,7 @@ class Project(Base):
 
 # Add index on project geometry
 Index("idx_geometry", Project.geometry, postgresql_using="gist")
+
+# Compute the geodesic area once per geometry change rather than on every read
+for statement in geodesic_area_triggers(Project.__tablename__):
+    event.listen(Project.__table__, "after_create", DDL(statement))
@@ -0,0 +1,272 @@
+import datetime
+from typing import Dict, List, Optional
+
+from databases import Database
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer
+
+from backend.db import Base
+
+MAPPING_TIME_ACTIONS = ("LOCKED_FOR_MAPPING", "AUTO_UNLOCKED_FOR_MAPPING")
+VALIDATION_TIME_ACTIONS = ("LOCKED_FOR_VALIDATION", "AUTO_UNLOCKED_FOR_VALIDATION")
+
+
+class ProjectContributor(Base):
+    """
+    Users with a non comment action on a project, one row each. The primary key makes
+    counting a new contributor in the rollup safe when their first actions race.
+    """
+
+    __tablename__ = "project_contributors"
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id"), primary_key=True)
+
+
+class ProjectActivityRollup(Base):
+    """
+    Per project aggregates of the task history, kept up to date incrementally as history
+    is written so stats and search can read a single row instead of scanning the history.
+    """
+
+    __tablename__ = "project_activity_rollup"
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    total_contributors = Column(Integer, nullable=False, default=0)
+    # Time spent and number of lock actions counted for the average mapping time
+    mapping_seconds = Column(BigInteger, nullable=False, default=0)
+    mapping_count = Column(Integer, nullable=False, default=0)
+    # Time spent and number of lock actions counted for the average validation time
+    validation_seconds = Column(BigInteger, nullable=False, default=0)
+    validation_count = Column(Integer, nullable=False, default=0)
+    comment_count = Column(Integer, nullable=False, default=0)
+    last_activity = Column(DateTime)
+
+    @staticmethod
+    async def get(project_id: int, db: Database):
+        """Gets the rollup row of the project, None if the project has no history yet"""
+        query = """
+            SELECT * FROM project_activity_rollup WHERE project_id = :project_id
+        """
+        return await db.fetch_one(query, values={"project_id": project_id})
+
+    @staticmethod
+    async def get_total_contributors(
+        project_ids: List[int], db: Database
+    ) -> Dict[int, int]:
+        """Gets the number of contributors of each of the supplied projects"""
+        if not project_ids:
+            return {}
+
+        query = """
+            SELECT project_id, total_contributors
+            FROM project_activity_rollup
+            WHERE project_id = ANY(:project_ids)
+        """
+        rows = await db.fetch_all(query, values={"project_ids": project_ids})
+        totals = {row["project_id"]: row["total_contributors"] for row in rows}
+        return {project_id: totals.get(project_id, 0) for project_id in project_ids}
+
+    @staticmethod
+    async def record_history(
+        project_id: int,
+        user_id: int,
+        action: str,
+        action_date: datetime.datetime,
+        db: Database,
+        duration_seconds: Optional[int] = None,
+    ):
+        """
+        Adds a newly inserted task history row to the rollup of its project. The user
+        counts as a new contributor if this is their first non comment action on it,
+        that is if their project_contributors row gets inserted.
+        """
+        is_mapping = action in MAPPING_TIME_ACTIONS
+        is_validation = action in VALIDATION_TIME_ACTIONS
+        seconds = duration_seconds or 0
+        query = """
+            WITH new_contributor AS (
+                INSERT INTO project_contributors (project_id, user_id)
+                SELECT CAST(:project_id AS integer), CAST(:user_id AS bigint)
+                WHERE :action != 'COMMENT' AND CAST(:user_id AS bigint) IS NOT NULL
+                ON CONFLICT DO NOTHING
+                RETURNING user_id
+            )
+            INSERT INTO project_activity_rollup AS r (
+                project_id, total_contributors, mapping_seconds, mapping_count,
+                validation_seconds, validation_count, comment_count, last_activity
+            )
+            VALUES (
+                :project_id,
+                (SELECT COUNT(*) FROM new_contributor),
+                :mapping_seconds, :mapping_count,
+                :validation_seconds, :validation_count,
+                :comment_count, :action_date
+            )
+            ON CONFLICT (project_id) DO UPDATE SET
+                total_contributors = r.total_contributors + EXCLUDED.total_contributors,
+                mapping_seconds = r.mapping_seconds + EXCLUDED.mapping_seconds,
+                mapping_count = r.mapping_count + EXCLUDED.mapping_count,
+                validation_seconds = r.validation_seconds + EXCLUDED.validation_seconds,
+                validation_count = r.validation_count + EXCLUDED.validation_count,
+                comment_count = r.comment_count + EXCLUDED.comment_count,
+                last_activity = GREATEST(r.last_activity, EXCLUDED.last_activity)
+        """
+        await db.execute(
+            query,
+            values={
+                "project_id": project_id,
+                "user_id": user_id,
+                "action": action,
+                "mapping_seconds": seconds if is_mapping else 0,
+                "mapping_count": 1 if is_mapping else 0,
+                "validation_seconds": seconds if is_validation else 0,
+                "validation_count": 1 if is_validation else 0,
+                "comment_count": 1 if action == "COMMENT" else 0,
+                "action_date": action_date,
+            },
+        )
+
+    @staticmethod
+    async def record_lock_duration(
+        project_id: int, action: str, duration_seconds: Optional[int], db: Database
+    ):
+        """Adds the duration written to an existing lock history row"""
+        await ProjectActivityRollup.record_history_change(
+            project_id, [(action, None, action, duration_seconds)], db
+        )
+
+    @staticmethod
+    async def record_history_change(project_id: int, changes: list, db: Database):
+        """
+        Applies changes of existing history rows to the rollup. Each change is a tuple of
+        (previous_action, previous_duration_seconds, action, duration_seconds) where the
+        previous values are None for rows that did not count before and the new values are
+        None for deleted rows. Contributors are left untouched as deleting lock rows never
+        removes a user's last contribution in practice; the backfill corrects any drift.
+        """
+        await ProjectActivityRollup.record_history_changes({project_id: changes}, db)
+
+    @staticmethod
+    async def record_history_changes(changes_by_project: Dict[int, list], db: Database):
+        """Applies history changes of several projects in a single statement"""
+        rows = []
+        for project_id, changes in changes_by_project.items():
+            deltas = {"mapping": [0, 0], "validation": [0, 0]}
+            for previous_action, previous_seconds, action, duration_seconds in changes:
+                for sign, row_action, row_seconds in (
+                    (-1, previous_action, previous_seconds),
+                    (1, action, duration_seconds),
+                ):
+                    if row_action in MAPPING_TIME_ACTIONS:
+                        kind = "mapping"
+                    elif row_action in VALIDATION_TIME_ACTIONS:
+                        kind = "validation"
+                    else:
+                        continue
+                    deltas[kind][0] += sign * (row_seconds or 0)
+                    deltas[kind][1] += sign
+            if any(deltas["mapping"] + deltas["validation"]):
+                rows.append((project_id, *deltas["mapping"], *deltas["validation"]))
+
+        if not rows:
+            return
+
+        query = """
+            UPDATE project_activity_rollup r
+            SET mapping_seconds = r.mapping_seconds + d.mapping_seconds,
+                mapping_count = r.mapping_count + d.mapping_count,
+                validation_seconds = r.validation_seconds + d.validation_seconds,
+                validation_count = r.validation_count + d.validation_count
+            FROM unnest(
+                CAST(:project_ids AS integer[]),
+                CAST(:mapping_seconds AS bigint[]),
+                CAST(:mapping_counts AS integer[]),
+                CAST(:validation_seconds AS bigint[]),
+                CAST(:validation_counts AS integer[])
+            ) AS d(
+                project_id, mapping_seconds, mapping_count,
+                validation_seconds, validation_count
+            )
+            WHERE r.project_id = d.project_id
+        """
+        columns = [list(column) for column in zip(*rows)]
+        await db.execute(
+            query,
+            values={
+                "project_ids": columns[0],
+                "mapping_seconds": columns[1],
+                "mapping_counts": columns[2],
+                "validation_seconds": columns[3],
+                "validation_counts": columns[4],
+            },
+        )
+
+    @staticmethod
+    async def refresh(db: Database, project_ids: Optional[List[int]] = None) -> int:
+        """
+        Recomputes the rollup from the full task history, for the supplied projects or
+        for all projects when none are given. Used to backfill and to repair drift.
+        :return: number of rollup rows written
+        """
+        values = {"project_ids": project_ids} if project_ids else {}
+        contributors_filter = (
+            "AND project_id = ANY(:project_ids)" if project_ids else ""
+        )
+        await db.execute(
+            f"""
+            DELETE FROM project_contributors c
+            WHERE NOT EXISTS (
+                SELECT 1 FROM task_history th
+                WHERE th.project_id = c.project_id
+                AND th.user_id = c.user_id
+                AND th.action != 'COMMENT'
+            ) {contributors_filter}
+            """,
+            values=values,
+        )
+        await db.execute(
+            f"""
+            INSERT INTO project_contributors (project_id, user_id)
+            SELECT DISTINCT project_id, user_id
+            FROM task_history
+            WHERE action != 'COMMENT' AND user_id IS NOT NULL {contributors_filter}
+            ON CONFLICT DO NOTHING
+            """,
+            values=values,
+        )
+
+        project_filter = "WHERE p.id = ANY(:project_ids)" if project_ids else ""
+        query = f"""
+            INSERT INTO project_activity_rollup AS r (
+                project_id, total_contributors, mapping_seconds, mapping_count,
+                validation_seconds, validation_count, comment_count, last_activity
+            )
+            SELECT
+                p.id,
+                COUNT(DISTINCT th.user_id) FILTER (WHERE th.action != 'COMMENT'),
+                COALESCE(SUM(th.duration_seconds) FILTER (
+                    WHERE th.action IN {MAPPING_TIME_ACTIONS}
+                ), 0),
+                COUNT(th.id) FILTER (WHERE th.action IN {MAPPING_TIME_ACTIONS}),
+                COALESCE(SUM(th.duration_seconds) FILTER (
+                    WHERE th.action IN {VALIDATION_TIME_ACTIONS}
+                ), 0),
+                COUNT(th.id) FILTER (WHERE th.action IN {VALIDATION_TIME_ACTIONS}),
+                COUNT(th.id) FILTER (WHERE th.action = 'COMMENT'),
+                MAX(th.action_date)
+            FROM projects p
+            LEFT JOIN task_history th ON th.project_id = p.id
+            {project_filter}
+            GROUP BY p.id
+            ON CONFLICT (project_id) DO UPDATE SET
+                total_contributors = EXCLUDED.total_contributors,
+                mapping_seconds = EXCLUDED.mapping_seconds,
+                mapping_count = EXCLUDED.mapping_count,
+                validation_seconds = EXCLUDED.validation_seconds,
+                validation_count = EXCLUDED.validation_count,
+                comment_count = EXCLUDED.comment_count,
+                last_activity = EXCLUDED.last_activity
+            RETURNING r.project_id
+        """
+        rows = await db.fetch_all(query, values=values)
+        return len(rows)
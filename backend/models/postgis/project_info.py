@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 from backend.models.postgis.utils import sanitize_markdown
 from databases import Database
@@ -14,6 +14,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import TSVECTOR
 
+from backend.cache import cache, project_tag
 from backend.db import Base
 from backend.models.dtos.project_dto import ProjectInfoDTO
 
@@ -68,6 +69,7 @@ class ProjectInfo(Base):
         }
         query = insert(ProjectInfo.__table__).values(**columns)
         result = await db.execute(query)
+        await cache.invalidate(project_tag(project_id))
         return result
 
     async def update_from_dto(self, dto: ProjectInfoDTO, db: Database):
@@ -95,6 +97,7 @@ class ProjectInfo(Base):
             .values(**columns)
         )
         result = await db.execute(query)
+        await cache.invalidate(project_tag(self.project_id))
         return result
 
     @staticmethod
@@ -119,39 +122,87 @@ class ProjectInfo(Base):
         project_info = await db.fetch_one(
             query, values={"project_id": project_id, "locale": locale}
         )
-        if project_info is None:
+        default_locale_info = None
+        if project_info is None or locale != default_locale:
             # Define the SQL query to get project info by default locale
             query_default = """
                 SELECT * FROM project_info
                 WHERE project_id = :project_id AND locale = :default_locale
             """
-
-            # Execute the query for the default locale
-            project_info = await db.fetch_one(
+            default_locale_info = await db.fetch_one(
                 query_default,
                 values={"project_id": project_id, "default_locale": default_locale},
             )
 
-            if project_info is None:
+        return ProjectInfo._merge_locale_records(
+            project_id, project_info, default_locale_info, locale, default_locale
+        )
+
+    @staticmethod
+    async def get_dtos_for_locale(
+        db: Database, default_locales: Dict[int, str], locale: str
+    ) -> Dict[int, ProjectInfoDTO]:
+        """
+        Gets the ProjectInfoDTO of several projects for the requested locale in a single query.
+        Falls back to each project's default locale exactly like get_dto_for_locale.
+        :param db: The async database connection
+        :param default_locales: Mapping of project_id to the default locale of that project
+        :param locale: Locale requested by user
+        :return: Dict of project_id to ProjectInfoDTO
+        :raises: ValueError if no info found for Default Locale
+        """
+        if not default_locales:
+            return {}
+
+        query = """
+            SELECT pi.*
+            FROM project_info pi
+            JOIN unnest(
+                CAST(:project_ids AS integer[]), CAST(:default_locales AS text[])
+            ) AS p(project_id, default_locale) ON p.project_id = pi.project_id
+            WHERE pi.locale = p.default_locale OR pi.locale = :locale
+        """
+        project_ids = list(default_locales.keys())
+        rows = await db.fetch_all(
+            query,
+            values={
+                "project_ids": project_ids,
+                "default_locales": [default_locales[pid] for pid in project_ids],
+                "locale": locale,
+            },
+        )
+        records = {(row["project_id"], row["locale"]): row for row in rows}
+
+        return {
+            project_id: ProjectInfo._merge_locale_records(
+                project_id,
+                records.get((project_id, locale)),
+                records.get((project_id, default_locales[project_id])),
+                locale,
+                default_locales[project_id],
+            )
+            for project_id in project_ids
+        }
+
+    @staticmethod
+    def _merge_locale_records(
+        project_id: int, project_info, default_locale_info, locale, default_locale
+    ) -> ProjectInfoDTO:
+        """
+        Builds the ProjectInfoDTO from the requested locale record, filling empty fields
+        of partial translations from the default locale record.
+        :raises: ValueError if no info found for Default Locale
+        """
+        if project_info is None:
+            if default_locale_info is None:
                 error_message = f"BAD DATA: No info for project {project_id},locale: {locale},default {default_locale}"
                 raise ValueError(error_message)
 
-            return ProjectInfoDTO(**project_info)
+            return ProjectInfoDTO(**default_locale_info)
 
         if locale == default_locale:
             # Return the DTO for the default locale
             return ProjectInfoDTO(**project_info)
-        # Define the SQL query to get project info by default locale for partial translations
-        query_default = """
-            SELECT * FROM project_info
-            WHERE project_id = :project_id AND locale = :default_locale
-        """
-
-        # Execute the query for the default locale
-        default_locale_info = await db.fetch_one(
-            query_default,
-            values={"project_id": project_id, "default_locale": default_locale},
-        )
 
         if default_locale_info is None:
             error_message = f"BAD DATA: no info for project {project_id}, locale: {locale}, default {default_locale}"
@@ -0,0 +1,94 @@
+import os
+from typing import Optional
+
+import httpx
+from databases import Database
+from loguru import logger
+from sqlalchemy import Column, DateTime, Integer, String
+
+from backend.config import settings
+from backend.db import Base
+from backend.http_client import http_client
+from backend.models.postgis.utils import timestamp
+
+# Centroids are rounded to this many decimals, about a kilometre, before lookup
+REVERSE_GEOCODE_PRECISION = 2
+
+
+class ReverseGeocode(Base):
+    """
+    Countries Nominatim returned for project centroids, keyed by the rounded centroid
+    so projects created around the same place don't call Nominatim again
+    """
+
+    __tablename__ = "reverse_geocodes"
+
+    # Rounded coordinates multiplied by 10 ** REVERSE_GEOCODE_PRECISION
+    lat_key = Column(Integer, primary_key=True, autoincrement=False)
+    lng_key = Column(Integer, primary_key=True, autoincrement=False)
+    # Null when the point is in no country, e.g. at sea
+    country = Column(String)
+    created = Column(DateTime, nullable=False, default=timestamp)
+
+    @staticmethod
+    async def get_country(lat: float, lng: float, db: Database) -> Optional[str]:
+        """
+        Gets the country of the point, from the stored lookups or from Nominatim.
+        Returns None when there is no country or Nominatim can't be reached, in which
+        case nothing is stored so a later call tries again.
+        """
+        scale = 10**REVERSE_GEOCODE_PRECISION
+        keys = {"lat_key": round(lat * scale), "lng_key": round(lng * scale)}
+        stored = await db.fetch_one(
+            """
+            SELECT country FROM reverse_geocodes
+            WHERE lat_key = :lat_key AND lng_key = :lng_key
+            """,
+            values=keys,
+        )
+        if stored is not None:
+            return stored["country"]
+
+        headers = {
+            "User-Agent": (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/58.0.3029.110 Safari/537.3"
+            ),
+            "Referer": os.environ.get("TM_APP_BASE_URL", "https://example.com"),
+        }
+        try:
+            response = await http_client.get(
+                f"{settings.OSM_NOMINATIM_SERVER_URL}/reverse",
+                params={
+                    "format": "jsonv2",
+                    "lat": lat,
+                    "lon": lng,
+                    "accept-language": "en",
+                },
+                headers=headers,
+            )
+            response.raise_for_status()
+            country_info = response.json()
+        except (ValueError, httpx.HTTPError) as e:
+            logger.debug(e, exc_info=True)
+            return None
+
+        if "error" in country_info:
+            # Nominatim found nothing at this point
+            country = None
+        elif isinstance(country_info.get("address"), dict):
+            country = country_info["address"].get("country")
+        else:
+            logger.debug(f"Unexpected Nominatim response: {country_info}")
+            return None
+
+        await db.execute(
+            """
+            INSERT INTO reverse_geocodes (lat_key, lng_key, country, created)
+            VALUES (:lat_key, :lng_key, :country, :created)
+            ON CONFLICT (lat_key, lng_key) DO NOTHING
+            """,
+            values={**keys, "country": country, "created": timestamp()},
+        )
+        return country
@@ -175,3 +175,11 @@ class BannerType(Enum):
 
     INFO = 1
     WARNING = 2
+
+
+class EmailOutboxStatus(Enum):
+    """Describes the delivery state of a queued email"""
+
+    PENDING = 0
+    SENT = 1
+    FAILED = 2  # Gave up after the maximum number of attempts
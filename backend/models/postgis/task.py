@@ -2,19 +2,22 @@ import datetime
 import json
 from datetime import timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional
 
 import bleach
 import geojson
 from databases import Database
 from geoalchemy2 import Geometry
+from geoalchemy2.elements import WKBElement
 from shapely.geometry import shape
 
 from sqlalchemy import (
+    DDL,
     BigInteger,
     Boolean,
     Column,
     DateTime,
+    Float,
     ForeignKey,
     ForeignKeyConstraint,
     Index,
@@ -22,11 +25,14 @@ from sqlalchemy import (
     String,
     Unicode,
     desc,
+    event,
     select,
+    text,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.exc import MultipleResultsFound
 
+from backend.cache import cache, project_tag
 from backend.config import settings
 from backend.db import Base
 from backend.exceptions import NotFound
@@ -39,16 +45,20 @@ from backend.models.dtos.project_dto import (
 )
 from backend.models.dtos.task_annotation_dto import TaskAnnotationDTO
 from backend.models.dtos.validator_dto import MappedTasks, MappedTasksByUser
-from backend.models.postgis.mapping_level import MappingLevel
+from backend.models.postgis.project_activity_rollup import ProjectActivityRollup
 from backend.models.postgis.statuses import TaskStatus
 from backend.models.postgis.task_annotation import TaskAnnotation
 from backend.models.postgis.user import User
 from backend.models.postgis.utils import (
     InvalidData,
     InvalidGeoJson,
+    duration_to_seconds,
+    geodesic_area_triggers,
     parse_duration,
     timestamp,
 )
+from backend.reference_data import reference_data
+from backend.services.task_event_service import task_event_hub
 
 
 class TaskAction(Enum):
@@ -267,6 +277,102 @@ class TaskInvalidationHistory(Base):
             },
         )
 
+    @staticmethod
+    async def record_transitions(
+        project_id: int,
+        user_id: int,
+        new_state: TaskStatus,
+        state_changes: list,
+        db: Database,
+    ):
+        """
+        Records the validation or invalidation of many tasks at once, as record_validation
+        and record_invalidation do for a single task.
+        :param state_changes: task history rows (id, task_id, action_date) of the state changes
+        """
+        if new_state not in [TaskStatus.VALIDATED, TaskStatus.INVALIDATED]:
+            return
+
+        values = {
+            "project_id": project_id,
+            "user_id": user_id,
+            "task_ids": [row["task_id"] for row in state_changes],
+            "history_ids": [row["id"] for row in state_changes],
+            "action_dates": [row["action_date"] for row in state_changes],
+            "updated_date": timestamp(),
+        }
+        changes_query = """
+            WITH changes AS (
+                SELECT *
+                FROM unnest(
+                    CAST(:task_ids AS integer[]),
+                    CAST(:history_ids AS integer[]),
+                    CAST(:action_dates AS timestamp[])
+                ) AS c(task_id, history_id, action_date)
+            ),
+            last_mapped AS (
+                SELECT DISTINCT ON (th.task_id) th.task_id, th.user_id, th.action_date
+                FROM task_history th
+                JOIN changes c ON c.task_id = th.task_id
+                WHERE th.project_id = :project_id
+                AND th.action = 'STATE_CHANGE'
+                AND th.action_text IN ('BADIMAGERY', 'MAPPED')
+                ORDER BY th.task_id, th.action_date DESC
+            )
+        """
+        if new_state == TaskStatus.VALIDATED:
+            query = (
+                changes_query
+                + """
+                UPDATE task_invalidation_history tih
+                SET mapper_id = lm.user_id,
+                    mapped_date = lm.action_date,
+                    validator_id = :user_id,
+                    validated_date = c.action_date,
+                    is_closed = TRUE,
+                    updated_date = :updated_date
+                FROM changes c
+                LEFT JOIN last_mapped lm ON lm.task_id = c.task_id
+                WHERE tih.project_id = :project_id
+                AND tih.task_id = c.task_id
+                AND tih.is_closed = FALSE
+            """
+            )
+            await db.execute(query, values=values)
+            return
+
+        # Invalidation always kicks off a new entry for a task, so close any existing ones
+        await db.execute(
+            """
+            UPDATE task_invalidation_history
+            SET is_closed = TRUE, updated_date = :updated_date
+            WHERE project_id = :project_id
+            AND task_id = ANY(:task_ids)
+            AND is_closed = FALSE
+            """,
+            values={
+                "project_id": project_id,
+                "task_ids": values["task_ids"],
+                "updated_date": values["updated_date"],
+            },
+        )
+        query = (
+            changes_query
+            + """
+            INSERT INTO task_invalidation_history (
+                project_id, task_id, is_closed, invalidation_history_id, mapper_id,
+                mapped_date, invalidator_id, invalidated_date, updated_date
+            )
+            SELECT
+                CAST(:project_id AS integer), c.task_id, FALSE, c.history_id,
+                lm.user_id, lm.action_date, CAST(:user_id AS bigint), c.action_date,
+                CAST(:updated_date AS timestamp)
+            FROM changes c
+            JOIN last_mapped lm ON lm.task_id = c.task_id
+        """
+        )
+        await db.execute(query, values=values)
+
 
 class TaskMappingIssue(Base):
     """Describes an issue (along with an occurrence count) with a
@@ -312,6 +418,8 @@ class TaskHistory(Base):
     task_id = Column(Integer, nullable=False)
     action = Column(String, nullable=False)
     action_text = Column(String)
+    # Lock duration of LOCKED_* and AUTO_UNLOCKED_* actions, action_text keeps the text form
+    duration_seconds = Column(Integer)
     action_date = Column(DateTime, nullable=False, default=timestamp)
     user_id = Column(
         BigInteger,
@@ -332,6 +440,26 @@ class TaskHistory(Base):
         ),
         Index("idx_task_history_composite", "task_id", "project_id"),
         Index("idx_task_history_project_id_user_id", "user_id", "project_id"),
+        # Seek index of the project activity feed, newest first
+        Index(
+            "idx_task_history_project_id_action_date",
+            "project_id",
+            "action_date",
+            "id",
+        ),
+        Index(
+            "idx_task_history_lock_durations",
+            "project_id",
+            "action",
+            postgresql_where=action.in_(
+                [
+                    "LOCKED_FOR_MAPPING",
+                    "LOCKED_FOR_VALIDATION",
+                    "AUTO_UNLOCKED_FOR_MAPPING",
+                    "AUTO_UNLOCKED_FOR_VALIDATION",
+                ]
+            ),
+        ),
         {},
     )
 
@@ -430,17 +558,24 @@ class TaskHistory(Base):
                 (datetime.datetime.min + duration_task_locked).time().isoformat()
             )
 
+            duration_seconds = int(duration_task_locked.total_seconds())
+
             # Update the task history with the duration
             update_query = """
                 UPDATE task_history
-                SET action_text = :action_text
+                SET action_text = :action_text,
+                    duration_seconds = :duration_seconds
                 WHERE id = :id
             """
             update_values = {
                 "action_text": action_text,
+                "duration_seconds": duration_seconds,
                 "id": last_locked["id"],
             }
             await db.execute(query=update_query, values=update_values)
+            await ProjectActivityRollup.record_lock_duration(
+                project_id, lock_action.name, duration_seconds, db
+            )
 
         except MultipleResultsFound:
             # Again race conditions may mean we have multiple rows within the Task History.  Here we attempt to
@@ -488,41 +623,8 @@ class TaskHistory(Base):
         }
 
         await db.execute(query=duplicate_query, values=values)
-
-    @staticmethod
-    async def update_expired_and_locked_actions(
-        task_id: int,
-        project_id: int,
-        expiry_date: datetime,
-        action_text: str,
-        db: Database,
-    ):
-        """Update expired actions with an auto-unlock state."""
-        query = """
-            UPDATE task_history
-            SET action = CASE
-                WHEN action IN ('LOCKED_FOR_MAPPING', 'EXTENDED_FOR_MAPPING')
-                    THEN 'AUTO_UNLOCKED_FOR_MAPPING'
-                WHEN action IN ('LOCKED_FOR_VALIDATION', 'EXTENDED_FOR_VALIDATION')
-                    THEN 'AUTO_UNLOCKED_FOR_VALIDATION'
-            END,
-            action_text = :action_text
-            WHERE task_id = :task_id
-            AND project_id = :project_id
-            AND action_text IS NULL
-            AND action IN (
-                'LOCKED_FOR_MAPPING', 'LOCKED_FOR_VALIDATION',
-                'EXTENDED_FOR_MAPPING', 'EXTENDED_FOR_VALIDATION'
-            )
-            AND action_date <= :expiry_date
-        """
-        values = {
-            "action_text": action_text,
-            "task_id": task_id,
-            "project_id": project_id,
-            "expiry_date": expiry_date,
-        }
-        await db.execute(query=query, values=values)
+        # Deleted rows may have been the user's only contribution, recompute the rollup
+        await ProjectActivityRollup.refresh(db, [project_id])
 
     @staticmethod
     async def get_all_comments(project_id: int, db: Database) -> ProjectCommentsDTO:
@@ -696,6 +798,43 @@ class TaskHistory(Base):
         return last_mapped
 
 
+# Number of tasks inserted per statement when creating a project
+TASK_INSERT_BATCH_SIZE = 5000
+
+# Tasks take a new version whenever their status, lock or history changes, so clients
+# can poll for the tasks changed since the version they last saw. Versions are the id
+# of the writing transaction shifted left by TASK_VERSION_STEP_BITS, plus a step that
+# orders the changes made within the transaction. Transactions don't commit in id
+# order, so readers only move a client's version up to task_version_watermark(): the
+# first version of the oldest transaction still running, none can commit below it.
+TASK_VERSION_STEP_BITS = 20
+TASK_VERSION_FUNCTIONS = [
+    f"""
+    CREATE OR REPLACE FUNCTION next_task_version() RETURNS bigint AS $$
+    DECLARE
+        step integer := COALESCE(
+            NULLIF(current_setting('tm.task_version_step', true), ''), '0'
+        )::integer + 1;
+    BEGIN
+        PERFORM set_config('tm.task_version_step', step::text, true);
+        RETURN (pg_current_xact_id()::text::bigint << {TASK_VERSION_STEP_BITS})
+            + LEAST(step, {2 ** TASK_VERSION_STEP_BITS - 1});
+    END;
+    $$ LANGUAGE plpgsql VOLATILE
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION task_version_watermark() RETURNS bigint AS $$
+        -- Our own transaction is left out of the running ones, it sees its changes
+        SELECT COALESCE(
+            (SELECT MIN(x.id::text::bigint) FROM pg_snapshot_xip(s.snapshot) x(id)),
+            pg_snapshot_xmax(s.snapshot)::text::bigint
+        ) << {TASK_VERSION_STEP_BITS}
+        FROM pg_current_snapshot() s(snapshot)
+    $$ LANGUAGE sql STABLE
+    """,
+]
+
+
 class Task(Base):
     """Describes an individual mapping Task"""
 
@@ -713,6 +852,8 @@ class Task(Base):
     # Tasks need to be split differently if created from an arbitrary grid or were clipped to the edge of the AOI
     is_square = Column(Boolean, default=True)
     geometry = Column(Geometry("MULTIPOLYGON", srid=4326))
+    # Geodesic area of the geometry, maintained by a trigger
+    area_km2 = Column(Float)
     task_status = Column(Integer, default=TaskStatus.READY.value)
     locked_by = Column(
         BigInteger, ForeignKey("users.id", name="fk_users_locked"), index=True
@@ -723,6 +864,11 @@ class Task(Base):
     validated_by = Column(
         BigInteger, ForeignKey("users.id", name="fk_users_validator"), index=True
     )
+    version = Column(
+        BigInteger, server_default=text("next_task_version()"), nullable=False
+    )
+
+    __table_args__ = (Index("idx_tasks_project_id_version", "project_id", "version"),)
 
     # Mapped objects
     task_history = relationship(
@@ -759,9 +905,7 @@ class Task(Base):
             task.y = task_feature.properties["y"]
             task.zoom = task_feature.properties["zoom"]
             task.is_square = task_feature.properties["isSquare"]
-            wkt = shape(task_feature.geometry).wkt
-            ewkt = f"SRID=4326;{wkt}"
-            task.geometry = ewkt
+            task.geometry = WKBElement(shape(task_feature.geometry).wkb, srid=4326)
         except KeyError as e:
             raise InvalidData(
                 f"PropertyNotFound: Expected property not found: {str(e)}"
@@ -774,6 +918,55 @@ class Task(Base):
         task.id = task_id
         return task
 
+    @staticmethod
+    async def insert_tasks(
+        project_id: int,
+        tasks: List["Task"],
+        db: Database,
+        batch_size: int = TASK_INSERT_BATCH_SIZE,
+    ):
+        """
+        Inserts the new tasks of a project as READY with one multi-row statement per
+        batch, passing each column as an array and the geometries as WKB.
+        :param project_id: ID of the project the tasks belong to
+        :param tasks: Tasks built by from_geojson_feature
+        :param batch_size: Maximum number of tasks sent per statement
+        """
+        query = """
+            INSERT INTO tasks (
+                id, project_id, x, y, zoom, is_square, task_status,
+                extra_properties, geometry
+            )
+            SELECT
+                t.id, :project_id, t.x, t.y, t.zoom, t.is_square, :task_status,
+                t.extra_properties, ST_GeomFromWKB(t.geometry, 4326)
+            FROM unnest(
+                CAST(:ids AS integer[]),
+                CAST(:xs AS integer[]),
+                CAST(:ys AS integer[]),
+                CAST(:zooms AS integer[]),
+                CAST(:is_squares AS boolean[]),
+                CAST(:extra_properties AS text[]),
+                CAST(:geometries AS bytea[])
+            ) AS t(id, x, y, zoom, is_square, extra_properties, geometry)
+        """
+        for start in range(0, len(tasks), batch_size):
+            batch = tasks[start : start + batch_size]
+            await db.execute(
+                query,
+                values={
+                    "project_id": project_id,
+                    "task_status": TaskStatus.READY.value,
+                    "ids": [task.id for task in batch],
+                    "xs": [task.x for task in batch],
+                    "ys": [task.y for task in batch],
+                    "zooms": [task.zoom for task in batch],
+                    "is_squares": [task.is_square for task in batch],
+                    "extra_properties": [task.extra_properties for task in batch],
+                    "geometries": [bytes(task.geometry.data) for task in batch],
+                },
+            )
+
     @staticmethod
     async def get(task_id: int, project_id: int, db: Database) -> Optional[dict]:
         """
@@ -846,6 +1039,50 @@ class Task(Base):
         rows = await db.fetch_all(query=query, values=values)
         return rows
 
+    @staticmethod
+    async def count_existing(project_id: int, task_ids: List[int], db: Database) -> int:
+        """Counts how many of the distinct task_ids are tasks of the project"""
+        query = """
+            SELECT COUNT(*) FROM tasks
+            WHERE project_id = :project_id AND id = ANY(:task_ids)
+        """
+        values = {"project_id": project_id, "task_ids": list(set(task_ids))}
+        return await db.fetch_val(query=query, values=values)
+
+    @staticmethod
+    async def any_exist(
+        project_id: int, task_ids: Optional[List[int]], db: Database
+    ) -> bool:
+        """Checks whether the project has any of the tasks, or any task at all"""
+        query = """
+            SELECT EXISTS (
+                SELECT 1 FROM tasks
+                WHERE project_id = :project_id
+                AND (CAST(:task_ids AS integer[]) IS NULL OR id = ANY(:task_ids))
+            )
+        """
+        values = {"project_id": project_id, "task_ids": task_ids}
+        return await db.fetch_val(query=query, values=values)
+
+    @staticmethod
+    async def iterate_geometries(
+        project_id: int, task_ids: Optional[List[int]], db: Database
+    ) -> AsyncGenerator:
+        """
+        Yields the id and geometry of the tasks, or of all tasks when task_ids is None,
+        in id order through a server side cursor so large projects aren't held in memory
+        """
+        query = """
+            SELECT id, geometry
+            FROM tasks
+            WHERE project_id = :project_id
+            AND (CAST(:task_ids AS integer[]) IS NULL OR id = ANY(:task_ids))
+            ORDER BY id
+        """
+        values = {"project_id": project_id, "task_ids": task_ids}
+        async for row in db.iterate(query=query, values=values):
+            yield row
+
     @staticmethod
     async def get_tasks_by_status(project_id: int, status: str, db: Database):
         """
@@ -874,56 +1111,385 @@ class Task(Base):
 
     @staticmethod
     async def auto_unlock_tasks(project_id: int, db: Database):
-        """Unlock all tasks locked for longer than the auto-unlock delta."""
+        """Unlock all tasks of the project locked for longer than the auto-unlock delta."""
+        return await Task.auto_unlock_all_tasks(db, [project_id])
+
+    @staticmethod
+    async def auto_unlock_all_tasks(
+        db: Database, project_ids: Optional[List[int]] = None
+    ) -> Dict[str, int]:
+        """
+        Unlocks every task locked for longer than the auto-unlock delta in a single
+        transaction, for the supplied projects or all projects when none are given.
+        Expired lock history rows become AUTO_UNLOCKED_* rows carrying the lock duration
+        and tasks whose last lock was auto-unlocked are reset to their last status.
+        :return: number of history rows, tasks and projects unlocked
+        """
         expiry_delta = await Task.auto_unlock_delta()
         expiry_date = datetime.datetime.utcnow() - expiry_delta
+        lock_duration = (datetime.datetime.min + expiry_delta).time().isoformat()
+        project_filter = "AND th.project_id = ANY(:project_ids)" if project_ids else ""
+
+        expire_query = f"""
+            WITH expired AS (
+                SELECT th.id, th.action AS previous_action
+                FROM task_history th
+                JOIN tasks t ON t.id = th.task_id AND t.project_id = th.project_id
+                WHERE t.task_status IN (:locked_for_mapping, :locked_for_validation)
+                AND th.action IN (
+                    'LOCKED_FOR_MAPPING', 'LOCKED_FOR_VALIDATION',
+                    'EXTENDED_FOR_MAPPING', 'EXTENDED_FOR_VALIDATION'
+                )
+                AND th.action_text IS NULL
+                AND th.action_date <= :expiry_date
+                {project_filter}
+            )
+            UPDATE task_history th
+            SET action = CASE
+                WHEN expired.previous_action IN ('LOCKED_FOR_MAPPING', 'EXTENDED_FOR_MAPPING')
+                    THEN 'AUTO_UNLOCKED_FOR_MAPPING'
+                ELSE 'AUTO_UNLOCKED_FOR_VALIDATION'
+            END,
+            action_text = :action_text,
+            duration_seconds = :duration_seconds
+            FROM expired
+            WHERE th.id = expired.id
+            RETURNING th.project_id, th.task_id, expired.previous_action, th.action,
+                th.duration_seconds
+        """
+        expire_values = {
+            "locked_for_mapping": TaskStatus.LOCKED_FOR_MAPPING.value,
+            "locked_for_validation": TaskStatus.LOCKED_FOR_VALIDATION.value,
+            "expiry_date": expiry_date,
+            "action_text": lock_duration,
+            "duration_seconds": duration_to_seconds(lock_duration),
+        }
+        if project_ids:
+            expire_values["project_ids"] = project_ids
 
-        # Query for task IDs to unlock
-        query = """
-            SELECT tasks.id
-            FROM tasks
-            JOIN task_history
-              ON tasks.id = task_history.task_id
-             AND tasks.project_id = task_history.project_id
-            WHERE tasks.task_status IN (1, 3)
-              AND task_history.action IN (
-                  'EXTENDED_FOR_MAPPING',
-                  'EXTENDED_FOR_VALIDATION',
-                  'LOCKED_FOR_VALIDATION',
-                  'LOCKED_FOR_MAPPING'
-              )
-              AND task_history.action_text IS NULL
-              AND tasks.project_id = :project_id
-              AND task_history.action_date <= :expiry_date
-        """
-        old_task_ids = await db.fetch_all(
-            query=query, values={"project_id": project_id, "expiry_date": expiry_date}
+        # Tasks go back to the status of their last state change, READY if there is none
+        status_cases = " ".join(
+            f"WHEN '{status.name}' THEN {status.value}" for status in TaskStatus
         )
-        old_task_ids = [row["id"] for row in old_task_ids]
-        if not old_task_ids:
-            return  # No tasks to unlock
+        clear_query = f"""
+            WITH touched AS (
+                SELECT DISTINCT task_id, project_id
+                FROM unnest(
+                    CAST(:task_ids AS integer[]), CAST(:project_ids AS integer[])
+                ) AS u(task_id, project_id)
+            ),
+            last_lock AS (
+                SELECT DISTINCT ON (th.project_id, th.task_id)
+                    th.project_id, th.task_id, th.action
+                FROM task_history th
+                JOIN touched
+                    ON touched.task_id = th.task_id
+                    AND touched.project_id = th.project_id
+                WHERE th.action IN (
+                    'LOCKED_FOR_MAPPING', 'LOCKED_FOR_VALIDATION',
+                    'AUTO_UNLOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_VALIDATION'
+                )
+                ORDER BY th.project_id, th.task_id, th.action_date DESC
+            ),
+            last_state AS (
+                SELECT DISTINCT ON (th.project_id, th.task_id)
+                    th.project_id, th.task_id, th.action_text
+                FROM task_history th
+                JOIN touched
+                    ON touched.task_id = th.task_id
+                    AND touched.project_id = th.project_id
+                WHERE th.action = 'STATE_CHANGE'
+                ORDER BY th.project_id, th.task_id, th.action_date DESC
+            )
+            UPDATE tasks t
+            SET task_status = CASE ls.action_text {status_cases} ELSE :ready END,
+                locked_by = NULL
+            FROM last_lock ll
+            LEFT JOIN last_state ls
+                ON ls.project_id = ll.project_id AND ls.task_id = ll.task_id
+            WHERE t.id = ll.task_id
+            AND t.project_id = ll.project_id
+            AND ll.action IN ('AUTO_UNLOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_VALIDATION')
+            RETURNING t.project_id, t.id, t.task_status
+        """
+
+        async with db.transaction():
+            expired_rows = await db.fetch_all(expire_query, values=expire_values)
+            if not expired_rows:
+                return {"history_rows": 0, "tasks": 0, "projects": 0}
+
+            unlocked_tasks = await db.fetch_all(
+                clear_query,
+                values={
+                    "task_ids": [row["task_id"] for row in expired_rows],
+                    "project_ids": [row["project_id"] for row in expired_rows],
+                    "ready": TaskStatus.READY.value,
+                },
+            )
 
-        for task_id in old_task_ids:
-            await Task.auto_unlock_expired_tasks(task_id, project_id, expiry_date, db)
+            changes_by_project = {}
+            for row in expired_rows:
+                changes_by_project.setdefault(row["project_id"], []).append(
+                    (
+                        row["previous_action"],
+                        None,
+                        row["action"],
+                        row["duration_seconds"],
+                    )
+                )
+            await ProjectActivityRollup.record_history_changes(changes_by_project, db)
+            await task_event_hub.publish_many(
+                [
+                    (
+                        task["project_id"],
+                        task["id"],
+                        TaskStatus(task["task_status"]),
+                        None,
+                    )
+                    for task in unlocked_tasks
+                ],
+                db,
+            )
 
-    @staticmethod
-    async def auto_unlock_expired_tasks(
-        task_id: int, project_id: int, expiry_date: datetime, db: Database
-    ):
-        """Unlock all tasks locked before expiry date. Clears task lock if needed."""
-        lock_duration = (
-            (datetime.datetime.min + await Task.auto_unlock_delta()).time().isoformat()
+        await cache.invalidate(
+            *[project_tag(project_id) for project_id in changes_by_project]
         )
+        return {
+            "history_rows": len(expired_rows),
+            "tasks": len(unlocked_tasks),
+            "projects": len(changes_by_project),
+        }
 
-        await TaskHistory.update_expired_and_locked_actions(
-            task_id, project_id, expiry_date, lock_duration, db
-        )
-        last_action = await TaskHistory.get_last_locked_or_auto_unlocked_action(
-            task_id, project_id, db
-        )
+    @staticmethod
+    async def transition_all_tasks(
+        project_id: int,
+        user_id: int,
+        task_statuses: List[TaskStatus],
+        new_state: TaskStatus,
+        db: Database,
+        lock_action: Optional[TaskAction] = None,
+        comment: Optional[str] = None,
+    ) -> int:
+        """
+        Moves every task of the project in one of the supplied statuses to the new state
+        with a fixed number of set-based statements in a single transaction, writing the
+        history that locking and unlocking the tasks one at a time would write.
+        With a lock action, tasks not locked yet are locked by the user and the locks are
+        closed with their duration on unlock. Without one the tasks are reset: open locks
+        are auto-unlocked and the mapper and validator are cleared.
+        Project counters are left to the caller.
+        :param comment: Optional comment added to the history of each task first
+        :return: number of tasks transitioned
+        """
+        locked_statuses = [
+            TaskStatus.LOCKED_FOR_MAPPING.value,
+            TaskStatus.LOCKED_FOR_VALIDATION.value,
+        ]
+        targets_query = """
+            SELECT
+                t.id, t.task_status, t.locked_by,
+                last_lock.id AS lock_history_id,
+                last_lock.action AS lock_action,
+                last_lock.action_text AS lock_action_text,
+                last_lock.action_date AS lock_date,
+                last_lock.user_id AS lock_user_id
+            FROM tasks t
+            LEFT JOIN LATERAL (
+                SELECT th.id, th.action, th.action_text, th.action_date, th.user_id
+                FROM task_history th
+                WHERE th.task_id = t.id
+                AND th.project_id = t.project_id
+                AND th.action IN ('LOCKED_FOR_MAPPING', 'LOCKED_FOR_VALIDATION')
+                ORDER BY th.action_date DESC
+                LIMIT 1
+            ) last_lock ON t.task_status = ANY(:locked_statuses)
+            WHERE t.project_id = :project_id
+            AND t.task_status = ANY(:task_statuses)
+            ORDER BY t.id
+            FOR UPDATE OF t
+        """
+        history_query = """
+            INSERT INTO task_history (
+                task_id, user_id, project_id, action, action_text, action_date,
+                duration_seconds
+            )
+            SELECT
+                h.task_id, h.user_id, CAST(:project_id AS integer), h.action,
+                CAST(:action_text AS varchar), CAST(:action_date AS timestamp),
+                CAST(:duration_seconds AS integer)
+            FROM unnest(
+                CAST(:task_ids AS integer[]),
+                CAST(:user_ids AS bigint[]),
+                CAST(:actions AS varchar[])
+            ) AS h(task_id, user_id, action)
+            RETURNING id, task_id, action_date
+        """
+
+        async def add_history(
+            task_ids, user_ids, actions, action_text=None, seconds=None
+        ):
+            return await db.fetch_all(
+                history_query,
+                values={
+                    "project_id": project_id,
+                    "action_text": action_text,
+                    "action_date": timestamp(),
+                    "duration_seconds": seconds,
+                    "task_ids": task_ids,
+                    "user_ids": user_ids,
+                    "actions": actions,
+                },
+            )
 
-        if last_action in ["AUTO_UNLOCKED_FOR_MAPPING", "AUTO_UNLOCKED_FOR_VALIDATION"]:
-            await Task.clear_lock(task_id, project_id, db)
+        async with db.transaction():
+            targets = await db.fetch_all(
+                targets_query,
+                values={
+                    "project_id": project_id,
+                    "task_statuses": [status.value for status in task_statuses],
+                    "locked_statuses": locked_statuses,
+                },
+            )
+            if not targets:
+                return 0
+            task_ids = [task["id"] for task in targets]
+            user_ids = [user_id] * len(task_ids)
+            locked = [
+                task for task in targets if task["task_status"] in locked_statuses
+            ]
+
+            if comment:
+                action, action_text = TaskHistory.set_comment_action(comment)
+                await add_history(
+                    task_ids, user_ids, [action] * len(task_ids), action_text
+                )
+
+            if lock_action is None and locked:
+                # Auto-unlock open locks, replacing the lock row as clear_task_lock does
+                expiry_delta = await Task.auto_unlock_delta()
+                lock_duration = (
+                    (datetime.datetime.min + expiry_delta).time().isoformat()
+                )
+                await db.execute(
+                    "DELETE FROM task_history WHERE id = ANY(:history_ids)",
+                    values={
+                        "history_ids": [
+                            task["lock_history_id"]
+                            for task in locked
+                            if task["lock_history_id"] is not None
+                        ]
+                    },
+                )
+                await add_history(
+                    [task["id"] for task in locked],
+                    [task["locked_by"] for task in locked],
+                    [
+                        (
+                            TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name
+                            if task["lock_action"] == TaskAction.LOCKED_FOR_MAPPING.name
+                            else TaskAction.AUTO_UNLOCKED_FOR_VALIDATION.name
+                        )
+                        for task in locked
+                    ],
+                    lock_duration,
+                    duration_to_seconds(lock_duration),
+                )
+
+            if lock_action is not None:
+                # Open locks of the user are closed along with the ones taken here
+                open_locks = {
+                    task["lock_history_id"]: task["lock_date"]
+                    for task in locked
+                    if task["lock_user_id"] == user_id
+                    and task["lock_action_text"] is None
+                }
+                locked_ids = {task["id"] for task in locked}
+                to_lock = [task_id for task_id in task_ids if task_id not in locked_ids]
+                if to_lock:
+                    new_locks = await add_history(
+                        to_lock,
+                        [user_id] * len(to_lock),
+                        [lock_action.name] * len(to_lock),
+                    )
+                    open_locks.update(
+                        {row["id"]: row["action_date"] for row in new_locks}
+                    )
+                if open_locks:
+                    unlock_date = datetime.datetime.utcnow()
+                    durations = [unlock_date - date for date in open_locks.values()]
+                    await db.execute(
+                        """
+                        UPDATE task_history th
+                        SET action_text = d.action_text,
+                            duration_seconds = d.duration_seconds
+                        FROM unnest(
+                            CAST(:history_ids AS integer[]),
+                            CAST(:action_texts AS varchar[]),
+                            CAST(:duration_seconds AS integer[])
+                        ) AS d(id, action_text, duration_seconds)
+                        WHERE th.id = d.id
+                        """,
+                        values={
+                            "history_ids": list(open_locks),
+                            "action_texts": [
+                                (datetime.datetime.min + duration).time().isoformat()
+                                for duration in durations
+                            ],
+                            "duration_seconds": [
+                                int(duration.total_seconds()) for duration in durations
+                            ],
+                        },
+                    )
+
+            state_changes = await add_history(
+                task_ids,
+                user_ids,
+                [TaskAction.STATE_CHANGE.name] * len(task_ids),
+                new_state.name,
+            )
+            await TaskInvalidationHistory.record_transitions(
+                project_id, user_id, new_state, state_changes, db
+            )
+
+            values = {
+                "project_id": project_id,
+                "task_ids": task_ids,
+                "new_status": new_state.value,
+            }
+            if lock_action is None or new_state == TaskStatus.INVALIDATED:
+                assignments = "mapped_by = NULL, validated_by = NULL,"
+            elif new_state == TaskStatus.VALIDATED:
+                assignments = """
+                    validated_by = :user_id,
+                    mapped_by = COALESCE(mapped_by, :user_id),
+                """
+                values["user_id"] = user_id
+            elif new_state in [TaskStatus.MAPPED, TaskStatus.BADIMAGERY]:
+                # Tasks locked for validation keep their mapper
+                assignments = """
+                    mapped_by = CASE
+                        WHEN task_status = :locked_for_validation THEN mapped_by
+                        ELSE :user_id
+                    END,
+                """
+                values["user_id"] = user_id
+                values["locked_for_validation"] = TaskStatus.LOCKED_FOR_VALIDATION.value
+            else:
+                assignments = ""
+            update_query = f"""
+                UPDATE tasks
+                SET {assignments}
+                    task_status = :new_status,
+                    locked_by = NULL
+                WHERE project_id = :project_id AND id = ANY(:task_ids)
+            """
+            await db.execute(update_query, values=values)
+
+            await ProjectActivityRollup.refresh(db, [project_id])
+            await task_event_hub.publish_resync(project_id, db)
+        await cache.invalidate(project_tag(project_id))
+
+        return len(task_ids)
 
     @staticmethod
     def is_mappable(task: dict) -> bool:
@@ -974,7 +1540,7 @@ class Task(Base):
         query = """
             INSERT INTO task_history (task_id, user_id, project_id, action, action_text, action_date)
             VALUES (:task_id, :user_id, :project_id, :action, :action_text, :action_date)
-            RETURNING id, action, action_text, action_date
+            RETURNING id, action, action_text, action_date, duration_seconds
         """
         values = {
             "task_id": task_id,
@@ -985,6 +1551,15 @@ class Task(Base):
             "action_date": timestamp(),
         }
         task_history = await db.fetch_one(query=query, values=values)
+        await ProjectActivityRollup.record_history(
+            project_id,
+            user_id,
+            action_name,
+            task_history["action_date"],
+            db,
+            task_history["duration_seconds"],
+        )
+        await cache.invalidate(project_tag(project_id))
 
         # TODO Verify this.
         # Insert any mapping issues into the task_mapping_issues table, building the query dynamically
@@ -1042,6 +1617,9 @@ class Task(Base):
             "project_id": project_id,
         }
         await db.execute(query=query, values=values)
+        await task_event_hub.publish(
+            project_id, task_id, TaskStatus.LOCKED_FOR_MAPPING, user_id, db
+        )
 
     @staticmethod
     async def lock_task_for_validating(
@@ -1064,6 +1642,9 @@ class Task(Base):
             "project_id": project_id,
         }
         await db.execute(query=query, values=values)
+        await task_event_hub.publish(
+            project_id, task_id, TaskStatus.LOCKED_FOR_VALIDATION, user_id, db
+        )
 
     @staticmethod
     async def reset_task(task_id: int, project_id: int, user_id: int, db: Database):
@@ -1114,6 +1695,7 @@ class Task(Base):
             db=db,
             new_state=TaskStatus.READY,
         )
+        await task_event_hub.publish(project_id, task_id, TaskStatus.READY, None, db)
 
     @staticmethod
     async def clear_task_lock(task_id: int, project_id: int, db: Database):
@@ -1125,10 +1707,17 @@ class Task(Base):
             delete_action_query = """
                 DELETE FROM task_history
                 WHERE id = :history_id
+                RETURNING action, duration_seconds
             """
-            await db.execute(
+            deleted = await db.fetch_one(
                 query=delete_action_query, values={"history_id": last_action["id"]}
             )
+            if deleted:
+                await ProjectActivityRollup.record_history_change(
+                    project_id,
+                    [(deleted["action"], deleted["duration_seconds"], None, None)],
+                    db,
+                )
 
         # Clear the lock from the task itself
         await Task.clear_lock(task_id=task_id, project_id=project_id, db=db)
@@ -1170,14 +1759,23 @@ class Task(Base):
         )
 
         # Update the action_text with the lock duration
+        duration_seconds = duration_to_seconds(lock_duration)
         update_history_query = """
             UPDATE task_history
-            SET action_text = :lock_duration
+            SET action_text = :lock_duration,
+                duration_seconds = :duration_seconds
             WHERE id = :history_id
         """
         await db.execute(
             query=update_history_query,
-            values={"lock_duration": lock_duration, "history_id": auto_unlocked["id"]},
+            values={
+                "lock_duration": lock_duration,
+                "duration_seconds": duration_seconds,
+                "history_id": auto_unlocked["id"],
+            },
+        )
+        await ProjectActivityRollup.record_lock_duration(
+            project_id, next_action.name, duration_seconds, db
         )
 
     @staticmethod
@@ -1315,6 +1913,7 @@ class Task(Base):
                 "project_id": project_id,
             },
         )
+        await task_event_hub.publish(project_id, task_id, new_state, None, db)
 
     @staticmethod
     async def reset_lock(
@@ -1379,6 +1978,7 @@ class Task(Base):
             "project_id": project_id,
         }
         await db.execute(query=update_query, values=update_values)
+        await task_event_hub.publish(project_id, task_id, last_status, None, db)
 
     @staticmethod
     async def get_tasks_as_geojson_feature_collection(
@@ -1388,6 +1988,7 @@ class Task(Base):
         order_by: Optional[str] = None,
         order_by_type: str = "ASC",
         status: Optional[int] = None,
+        since: Optional[int] = None,
     ) -> geojson.FeatureCollection:
         """
         Creates a geoJson.FeatureCollection object for tasks related to the supplied project ID.
@@ -1397,6 +1998,8 @@ class Task(Base):
         :param order_by: Sorting option: available values are 'effort_prediction'
         :param order_by_type: Sorting order: 'ASC' or 'DESC'
         :param status: Task status ID to filter by
+        :param since: Only return tasks changed after this version, the collection then
+                      carries the version to poll from next
         :return: geojson.FeatureCollection
         """
         # Base query
@@ -1411,7 +2014,9 @@ class Task(Base):
                 ST_AsGeoJSON(t.geometry) AS geojson,
                 t.locked_by,
                 t.mapped_by,
-                t.validated_by
+                t.validated_by,
+                t.version,
+                t.version < (SELECT task_version_watermark()) AS settled
             FROM tasks t
             WHERE t.project_id = :project_id
         """
@@ -1419,6 +2024,10 @@ class Task(Base):
         # Initialize query parameters
         filters = {"project_id": project_id}
 
+        if since is not None:
+            query += " AND t.version > :since"
+            filters["since"] = since
+
         # Add task_id filter
         if task_ids_str:
             task_ids = [int(task_id) for task_id in task_ids_str.split(",")]
@@ -1471,6 +2080,11 @@ class Task(Base):
             )
             tasks_features.append(feature)
 
+        if since is not None:
+            # Tasks written by transactions that may commit out of order come back
+            # on the next poll too, as the version only moves past settled ones
+            version = max([since] + [row["version"] for row in rows if row["settled"]])
+            return geojson.FeatureCollection(tasks_features, version=version)
         return geojson.FeatureCollection(tasks_features)
 
     @staticmethod
@@ -1546,12 +2160,12 @@ class Task(Base):
         results = await db.fetch_all(query=query, values={"project_id": project_id})
 
         mapped_tasks_dto = MappedTasks()
+        levels = await reference_data.get(db)
 
         for row in results:
             tasks_mapped_str = row["tasks_mapped"]
             tasks_mapped = json.loads(tasks_mapped_str) if tasks_mapped_str else []
-            mapping_level = await MappingLevel.get_by_id(row["mapping_level"], db)
-            mapping_level_name = mapping_level.name
+            mapping_level_name = levels.mapping_level(row["mapping_level"]).name
 
             user_mapped = MappedTasksByUser(
                 username=row["username"],
@@ -1894,8 +2508,11 @@ class Task(Base):
         """
         # Insert the task history with the new_task_id and provided project_id
         insert_query = """
-            INSERT INTO task_history (project_id, task_id, action, action_text, action_date, user_id)
-            SELECT :project_id, :new_task_id, action, action_text, action_date, user_id
+            INSERT INTO task_history (
+                project_id, task_id, action, action_text, duration_seconds, action_date, user_id
+            )
+            SELECT
+                :project_id, :new_task_id, action, action_text, duration_seconds, action_date, user_id
             FROM task_history
             WHERE task_id = :original_task_id AND project_id = :project_id
         """
@@ -1939,3 +2556,64 @@ class Task(Base):
         locked_tasks = [task for task in tasks]
 
         return locked_tasks
+
+
+# Keep task versions current whatever statement changes a task or its history
+TASK_VERSION_TRIGGERS = {
+    Task.__table__: [
+        """
+        CREATE OR REPLACE FUNCTION tasks_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := next_task_version();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER tasks_version
+        BEFORE UPDATE OF task_status, locked_by, mapped_by, validated_by, geometry
+        ON tasks
+        FOR EACH ROW EXECUTE FUNCTION tasks_bump_version()
+        """,
+    ],
+    TaskHistory.__table__: [
+        """
+        CREATE OR REPLACE FUNCTION task_history_bump_task_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE tasks t
+            SET version = next_task_version()
+            FROM (SELECT DISTINCT project_id, task_id FROM changed_history) h
+            WHERE t.project_id = h.project_id AND t.id = h.task_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER task_history_insert_version
+        AFTER INSERT ON task_history
+        REFERENCING NEW TABLE AS changed_history
+        FOR EACH STATEMENT EXECUTE FUNCTION task_history_bump_task_version()
+        """,
+        """
+        CREATE TRIGGER task_history_update_version
+        AFTER UPDATE ON task_history
+        REFERENCING NEW TABLE AS changed_history
+        FOR EACH STATEMENT EXECUTE FUNCTION task_history_bump_task_version()
+        """,
+        """
+        CREATE TRIGGER task_history_delete_version
+        AFTER DELETE ON task_history
+        REFERENCING OLD TABLE AS changed_history
+        FOR EACH STATEMENT EXECUTE FUNCTION task_history_bump_task_version()
+        """,
+    ],
+}
+for statement in TASK_VERSION_FUNCTIONS:
+    # The functions are needed by the default of tasks.version
+    event.listen(Task.__table__, "before_create", DDL(statement))
+for table, statements in TASK_VERSION_TRIGGERS.items():
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement))
+
+for statement in geodesic_area_triggers(Task.__tablename__):
+    event.listen(Task.__table__, "after_create", DDL(statement))
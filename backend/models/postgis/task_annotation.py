@@ -1,3 +1,6 @@
+import json
+from typing import List
+
 from databases import Database
 from sqlalchemy import (
     JSON,
@@ -37,6 +40,13 @@ class TaskAnnotation(Base):
             name="fk_task_annotations",
         ),
         Index("idx_task_annotations_composite", "task_id", "project_id"),
+        Index(
+            "uq_task_annotations_task_type",
+            "task_id",
+            "project_id",
+            "annotation_type",
+            unique=True,
+        ),
         {},
     )
 
@@ -72,6 +82,50 @@ class TaskAnnotation(Base):
             },
         )
 
+    @staticmethod
+    async def upsert_many(
+        project_id: int, annotation_type: str, annotations: List[dict], db: Database
+    ):
+        """
+        Creates or updates the annotations of the supplied type in a single statement.
+        Annotations are dicts of taskId, properties and optionally annotationSource and
+        annotationMarkdown, with at most one annotation per task. Existing annotations
+        only get their properties and timestamp updated.
+        """
+        if not annotations:
+            return
+
+        query = """
+            INSERT INTO task_annotations (
+                task_id, project_id, annotation_type, properties,
+                annotation_source, annotation_markdown, updated_timestamp
+            )
+            SELECT
+                a.task_id, :project_id, :annotation_type, CAST(a.properties AS json),
+                a.annotation_source, a.annotation_markdown, :updated_timestamp
+            FROM unnest(
+                CAST(:task_ids AS integer[]),
+                CAST(:properties AS text[]),
+                CAST(:sources AS text[]),
+                CAST(:markdowns AS text[])
+            ) AS a(task_id, properties, annotation_source, annotation_markdown)
+            ON CONFLICT (task_id, project_id, annotation_type) DO UPDATE
+            SET properties = EXCLUDED.properties,
+                updated_timestamp = EXCLUDED.updated_timestamp
+        """
+        await db.execute(
+            query,
+            values={
+                "project_id": project_id,
+                "annotation_type": annotation_type,
+                "updated_timestamp": timestamp(),
+                "task_ids": [a["taskId"] for a in annotations],
+                "properties": [json.dumps(a["properties"]) for a in annotations],
+                "sources": [a.get("annotationSource") for a in annotations],
+                "markdowns": [a.get("annotationMarkdown") for a in annotations],
+            },
+        )
+
     def get_dto(self):
         task_annotation_dto = TaskAnnotationDTO()
         task_annotation_dto.task_id = self.task_id
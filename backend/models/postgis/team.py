@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from databases import Database
 from sqlalchemy import (
     BigInteger,
@@ -483,6 +485,82 @@ class Team(Base):
 
         return await db.fetch_val(query=query, values=values)
 
+    @staticmethod
+    async def get_members_of_teams(
+        db: Database, team_ids: List[int], count: int = None
+    ) -> Dict[int, dict]:
+        """
+        Returns the active members of several teams along with their member and
+        manager counts, in a single query.
+        --------------------------------
+        :param db: Database session
+        :param team_ids: IDs of the teams
+        :param count: Number of members and of managers to return per team, all of
+                      them if not set
+        :return: Dict keyed by team ID with the members (members before managers),
+                 members_count and managers_count of each team
+        """
+        if not team_ids:
+            return {}
+
+        manager = TeamMemberFunctions.MANAGER
+        member = TeamMemberFunctions.MEMBER
+        query = f"""
+            SELECT team_id, username, function, active, join_request_notifications,
+                picture_url, role_count
+            FROM (
+                SELECT tm.team_id,
+                    u.username,
+                    CASE
+                        WHEN tm.function = {manager.value} THEN '{manager.name}'
+                        WHEN tm.function = {member.value} THEN '{member.name}'
+                        ELSE 'UNKNOWN'
+                    END as function,
+                    tm.function AS function_value,
+                    tm.active,
+                    tm.join_request_notifications,
+                    u.picture_url,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY tm.team_id, tm.function ORDER BY u.username
+                    ) AS position,
+                    COUNT(*) OVER (PARTITION BY tm.team_id, tm.function) AS role_count
+                FROM team_members tm
+                JOIN users u ON tm.user_id = u.id
+                WHERE tm.team_id = ANY(:team_ids) AND tm.active = true
+            ) ranked
+        """
+        values = {"team_ids": team_ids}
+
+        if count:
+            query += " WHERE position <= :count"
+            values["count"] = count
+        query += f"""
+            ORDER BY team_id,
+                function_value = {manager.value},
+                position
+        """
+
+        teams = {
+            team_id: {"members": [], "members_count": 0, "managers_count": 0}
+            for team_id in team_ids
+        }
+        for row in await db.fetch_all(query=query, values=values):
+            team = teams[row["team_id"]]
+            team["members"].append(
+                TeamMembersDTO(
+                    username=row["username"],
+                    function=row["function"],
+                    active=row["active"],
+                    join_request_notifications=row["join_request_notifications"],
+                    picture_url=row["picture_url"],
+                )
+            )
+            if row["function"] == manager.name:
+                team["managers_count"] = row["role_count"]
+            elif row["function"] == member.name:
+                team["members_count"] = row["role_count"]
+        return teams
+
     @staticmethod
     async def update_team_members(team, team_dto: TeamDTO, db: Database):
         # Get existing members from the team
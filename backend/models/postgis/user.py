@@ -1,5 +1,7 @@
+import datetime
 import re
 import json
+from typing import Dict, List, Optional, Tuple
 import geojson
 import sqlalchemy as sa
 from databases import Database
@@ -42,6 +44,7 @@ from backend.models.postgis.statuses import (
     UserRole,
 )
 from backend.models.postgis.utils import timestamp
+from backend.reference_data import reference_data
 
 
 class User(Base):
@@ -241,12 +244,13 @@ class User(Base):
         else:
             results = await db.fetch_all(base_query, params)
 
+        levels = await reference_data.get(db)
         dto = UserSearchDTO()
         for result in results:
             listed_user = ListedUser()
             listed_user.id = result["id"]
-            listed_user.mapping_level = (
-                await MappingLevel.get_by_id(result["mapping_level"], db)
+            listed_user.mapping_level = levels.mapping_level(
+                result["mapping_level"]
             ).name
             listed_user.username = result["username"]
             listed_user.picture_url = result["picture_url"]
@@ -349,6 +353,65 @@ class User(Base):
         """
         await db.execute(query, values={"user_id": user_id, "project_id": project_id})
 
+    @staticmethod
+    async def refresh_projects_mapped(
+        db: Database,
+        updated_since: Optional[datetime.datetime] = None,
+        dry_run: bool = False,
+    ) -> int:
+        """
+        Adds every project a user changed a task state on to their mapped projects, for
+        all projects or the projects updated since the supplied date, in one statement.
+        :param dry_run: only count the users missing projects, leave them untouched
+        :return: number of users missing projects
+        """
+        project_filter = (
+            """
+            AND project_id IN (
+                SELECT id FROM projects WHERE last_updated > :updated_since
+            )
+            """
+            if updated_since
+            else ""
+        )
+        missing_query = f"""
+            WITH mapped AS (
+                SELECT user_id, ARRAY_AGG(DISTINCT project_id) AS project_ids
+                FROM task_history
+                WHERE action = 'STATE_CHANGE'
+                {project_filter}
+                GROUP BY user_id
+            ),
+            missing AS (
+                SELECT
+                    u.id AS user_id,
+                    ARRAY(
+                        SELECT project_id FROM unnest(m.project_ids) AS project_id
+                        WHERE NOT project_id = ANY(COALESCE(u.projects_mapped, '{{}}'))
+                        ORDER BY project_id
+                    ) AS project_ids
+                FROM users u
+                JOIN mapped m ON m.user_id = u.id
+                WHERE NOT m.project_ids <@ COALESCE(u.projects_mapped, '{{}}')
+            )
+        """
+        if dry_run:
+            query = missing_query + "SELECT user_id FROM missing"
+        else:
+            query = (
+                missing_query
+                + """
+                UPDATE users u
+                SET projects_mapped = COALESCE(u.projects_mapped, '{}') || missing.project_ids
+                FROM missing
+                WHERE u.id = missing.user_id
+                RETURNING u.id
+            """
+            )
+        values = {"updated_since": updated_since} if updated_since else {}
+        rows = await db.fetch_all(query, values=values)
+        return len(rows)
+
     @staticmethod
     async def get_mapped_projects(
         user_id: int, preferred_locale: str, db: Database
@@ -443,6 +506,29 @@ class User(Base):
             ],
         )
 
+    @staticmethod
+    async def set_mapping_levels(levels: Dict[int, int], db: Database):
+        """Sets the mapping level of many users at once, given level ids by user id"""
+        if not levels:
+            return
+
+        query = """
+            UPDATE users
+            SET mapping_level = l.mapping_level
+            FROM unnest(
+                CAST(:user_ids AS bigint[]),
+                CAST(:level_ids AS integer[])
+            ) AS l(user_id, mapping_level)
+            WHERE users.id = l.user_id
+        """
+        await db.execute(
+            query,
+            values={
+                "user_ids": list(levels.keys()),
+                "level_ids": list(levels.values()),
+            },
+        )
+
     async def accept_license_terms(self, user_id, license_id: int, db: Database):
         """Associate the user in scope with the supplied license"""
         _ = await License.get_by_id(license_id, db)
@@ -479,12 +565,11 @@ class User(Base):
         user_dto.username = self.username
         user_dto.role = UserRole(self.role).name
 
-        user_dto.mapping_level = (
-            await MappingLevel.get_by_id(self.mapping_level, db)
-        ).name
-        user_dto.level_ordering = (
-            await MappingLevel.get_by_id(self.mapping_level, db)
-        ).ordering
+        mapping_level = (await reference_data.get(db)).mapping_level(
+            self.mapping_level
+        )
+        user_dto.mapping_level = mapping_level.name
+        user_dto.level_ordering = mapping_level.ordering
         user_dto.projects_mapped = (
             len(self.projects_mapped) if self.projects_mapped else None
         )
@@ -555,10 +640,7 @@ class UserStats(Base):
 
     @staticmethod
     async def update(user_id: int, stats: dict, db: Database):
-        new_stats = {}
-
-        for key, value in stats["result"]["topics"].items():
-            new_stats[key] = value["added"] if "added" in value else value["value"]
+        new_stats = UserStats.flatten(stats)
 
         await db.execute(
             """
@@ -575,6 +657,40 @@ class UserStats(Base):
 
         return new_stats
 
+    @staticmethod
+    def flatten(stats: dict) -> dict:
+        """Reduces ohsome topics to a value per topic, as stored in user_stats"""
+        new_stats = {}
+
+        for key, value in stats["result"]["topics"].items():
+            new_stats[key] = value["added"] if "added" in value else value["value"]
+
+        return new_stats
+
+    @staticmethod
+    async def update_many(stats: Dict[int, dict], db: Database):
+        """Stores the flattened stats of many users at once, keyed by user id"""
+        if not stats:
+            return
+
+        query = """
+            INSERT INTO user_stats (user_id, stats, date_obtained)
+            SELECT s.user_id, CAST(s.stats AS json), current_timestamp
+            FROM unnest(
+                CAST(:user_ids AS bigint[]),
+                CAST(:stats AS text[])
+            ) AS s(user_id, stats)
+            ON CONFLICT (user_id)
+            DO UPDATE SET stats=excluded.stats, date_obtained=current_timestamp
+        """
+        await db.execute(
+            query,
+            values={
+                "user_ids": list(stats.keys()),
+                "stats": [json.dumps(user_stats) for user_stats in stats.values()],
+            },
+        )
+
     @staticmethod
     async def get_for_user(user_id: int, db: Database):
         result = await db.fetch_one(
@@ -593,6 +709,41 @@ class UserMappingBadge(Base):
     badge_id = Column(Integer, nullable=False, primary_key=True)
     date_assigned = Column(DateTime, nullable=False, default=timestamp)
 
+    @staticmethod
+    async def get_for_users(user_ids: List[int], db: Database) -> Dict[int, set]:
+        """Gets the ids of the badges each of the users has"""
+        rows = await db.fetch_all(
+            """
+            SELECT user_id, badge_id FROM user_mapping_badge
+            WHERE user_id = ANY(:user_ids)
+            """,
+            values={"user_ids": user_ids},
+        )
+        badges = {user_id: set() for user_id in user_ids}
+        for row in rows:
+            badges[row["user_id"]].add(row["badge_id"])
+        return badges
+
+    @staticmethod
+    async def assign_many(assignments: List[Tuple[int, int]], db: Database):
+        """Assigns badges given as (user_id, badge_id) pairs, skipping those held"""
+        if not assignments:
+            return
+
+        query = """
+            INSERT INTO user_mapping_badge (user_id, badge_id, date_assigned)
+            SELECT a.user_id, a.badge_id, current_timestamp
+            FROM unnest(
+                CAST(:user_ids AS bigint[]),
+                CAST(:badge_ids AS integer[])
+            ) AS a(user_id, badge_id)
+            ON CONFLICT (user_id, badge_id) DO NOTHING
+        """
+        user_ids, badge_ids = zip(*assignments)
+        await db.execute(
+            query, values={"user_ids": list(user_ids), "badge_ids": list(badge_ids)}
+        )
+
 
 class UserNextLevel(Base):
     __tablename__ = "user_next_level"
@@ -633,6 +784,31 @@ class UserNextLevel(Base):
             },
         )
 
+    @staticmethod
+    async def nominate_many(nominations: List[Tuple[int, int]], db: Database):
+        """Nominates users given as (user_id, level_id) pairs for their next level"""
+        if not nominations:
+            return
+
+        query = """
+            INSERT INTO user_next_level (user_id, level_id, nomination_date)
+            SELECT n.user_id, n.level_id, :nomination_date
+            FROM unnest(
+                CAST(:user_ids AS bigint[]),
+                CAST(:level_ids AS integer[])
+            ) AS n(user_id, level_id)
+            ON CONFLICT (user_id, level_id) DO NOTHING
+        """
+        user_ids, level_ids = zip(*nominations)
+        await db.execute(
+            query,
+            values={
+                "user_ids": list(user_ids),
+                "level_ids": list(level_ids),
+                "nomination_date": timestamp(),
+            },
+        )
+
     @staticmethod
     async def is_nominated(user_id: int, level_id: int, db: Database):
         result = await db.fetch_one(
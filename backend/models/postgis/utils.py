@@ -158,6 +158,49 @@ def parse_duration(time_str):
     return datetime.timedelta(**time_params)
 
 
+def duration_to_seconds(duration_text):
+    """
+    Converts a lock duration written as 'HH:MM:SS[.ffffff]' into whole seconds.
+
+    :param duration_text: Duration as stored in the task history, may be None
+    :return int: Number of seconds, 0 when there is no duration
+    """
+    if not duration_text:
+        return 0
+    parts = duration_text.split(":")
+    return int(sum(float(part) * unit for part, unit in zip(parts, (3600, 60, 1))))
+
+
+def geodesic_area_triggers(table: str) -> list:
+    """
+    DDL keeping the area_km2 column of a table with a geometry column equal to the
+    geodesic area of the geometry. The area is computed on insert and when the
+    geometry changes; other writes of area_km2 are ignored.
+
+    :param table: Name of the table
+    :return list: Statements creating the trigger function and the trigger
+    """
+    return [
+        """
+        CREATE OR REPLACE FUNCTION set_area_km2() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' OR NEW.geometry IS DISTINCT FROM OLD.geometry THEN
+                NEW.area_km2 := ST_Area(NEW.geometry::geography) / 1000000;
+            ELSE
+                NEW.area_km2 := OLD.area_km2;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE TRIGGER {table}_area_km2
+        BEFORE INSERT OR UPDATE OF geometry, area_km2 ON {table}
+        FOR EACH ROW EXECUTE FUNCTION set_area_km2()
+        """,
+    ]
+
+
 def sanitize_markdown(text: str | None) -> str | None:
     """Convert markdown to sanitized HTML. Returns None for empty input."""
     if not text:
@@ -0,0 +1,164 @@
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional, Tuple
+
+from databases import Database
+from loguru import logger
+
+from backend.config import settings
+from backend.models.postgis.mapping_badge import MappingBadge
+from backend.models.postgis.mapping_level import MappingLevel
+from backend.services.task_event_service import (
+    InMemoryTaskEventBackend,
+    PostgresTaskEventBackend,
+)
+
+REFERENCE_DATA_CHANNEL = "reference_data"
+
+
+class ReferenceData:
+    """
+    Snapshot of the small tables read on hot paths: mapping levels and the badges
+    they require, mapping badges, licenses, interests and mapping issue categories.
+    Rows are indexed by id in read-only mappings and the snapshot is never changed
+    once loaded, a write replaces it with a new one instead.
+    """
+
+    def __init__(
+        self,
+        mapping_levels: Tuple[MappingLevel, ...],
+        level_badges: Dict[int, FrozenSet[int]],
+        mapping_badges: Tuple[MappingBadge, ...],
+        licenses: tuple,
+        interests: tuple,
+        mapping_issue_categories: tuple,
+    ):
+        # Ordered by their ordering, lowest level first
+        self.mapping_levels = mapping_levels
+        self.mapping_levels_by_id: Mapping[int, MappingLevel] = MappingProxyType(
+            {level.id: level for level in mapping_levels}
+        )
+        self.level_badges: Mapping[int, FrozenSet[int]] = MappingProxyType(
+            {
+                level.id: level_badges.get(level.id, frozenset())
+                for level in mapping_levels
+            }
+        )
+        self.mapping_badges: Mapping[int, MappingBadge] = MappingProxyType(
+            {badge.id: badge for badge in mapping_badges}
+        )
+        self.licenses: Mapping[int, Mapping] = MappingProxyType(
+            {row["id"]: row for row in licenses}
+        )
+        self.interests: Mapping[int, Mapping] = MappingProxyType(
+            {row["id"]: row for row in interests}
+        )
+        # Ordered by name, as listed to validators
+        self.mapping_issue_categories: Mapping[int, Mapping] = MappingProxyType(
+            {row["id"]: row for row in mapping_issue_categories}
+        )
+
+    @staticmethod
+    async def load(db: Database) -> "ReferenceData":
+        level_badges: Dict[int, set] = {}
+        for row in await db.fetch_all(
+            "SELECT level_id, badge_id FROM mapping_level_badges"
+        ):
+            level_badges.setdefault(row["level_id"], set()).add(row["badge_id"])
+
+        return ReferenceData(
+            tuple(await MappingLevel.get_all(db)),
+            {level_id: frozenset(ids) for level_id, ids in level_badges.items()},
+            tuple(await MappingBadge.get_all(db)),
+            tuple(
+                await db.fetch_all(
+                    """
+                    SELECT id, name, description, plain_text
+                    FROM licenses
+                    ORDER BY id
+                    """
+                )
+            ),
+            tuple(await db.fetch_all("SELECT id, name FROM interests ORDER BY id")),
+            tuple(
+                await db.fetch_all(
+                    """
+                    SELECT id, name, description, archived
+                    FROM mapping_issue_categories
+                    ORDER BY name
+                    """
+                )
+            ),
+        )
+
+    def mapping_level(self, level_id: int) -> Optional[MappingLevel]:
+        return self.mapping_levels_by_id.get(level_id)
+
+    def next_mapping_level(self, level_id: int) -> Optional[MappingLevel]:
+        """Gets the level after the supplied one, None for the highest level"""
+        current = self.mapping_levels_by_id.get(level_id)
+        if current is None:
+            return None
+        return next(
+            (
+                level
+                for level in self.mapping_levels
+                if level.ordering > current.ordering
+            ),
+            None,
+        )
+
+
+class ReferenceDataRegistry:
+    """
+    Process-wide copy of the reference data. It is loaded on first use and dropped
+    whenever one of its tables is written to, so the next read loads it again. With
+    the default 'postgres' backend writes made by other workers drop it too.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.data: Optional[ReferenceData] = None
+        # Bumped on each invalidation so a load racing a write isn't kept
+        self.version = 0
+
+    async def start(self, db: Database):
+        await self.backend.start(self._on_change)
+        await self.get(db)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    async def get(self, db: Database) -> ReferenceData:
+        data = self.data
+        if data is None:
+            version = self.version
+            data = await ReferenceData.load(db)
+            if version == self.version:
+                self.data = data
+        return data
+
+    def invalidate(self):
+        self.version += 1
+        self.data = None
+
+    async def changed(self, db: Database):
+        """To be called after writing to a reference table, reloads it everywhere"""
+        self.invalidate()
+        await self.backend.publish({"changed": True}, db)
+
+    def _on_change(self, event: dict):
+        # Resync events after a lost connection also invalidate, changes may be missed
+        logger.debug(f"Reference data invalidated by {event}")
+        self.invalidate()
+
+
+def get_reference_data_backend():
+    if settings.REFERENCE_DATA_BACKEND == "postgres":
+        dsn = settings.SQLALCHEMY_DATABASE_URI.unicode_string()
+        return PostgresTaskEventBackend(
+            dsn.replace("postgresql+asyncpg", "postgresql"), REFERENCE_DATA_CHANNEL
+        )
+    return InMemoryTaskEventBackend()
+
+
+reference_data = ReferenceDataRegistry(get_reference_data_backend())
@@ -1,8 +1,11 @@
 import json
 
 import geojson
+import numpy as np
+import shapely
 import shapely.geometry
 from loguru import logger
+from shapely import STRtree
 from shapely.geometry import MultiPolygon, mapping
 from shapely.ops import unary_union
 
@@ -26,38 +29,111 @@ class GridService:
         :param grid_dto: the dto containing
         :return: geojson.FeatureCollection trimmed task grid
         """
-        # get items out of the dto
-        grid = geojson.loads(geojson.dumps(grid_dto.grid))
-        aoi = geojson.loads(geojson.dumps(grid_dto.area_of_interest))
+        features = grid_dto.grid["features"]
         clip_to_aoi = grid_dto.clip_to_aoi
 
-        # create a shapely shape from the aoi
+        # create a prepared shapely shape from the aoi
         aoi_multi_polygon_geojson = GridService.merge_to_multi_polygon(
-            aoi, dissolve=True
+            grid_dto.area_of_interest, dissolve=True
         )
-
         aoi_multi_polygon = shapely.geometry.shape(aoi_multi_polygon_geojson)
+        shapely.prepare(aoi_multi_polygon)
+
+        # only tiles intersecting the aoi are kept, use the tree to find them
+        tiles, rings, is_multi = GridService._features_to_geometries(features)
+        candidates = np.sort(
+            STRtree(tiles).query(aoi_multi_polygon, predicate="intersects")
+        )
+        # tiles completely within the aoi are used as is, the others are intersected
+        contained = shapely.contains(aoi_multi_polygon, tiles[candidates])
+        partial = candidates[~contained]
+        intersections = shapely.intersection(aoi_multi_polygon, tiles[partial])
+        # skip intersections which are not polygons, tiles only touching the aoi
+        is_polygonal = np.isin(
+            shapely.get_type_id(intersections),
+            [shapely.GeometryType.POLYGON, shapely.GeometryType.MULTIPOLYGON],
+        ) & ~shapely.is_empty(intersections)
+        clipped = dict(zip(partial[is_polygonal], intersections[is_polygonal]))
+
         intersecting_features = []
-        for feature in grid["features"]:
-            # create a shapely shape for the tile
-            tile = shapely.geometry.shape(feature["geometry"])
-            if aoi_multi_polygon.contains(tile):
+        for index, is_contained in zip(candidates, contained):
+            if not is_contained and index not in clipped:
+                continue
+            feature = {
+                **features[index],
+                "geometry": GridService._tile_geometry(tiles, rings, is_multi, index),
+            }
+            if is_contained:
                 # tile is completely within aoi, use as is
                 intersecting_features.append(feature)
-            else:
-                intersection = aoi_multi_polygon.intersection(tile)
-                if intersection.is_empty or intersection.geom_type not in [
-                    "Polygon",
-                    "MultiPolygon",
-                ]:
-                    continue  # this intersections which are not polygons or which are completely outside aoi
-                # tile is partially intersecting the aoi
-                clipped_feature = GridService._update_feature(
-                    clip_to_aoi, feature, intersection
-                )
-                intersecting_features.append(clipped_feature)
+                continue
+            # tile is partially intersecting the aoi, copy properties to leave the dto untouched
+            feature["properties"] = dict(feature.get("properties") or {})
+            clipped_feature = GridService._update_feature(
+                clip_to_aoi, feature, clipped[index]
+            )
+            intersecting_features.append(clipped_feature)
         return geojson.FeatureCollection(intersecting_features)
 
+    @staticmethod
+    def _features_to_geometries(features: list) -> tuple:
+        """
+        Builds an array of shapely geometries for the grid features, with coordinates rounded
+        to the geojson precision used for the aoi. Grid squares are single ring polygons,
+        these are built in one call from their coordinates, z values included.
+        :param features: list of geojson features
+        :return: geometries in the order of the features and, for single ring polygons,
+            their rounded rings and whether each was a MultiPolygon, otherwise None
+        """
+        rings = []
+        is_multi = []
+        for feature in features:
+            geometry = feature["geometry"]
+            if geometry["type"] == "MultiPolygon" and len(geometry["coordinates"]) == 1:
+                polygon = geometry["coordinates"][0]
+            elif geometry["type"] == "Polygon":
+                polygon = geometry["coordinates"]
+            else:
+                polygon = None
+            if polygon is None or len(polygon) != 1:
+                break
+            rings.append(polygon[0])
+            is_multi.append(geometry["type"] == "MultiPolygon")
+        else:
+            if rings and len({len(ring) for ring in rings}) == 1:
+                try:
+                    coordinates = np.asarray(rings, dtype=float)
+                except ValueError:
+                    coordinates = None  # rings mixing 2D and 3D positions
+                if coordinates is not None and coordinates.shape[2] in (2, 3):
+                    coordinates = np.round(
+                        coordinates, geojson.geometry.DEFAULT_PRECISION
+                    )
+                    return shapely.polygons(coordinates), coordinates, is_multi
+
+        # mixed or multi part geometries, build them one by one
+        geometries = np.array(
+            [
+                shapely.geometry.shape(geojson.GeoJSON.to_instance(feature["geometry"]))
+                for feature in features
+            ],
+            dtype=object,
+        )
+        return geometries, None, None
+
+    @staticmethod
+    def _tile_geometry(tiles, rings, is_multi, index) -> dict:
+        """
+        Returns the geojson geometry of a grid tile from its rounded coordinates, keeping
+        the z values of 3D tiles like the tiles built one by one
+        """
+        if rings is None:
+            return mapping(tiles[index])
+        ring = rings[index].tolist()
+        if is_multi[index]:
+            return {"type": "MultiPolygon", "coordinates": [[ring]]}
+        return {"type": "Polygon", "coordinates": [ring]}
+
     @staticmethod
     def tasks_from_aoi_features(feature_collection: str) -> geojson.FeatureCollection:
         """
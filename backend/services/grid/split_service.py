@@ -1,3 +1,5 @@
+import math
+
 from backend.exceptions import NotFound
 import geojson
 from databases import Database
@@ -5,14 +7,22 @@ from databases import Database
 from geoalchemy2 import shape
 from geoalchemy2.elements import WKBElement
 from loguru import logger
-from shapely.geometry import LineString, MultiPolygon, Polygon
+from shapely.geometry import LineString, MultiPolygon, mapping
 from shapely.geometry import shape as shapely_shape
 from shapely.ops import split
 
+from backend.cache import cache, project_tag
 from backend.models.dtos.grid_dto import SplitTaskDTO
 from backend.models.dtos.mapping_dto import TaskDTOs
+from backend.models.postgis.project_activity_rollup import ProjectActivityRollup
 from backend.models.postgis.task import Task, TaskAction, TaskStatus
 from backend.models.postgis.utils import InvalidGeoJson
+from backend.services.task_event_service import task_event_hub
+
+# Radius of the sphere used by the Web Mercator projection
+EARTH_RADIUS = 6378137
+# Default number of decimal digits written by PostGIS ST_AsGeoJSON
+GEOJSON_DECIMAL_DIGITS = 9
 
 
 class SplitServiceError(Exception):
@@ -24,12 +34,12 @@ class SplitServiceError(Exception):
 
 class SplitService:
     @staticmethod
-    async def _create_split_tasks(x, y, zoom, task, db) -> list:
+    def _create_split_tasks(x, y, zoom, task) -> list:
         """
         Splitting a task square geometry into 4 smaller squares.
         """
         if x is None or y is None or zoom is None or not task.is_square:
-            return await SplitService._create_split_tasks_from_geometry(task, db)
+            return SplitService._create_split_tasks_from_geometry(task)
 
         try:
             split_geoms = []
@@ -38,9 +48,7 @@ class SplitService:
                     new_x = x * 2 + i
                     new_y = y * 2 + j
                     new_zoom = zoom + 1
-                    new_square = await SplitService._create_square(
-                        new_x, new_y, new_zoom, db
-                    )
+                    new_square = SplitService._create_square(new_x, new_y, new_zoom)
                     feature = geojson.Feature()
                     feature.geometry = new_square
                     feature.properties = {
@@ -59,9 +67,10 @@ class SplitService:
             raise SplitServiceError(f"unhandled error splitting tile: {str(e)}")
 
     @staticmethod
-    async def _create_square(x, y, zoom, db) -> geojson.MultiPolygon:
+    def _create_square(x, y, zoom) -> geojson.MultiPolygon:
         """
-        Refactored function to create a geojson.MultiPolygon square using raw SQL with encode databases.
+        Creates the geojson.MultiPolygon of a tile square in WGS84 from its Web Mercator
+        tile coordinates.
         """
         MAXRESOLUTION = 156543.0339
         max = MAXRESOLUTION * 256 / 2
@@ -72,49 +81,32 @@ class SplitService:
         xmax = (x + 1) * step - max
         ymax = (y + 1) * step - max
 
-        # Create the MultiPolygon object
-        multipolygon = MultiPolygon(
-            [Polygon([(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)])]
-        )
+        # round as ST_AsGeoJSON does, so squares match those PostGIS used to create
+        ring = [
+            tuple(
+                round(value, GEOJSON_DECIMAL_DIGITS)
+                for value in SplitService._mercator_to_lon_lat(x, y)
+            )
+            for x, y in ((xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax))
+        ]
+        return geojson.MultiPolygon([[ring + ring[:1]]])
 
-        # Convert MultiPolygon to WKT
-        multipolygon_wkt = multipolygon.wkt
-
-        # Query to transform and get the GeoJSON
-        create_square_query = """
-            SELECT ST_AsGeoJSON(
-                ST_Transform(
-                    ST_SetSRID(
-                        ST_Multi(ST_GeomFromText(:multipolygon_geometry)),
-                        3857
-                    ),
-                    4326
-                )
-            ) AS geojson
+    @staticmethod
+    def _mercator_to_lon_lat(x: float, y: float) -> tuple:
         """
-        # Use the WKT version of the multipolygon in the SQL query
-        square_geojson_str = await db.fetch_val(
-            create_square_query, values={"multipolygon_geometry": multipolygon_wkt}
-        )
-
-        # Convert the result back to GeoJSON and return
-        return geojson.loads(square_geojson_str)
+        Converts a Web Mercator (EPSG:3857) position into longitude and latitude (EPSG:4326)
+        using the spherical inverse projection, as PostGIS ST_Transform does
+        """
+        lon = math.degrees(x / EARTH_RADIUS)
+        lat = math.degrees(math.atan(math.sinh(y / EARTH_RADIUS)))
+        return lon, lat
 
     @staticmethod
-    async def _create_split_tasks_from_geometry(task, db) -> list:
+    def _create_split_tasks_from_geometry(task) -> list:
         """
         Splits a task into 4 smaller tasks based on its geometry (not OSM tile).
         """
-        task_query = """
-            SELECT ST_AsGeoJSON(geometry) AS geometry
-            FROM tasks
-            WHERE id = :task_id AND project_id = :project_id
-        """
-        task_geojson_str = await db.fetch_val(
-            task_query, values={"task_id": task.id, "project_id": task.project_id}
-        )
-        task_geojson = geojson.loads(task_geojson_str)
-        geometry = shapely_shape(task_geojson)
+        geometry = shape.to_shape(WKBElement(task["geometry"], srid=4326))
         centroid = geometry.centroid
         minx, miny, maxx, maxy = geometry.bounds
 
@@ -134,23 +126,13 @@ class SplitService:
         # convert split geometries into GeoJSON features expected by Task
         split_features = []
         for split_geometry in split_geometries:
-            multipolygon_geometry_wkt = split_geometry.wkt
-            multipolygon_as_geojson_query = """
-                SELECT ST_AsGeoJSON(
-                    ST_Transform(
-                        ST_SetSRID(
-                            ST_Multi(ST_GeomFromText(:multipolygon_geometry)),
-                            4326
-                        ),
-                        4326
-                    )
-                ) AS geojson
-            """
-            feature_geojson = await db.fetch_val(
-                multipolygon_as_geojson_query,
-                values={"multipolygon_geometry": multipolygon_geometry_wkt},
-            )
-            feature = geojson.Feature(geometry=geojson.loads(feature_geojson))
+            if split_geometry.geom_type == "Polygon":
+                split_geometry = MultiPolygon([split_geometry])
+            coordinates = geojson.utils.map_coords(
+                lambda value: round(value, GEOJSON_DECIMAL_DIGITS),
+                mapping(split_geometry),
+            )["coordinates"]
+            feature = geojson.Feature(geometry=geojson.MultiPolygon(coordinates))
             feature.properties["x"] = None
             feature.properties["y"] = None
             feature.properties["zoom"] = None
@@ -238,29 +220,29 @@ class SplitService:
 
     @staticmethod
     async def split_task(split_task_dto: SplitTaskDTO, db: Database) -> list:
-        original_task = await Task.get(
-            split_task_dto.task_id, split_task_dto.project_id, db
-        )
-
-        if not original_task:
-            raise NotFound(sub_code="TASK_NOT_FOUND", task_id=split_task_dto.task_id)
-
-        original_geometry = shape.to_shape(
-            WKBElement(original_task["geometry"], srid=4326)
-        )
-
+        # Fetch the task along with its stored area in m²
         query = """
-            SELECT ST_Area(ST_GeogFromWKB(geometry))
+            SELECT
+                id, project_id, x, y, zoom, is_square, task_status, locked_by, geometry,
+                area_km2 * 1000000 AS area
             FROM tasks
             WHERE id = :task_id AND project_id = :project_id
         """
-        original_task_area_m = await db.fetch_val(
+        original_task = await db.fetch_one(
             query,
             values={
                 "task_id": split_task_dto.task_id,
                 "project_id": split_task_dto.project_id,
             },
         )
+
+        if not original_task:
+            raise NotFound(sub_code="TASK_NOT_FOUND", task_id=split_task_dto.task_id)
+
+        original_geometry = shape.to_shape(
+            WKBElement(original_task["geometry"], srid=4326)
+        )
+        original_task_area_m = original_task["area"]
         if (
             original_task["zoom"] and original_task["zoom"] >= 18
         ) or original_task_area_m < 25000:
@@ -276,12 +258,11 @@ class SplitService:
             )
 
         # Split the task geometry into smaller tasks
-        new_tasks_geojson = await SplitService._create_split_tasks(
+        new_tasks_geojson = SplitService._create_split_tasks(
             original_task["x"],
             original_task["y"],
             original_task["zoom"],
             original_task,
-            db,
         )
 
         # Fetch the highest task ID for the project
@@ -366,6 +347,11 @@ class SplitService:
         await SplitService.delete_task_and_related_records(
             split_task_dto.task_id, split_task_dto.project_id, db
         )
+        # History was copied to the new tasks and removed from the original one
+        await ProjectActivityRollup.refresh(db, [split_task_dto.project_id])
+        # The task geometries changed, clients reload the project tasks
+        await task_event_hub.publish_resync(split_task_dto.project_id, db)
+        await cache.invalidate(project_tag(split_task_dto.project_id))
 
         query = """
             UPDATE projects
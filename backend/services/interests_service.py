@@ -11,18 +11,14 @@ from backend.models.dtos.interests_dto import (
 )
 from backend.models.postgis.interests import Interest
 from backend.models.postgis.project import Project
+from backend.reference_data import reference_data
 from backend.services.project_service import ProjectService
 
 
 class InterestService:
     @staticmethod
     async def get(interest_id: int, db: Database) -> InterestDTO:
-        query = """
-            SELECT id, name
-            FROM interests
-            WHERE id = :interest_id
-        """
-        interest_dto = await db.fetch_one(query, {"interest_id": interest_id})
+        interest_dto = (await reference_data.get(db)).interests.get(interest_id)
         if interest_dto is None:
             raise NotFound(sub_code="INTEREST_NOT_FOUND", interest_id=interest_id)
         return interest_dto
@@ -41,6 +37,7 @@ class InterestService:
         """
         values = {"name": interest_name}
         interest_id = await db.execute(query, values)
+        await reference_data.changed(db)
 
         query_select = """
             SELECT id, name
@@ -64,6 +61,7 @@ class InterestService:
         """
         values = {"name": interest_dto.name}
         await db.execute(query, {**values, "interest_id": interest_id})
+        await reference_data.changed(db)
 
         query_select = """
             SELECT id, name
@@ -75,14 +73,10 @@ class InterestService:
 
     @staticmethod
     async def get_all_interests(db: Database) -> InterestsListDTO:
-        query = """
-            SELECT id, name
-            FROM interests
-        """
-        results = await db.fetch_all(query)
+        interests = (await reference_data.get(db)).interests
 
         interest_list_dto = InterestsListDTO()
-        for record in results:
+        for record in interests.values():
             interest_dto = InterestDTO(**record)
             interest_list_dto.interests.append(interest_dto)
         return interest_list_dto
@@ -133,6 +127,7 @@ class InterestService:
                 await db.execute(query, {"interest_id": interest_id})
         except Exception as e:
             raise HTTPException(status_code=500, detail="Deletion failed") from e
+        await reference_data.changed(db)
 
     @staticmethod
     async def create_or_update_project_interests(project_id, interests, db: Database):
@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from backend.exceptions import NotFound
 from backend.models.dtos.licenses_dto import LicenseDTO, LicenseListDTO
 from backend.models.postgis.licenses import License
+from backend.reference_data import reference_data
 
 
 class LicenseService:
@@ -18,22 +19,18 @@ class LicenseService:
 
     @staticmethod
     async def get_license_as_dto(license_id: int, db: Database) -> LicenseDTO:
-        """Get License from DB"""
-        query = """
-            SELECT id AS "licenseId", name, description, plain_text AS "plainText"
-            FROM licenses
-            WHERE id = :license_id
-        """
-        license_dto = await db.fetch_one(query, {"license_id": license_id})
+        """Get License from the reference data"""
+        map_license = (await reference_data.get(db)).licenses.get(license_id)
 
-        if license_dto is None:
+        if map_license is None:
             raise NotFound(sub_code="LICENSE_NOT_FOUND", license_id=license_id)
-        return LicenseDTO(**license_dto)
+        return LicenseService._as_dto(map_license)
 
     @staticmethod
     async def create_license(license_dto: LicenseDTO, db: Database) -> int:
         """Create License in DB"""
         new_license_id = await License.create_from_dto(license_dto, db)
+        await reference_data.changed(db)
         return new_license_id
 
     @staticmethod
@@ -54,6 +51,7 @@ class LicenseService:
             "plain_text": license_dto.plain_text,
         }
         await db.execute(query, values={**values, "license_id": license_id})
+        await reference_data.changed(db)
 
     @staticmethod
     async def delete_license(license_id: int, db: Database):
@@ -80,18 +78,23 @@ class LicenseService:
                 await db.execute(query, {"license_id": license_id})
         except Exception as e:
             raise HTTPException(status_code=500, detail="Deletion failed") from e
+        await reference_data.changed(db)
 
     @staticmethod
     async def get_all_licenses(db: Database) -> LicenseListDTO:
         """Gets all licenses currently stored"""
-        query = """
-            SELECT id AS "licenseId", name, description, plain_text AS "plainText"
-            FROM licenses
-        """
-        results = await db.fetch_all(query)
+        licenses = (await reference_data.get(db)).licenses
 
         lic_dto = LicenseListDTO()
-        for record in results:
-            l_dto = LicenseDTO(**record)
-            lic_dto.licenses.append(l_dto)
+        for record in licenses.values():
+            lic_dto.licenses.append(LicenseService._as_dto(record))
         return lic_dto
+
+    @staticmethod
+    def _as_dto(record) -> LicenseDTO:
+        return LicenseDTO(
+            licenseId=record["id"],
+            name=record["name"],
+            description=record["description"],
+            plainText=record["plain_text"],
+        )
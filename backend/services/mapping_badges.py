@@ -8,6 +8,7 @@ from backend.models.dtos.mapping_badge_dto import (
     MappingBadgeListDTO,
     MappingBadgePublicListDTO,
 )
+from backend.reference_data import reference_data
 
 
 class MappingBadgeService:
@@ -23,15 +24,20 @@ class MappingBadgeService:
 
     @staticmethod
     async def create(data: MappingBadgeCreateDTO, db: Database) -> MappingBadgeDTO:
-        return (await MappingBadge.create(data, db)).as_dto()
+        badge = await MappingBadge.create(data, db)
+        await reference_data.changed(db)
+        return badge.as_dto()
 
     @staticmethod
     async def update(data: MappingBadgeUpdateDTO, db: Database) -> MappingBadgeDTO:
-        return (await MappingBadge.update(data, db)).as_dto()
+        badge = await MappingBadge.update(data, db)
+        await reference_data.changed(db)
+        return badge.as_dto()
 
     @staticmethod
     async def delete(id: int, db: Database):
         await MappingBadge.delete(id, db)
+        await reference_data.changed(db)
 
     @staticmethod
     async def get_for_user(user_id: int, db: Database):
@@ -1,8 +1,12 @@
 from databases import Database
 
 from backend.exceptions import NotFound
-from backend.models.dtos.mapping_issues_dto import MappingIssueCategoryDTO
+from backend.models.dtos.mapping_issues_dto import (
+    MappingIssueCategoriesDTO,
+    MappingIssueCategoryDTO,
+)
 from backend.models.postgis.mapping_issues import MappingIssueCategory
+from backend.reference_data import reference_data
 
 
 class MappingIssueCategoryService:
@@ -39,6 +43,7 @@ class MappingIssueCategoryService:
         new_mapping_issue_category_id = await MappingIssueCategory.create_from_dto(
             category_dto, db
         )
+        await reference_data.changed(db)
         return new_mapping_issue_category_id
 
     @staticmethod
@@ -50,6 +55,7 @@ class MappingIssueCategoryService:
             category_dto.category_id, db
         )
         await MappingIssueCategory.update_category(category, category_dto, db)
+        await reference_data.changed(db)
         return MappingIssueCategory.as_dto(category)
 
     @staticmethod
@@ -59,8 +65,22 @@ class MappingIssueCategoryService:
             category_id, db
         )
         await MappingIssueCategory.delete(category, db)
+        await reference_data.changed(db)
 
     @staticmethod
     async def get_all_mapping_issue_categories(include_archived, db):
-        """Get all mapping issue categories"""
-        return await MappingIssueCategory.get_all_categories(include_archived, db)
+        """Get all mapping issue categories, ordered by name"""
+        categories = (await reference_data.get(db)).mapping_issue_categories
+
+        dto = MappingIssueCategoriesDTO()
+        for row in categories.values():
+            if row["archived"] and not include_archived:
+                continue
+            category = MappingIssueCategoryDTO()
+            category.category_id = row["id"]
+            category.name = row["name"]
+            category.description = row["description"]
+            category.archived = row["archived"]
+            dto.categories.append(category)
+
+        return dto
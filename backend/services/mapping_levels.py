@@ -12,6 +12,7 @@ from backend.models.dtos.mapping_level_dto import (
     MappingLevelListDTO,
 )
 from backend.models.dtos.mapping_badge_dto import MappingBadgeDTO
+from backend.reference_data import reference_data
 
 
 class MappingLevelService:
@@ -56,6 +57,7 @@ class MappingLevelService:
     @staticmethod
     async def create(data: MappingLevelCreateDTO, db: Database) -> MappingLevelDTO:
         dto = (await MappingLevel.create(data, db)).as_dto()
+        await reference_data.changed(db)
         dto.required_badges = await MappingLevelService.get_associated_badges(
             dto.id, db
         )
@@ -65,6 +67,7 @@ class MappingLevelService:
     @staticmethod
     async def update(data: MappingLevelUpdateDTO, db: Database) -> MappingLevelDTO:
         dto = (await MappingLevel.update(data, db)).as_dto()
+        await reference_data.changed(db)
         dto.required_badges = await MappingLevelService.get_associated_badges(
             dto.id, db
         )
@@ -74,3 +77,4 @@ class MappingLevelService:
     @staticmethod
     async def delete(id: int, db: Database):
         await MappingLevel.delete(id, db)
+        await reference_data.changed(db)
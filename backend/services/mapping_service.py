@@ -1,5 +1,6 @@
 import datetime
 import xml.etree.ElementTree as ET
+from typing import AsyncGenerator, Callable, List, Optional
 
 from databases import Database
 from fastapi import BackgroundTasks
@@ -24,6 +25,11 @@ from backend.services.messaging.message_service import MessageService
 from backend.services.project_service import ProjectService
 from backend.services.stats_service import StatsService
 
+# Declaration ElementTree writes for encoding="utf8"
+XML_DECLARATION = "<?xml version='1.0' encoding='utf8'?>\n"
+# Number of tasks rendered per chunk of the GPX and OSM XML exports
+EXPORT_CHUNK_SIZE = 100
+
 
 class MappingServiceError(Exception):
     """Custom Exception to notify callers an error occurred when handling mapping"""
@@ -286,29 +292,62 @@ class MappingService:
             task_comment.preferred_locale,
         )
 
+    @staticmethod
+    async def get_export_task_ids(
+        project_id: int, task_ids_str: Optional[str], db: Database
+    ) -> Optional[List[int]]:
+        """
+        Parses the comma separated task ids of a GPX or OSM XML export, None meaning all
+        tasks. Raises NotFound before anything is streamed if there is no such task.
+        """
+        if not task_ids_str:
+            if not await Task.any_exist(project_id, None, db):
+                raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
+            return None
+
+        task_ids = list(map(int, task_ids_str.split(",")))
+        if not await Task.any_exist(project_id, task_ids, db):
+            raise NotFound(
+                sub_code="TASKS_NOT_FOUND", project_id=project_id, task_ids=task_ids
+            )
+        return task_ids
+
     @staticmethod
     async def generate_gpx(
         project_id: int, task_ids_str: str, db: Database, timestamp=None
-    ):
+    ) -> bytes:
         """
         Creates a GPX file for supplied tasks.  Timestamp is for unit testing only.
         You can use the following URL to test locally:
         http://www.openstreetmap.org/edit?editor=id&#map=11/31.50362930069913/34.628906243797054&comment=CHANGSET_COMMENT&gpx=http://localhost:5000/api/v2/projects/{project_id}/tasks/queries/gpx%3Ftasks=2
         """
+        task_ids = await MappingService.get_export_task_ids(
+            project_id, task_ids_str, db
+        )
+        return b"".join(
+            [
+                chunk
+                async for chunk in MappingService.stream_gpx(
+                    project_id, task_ids, db, timestamp
+                )
+            ]
+        )
 
+    @staticmethod
+    async def stream_gpx(
+        project_id: int,
+        task_ids: Optional[List[int]],
+        db: Database,
+        timestamp=None,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Streams the GPX file of the tasks in chunks, with the same bytes ElementTree
+        would write for the whole document. Waypoints follow the track, so the tasks
+        are read twice rather than kept in memory.
+        """
         if timestamp is None:
             timestamp = datetime.datetime.utcnow()
 
-        root = ET.Element(
-            "gpx",
-            attrib=dict(
-                version="1.1",
-                creator="HOT Tasking Manager",
-                xmlns="http://www.topografix.com/GPX/1/1",
-            ),
-        )
-
-        # Create GPX Metadata element
         metadata = ET.Element("metadata")
         link = ET.SubElement(
             metadata,
@@ -317,86 +356,95 @@ class MappingService:
         )
         ET.SubElement(link, "text").text = "HOT Tasking Manager"
         ET.SubElement(metadata, "time").text = timestamp.isoformat()
-        root.append(metadata)
-
-        # Create trk element
-        trk = ET.Element("trk")
-        root.append(trk)
-        ET.SubElement(trk, "name").text = (
-            f"Task for project {project_id}. Do not edit outside of this area!"
-        )
-
-        # Construct trkseg elements
-        if task_ids_str is not None:
-            task_ids = list(map(int, task_ids_str.split(",")))
-            tasks = await Task.get_tasks(project_id, task_ids, db)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(
-                    sub_code="TASKS_NOT_FOUND", project_id=project_id, task_ids=task_ids
-                )
-        else:
-            tasks = await Task.get_all_tasks(project_id, db)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
-
-        for task in tasks:
-            # task_geom = shape.to_shape(task.geometry)
-            if isinstance(task["geometry"], (bytes, str)):
-                task_geom = to_shape(WKBElement(task["geometry"], srid=4326))
-            else:
-                raise ValueError("Invalid geometry format")
-            for poly in task_geom.geoms:
-                trkseg = ET.SubElement(trk, "trkseg")
+        name = ET.Element("name")
+        name.text = f"Task for project {project_id}. Do not edit outside of this area!"
+        yield (
+            XML_DECLARATION
+            + '<gpx version="1.1" creator="HOT Tasking Manager" '
+            + 'xmlns="http://www.topografix.com/GPX/1/1">'
+            + ET.tostring(metadata, encoding="unicode")
+            + "<trk>"
+            + ET.tostring(name, encoding="unicode")
+        ).encode()
+
+        def trksegs(task_id: int, polygons) -> str:
+            parts = []
+            for poly in polygons:
+                trkseg = ET.Element("trkseg")
                 for point in poly.exterior.coords:
                     ET.SubElement(
                         trkseg,
                         "trkpt",
                         attrib=dict(lon=str(point[0]), lat=str(point[1])),
                     )
-                    wpt = ET.Element(
+                parts.append(ET.tostring(trkseg, encoding="unicode"))
+            return "".join(parts)
+
+        def wpts(task_id: int, polygons) -> str:
+            return "".join(
+                ET.tostring(
+                    ET.Element(
                         "wpt", attrib=dict(lon=str(point[0]), lat=str(point[1]))
-                    )
-                    root.append(wpt)
+                    ),
+                    encoding="unicode",
+                )
+                for poly in polygons
+                for point in poly.exterior.coords
+            )
 
-        xml_gpx = ET.tostring(root, encoding="utf8")
-        return xml_gpx
+        async for chunk in MappingService._stream_tasks(
+            project_id, task_ids, db, trksegs
+        ):
+            yield chunk
+        yield b"</trk>"
+        async for chunk in MappingService._stream_tasks(project_id, task_ids, db, wpts):
+            yield chunk
+        yield b"</gpx>"
 
     @staticmethod
-    async def generate_osm_xml(project_id: int, task_ids_str: str, db: Database) -> str:
+    async def generate_osm_xml(
+        project_id: int, task_ids_str: str, db: Database
+    ) -> bytes:
         """Generate xml response suitable for loading into JOSM.  A sample output file is in
         /backend/helpers/testfiles/osm-sample.xml"""
-        # Note XML created with upload No to ensure it will be rejected by OSM if uploaded by mistake
-        root = ET.Element(
-            "osm",
-            attrib=dict(version="0.6", upload="never", creator="HOT Tasking Manager"),
+        task_ids = await MappingService.get_export_task_ids(
+            project_id, task_ids_str, db
         )
-        if task_ids_str:
-            task_ids = list(map(int, task_ids_str.split(",")))
-            tasks = await Task.get_tasks(project_id, task_ids, db)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(
-                    sub_code="TASKS_NOT_FOUND", project_id=project_id, task_ids=task_ids
+        return b"".join(
+            [
+                chunk
+                async for chunk in MappingService.stream_osm_xml(
+                    project_id, task_ids, db
                 )
-        else:
-            tasks = await Task.get_all_tasks(project_id, db)
-            if not tasks or len(tasks) == 0:
-                raise NotFound(sub_code="TASKS_NOT_FOUND", project_id=project_id)
+            ]
+        )
+
+    @staticmethod
+    async def stream_osm_xml(
+        project_id: int, task_ids: Optional[List[int]], db: Database
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Streams the OSM XML of the tasks in chunks, with the same bytes ElementTree
+        would write for the whole document
+        """
+        # Note XML created with upload No to ensure it will be rejected by OSM if uploaded by mistake
+        yield (
+            XML_DECLARATION
+            + '<osm version="0.6" upload="never" creator="HOT Tasking Manager">'
+        ).encode()
 
         fake_id = -1  # We use fake-ids to ensure XML will not be validated by OSM
-        for task in tasks:
-            if isinstance(task["geometry"], (bytes, str)):
-                task_geom = to_shape(WKBElement(task["geometry"], srid=4326))
-            else:
-                raise ValueError("Invalid geometry format")
-            way = ET.SubElement(
-                root,
+
+        def way_and_nodes(task_id: int, polygons) -> str:
+            nonlocal fake_id
+            way = ET.Element(
                 "way",
-                attrib=dict(id=str((task.id * -1)), action="modify", visible="true"),
+                attrib=dict(id=str((task_id * -1)), action="modify", visible="true"),
             )
-            for poly in task_geom.geoms:
+            nodes = []
+            for poly in polygons:
                 for point in poly.exterior.coords:
-                    ET.SubElement(
-                        root,
+                    node = ET.Element(
                         "node",
                         attrib=dict(
                             action="modify",
@@ -406,11 +454,40 @@ class MappingService:
                             lat=str(point[1]),
                         ),
                     )
+                    nodes.append(ET.tostring(node, encoding="unicode"))
                     ET.SubElement(way, "nd", attrib=dict(ref=str(fake_id)))
                     fake_id -= 1
+            return ET.tostring(way, encoding="unicode") + "".join(nodes)
 
-        xml_gpx = ET.tostring(root, encoding="utf8")
-        return xml_gpx
+        async for chunk in MappingService._stream_tasks(
+            project_id, task_ids, db, way_and_nodes
+        ):
+            yield chunk
+        yield b"</osm>"
+
+    @staticmethod
+    async def _stream_tasks(
+        project_id: int,
+        task_ids: Optional[List[int]],
+        db: Database,
+        render: Callable[[int, list], str],
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Renders the id and polygons of each task, read through a server side cursor,
+        yielding the output of EXPORT_CHUNK_SIZE tasks at a time
+        """
+        parts = []
+        async for task in Task.iterate_geometries(project_id, task_ids, db):
+            if isinstance(task["geometry"], (bytes, str)):
+                polygons = to_shape(WKBElement(task["geometry"], srid=4326)).geoms
+            else:
+                raise ValueError("Invalid geometry format")
+            parts.append(render(task["id"], polygons))
+            if len(parts) == EXPORT_CHUNK_SIZE:
+                yield "".join(parts).encode()
+                parts = []
+        if parts:
+            yield "".join(parts).encode()
 
     @staticmethod
     async def undo_mapping(
@@ -460,44 +537,20 @@ class MappingService:
 
     @staticmethod
     async def map_all_tasks(project_id: int, user_id: int, db: Database):
-        """Marks all tasks on a project as mapped using raw SQL queries"""
-
-        query = """
-            SELECT id, task_status
-            FROM tasks
-            WHERE project_id = :project_id
-            AND task_status NOT IN (:bad_imagery, :mapped, :validated)
-        """
-        tasks_to_map = await db.fetch_all(
-            query=query,
-            values={
-                "project_id": project_id,
-                "bad_imagery": TaskStatus.BADIMAGERY.value,
-                "mapped": TaskStatus.MAPPED.value,
-                "validated": TaskStatus.VALIDATED.value,
-            },
-        )
-
-        for task in tasks_to_map:
-
-            task_id = task["id"]
-            current_status = TaskStatus(task["task_status"])
-
-            # Lock the task for mapping if it's not already locked
-            if current_status not in [
+        """Marks all tasks on a project as mapped, other than bad imagery and validated"""
+        await Task.transition_all_tasks(
+            project_id,
+            user_id,
+            [
+                TaskStatus.READY,
+                TaskStatus.INVALIDATED,
                 TaskStatus.LOCKED_FOR_MAPPING,
                 TaskStatus.LOCKED_FOR_VALIDATION,
-            ]:
-                await Task.lock_task_for_mapping(task_id, project_id, user_id, db)
-
-            # Unlock the task and set its status to MAPPED
-            await Task.unlock_task(
-                task_id=task_id,
-                project_id=project_id,
-                user_id=user_id,
-                new_state=TaskStatus.MAPPED,
-                db=db,
-            )
+            ],
+            TaskStatus.MAPPED,
+            db,
+            lock_action=TaskAction.LOCKED_FOR_MAPPING,
+        )
 
         project_update_query = """
             UPDATE projects
@@ -509,23 +562,14 @@ class MappingService:
     @staticmethod
     async def reset_all_badimagery(project_id: int, user_id: int, db: Database):
         """Marks all bad imagery tasks as ready for mapping and resets the bad imagery counter"""
-
-        # Fetch all tasks with status BADIMAGERY for the given project
-        badimagery_query = """
-            SELECT id FROM tasks
-            WHERE task_status = :task_status AND project_id = :project_id
-        """
-        badimagery_tasks = await db.fetch_all(
-            query=badimagery_query,
-            values={
-                "task_status": TaskStatus.BADIMAGERY.value,
-                "project_id": project_id,
-            },
+        await Task.transition_all_tasks(
+            project_id,
+            user_id,
+            [TaskStatus.BADIMAGERY],
+            TaskStatus.READY,
+            db,
+            lock_action=TaskAction.LOCKED_FOR_MAPPING,
         )
-        for task in badimagery_tasks:
-            task_id = task["id"]
-            await Task.lock_task_for_mapping(task_id, project_id, user_id, db)
-            await Task.unlock_task(task_id, project_id, user_id, TaskStatus.READY, db)
 
         # Reset bad imagery counter in the project
         reset_query = """
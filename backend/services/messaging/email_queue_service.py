@@ -0,0 +1,177 @@
+import asyncio
+from contextlib import AsyncExitStack, suppress
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Callable, List, Optional
+
+from databases import Database
+from fastapi_mail.connection import Connection
+from loguru import logger
+
+from backend import conf
+from backend.config import settings
+from backend.db import db_connection
+from backend.models.postgis.email_outbox import EmailOutbox
+
+
+class SMTPMailer:
+    """Sends emails over one SMTP connection, reconnecting after a failed send"""
+
+    def __init__(self):
+        self.connection_stack: Optional[AsyncExitStack] = None
+        self.connection: Optional[Connection] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._close()
+
+    async def send(self, message: EmailMessage):
+        if self.connection is None:
+            self.connection_stack = AsyncExitStack()
+            self.connection = await self.connection_stack.enter_async_context(
+                Connection(conf)
+            )
+        try:
+            await self.connection.session.send_message(message)
+        except Exception:
+            await self._close()
+            raise
+
+    async def _close(self):
+        stack = self.connection_stack
+        self.connection_stack = self.connection = None
+        if stack is not None:
+            # The server may already have dropped the connection
+            with suppress(Exception):
+                await stack.aclose()
+
+
+class LoggingMailer:
+    """Logs emails instead of sending them, used when LOG_LEVEL is DEBUG"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def send(self, message: EmailMessage):
+        logger.debug(message.as_string())
+
+
+class EmailQueueService:
+    @staticmethod
+    async def enqueue(emails: List[dict], db: Database):
+        """Queues emails for the worker, see EmailOutbox.enqueue"""
+        await EmailOutbox.enqueue(emails, db)
+        email_queue_worker.wake()
+
+    @staticmethod
+    async def drain(db: Database, mailer_factory: Optional[Callable] = None) -> dict:
+        """
+        Sends the due emails batch by batch until none is left, returning the number of
+        emails sent, rescheduled and given up
+        """
+        if mailer_factory is None:
+            mailer_factory = (
+                LoggingMailer if settings.LOG_LEVEL == "DEBUG" else SMTPMailer
+            )
+        counts = {"sent": 0, "retried": 0, "failed": 0}
+        while True:
+            batch = await EmailOutbox.claim_batch(settings.EMAIL_QUEUE_BATCH_SIZE, db)
+            if not batch:
+                return counts
+
+            sent, failures = await EmailQueueService._send_batch(batch, mailer_factory)
+            await EmailOutbox.mark_sent(sent, db)
+            await EmailOutbox.mark_failed(
+                failures, settings.EMAIL_QUEUE_MAX_ATTEMPTS, db
+            )
+            counts["sent"] += len(sent)
+            for email, error in failures:
+                if email["attempts"] >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+                    counts["failed"] += 1
+                    # ERROR level logs are automatically captured by sentry so that admins are notified
+                    logger.error(
+                        f"{error}: Sending email {email['id']} failed after "
+                        f"{email['attempts']} attempts. Please check SMTP configuration"
+                    )
+                else:
+                    counts["retried"] += 1
+                    logger.warning(f"{error}: Sending email {email['id']} failed")
+
+    @staticmethod
+    async def _send_batch(batch: list, mailer_factory: Callable):
+        """
+        Sends the batch over a single mailer, spacing the sends to stay within the rate
+        limit without blocking the event loop
+        """
+        sent, failures = [], []
+        loop = asyncio.get_running_loop()
+        interval = 1 / settings.EMAIL_QUEUE_RATE_PER_SECOND
+        next_send = loop.time()
+        async with mailer_factory() as mailer:
+            for email in batch:
+                delay = next_send - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_send = max(next_send, loop.time()) + interval
+                try:
+                    await mailer.send(EmailQueueService._build_message(email))
+                    sent.append(email["id"])
+                except Exception as e:
+                    failures.append((email, str(e) or type(e).__name__))
+        return sent, failures
+
+    @staticmethod
+    def _build_message(email) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((settings.ORG_NAME, settings.MAIL_DEFAULT_SENDER))
+        message["To"] = email["to_address"]
+        message["Subject"] = email["subject"]
+        message.set_content(email["text_body"])
+        message.add_alternative(email["html_body"], subtype="html")
+        return message
+
+
+class EmailQueueWorker:
+    """
+    Drains the email outbox in the background of the API process. It wakes up when
+    this process queues emails and polls for retries and emails queued elsewhere.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup = asyncio.Event()
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    def wake(self):
+        self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            try:
+                async with db_connection.database.connection() as conn:
+                    await EmailQueueService.drain(conn)
+            except Exception as e:
+                logger.error(f"{e}: Draining the email outbox failed")
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self.wakeup.wait(), settings.EMAIL_QUEUE_POLL_SECONDS
+                )
+
+
+email_queue_worker = EmailQueueWorker()
@@ -1,6 +1,5 @@
 import datetime
 import re
-import time
 from typing import List
 
 import bleach
@@ -17,7 +16,7 @@ from backend.models.dtos.message_dto import MessageDTO, MessagesDTO
 from backend.models.dtos.stats_dto import Pagination
 from backend.models.postgis.message import Message, MessageType
 from backend.models.postgis.notification import Notification
-from backend.models.postgis.project import Project, ProjectInfo
+from backend.models.postgis.project import Project
 from backend.models.postgis.statuses import TeamRoles
 from backend.models.postgis.task import TaskAction, TaskStatus
 from backend.models.postgis.utils import timestamp
@@ -78,16 +77,7 @@ class MessageService:
         """Sends mapper a notification after their task has been marked valid or invalid"""
         if validated_by == mapped_by:
             return  # No need to send a notification if you've verified your own task
-        project = await Project.get(project_id, db)
-        project_name_query = """
-            SELECT name
-            FROM project_info
-            WHERE project_id = :project_id AND locale = :locale
-        """
-        project_name = await db.fetch_val(
-            project_name_query,
-            values={"project_id": project_id, "locale": project.default_locale},
-        )
+        project_name = await Project.get_project_title(db, project_id)
         user = await UserService.get_user_by_id(mapped_by, db)
         text_template = get_txt_template(
             "invalidation_message_en.txt"
@@ -137,13 +127,10 @@ class MessageService:
         """
         async with db_connection.database.connection() as conn:
             contributors = await Message.get_all_contributors(project_id, conn)
-            project = await Project.get(project_id, conn)
-            project_info = await ProjectInfo.get_dto_for_locale(
-                conn, project_id, project.default_locale
-            )
+            project_name = await Project.get_project_title(conn, project_id)
             message_dto.message = "A message from {} managers:<br/><br/>{}".format(
                 MessageService.get_project_link(
-                    project_id, project_info.name, highlight=True
+                    project_id, project_name, highlight=True
                 ),
                 markdown(message_dto.message, output_format="html"),
             )
@@ -154,7 +141,7 @@ class MessageService:
                 message.project_id = project_id
                 user = await UserService.get_user_by_id(contributor, conn)
                 messages.append(
-                    dict(message=message, user=user, project_name=project_info.name)
+                    dict(message=message, user=user, project_name=project_name)
                 )
             await MessageService._push_messages(messages, conn)
 
@@ -163,10 +150,10 @@ class MessageService:
         if len(messages) == 0:
             return
         messages_objs = []
-        for i, message in enumerate(messages):
+        alerts = []
+        for message in messages:
             user = message.get("user")
             obj = message.get("message")
-            project_name = message.get("project_name")
 
             # Skipping message if certain notifications are disabled
             if (
@@ -219,26 +206,31 @@ class MessageService:
                 continue
             # If the notification is enabled, send an email
             messages_objs.append(obj)
-            await SMTPService.send_email_alert(
+            alerts.append((message, user))
+
+        # Emails are only queued here, the email queue worker sends them
+        from_usernames = await UserService.get_usernames_by_ids(
+            {message["message"].from_user_id for message, _ in alerts}, db
+        )
+        emails = []
+        for message, user in alerts:
+            obj = message["message"]
+            email = SMTPService.build_email_alert(
                 user.email_address,
                 user.username,
                 user.is_email_verified,
-                message["message"].id,
-                (
-                    await UserService.get_user_by_id(
-                        message["message"].from_user_id, db
-                    )
-                ).username,
-                message["message"].project_id,
-                message["message"].task_id,
-                clean_html(message["message"].subject),
-                message["message"].message,
+                obj.id,
+                from_usernames.get(obj.from_user_id),
+                obj.project_id,
+                obj.task_id,
+                clean_html(obj.subject),
+                obj.message,
                 obj.message_type,
-                project_name,
+                message.get("project_name"),
             )
-
-            if (i + 1) % 10 == 0:
-                time.sleep(0.5)
+            if email is not None:
+                emails.append(email)
+        await SMTPService._send_messages(emails, db)
 
         if messages_objs:
             insert_values = [
@@ -274,17 +266,7 @@ class MessageService:
         if comment_from_user.username in usernames:
             usernames.remove(comment_from_user.username)
 
-        # Fetch project details
-        project = await db.fetch_one(
-            "SELECT * FROM projects WHERE id = :project_id", {"project_id": project_id}
-        )
-        default_locale = project["default_locale"] if project else "en"
-
-        # Get the project info DTO using the get_dto_for_locale function
-        project_info_dto = await ProjectInfo.get_dto_for_locale(
-            db, project_id, default_locale
-        )
-        project_name = project_info_dto.name  # Use the `name` field from the DTO
+        project_name = await Project.get_project_title(db, project_id)
 
         if usernames:
             task_link = MessageService.get_task_link(project_id, task_id)
@@ -437,6 +419,7 @@ class MessageService:
                         message.subject,
                         html_template,
                         message.message,
+                        db,
                     )
 
     @staticmethod
@@ -706,7 +689,7 @@ class MessageService:
                 activity_message.append(user_profile_link)
 
             activity_message = ", ".join(activity_message)
-            project_name = await ProjectInfo.get_project_name(project["id"], db)
+            project_name = await Project.get_project_title(db, project["id"])
             project_link = MessageService.get_project_link(project["id"], project_name)
 
             message = {
@@ -728,7 +711,9 @@ class MessageService:
         user = await UserService.get_user_by_id(user_id, db)
         if user.email_address is None:
             raise ValueError("EmailNotSet- User does not have an email address")
-        await SMTPService.send_verification_email(user.email_address, user.username)
+        await SMTPService.send_verification_email(
+            user.email_address, user.username, db
+        )
 
     @staticmethod
     async def get_all_tasks_mappers(
@@ -953,6 +938,12 @@ class MessageService:
 
         messages = await db.fetch_all(query, params)
 
+        project_ids = [msg["project_id"] for msg in messages if msg["project_id"]]
+        try:
+            project_titles = await Project.get_project_titles(db, project_ids, locale)
+        except Exception:
+            raise MessageServiceError("Unable to fetch project name.")
+
         messages_dto = MessagesDTO()
         for msg in messages:
             message_dict = dict(msg)
@@ -961,15 +952,9 @@ class MessageService:
                     message_dict["message_type"]
                 ).name
                 if message_dict["project_id"]:
-                    try:
-                        message_dict["project_title"] = (
-                            await Project.get_project_title(
-                                db, message_dict["project_id"], locale
-                            )
-                            or ""
-                        )
-                    except Exception:
-                        raise MessageServiceError("Unable to fetch project name.")
+                    message_dict["project_title"] = (
+                        project_titles.get(message_dict["project_id"]) or ""
+                    )
             msg_dto = MessageDTO(**message_dict).copy(exclude={"from_user_id"})
             messages_dto.user_messages.append(msg_dto)
 
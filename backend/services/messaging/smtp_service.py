@@ -1,18 +1,17 @@
 import re
 import urllib.parse
 from html import unescape
+from typing import List, Optional
 
 from databases import Database
-from fastapi_mail import MessageSchema, MessageType
-from fastapi_mail.schemas import MultipartSubtypeEnum
 from itsdangerous import URLSafeTimedSerializer
 from loguru import logger
 
-# from backend import mail, create_app
-from backend import mail
 from backend.config import settings
+from backend.db import db_connection
 from backend.models.postgis.message import Message as PostgisMessage
 from backend.models.postgis.statuses import EncouragingEmailType
+from backend.services.messaging.email_queue_service import EmailQueueService
 from backend.services.messaging.template_service import (
     format_username_link,
     get_template,
@@ -37,7 +36,9 @@ def html_to_text(html_content: str) -> str:
 
 class SMTPService:
     @staticmethod
-    async def send_verification_email(to_address: str, username: str):
+    async def send_verification_email(
+        to_address: str, username: str, db: Database = None
+    ):
         """Sends a verification email with a unique token so we can verify user owns this email address"""
         # TODO these could be localised if needed, in the future
         verification_url = SMTPService._generate_email_verification_url(
@@ -49,11 +50,11 @@ class SMTPService:
         }
         html_template = get_template("email_verification_en.html", values)
         subject = "Confirm your email address"
-        await SMTPService._send_message(to_address, subject, html_template)
+        await SMTPService._send_message(to_address, subject, html_template, db=db)
         return True
 
     @staticmethod
-    async def send_welcome_email(to_address: str, username: str):
+    async def send_welcome_email(to_address: str, username: str, db: Database = None):
         """Sends email welcoming new user to tasking manager"""
         values = {
             "USERNAME": username,
@@ -61,7 +62,7 @@ class SMTPService:
         html_template = get_template("welcome.html", values)
 
         subject = "Welcome to Tasking Manager"
-        await SMTPService._send_message(to_address, subject, html_template)
+        await SMTPService._send_message(to_address, subject, html_template, db=db)
         return True
 
     @staticmethod
@@ -139,7 +140,7 @@ class SMTPService:
                     f"Sending {email_type} email to {contributor.email_address} for project {project_id}"
                 )
                 await SMTPService._send_message(
-                    contributor.email_address, subject, html_template
+                    contributor.email_address, subject, html_template, db=db
                 )
 
     @staticmethod
@@ -155,11 +156,46 @@ class SMTPService:
         content: str,
         message_type: int,
         project_name: str,
+        db: Database = None,
     ):
         """Send an email to user to alert that they have a new message."""
+        email = SMTPService.build_email_alert(
+            to_address,
+            username,
+            user_email_verified,
+            message_id,
+            from_username,
+            project_id,
+            task_id,
+            subject,
+            content,
+            message_type,
+            project_name,
+        )
+        if email is None:
+            return False
+
+        await SMTPService._send_messages([email], db)
+        return True
+
+    @staticmethod
+    def build_email_alert(
+        to_address: str,
+        username: str,
+        user_email_verified: bool,
+        message_id: int,
+        from_username: str,
+        project_id: int,
+        task_id: int,
+        subject: str,
+        content: str,
+        message_type: int,
+        project_name: str,
+    ) -> Optional[dict]:
+        """Builds the email alerting a user of a new message, None if it can't be sent"""
 
         if not user_email_verified:
-            return False
+            return None
 
         logger.debug(f"Test if email required {to_address}")
         from_user_link = f"{settings.APP_BASE_URL}/users/{from_username}"
@@ -170,7 +206,7 @@ class SMTPService:
         settings_url = "{}/settings#notifications".format(settings.APP_BASE_URL)
 
         if not to_address:
-            return False  # Many users will not have supplied email address so return
+            return None  # Many users will not have supplied email address so return
         message_path = ""
         if message_id is not None:
             message_path = f"/message/{message_id}"
@@ -190,41 +226,48 @@ class SMTPService:
             "MESSAGE_TYPE": message_type,
         }
         html_template = get_template("message_alert_en.html", values)
-        await SMTPService._send_message(to_address, subject, html_template)
-
-        return True
+        return SMTPService._build_email(to_address, subject, html_template)
 
     @staticmethod
     async def _send_message(
-        to_address: str, subject: str, html_message: str, text_message: str = None
+        to_address: str,
+        subject: str,
+        html_message: str,
+        text_message: str = None,
+        db: Database = None,
     ):
-        """Helper sends SMTP message"""
-        from_address = settings.MAIL_DEFAULT_SENDER
-        if from_address is None:
+        """Helper queues a single SMTP message"""
+        email = SMTPService._build_email(
+            to_address, subject, html_message, text_message
+        )
+        await SMTPService._send_messages([email], db)
+
+    @staticmethod
+    async def _send_messages(emails: List[dict], db: Database = None):
+        """
+        Queues emails in the outbox, from which the email queue worker sends them.
+        Without a connection they are queued on one of the pool.
+        """
+        if not emails:
+            return
+        if settings.MAIL_DEFAULT_SENDER is None:
             raise ValueError("Missing TM_EMAIL_FROM_ADDRESS environment variable")
+
+        logger.debug(f"Queueing {len(emails)} emails")
+        await EmailQueueService.enqueue(emails, db or db_connection.database)
+
+    @staticmethod
+    def _build_email(
+        to_address: str, subject: str, html_message: str, text_message: str = None
+    ) -> dict:
         if text_message is None:
             text_message = html_to_text(html_message)
-        msg = MessageSchema(
-            recipients=[to_address],
-            subject=subject,
-            body=text_message,
-            alternative_body=html_message,
-            subtype=MessageType.plain,
-            multipart_subtype=MultipartSubtypeEnum.alternative,
-        )
-        logger.debug(f"Sending email via SMTP {to_address}")
-        if settings.LOG_LEVEL == "DEBUG":
-            logger.debug(msg.as_string())
-
-        else:
-            try:
-                await mail.send_message(msg)
-                logger.debug(f"Email sent {to_address}")
-            except Exception as e:
-                # ERROR level logs are automatically captured by sentry so that admins are notified
-                logger.error(
-                    f"{e}: Sending email failed. Please check SMTP configuration"
-                )
+        return {
+            "to_address": to_address,
+            "subject": subject,
+            "html_body": html_message,
+            "text_body": text_message,
+        }
 
     @staticmethod
     def _generate_email_verification_url(email_address: str, user_name: str):
@@ -15,7 +15,7 @@ from backend.models.dtos.project_dto import (
 )
 from backend.models.postgis.project import Project, ProjectStatus, Task
 from backend.models.postgis.statuses import TaskCreationMode, TeamRoles
-from backend.models.postgis.task import TaskAction, TaskHistory, TaskStatus
+from backend.models.postgis.task import TaskHistory, TaskStatus
 from backend.models.postgis.user import User
 from backend.models.postgis.utils import InvalidData, InvalidGeoJson
 from backend.services.grid.grid_service import GridService
@@ -97,7 +97,7 @@ class ProjectAdminService:
             tasks = draft_project_dto.tasks
 
         await ProjectAdminService._attach_tasks_to_project(draft_project, tasks, db)
-        draft_project.set_country_info()
+        await draft_project.set_country_info(db)
 
         if draft_project_dto.cloneFromProjectId:
             draft_project.set_default_changeset_comment()
@@ -194,42 +194,15 @@ class ProjectAdminService:
     @staticmethod
     async def reset_all_tasks(project_id: int, user_id: int, db: Database):
         """Resets all tasks on project, preserving history"""
-
-        # Fetch tasks that are not in the READY state
-        query = """
-            SELECT id, task_status
-            FROM tasks
-            WHERE project_id = :project_id
-            AND task_status != :ready_status
-        """
-        tasks_to_reset = await db.fetch_all(
-            query=query,
-            values={
-                "project_id": project_id,
-                "ready_status": TaskStatus.READY.value,
-            },
+        await Task.transition_all_tasks(
+            project_id,
+            user_id,
+            [status for status in TaskStatus if status != TaskStatus.READY],
+            TaskStatus.READY,
+            db,
+            comment="Task reset",
         )
 
-        # Reset each task and preserve history
-        for task in tasks_to_reset:
-            task_id = task["id"]
-
-            # Add a history entry for the task reset
-            await Task.set_task_history(
-                task_id=task_id,
-                project_id=project_id,
-                user_id=user_id,
-                action=TaskAction.COMMENT,
-                db=db,
-                comment="Task reset",
-                new_state=TaskStatus.READY,
-            )
-
-            # Reset the task's status to READY
-            await Task.reset_task(
-                task_id=task_id, project_id=project_id, user_id=user_id, db=db
-            )
-
         # Reset project counters using raw SQL
         project_update_query = """
             UPDATE projects
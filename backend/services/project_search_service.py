@@ -1,9 +1,9 @@
+import csv
+import io
 import math
-from typing import List
+from typing import AsyncGenerator, List, Tuple
 
 import geojson
-import pandas as pd
-from aiocache import Cache, cached
 from databases import Database
 from geoalchemy2 import shape
 from loguru import logger
@@ -19,7 +19,6 @@ from backend.models.dtos.project_dto import (
     ProjectSearchResultsDTO,
 )
 from backend.models.postgis.project import Project, ProjectInfo
-from backend.models.postgis.mapping_level import MappingLevel
 from backend.models.postgis.statuses import (
     MappingTypes,
     ProjectDifficulty,
@@ -28,6 +27,7 @@ from backend.models.postgis.statuses import (
     TeamRoles,
     UserRole,
 )
+from backend.reference_data import reference_data
 from backend.services.users.user_service import UserService
 
 # search_cache = TTLCache(maxsize=128, ttl=300)
@@ -37,6 +37,30 @@ from backend.services.users.user_service import UserService
 # client resolution (mpp)* arbitrary large map size on a large screen in pixels * 50% buffer, all squared
 MAX_AREA = math.pow(1250 * 4275 * 1.5, 2)
 
+# Rows written to the CSV buffer before a chunk is flushed to the client
+CSV_CHUNK_SIZE = 500
+
+# Export query columns and their CSV header, in output order
+CSV_COLUMNS = {
+    "id": "projectId",
+    "project_name": "name",
+    "priority": "priority",
+    "difficulty": "difficulty",
+    "status": "status",
+    "sandbox": "sandbox",
+    "database": "database",
+    "last_updated": "lastUpdated",
+    "due_date": "dueDate",
+    "organisation_name": "organisationName",
+    "percent_mapped": "percentMapped",
+    "percent_validated": "percentValidated",
+    "total_area": "totalArea",
+    "country": "country",
+    "creation_date": "creation_date",
+    "total_contributors": "totalContributors",
+    "author": "author",
+}
+
 
 class ProjectSearchServiceError(Exception):
     """Custom Exception to notify callers an error occurred when handling mapping"""
@@ -54,26 +78,45 @@ class BBoxTooBigError(Exception):
 
 class ProjectSearchService:
     @staticmethod
-    async def create_search_query(db, user=None, as_csv: bool = False):
+    async def create_search_query(
+        db, user=None, as_csv: bool = False, preferred_locale: str = "en"
+    ):
         # Base query for fetching project details
+        params = {}
         if as_csv:
-            query = """
+            # Contributors, localized name and partner names are aggregated per row
+            # so the whole export is produced by this single query.
+            partner_names = ""
+            if user is not None and user.role == UserRole.ADMIN.value:
+                partner_names = """,
+                    ARRAY(
+                        SELECT DISTINCT pa.name
+                        FROM project_partnerships pp
+                        JOIN partners pa ON pp.partner_id = pa.id
+                        WHERE pp.project_id = p.id
+                    ) AS partner_names"""
+            query = f"""
                 SELECT
                     p.id AS id,
+                    COALESCE(
+                        (SELECT pi.name
+                        FROM project_info pi
+                        WHERE pi.project_id = p.id
+                        AND pi.locale = :csv_locale
+                        LIMIT 1),
+                        (SELECT pi.name
+                        FROM project_info pi
+                        WHERE pi.project_id = p.id
+                        AND pi.locale = 'en'
+                        LIMIT 1)
+                    ) AS project_name,
                     p.priority,
                     p.difficulty,
-                    p.default_locale,
                     p.status,
                     p.sandbox,
                     p.database,
                     p.last_updated,
                     p.due_date,
-                    p.total_tasks,
-                    p.tasks_mapped,
-                    p.tasks_validated,
-                    p.tasks_bad_imagery,
-                    u.name AS author_name,
-                    u.username AS author_username,
                     o.name AS organisation_name,
                     ROUND(
                         COALESCE(
@@ -86,16 +129,18 @@ class ProjectSearchService:
                     ROUND(COALESCE(
                         p.tasks_validated * 100.0 / NULLIF(p.total_tasks - p.tasks_bad_imagery, 0), 0
                     ), 2) AS percent_validated,
-                    ROUND(CAST(COALESCE(
-                        ST_Area(p.geometry::geography) / 1000000, 0
-                    ) AS numeric), 3) AS total_area,
+                    ROUND(CAST(COALESCE(p.area_km2, 0) AS numeric), 3) AS total_area,
                     p.country,
-                    p.created AS creation_date
+                    p.created AS creation_date,
+                    COALESCE(par.total_contributors, 0) AS total_contributors,
+                    COALESCE(NULLIF(u.name, ''), u.username) AS author{partner_names}
                 FROM projects p
                 LEFT JOIN organisations o ON o.id = p.organisation_id
                 LEFT JOIN users u ON u.id = p.author_id
+                LEFT JOIN project_activity_rollup par ON par.project_id = p.id
                 WHERE p.geometry IS NOT NULL
             """
+            params["csv_locale"] = preferred_locale or "en"
 
         else:
             query = """
@@ -128,7 +173,6 @@ class ProjectSearchService:
             """
 
         filters = []
-        params = {}
         if user is None:
             filters.append("p.private = :private")
             params["private"] = False
@@ -178,13 +222,43 @@ class ProjectSearchService:
         return query, params
 
     @staticmethod
-    async def create_result_dto(
-        project, preferred_locale, total_contributors, db: Database
-    ):
-        project_info_dto = await ProjectInfo.get_dto_for_locale(
-            db, project.id, preferred_locale, project.default_locale
+    async def create_result_dtos(
+        projects, preferred_locale, db: Database
+    ) -> List[ListSearchResultDTO]:
+        """
+        Builds the search result DTOs of a page of projects. Localized info, active mappers,
+        campaigns and contributor counts are loaded for the whole page with one query each.
+        """
+        if not projects:
+            return []
+
+        project_ids = [project.id for project in projects]
+        project_infos = await ProjectInfo.get_dtos_for_locale(
+            db,
+            {project.id: project.default_locale for project in projects},
+            preferred_locale,
+        )
+        active_mappers = await Project.get_active_mappers_for_projects(project_ids, db)
+        campaigns = await Project.get_campaigns_for_projects(project_ids, db)
+        total_contributors = await Project.get_total_contributions_for_projects(
+            project_ids, db
         )
 
+        return [
+            ProjectSearchService._build_result_dto(
+                project,
+                project_infos[project.id],
+                active_mappers[project.id],
+                total_contributors[project.id],
+                campaigns[project.id],
+            )
+            for project in projects
+        ]
+
+    @staticmethod
+    def _build_result_dto(
+        project, project_info_dto, active_mappers, total_contributors, campaigns
+    ) -> ListSearchResultDTO:
         list_dto = ListSearchResultDTO()
         list_dto.project_id = project.id
         list_dto.locale = project_info_dto.locale
@@ -209,7 +283,7 @@ class ProjectSearchService:
             project.tasks_bad_imagery,
         )
         list_dto.status = ProjectStatus(project.status).name
-        list_dto.active_mappers = await Project.get_active_mappers(project.id, db)
+        list_dto.active_mappers = active_mappers
         list_dto.total_contributors = total_contributors
         list_dto.country = project.country
         list_dto.sandbox = project.sandbox
@@ -217,34 +291,9 @@ class ProjectSearchService:
         list_dto.author = project.author_name or project.author_username
         list_dto.organisation_name = project.organisation_name
         list_dto.organisation_logo = project.organisation_logo
-        list_dto.campaigns = await Project.get_project_campaigns(project.id, db)
+        list_dto.campaigns = campaigns
         return list_dto
 
-    @staticmethod
-    async def get_total_contributions(
-        project_ids: List[int], db: Database
-    ) -> List[int]:
-        """Fetch total contributions for given project IDs."""
-        if not project_ids:
-            return []
-
-        query = """
-        SELECT
-            p.id AS id,
-            COUNT(DISTINCT th.user_id) AS total
-        FROM projects p
-        LEFT JOIN task_history th ON th.project_id = p.id
-            AND th.action != 'COMMENT'
-        WHERE p.id = ANY(:project_ids)
-        GROUP BY p.id
-        """
-
-        params = {"project_ids": project_ids}
-
-        result = await db.fetch_all(query, params)
-
-        return [row["total"] for row in result]
-
     @staticmethod
     async def get_managed_projects(user_id, db):
         org_projects_query = """
@@ -289,106 +338,52 @@ class ProjectSearchService:
         )
         return project_ids
 
-    def csv_cache_key_builder(func, *args, **kwargs):
-        args_without_db = args[:-2]
-        return f"{func.__name__}:{args_without_db}:{kwargs}"
-
     @staticmethod
-    @cached(cache=Cache.MEMORY, key_builder=csv_cache_key_builder, ttl=3600)
-    async def search_projects_as_csv(
-        search_dto: ProjectSearchDTO, user, db: Database, as_csv: bool = False
-    ) -> str:
+    async def create_csv_query(
+        search_dto: ProjectSearchDTO, user, db: Database
+    ) -> Tuple[str, dict, List[str]]:
+        """Builds the export query for the search criteria along with the CSV header"""
         if user:
             user = await UserService.get_user_by_id(user, db)
-        all_results = await ProjectSearchService._filter_projects(
-            search_dto, user, db, as_csv
+        query, params = await ProjectSearchService._filter_projects(
+            search_dto, user, db, as_csv=True
         )
-        rows = [dict(row) for row in all_results]
-        is_user_admin = user is not None and user.role == UserRole.ADMIN.value
-        for row in rows:
+        header = list(CSV_COLUMNS.values())
+        if user is not None and user.role == UserRole.ADMIN.value:
+            header.append("partnerNames")
+        return query, params, header
+
+    @staticmethod
+    async def search_projects_as_csv(
+        query: str, params: dict, header: List[str], db: Database
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streams the rows of the export query as CSV chunks. Rows are read through a
+        server side cursor so memory stays flat regardless of the number of projects.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(header)
+
+        rows_in_buffer = 0
+        async for row in db.iterate(query=query, values=params):
+            row = dict(row)
             row["priority"] = ProjectPriority(row["priority"]).name
             row["difficulty"] = ProjectDifficulty(row["difficulty"]).name
             row["status"] = ProjectStatus(row["status"]).name
-            row["total_area"] = round(row["total_area"], 3)
-            row["total_contributors"] = await Project.get_project_total_contributions(
-                row["id"], db
-            )
-            row["author"] = row["author_name"] or row["author_username"]
-
-            project_name_query = """
-                SELECT COALESCE(
-                    (SELECT pi.name
-                    FROM project_info pi
-                    WHERE pi.project_id = :project_id
-                    AND pi.locale = :locale
-                    LIMIT 1),
-                    (SELECT pi.name
-                    FROM project_info pi
-                    WHERE pi.project_id = :project_id
-                    AND pi.locale = 'en'
-                    LIMIT 1)
-                ) AS name
-            """
-
-            result = await db.fetch_one(
-                project_name_query,
-                {
-                    "project_id": row["id"],
-                    "locale": search_dto.preferred_locale or "en",
-                },
-            )
+            values = [row[column] for column in CSV_COLUMNS]
+            if "partner_names" in row:
+                values.append(row["partner_names"])
+            writer.writerow(values)
 
-            row["project_name"] = result["name"] if result else None
+            rows_in_buffer += 1
+            if rows_in_buffer == CSV_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                rows_in_buffer = 0
 
-            if is_user_admin:
-                query = """
-                SELECT p.name
-                FROM project_partnerships pp
-                JOIN partners p ON pp.partner_id = p.id
-                WHERE pp.project_id = :project_id
-                GROUP BY pp.project_id, p.name
-                """
-                partners_names = await db.fetch_all(
-                    query=query, values={"project_id": row["id"]}
-                )
-                row["partner_names"] = [record["name"] for record in partners_names]
-
-        df = pd.json_normalize(rows)
-        columns_to_drop = [
-            "default_locale",
-            "tasks_bad_imagery",
-            "tasks_mapped",
-            "tasks_validated",
-            "total_tasks",
-            "author_name",
-            "author_username",
-        ]
-
-        colummns_to_rename = {
-            "id": "projectId",
-            "organisation_name": "organisationName",
-            "last_updated": "lastUpdated",
-            "due_date": "dueDate",
-            "percent_mapped": "percentMapped",
-            "percent_validated": "percentValidated",
-            "total_area": "totalArea",
-            "total_contributors": "totalContributors",
-            "partner_names": "partnerNames",
-            "author_name": "author",
-            "project_name": "name",
-        }
-
-        df.drop(
-            columns=columns_to_drop,
-            inplace=True,
-            axis=1,
-        )
-        df.rename(columns=colummns_to_rename, inplace=True)
-        cols_order = ["projectId", "name"] + [
-            col for col in df.columns if col not in ["projectId", "name"]
-        ]
-        df = df[cols_order]
-        return df.to_csv(index=False)
+        yield buffer.getvalue()
 
     @staticmethod
     # @cached(cache=Cache.MEMORY, key_builder=cache_key_builder, ttl=300)
@@ -405,15 +400,9 @@ class ProjectSearchService:
             raise NotFound(sub_code="PROJECTS_NOT_FOUND")
 
         dto = ProjectSearchResultsDTO()
-        dto.results = [
-            await ProjectSearchService.create_result_dto(
-                p,
-                search_dto.preferred_locale,
-                await Project.get_project_total_contributions(p.id, db),
-                db,
-            )
-            for p in paginated_results
-        ]
+        dto.results = await ProjectSearchService.create_result_dtos(
+            paginated_results, search_dto.preferred_locale, db
+        )
 
         dto.pagination = pagination_dto
         if search_dto.omit_map_results:
@@ -439,7 +428,7 @@ class ProjectSearchService:
         search_dto: ProjectSearchDTO, user, db: Database, as_csv: bool = False
     ):
         base_query, params = await ProjectSearchService.create_search_query(
-            db, user, as_csv
+            db, user, as_csv, search_dto.preferred_locale
         )
         # Initialize filter list and parameters dictionary
         filters = []
@@ -767,12 +756,11 @@ class ProjectSearchService:
         offset = (page - 1) * per_page
         all_results = []
 
-        if as_csv or not search_dto.omit_map_results:
-            all_results = await db.fetch_all(sql_query, values=params)
-
-            if as_csv:
-                return all_results
+        if as_csv:
+            return sql_query, params
 
+        if not search_dto.omit_map_results:
+            all_results = await db.fetch_all(sql_query, values=params)
             total_count = len(all_results)
             paginated_results = all_results[offset : offset + per_page]
         else:
@@ -831,7 +819,8 @@ class ProjectSearchService:
         }
 
         if user:
-            user_level = await MappingLevel.get_by_id(user.mapping_level, db)
+            levels = await reference_data.get(db)
+            user_level = levels.mapping_level(user.mapping_level)
             base_query += " AND l.ordering <= :user_level_ordering"
             params["user_level_ordering"] = user_level.ordering
 
@@ -865,7 +854,8 @@ class ProjectSearchService:
         }
 
         if user:
-            user_level = await MappingLevel.get_by_id(user.mapping_level, db)
+            levels = await reference_data.get(db)
+            user_level = levels.mapping_level(user.mapping_level)
             base_query += " AND l.ordering <= :user_level_ordering"
             params["user_level_ordering"] = user_level.ordering
 
@@ -3,11 +3,11 @@ from datetime import datetime, timedelta, timezone
 from typing import Tuple
 
 import geojson
-from aiocache import Cache, cached
 
 from databases import Database
 from loguru import logger
 
+from backend.cache import cache, project_cache_tags
 from backend.config import get_settings
 from backend.db import db_connection
 from backend.exceptions import NotFound
@@ -32,7 +32,7 @@ from backend.models.postgis.statuses import (
     ValidationPermission,
 )
 from backend.models.postgis.task import Task
-from backend.models.postgis.mapping_level import MappingLevel
+from backend.reference_data import reference_data
 from backend.services.messaging.smtp_service import SMTPService
 from backend.services.project_admin_service import ProjectAdminService
 from backend.services.project_search_service import ProjectSearchService
@@ -283,10 +283,11 @@ class ProjectService:
         order_by: str = None,
         order_by_type: str = "ASC",
         status: int = None,
+        since: int = None,
     ):
         await Project.exists(project_id, db)
         return await Project.tasks_as_geojson(
-            db, project_id, task_ids_str, order_by, order_by_type, status
+            db, project_id, task_ids_str, order_by, order_by_type, status, since
         )
 
     @staticmethod
@@ -373,9 +374,8 @@ class ProjectService:
         if mapping_permission == MappingPermission.TEAMS.value and not is_team_member:
             return False, MappingNotAllowed.USER_NOT_TEAM_MEMBER
 
-        level_required = await MappingLevel.get_by_id(
-            project.mapping_permission_level_id, db
-        )
+        levels = await reference_data.get(db)
+        level_required = levels.mapping_level(project.mapping_permission_level_id)
         user_level = await UserService.get_mapping_level(user_id, db)
 
         if user_level.ordering < level_required.ordering:
@@ -465,9 +465,8 @@ class ProjectService:
         ):
             return False, ValidatingNotAllowed.USER_NOT_TEAM_MEMBER
 
-        level_required = await MappingLevel.get_by_id(
-            project.validation_permission_level_id, db
-        )
+        levels = await reference_data.get(db)
+        level_required = levels.mapping_level(project.validation_permission_level_id)
         user_level = await UserService.get_mapping_level(user_id, db)
 
         if user_level.ordering < level_required.ordering:
@@ -536,21 +535,18 @@ class ProjectService:
 
         return True, "User allowed to validate"
 
-    def summary_cache_key_builder(func, *args, **kwargs):
-        args_without_db = args[:-1]
-        return f"{func.__name__}:{args_without_db}:{kwargs}"
-
-    @staticmethod
-    @cached(cache=Cache.MEMORY, key_builder=summary_cache_key_builder, ttl=600)
-    def get_cached_project_summary(
-        project_id: int, preferred_locale: str = "en"
-    ) -> ProjectSummary:
-        """Gets the project summary DTO"""
-        project = ProjectService.get_project_by_id(project_id)
-        # We don't want to cache the project stats, so we set calculate_completion to False
-        return project.get_project_summary(preferred_locale, calculate_completion=False)
+    def summary_cache_key_builder(func, project_id, db, preferred_locale="en"):
+        return f"{func.__name__}:{project_id}:{preferred_locale}"
 
     @staticmethod
+    @cache.cached(
+        "project_summary",
+        ttl=600,
+        key_builder=summary_cache_key_builder,
+        tags=project_cache_tags,
+        # Carries the mapped and validated percentages, which change with every task
+        shared_only=True,
+    )
     async def get_project_summary(
         project_id: int, db: Database, preferred_locale: str = "en"
     ) -> ProjectSummary:
@@ -659,21 +655,11 @@ class ProjectService:
         query += " AND p.featured = TRUE"
 
         projects = await db.fetch_all(query, params)
-        project_ids = [project["id"] for project in projects]
-
-        # Get total contributors
-        contrib_counts = await ProjectSearchService.get_total_contributions(
-            project_ids, db
-        )
-        zip_items = zip(projects, contrib_counts)
 
         dto = ProjectSearchResultsDTO()
-        dto.results = [
-            await ProjectSearchService.create_result_dto(
-                project, preferred_locale, total_contributors, db
-            )
-            for project, total_contributors in zip_items
-        ]
+        dto.results = await ProjectSearchService.create_result_dtos(
+            projects, preferred_locale, db
+        )
         dto.pagination = None
         return dto
 
@@ -703,7 +689,12 @@ class ProjectService:
         return f"{func.__name__}:{args_without_db}:{kwargs}"
 
     @staticmethod
-    @cached(cache=Cache.MEMORY, key_builder=stats_cache_key_builder, ttl=600)
+    @cache.cached(
+        "project_stats",
+        ttl=600,
+        key_builder=stats_cache_key_builder,
+        tags=project_cache_tags,
+    )
     async def get_project_stats(project_id: int, db: Database) -> ProjectStatsDTO:
         """Gets the project stats DTO"""
         await ProjectService.exists(project_id, db)
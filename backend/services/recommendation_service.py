@@ -1,13 +1,12 @@
 import pandas as pd
-from aiocache import Cache, cached
 from cachetools import TTLCache
 from databases import Database
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import MultiLabelBinarizer
 
+from backend.cache import cache, projects_cache_tags
 from backend.exceptions import NotFound
 from backend.models.dtos.project_dto import ProjectSearchResultsDTO
-from backend.models.postgis.project import Project
 from backend.models.postgis.statuses import ProjectStatus
 from backend.services.project_search_service import ProjectSearchService
 from backend.services.users.user_service import UserService
@@ -126,7 +125,12 @@ class ProjectRecommendationService:
     # This function is cached so that the matrix is not calculated every time
     # as it is expensive and not changing often
     @staticmethod
-    @cached(cache=Cache.MEMORY, key_builder=matrix_cache_key_builder, ttl=3600)
+    @cache.cached(
+        "project_matrix",
+        ttl=3600,
+        key_builder=matrix_cache_key_builder,
+        tags=projects_cache_tags,
+    )
     async def create_project_matrix(db: Database, target_project=None) -> pd.DataFrame:
         """Creates project matrix required to calculate similarity."""
         # Query to fetch all published projects with their related data
@@ -212,7 +216,8 @@ class ProjectRecommendationService:
         # Limit the number of similar projects to fetch
         limit = min(limit, len(similar_projects)) if similar_projects else 0
         count = 0
-        while len(dto.results) < limit:
+        projects = []
+        while len(projects) < limit:
             try:
                 similar_project_id = similar_projects[count]
             except IndexError:
@@ -221,16 +226,10 @@ class ProjectRecommendationService:
                 query=search_query, values={**params, "project_id": similar_project_id}
             )
             if project:
-                dto.results.append(
-                    await ProjectSearchService.create_result_dto(
-                        project,
-                        preferred_locale,
-                        await Project.get_project_total_contributions(
-                            project["id"], db
-                        ),
-                        db,
-                    )
-                )
+                projects.append(project)
             count += 1
 
+        dto.results = await ProjectSearchService.create_result_dtos(
+            projects, preferred_locale, db
+        )
         return dto
@@ -1,13 +1,17 @@
+import base64
 import datetime
 from datetime import date, timedelta
+from typing import Optional, Tuple
 
-from aiocache import Cache, cached
 from databases import Database
 from sqlalchemy import func, select
 
+from backend.cache import cache, project_cache_tags
+from backend.exceptions import BadRequest
 from backend.models.dtos.project_dto import ProjectSearchResultsDTO
 from backend.models.dtos.stats_dto import (
     CampaignStatsDTO,
+    CursorPagination,
     GenderStatsDTO,
     HomePageStatsDTO,
     OrganizationListStatsDTO,
@@ -23,12 +27,13 @@ from backend.models.dtos.stats_dto import (
     LevelStats,
 )
 from backend.models.postgis.campaign import Campaign, campaign_projects
-from backend.models.postgis.mapping_level import MappingLevel
+from backend.models.postgis.global_stats import GlobalStats
 from backend.models.postgis.organisation import Organisation
 from backend.models.postgis.project import Project
 from backend.models.postgis.statuses import TaskStatus, UserGender
-from backend.models.postgis.task import Task, TaskAction, User
+from backend.models.postgis.task import TaskAction, User
 from backend.models.postgis.utils import timestamp  # noqa: F401
+from backend.reference_data import reference_data
 from backend.services.project_search_service import ProjectSearchService
 from backend.services.project_service import ProjectService
 from backend.services.users.user_service import UserService
@@ -155,18 +160,80 @@ class StatsService:
         )
         return project, user
 
+    def activity_count_cache_key_builder(func, *args, **kwargs):
+        args_without_db = args[:-1]
+        return f"{func.__name__}:{args_without_db}:{kwargs}"
+
+    @staticmethod
+    @cache.cached(
+        "activity_count",
+        ttl=300,
+        key_builder=activity_count_cache_key_builder,
+        tags=project_cache_tags,
+    )
+    async def get_activity_count(project_id: int, db: Database) -> int:
+        """Counts the non comment history of a project, cached as it scans all of it"""
+        query = """
+            SELECT COUNT(*)
+            FROM task_history
+            WHERE project_id = :project_id
+            AND action != 'COMMENT'
+        """
+        return await db.fetch_val(query, {"project_id": project_id})
+
+    @staticmethod
+    def encode_activity_cursor(action_date: datetime.datetime, history_id: int) -> str:
+        """Encodes the position of the last activity returned into an opaque cursor"""
+        position = f"{action_date.isoformat()}|{history_id}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def decode_activity_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+        """Decodes a cursor returned by encode_activity_cursor"""
+        try:
+            position = base64.urlsafe_b64decode(cursor.encode()).decode()
+            action_date, history_id = position.split("|")
+            return datetime.datetime.fromisoformat(action_date), int(history_id)
+        except ValueError:
+            raise BadRequest(
+                sub_code="INVALID_CURSOR",
+                message="Cursor is not one returned by this feed.",
+                cursor=cursor,
+            )
+
     @staticmethod
     async def get_latest_activity(
-        project_id: int, page: int, db: Database
+        project_id: int, page: int, db: Database, cursor: Optional[str] = None
     ) -> ProjectActivityDTO:
-        """Gets all the activity on a project"""
+        """
+        Gets all the activity on a project, newest first. Pages are read by number, or
+        when a cursor is supplied by seeking past the position it encodes, an empty
+        cursor giving the first page. Cursor pages carry a cached total.
+        """
 
         # Pagination setup
         page_size = 10
         offset = (page - 1) * page_size
+        values = {"project_id": project_id, "comment_action": "COMMENT"}
+
+        if cursor is None:
+            pagination_clause = "LIMIT :limit OFFSET :offset"
+            values.update({"limit": page_size, "offset": offset})
+        else:
+            # Fetch one row more than the page to know whether another page follows
+            pagination_clause = "LIMIT :limit"
+            values["limit"] = page_size + 1
+            if cursor:
+                pagination_clause = (
+                    "AND (th.action_date, th.id) < (CAST(:cursor_date AS timestamp), :cursor_id) "
+                    + pagination_clause
+                )
+                values["cursor_date"], values["cursor_id"] = (
+                    StatsService.decode_activity_cursor(cursor)
+                )
 
         # Query to fetch task history
-        query = """
+        query = f"""
         SELECT
             th.id,
             th.task_id,
@@ -179,18 +246,14 @@ class StatsService:
         WHERE
             th.project_id = :project_id
             AND th.action != :comment_action
-        ORDER BY th.action_date DESC
-        LIMIT :limit OFFSET :offset
+        ORDER BY th.action_date DESC, th.id DESC
+        {pagination_clause}
         """
-        rows = await db.fetch_all(
-            query,
-            {
-                "project_id": project_id,
-                "comment_action": "COMMENT",
-                "limit": page_size,
-                "offset": offset,
-            },
-        )
+        rows = await db.fetch_all(query, values)
+
+        if cursor is not None:
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
 
         # Creating DTO
         activity_dto = ProjectActivityDTO(activity=[])
@@ -205,6 +268,21 @@ class StatsService:
             )
             activity_dto.activity.append(history)
 
+        if cursor is not None:
+            activity_dto.pagination = CursorPagination(
+                has_next=has_next,
+                next_cursor=(
+                    StatsService.encode_activity_cursor(
+                        rows[-1]["action_date"], rows[-1]["id"]
+                    )
+                    if has_next
+                    else None
+                ),
+                per_page=page_size,
+                total=await StatsService.get_activity_count(project_id, db),
+            )
+            return activity_dto
+
         # Calculate total items for pagination
         total_query = """
         SELECT COUNT(*)
@@ -266,57 +344,50 @@ class StatsService:
 
         projects = await db.fetch_all(project_query, query_params)
 
-        # Get total contributors for each project
-        contrib_counts = await ProjectSearchService.get_total_contributions(
-            project_ids, db
-        )
-        zip_items = zip(projects, contrib_counts)
-
         # Prepare the final DTO with all project details
         dto = ProjectSearchResultsDTO()
-        dto.results = [
-            await ProjectSearchService.create_result_dto(p, "en", t, db)
-            for p, t in zip_items
-        ]
+        dto.results = await ProjectSearchService.create_result_dtos(projects, "en", db)
 
         return dto
 
     @staticmethod
     async def get_last_activity(
-        project_id: int, db: Database
+        project_id: int, db: Database, since: Optional[int] = None
     ) -> ProjectLastActivityDTO:
-        """Gets the last activity for a project's tasks"""
-
-        # Subquery: Fetch latest actions for each task, excluding comments
-        subquery_latest_action = """
-        SELECT DISTINCT ON (th.task_id)
-            th.task_id,
-            th.action_date,
-            th.user_id
-        FROM task_history th
-        WHERE th.project_id = :project_id
-        AND th.action != :comment_action
-        ORDER BY th.task_id, th.action_date DESC
         """
-
-        # Main query: Join task statuses with latest actions and user details
-        query_task_statuses = f"""
+        Gets the last activity for a project's tasks, only for the tasks changed after
+        the since version when supplied, along with the current project version
+        """
+        version_filter = "AND t.version > :since" if since is not None else ""
+        query = f"""
         SELECT
             t.id AS task_id,
             t.task_status,
+            t.version,
+            t.version < (SELECT task_version_watermark()) AS settled,
             la.action_date,
             u.username AS action_by
         FROM tasks t
-        LEFT JOIN ({subquery_latest_action}) la ON la.task_id = t.id
+        LEFT JOIN LATERAL (
+            SELECT th.action_date, th.user_id
+            FROM task_history th
+            WHERE th.project_id = t.project_id
+            AND th.task_id = t.id
+            AND th.action != :comment_action
+            ORDER BY th.action_date DESC
+            LIMIT 1
+        ) la ON TRUE
         LEFT JOIN users u ON u.id = la.user_id
         WHERE t.project_id = :project_id
+        {version_filter}
         ORDER BY t.id
         """
+        values = {"project_id": project_id, "comment_action": "COMMENT"}
+        if since is not None:
+            values["since"] = since
 
         # Execute the query
-        results = await db.fetch_all(
-            query_task_statuses, {"project_id": project_id, "comment_action": "COMMENT"}
-        )
+        results = await db.fetch_all(query, values)
 
         # Create DTO
         dto = ProjectLastActivityDTO(activity=[])
@@ -328,6 +399,10 @@ class StatsService:
                 action_by=row["action_by"],
             )
             dto.activity.append(task_status_dto)
+        # See Task.get_tasks_as_geojson_feature_collection
+        dto.version = max(
+            [since or 0] + [row["version"] for row in results if row["settled"]]
+        )
 
         return dto
 
@@ -405,14 +480,13 @@ class StatsService:
 
         # Process the results into DTO
         contrib_dto = ProjectContributionsDTO()
+        levels = await reference_data.get(db)
         user_contributions = [
             UserContribution(
                 dict(
                     username=row["username"],
                     name=row["name"],
-                    mapping_level=(
-                        await MappingLevel.get_by_id(row["mapping_level"], db)
-                    ).name,
+                    mapping_level=levels.mapping_level(row["mapping_level"]).name,
                     picture_url=row["picture_url"],
                     mapped=row["mapped"],
                     bad_imagery=row["bad_imagery"],
@@ -442,67 +516,24 @@ class StatsService:
 
         return contrib_dto
 
-    def homepage_cache_key_builder(func, *args, **kwargs):
-        args_without_db = args[:-1]
-        return f"{func.__name__}:{args_without_db}:{kwargs}"
-
     @staticmethod
-    @cached(cache=Cache.MEMORY, key_builder=homepage_cache_key_builder, ttl=600)
     async def get_homepage_stats(
         abbrev: bool = True, db: Database = None
     ) -> HomePageStatsDTO:
         """Get overall TM stats to give community a feel for progress that's being made"""
         dto = HomePageStatsDTO()
-        # Total Projects
-        query = select(func.count(Project.id))
-        dto.total_projects = await db.fetch_val(query)
-
-        # Mappers online (distinct users who locked tasks)
-        query = select(func.count(Task.locked_by.distinct())).where(
-            Task.locked_by.isnot(None)
-        )
-        dto.mappers_online = await db.fetch_val(query)
-
-        # Total Mappers
-        query = select(func.count(User.id))
-        dto.total_mappers = await db.fetch_val(query)
-
-        # Tasks mapped (status: MAPPED, VALIDATED)
-        query = select(func.count()).where(
-            Task.task_status.in_([TaskStatus.MAPPED.value, TaskStatus.VALIDATED.value])
-        )
-        dto.tasks_mapped = await db.fetch_val(query)
+        totals = await GlobalStats.get(db)
+        dto.total_projects = totals["total_projects"]
+        dto.mappers_online = totals["mappers_online"]
+        dto.total_mappers = totals["total_mappers"]
+        dto.tasks_mapped = totals["tasks_mapped"]
 
         if not abbrev:
-            # Total Validators
-            query = select(func.count(Task.validated_by.distinct())).where(
-                Task.task_status == TaskStatus.VALIDATED.value
-            )
-            dto.total_validators = await db.fetch_val(query)
-
-            # Tasks Validated
-            query = select(func.count()).where(
-                Task.task_status == TaskStatus.VALIDATED.value
-            )
-            dto.tasks_validated = await db.fetch_val(query)
-
-            # Total Area (sum of project areas in km²)
-            query = select(
-                func.coalesce(func.sum(func.ST_Area(Project.geometry, True) / 1000000))
-            )
-            dto.total_area = await db.fetch_val(query)
-
-            # Total Mapped Area
-            query = select(
-                func.coalesce(func.sum(func.ST_Area(Task.geometry, True) / 1000000))
-            ).where(Task.task_status == TaskStatus.MAPPED.value)
-            dto.total_mapped_area = await db.fetch_val(query)
-
-            # Total Validated Area
-            query = select(
-                func.coalesce(func.sum(func.ST_Area(Task.geometry, True) / 1000000))
-            ).where(Task.task_status == TaskStatus.VALIDATED.value)
-            dto.total_validated_area = await db.fetch_val(query)
+            dto.total_validators = totals["total_validators"]
+            dto.tasks_validated = totals["tasks_validated"]
+            dto.total_area = totals["total_area"]
+            dto.total_mapped_area = totals["total_mapped_area"]
+            dto.total_validated_area = totals["total_validated_area"]
 
             # Campaign Stats
             query = select(func.count(Campaign.id))
@@ -622,7 +653,7 @@ class StatsService:
 
         by_level = []
 
-        for level in await MappingLevel.get_all(db):
+        for level in (await reference_data.get(db)).mapping_levels:
             query = select(func.count()).select_from(
                 base_query.filter(User.mapping_level == level.id).subquery()
             )
@@ -695,7 +726,7 @@ class StatsService:
         return f"{func.__name__}:{args_without_first}:{kwargs}"
 
     @staticmethod
-    @cached(cache=Cache.MEMORY, key_builder=cache_key_builder, ttl=3600)
+    @cache.cached("task_stats", ttl=3600, key_builder=cache_key_builder)
     async def get_task_stats(
         db: Database,
         start_date,
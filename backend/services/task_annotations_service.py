@@ -1,8 +1,18 @@
-import datetime
 import json
+from typing import AsyncIterator, Iterable, List
 
 from databases import Database
 
+from backend.models.postgis.task import Task
+from backend.models.postgis.task_annotation import TaskAnnotation
+
+# Number of newline-delimited annotations validated and written per statement
+ANNOTATION_CHUNK_SIZE = 1000
+
+
+class InvalidTaskIdError(ValueError):
+    """Raised when annotations are posted for tasks the project doesn't have"""
+
 
 class TaskAnnotationsService:
     @staticmethod
@@ -10,56 +20,96 @@ class TaskAnnotationsService:
         annotation, project_id, annotation_type, db: Database
     ):
         """Takes a JSON of tasks and creates or updates annotations in the database."""
+        await TaskAnnotationsService.add_or_update_annotations(
+            [annotation], project_id, annotation_type, db
+        )
+
+    @staticmethod
+    async def add_or_update_annotations(
+        annotations: List[dict], project_id: int, annotation_type: str, db: Database
+    ):
+        """
+        Validates all the annotations, then creates or updates them in one transaction.
+        Raises ValueError for malformed annotations and InvalidTaskIdError for unknown
+        tasks, writing nothing in both cases.
+        """
+        annotations = TaskAnnotationsService.validate_annotations(annotations)
+        await TaskAnnotationsService._check_task_ids(annotations, project_id, db)
+        async with db.transaction():
+            await TaskAnnotation.upsert_many(
+                project_id, annotation_type, annotations, db
+            )
 
-        task_id = annotation["taskId"]
-        source = annotation.get("annotationSource")
-        markdown = annotation.get("annotationMarkdown")
-        properties = json.dumps(annotation["properties"])
-        updated_timestamp = datetime.datetime.utcnow()
+    @staticmethod
+    async def add_or_update_annotations_stream(
+        chunks: AsyncIterator[bytes],
+        project_id: int,
+        annotation_type: str,
+        db: Database,
+    ) -> int:
+        """
+        Creates or updates annotations posted as newline-delimited JSON, one task
+        annotation per line, validating and writing ANNOTATION_CHUNK_SIZE of them at a
+        time. Everything runs in one transaction, so an invalid line anywhere in the
+        stream rolls back the chunks already written.
+        :return: number of annotations read
+        """
+        count = 0
+        async with db.transaction():
+            async for batch in TaskAnnotationsService._read_ndjson(chunks):
+                annotations = TaskAnnotationsService.validate_annotations(batch)
+                await TaskAnnotationsService._check_task_ids(
+                    annotations, project_id, db
+                )
+                await TaskAnnotation.upsert_many(
+                    project_id, annotation_type, annotations, db
+                )
+                count += len(batch)
+        return count
 
-        query = """
-            SELECT id FROM task_annotations
-            WHERE task_id = :task_id AND project_id = :project_id AND annotation_type = :annotation_type
+    @staticmethod
+    def validate_annotations(annotations: Iterable) -> List[dict]:
         """
-        existing_annotation = await db.fetch_one(
-            query,
-            values={
-                "task_id": task_id,
-                "project_id": project_id,
-                "annotation_type": annotation_type,
-            },
-        )
+        Checks every annotation has an integer taskId and JSON properties, returning
+        one annotation per task with the last one posted for a task winning
+        """
+        by_task = {}
+        for annotation in annotations:
+            if not isinstance(annotation, dict):
+                raise ValueError(f"Annotation {annotation!r} is not an object")
+            task_id = annotation.get("taskId")
+            if not isinstance(task_id, int) or isinstance(task_id, bool):
+                raise ValueError(f"Annotation taskId {task_id!r} is not an integer")
+            if "properties" not in annotation:
+                raise ValueError(f"Annotation of task {task_id} has no properties")
+            for field in ("annotationSource", "annotationMarkdown"):
+                if not isinstance(annotation.get(field), (str, type(None))):
+                    raise ValueError(
+                        f"Annotation {field} of task {task_id} is not a string"
+                    )
+            by_task[task_id] = annotation
+        return list(by_task.values())
 
-        if existing_annotation:
-            update_query = """
-                UPDATE task_annotations
-                SET properties = :properties, updated_timestamp = :updated_timestamp
-                WHERE id = :id
-            """
-            await db.execute(
-                update_query,
-                values={
-                    "properties": properties,
-                    "updated_timestamp": updated_timestamp,
-                    "id": existing_annotation["id"],
-                },
-            )
-        else:
-            insert_query = """
-                INSERT INTO task_annotations
-                (task_id, project_id, annotation_type, properties, annotation_source,
-                annotation_markdown, updated_timestamp)
-                VALUES (:task_id, :project_id, :annotation_type, :properties, :source, :markdown, :updated_timestamp)
-            """
-            await db.execute(
-                insert_query,
-                values={
-                    "task_id": task_id,
-                    "project_id": project_id,
-                    "annotation_type": annotation_type,
-                    "properties": properties,
-                    "source": source,
-                    "markdown": markdown,
-                    "updated_timestamp": updated_timestamp,
-                },
-            )
+    @staticmethod
+    async def _check_task_ids(annotations: List[dict], project_id: int, db: Database):
+        task_ids = [annotation["taskId"] for annotation in annotations]
+        if await Task.count_existing(project_id, task_ids, db) != len(task_ids):
+            raise InvalidTaskIdError("Invalid task id")
+
+    @staticmethod
+    async def _read_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[List]:
+        """Parses the lines of the byte stream into batches of ANNOTATION_CHUNK_SIZE"""
+        batch, pending = [], b""
+        async for chunk in chunks:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= ANNOTATION_CHUNK_SIZE:
+                    yield batch
+                    batch = []
+        if pending.strip():
+            batch.append(json.loads(pending))
+        if batch:
+            yield batch
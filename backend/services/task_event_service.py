@@ -0,0 +1,218 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+from databases import Database
+from loguru import logger
+
+from backend.config import settings
+from backend.models.postgis.statuses import TaskStatus
+
+TASK_EVENTS_CHANNEL = "task_events"
+# Events buffered per subscriber before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 100
+LISTENER_RECONNECT_SECONDS = 5
+
+
+class InMemoryTaskEventBackend:
+    """
+    Delivers events straight to the subscribers of this process. Only suitable when the
+    API runs as a single worker; events are delivered before the transaction commits.
+    """
+
+    def __init__(self):
+        self.deliver: Optional[Callable[[dict], None]] = None
+
+    async def start(self, deliver: Callable[[dict], None]):
+        self.deliver = deliver
+
+    async def stop(self):
+        self.deliver = None
+
+    async def publish(self, event: dict, db: Database):
+        if self.deliver:
+            self.deliver(event)
+
+    async def publish_many(self, events: List[dict], db: Database):
+        for event in events:
+            await self.publish(event, db)
+
+
+class PostgresTaskEventBackend:
+    """
+    Sends events through Postgres NOTIFY so subscribers connected to any worker receive
+    them. Notifications go out on the connection of the request, so they are only
+    delivered once its transaction commits and never for rolled back changes.
+    """
+
+    def __init__(self, dsn: str, channel: str = TASK_EVENTS_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.deliver: Optional[Callable[[dict], None]] = None
+        self.connection: Optional[asyncpg.Connection] = None
+        self.reconnect_task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Callable[[dict], None]):
+        self.deliver = deliver
+        await self._listen()
+
+    async def stop(self):
+        self.deliver = None
+        if self.reconnect_task:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+        if self.connection and not self.connection.is_closed():
+            await self.connection.close()
+        self.connection = None
+
+    async def publish(self, event: dict, db: Database):
+        await db.execute(
+            "SELECT pg_notify(:channel, :payload)",
+            values={"channel": self.channel, "payload": json.dumps(event)},
+        )
+
+    async def publish_many(self, events: List[dict], db: Database):
+        """Sends the events in a single round trip, one notification each"""
+        await db.execute(
+            """
+            SELECT pg_notify(:channel, payload)
+            FROM unnest(CAST(:payloads AS text[])) AS payload
+            """,
+            values={
+                "channel": self.channel,
+                "payloads": [json.dumps(event) for event in events],
+            },
+        )
+
+    async def _listen(self):
+        self.connection = await asyncpg.connect(self.dsn)
+        self.connection.add_termination_listener(self._on_termination)
+        await self.connection.add_listener(self.channel, self._on_notification)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        if self.deliver:
+            self.deliver(json.loads(payload))
+
+    def _on_termination(self, connection):
+        if self.deliver and not self.reconnect_task:
+            self.reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self):
+        """Listens again after losing the connection, subscribers resync as events may be lost"""
+        while self.deliver:
+            await asyncio.sleep(LISTENER_RECONNECT_SECONDS)
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(f"Listener of {self.channel} reconnect failed: {e}")
+                continue
+            self.reconnect_task = None
+            if self.deliver:
+                self.deliver({"resync": True})
+            return
+
+
+class TaskEventHub:
+    """
+    Publishes a compact event for each task lock or status change and fans it out to the
+    clients subscribed to the project, so they don't have to poll for task changes.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def stop(self):
+        await self.backend.stop()
+
+    async def publish(
+        self,
+        project_id: int,
+        task_id: int,
+        task_status: TaskStatus,
+        locked_by: Optional[int],
+        db: Database,
+    ):
+        """Publishes the new state of a task to the subscribers of its project"""
+        await self.backend.publish(
+            TaskEventHub._event(project_id, task_id, task_status, locked_by), db
+        )
+
+    async def publish_many(
+        self,
+        changes: List[Tuple[int, int, TaskStatus, Optional[int]]],
+        db: Database,
+    ):
+        """
+        Publishes the new state of many tasks at once, see publish
+        :param changes: project id, task id, task status and lock holder of each task
+        """
+        if changes:
+            await self.backend.publish_many(
+                [TaskEventHub._event(*change) for change in changes], db
+            )
+
+    async def publish_resync(self, project_id: int, db: Database):
+        """Tells the subscribers of the project to reload its tasks after a bulk change"""
+        await self.backend.publish({"projectId": project_id, "resync": True}, db)
+
+    @asynccontextmanager
+    async def subscribe(self, project_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Yields a queue receiving the events of the project until the context exits"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.setdefault(project_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self.subscribers.get(project_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self.subscribers[project_id]
+
+    @staticmethod
+    def _event(
+        project_id: int, task_id: int, task_status: TaskStatus, locked_by: Optional[int]
+    ) -> dict:
+        return {
+            "projectId": project_id,
+            "taskId": task_id,
+            "taskStatus": task_status.name,
+            "lockedBy": locked_by,
+        }
+
+    def _deliver(self, event: dict):
+        project_id = event.get("projectId")
+        if project_id is None:
+            # Events may have been missed, every subscriber has to resync
+            for project_id, queues in self.subscribers.items():
+                for queue in queues:
+                    self._put(queue, {"projectId": project_id, "resync": True})
+            return
+        for queue in self.subscribers.get(project_id, ()):
+            self._put(queue, event)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A slow client gets a single resync event rather than a growing backlog
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"projectId": event["projectId"], "resync": True})
+
+
+def get_task_event_backend():
+    if settings.TASK_EVENTS_BACKEND == "postgres":
+        dsn = settings.SQLALCHEMY_DATABASE_URI.unicode_string()
+        return PostgresTaskEventBackend(dsn.replace("postgresql+asyncpg", "postgresql"))
+    return InMemoryTaskEventBackend()
+
+
+task_event_hub = TaskEventHub(get_task_event_backend())
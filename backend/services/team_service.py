@@ -364,6 +364,12 @@ class TeamService:
             rows = await db.fetch_all(query=final_query, values=params)
 
         teams_list_dto = TeamsListDTO()
+        if not search_dto.omit_members:
+            team_members = await Team.get_members_of_teams(
+                db,
+                [row["id"] for row in rows],
+                None if search_dto.full_members_list else 10,
+            )
         for row in rows:
             team_dto = TeamDTO(
                 team_id=row["id"],
@@ -378,20 +384,10 @@ class TeamService:
             )
 
             if not search_dto.omit_members:
-                if search_dto.full_members_list:
-                    team_dto.members = await Team.get_all_members(db, row["id"], None)
-                else:
-                    team_managers = await Team.get_team_managers(db, row["id"], 10)
-                    team_members = await Team.get_team_members(db, row["id"], 10)
-                    team_members.extend(team_managers)
-                    team_dto.members = team_members
-
-                team_dto.members_count = await Team.get_members_count_by_role(
-                    db, row["id"], TeamMemberFunctions.MEMBER
-                )
-                team_dto.managers_count = await Team.get_members_count_by_role(
-                    db, row["id"], TeamMemberFunctions.MANAGER
-                )
+                members = team_members[row["id"]]
+                team_dto.members = members["members"]
+                team_dto.members_count = members["members_count"]
+                team_dto.managers_count = members["managers_count"]
 
             teams_list_dto.teams.append(team_dto)
 
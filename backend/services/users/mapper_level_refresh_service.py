@@ -0,0 +1,320 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+import httpx
+from databases import Database
+from loguru import logger
+from sqlalchemy import insert
+
+from backend.config import settings
+from backend.models.postgis.mapper_level_refresh import MapperLevelRefreshRun
+from backend.models.postgis.mapping_badge import MappingBadge
+from backend.models.postgis.mapping_level import MappingLevel
+from backend.models.postgis.message import Message, MessageType
+from backend.models.postgis.user import (
+    User,
+    UserMappingBadge,
+    UserNextLevel,
+    UserStats,
+)
+from backend.models.postgis.utils import timestamp
+from backend.services.users.user_service import UserService
+
+# Number of users whose stats are fetched and written per transaction
+REFRESH_BATCH_SIZE = 1000
+# Attempts at fetching the stats of a user before counting them as failed
+REFRESH_FETCH_ATTEMPTS = 2
+REFRESH_RETRY_DELAY_SECONDS = 1.0
+
+
+class MapperLevelRefreshAborted(Exception):
+    """No stats of a batch could be fetched, the run stops before it to be resumed"""
+
+
+class MappingLadder:
+    """The mapping levels and the badges they require, loaded once per refresh"""
+
+    def __init__(self, levels: List[MappingLevel], badges: List[MappingBadge], rows):
+        self.levels = levels
+        self.levels_by_id = {level.id: level for level in levels}
+        self.badge_requirements = {
+            badge.id: json.loads(badge.requirements) for badge in badges
+        }
+        self.level_badges: Dict[int, set] = {level.id: set() for level in levels}
+        for row in rows:
+            self.level_badges[row["level_id"]].add(row["badge_id"])
+
+    @staticmethod
+    async def load(db: Database) -> "MappingLadder":
+        return MappingLadder(
+            await MappingLevel.get_all(db),
+            await MappingBadge.get_all(db),
+            await db.fetch_all("SELECT level_id, badge_id FROM mapping_level_badges"),
+        )
+
+    def next_level(self, level_id: int) -> Optional[MappingLevel]:
+        """Gets the level after the supplied one, see MappingLevel.get_next"""
+        current = self.levels_by_id.get(level_id)
+        if current is None:
+            return None
+        return next(
+            (level for level in self.levels if level.ordering > current.ordering),
+            None,
+        )
+
+    def satisfied_badges(self, stats: dict) -> List[int]:
+        """Ids of the badges whose requirements the stats meet"""
+        return [
+            badge_id
+            for badge_id, requirements in self.badge_requirements.items()
+            if all(stats.get(key, 0) >= value for key, value in requirements.items())
+        ]
+
+
+class MapperLevelRefreshService:
+    @staticmethod
+    async def refresh(
+        db: Database,
+        workers: int = settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        batch_size: int = REFRESH_BATCH_SIZE,
+        only_missing: bool = False,
+        resume: bool = True,
+    ) -> dict:
+        """
+        Refreshes the stats, badges and mapping level of all users, or only of those
+        without stats. The level ladder is loaded once, the stats of a batch of users
+        are fetched `workers` at a time and each batch is written in bulk in one
+        transaction along with a checkpoint. Unless `resume` is False, an unfinished
+        run of the same kind continues after its last committed batch.
+        Users whose stats can't be fetched are retried once before the run finishes.
+        If none of a batch can be fetched, as when the stats API is down, the run
+        raises MapperLevelRefreshAborted without going past that batch.
+        :return: run id, users processed in this call, users of the run still failing
+                 and their ids, and users per second
+        """
+        ladder = await MappingLadder.load(db)
+        run = await MapperLevelRefreshRun.get_unfinished(only_missing, db)
+        if run is None or not resume:
+            run = await MapperLevelRefreshRun.start(only_missing, db)
+        else:
+            logger.info(
+                f"Resuming mapper level refresh {run['id']} after user "
+                f"{run['last_user_id']}, {run['users_processed']} users done"
+            )
+
+        semaphore = asyncio.Semaphore(workers)
+        last_user_id = run["last_user_id"]
+        failed_user_ids = list(run["failed_user_ids"])
+        processed = 0
+        started = time.monotonic()
+        while True:
+            users = await MapperLevelRefreshService._get_users(
+                last_user_id, batch_size, only_missing, db
+            )
+            if not users:
+                break
+
+            batch_started = time.monotonic()
+            stats_by_user = await MapperLevelRefreshService._fetch_all_stats(
+                users, semaphore
+            )
+            batch_failed = [
+                user["id"] for user in users if user["id"] not in stats_by_user
+            ]
+            if not stats_by_user:
+                logger.error(
+                    f"Stopping mapper level refresh {run['id']} after user "
+                    f"{last_user_id}, fetching the stats of users {batch_failed} "
+                    f"failed"
+                )
+                raise MapperLevelRefreshAborted(
+                    f"Fetching the stats of the {len(users)} users after "
+                    f"{last_user_id} failed, run again to resume"
+                )
+
+            last_user_id = users[-1]["id"]
+            async with db.transaction():
+                await MapperLevelRefreshService._apply(
+                    users, stats_by_user, ladder, db
+                )
+                await MapperLevelRefreshRun.checkpoint(
+                    run["id"], last_user_id, len(users), batch_failed, db
+                )
+
+            processed += len(users)
+            failed_user_ids += batch_failed
+            if batch_failed:
+                logger.warning(
+                    f"Fetching the stats of users {batch_failed} failed, retrying "
+                    f"them at the end of the run"
+                )
+            batch_seconds = max(time.monotonic() - batch_started, 0.001)
+            logger.info(
+                f"Refreshed {len(users)} users up to {last_user_id} in "
+                f"{batch_seconds:.1f}s ({len(users) / batch_seconds:.1f} users/s), "
+                f"{processed} done and {len(failed_user_ids)} failed so far"
+            )
+
+        if failed_user_ids:
+            failed_user_ids = await MapperLevelRefreshService._retry_failed(
+                run["id"], failed_user_ids, ladder, semaphore, db
+            )
+        await MapperLevelRefreshRun.finish(run["id"], db)
+        seconds = time.monotonic() - started
+        return {
+            "run_id": run["id"],
+            "processed": processed,
+            "failed": len(failed_user_ids),
+            "failed_user_ids": failed_user_ids,
+            "users_per_second": round(processed / seconds, 1) if seconds else 0.0,
+        }
+
+    @staticmethod
+    async def _retry_failed(
+        run_id: int,
+        user_ids: List[int],
+        ladder: MappingLadder,
+        semaphore: asyncio.Semaphore,
+        db: Database,
+    ) -> List[int]:
+        """Fetches the stats of the failed users again, returning those still failing"""
+        users = await db.fetch_all(
+            """
+            SELECT u.id, u.username, u.mapping_level
+            FROM users u
+            WHERE u.id = ANY(:user_ids)
+            ORDER BY u.id
+            """,
+            values={"user_ids": user_ids},
+        )
+        stats_by_user = await MapperLevelRefreshService._fetch_all_stats(
+            users, semaphore
+        )
+        still_failed = [user["id"] for user in users if user["id"] not in stats_by_user]
+        async with db.transaction():
+            await MapperLevelRefreshService._apply(users, stats_by_user, ladder, db)
+            await MapperLevelRefreshRun.record_retry(run_id, still_failed, db)
+
+        logger.info(
+            f"Refreshed {len(stats_by_user)} of the {len(user_ids)} users whose stats "
+            f"failed before"
+        )
+        if still_failed:
+            logger.warning(
+                f"Mapper level refresh {run_id} couldn't fetch the stats of users "
+                f"{still_failed}"
+            )
+        return still_failed
+
+    @staticmethod
+    async def _fetch_all_stats(
+        users: list, semaphore: asyncio.Semaphore
+    ) -> Dict[int, dict]:
+        """Flattened stats by user id, leaving out the users they couldn't be had of"""
+        stats = await asyncio.gather(
+            *(
+                MapperLevelRefreshService._fetch_stats(user["id"], semaphore)
+                for user in users
+            )
+        )
+        return {
+            user["id"]: user_stats
+            for user, user_stats in zip(users, stats)
+            if user_stats is not None
+        }
+
+    @staticmethod
+    async def _get_users(
+        after_user_id: int, batch_size: int, only_missing: bool, db: Database
+    ) -> list:
+        missing_filter = (
+            "AND NOT EXISTS (SELECT 1 FROM user_stats s WHERE s.user_id = u.id)"
+            if only_missing
+            else ""
+        )
+        query = f"""
+            SELECT u.id, u.username, u.mapping_level
+            FROM users u
+            WHERE u.id > :after_user_id {missing_filter}
+            ORDER BY u.id
+            LIMIT :batch_size
+        """
+        return await db.fetch_all(
+            query, values={"after_user_id": after_user_id, "batch_size": batch_size}
+        )
+
+    @staticmethod
+    async def _fetch_stats(
+        user_id: int, semaphore: asyncio.Semaphore
+    ) -> Optional[dict]:
+        """Fetches the flattened stats of the user, or None if they can't be had"""
+        async with semaphore:
+            for attempt in range(1, REFRESH_FETCH_ATTEMPTS + 1):
+                try:
+                    topic_data = await UserService.fetch_stats(user_id)
+                    return UserStats.flatten(topic_data) if topic_data else None
+                except httpx.HTTPError as e:
+                    if attempt == REFRESH_FETCH_ATTEMPTS:
+                        logger.warning(f"{e}: Fetching stats of user {user_id} failed")
+                        return None
+                    await asyncio.sleep(REFRESH_RETRY_DELAY_SECONDS)
+                except Exception as e:
+                    logger.exception(f"{e}: Fetching stats of user {user_id} failed")
+                    return None
+
+    @staticmethod
+    async def _apply(
+        users: list, stats_by_user: Dict[int, dict], ladder: MappingLadder, db: Database
+    ):
+        """
+        Writes the stats, new badges and level changes of the users whose stats were
+        fetched, the same way check_and_update_mapper_level does for one user
+        """
+        if not stats_by_user:
+            return
+
+        await UserStats.update_many(stats_by_user, db)
+
+        held_badges = await UserMappingBadge.get_for_users(list(stats_by_user), db)
+        assignments = []
+        for user_id, user_stats in stats_by_user.items():
+            for badge_id in ladder.satisfied_badges(user_stats):
+                if badge_id not in held_badges[user_id]:
+                    held_badges[user_id].add(badge_id)
+                    assignments.append((user_id, badge_id))
+        await UserMappingBadge.assign_many(assignments, db)
+
+        levels, nominations, messages = {}, [], []
+        for user in users:
+            if user["id"] not in stats_by_user:
+                continue
+            next_level = ladder.next_level(user["mapping_level"])
+            if next_level is None or not ladder.level_badges[next_level.id].issubset(
+                held_badges[user["id"]]
+            ):
+                continue
+
+            if next_level.approvals_required == 0:
+                levels[user["id"]] = next_level.id
+                subject, message = UserService.level_upgrade_message(
+                    user["username"], next_level.name
+                )
+                messages.append(
+                    {
+                        "to_user_id": user["id"],
+                        "subject": subject,
+                        "message": message,
+                        "message_type": MessageType.SYSTEM.value,
+                        "date": timestamp(),
+                        "read": False,
+                    }
+                )
+            else:
+                nominations.append((user["id"], next_level.id))
+
+        await User.set_mapping_levels(levels, db)
+        await UserNextLevel.nominate_many(nominations, db)
+        if messages:
+            await db.execute(insert(Message).values(messages))
@@ -1,12 +1,11 @@
 import re
 from typing import AsyncGenerator, Optional
 
-import requests
 from loguru import logger
 
 from backend.config import settings
+from backend.http_client import http_client
 from backend.models.dtos.user_dto import UserOSMDTO
-import httpx
 
 
 class OSMServiceError(Exception):
@@ -24,8 +23,7 @@ class OSMService:
         Returns True for 410, False for 200, raise OSMServiceError otherwise.
         """
         osm_user_details_url = f"{settings.OSM_SERVER_URL}/api/0.6/user/{user_id}.json"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.head(osm_user_details_url, follow_redirects=True)
+        resp = await http_client.head(osm_user_details_url, follow_redirects=True)
         if resp.status_code == 410:
             return True
         if resp.status_code == 200:
@@ -46,31 +44,30 @@ class OSMService:
         async def _gen() -> AsyncGenerator[int, None]:
             url = "https://planet.openstreetmap.org/users_deleted/users_deleted.txt"
             username_re = re.compile(r"^\s*(\d+)\s*$")
-            async with httpx.AsyncClient(timeout=None) as client:
-                async with client.stream("GET", url) as resp:
-                    if resp.status_code != 200:
-                        # Fail fast — caller can handle OSMServiceError
-                        raise OSMServiceError(
-                            f"Failed fetching deleted users: {resp.status_code}"
-                        )
-                    async for line in resp.aiter_lines():
-                        if not line:
-                            continue
-                        m = username_re.fullmatch(line)
-                        if m:
-                            yield int(m.group(1))
+            async with http_client.stream("GET", url, timeout=None) as resp:
+                if resp.status_code != 200:
+                    # Fail fast — caller can handle OSMServiceError
+                    raise OSMServiceError(
+                        f"Failed fetching deleted users: {resp.status_code}"
+                    )
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    m = username_re.fullmatch(line)
+                    if m:
+                        yield int(m.group(1))
 
         return _gen()
 
     @staticmethod
-    def get_osm_details_for_user(user_id: int) -> UserOSMDTO:
+    async def get_osm_details_for_user(user_id: int) -> UserOSMDTO:
         """
         Gets OSM details for the user from OSM API
         :param user_id: user_id in scope
         :raises OSMServiceError
         """
         osm_user_details_url = f"{settings.OSM_SERVER_URL}/api/0.6/user/{user_id}.json"
-        response = requests.get(osm_user_details_url)
+        response = await http_client.get(osm_user_details_url)
 
         if response.status_code == 410:
             raise OSMServiceError("User no longer exists on OSM")
@@ -1,14 +1,16 @@
+import asyncio
 import json
 import datetime
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from databases import Database
 from loguru import logger
 from sqlalchemy import and_, desc, distinct, func, insert, select
-from httpx import AsyncClient
 
 from backend.exceptions import NotFound
+from backend.http_client import http_client
 from backend.models.dtos.interests_dto import InterestDTO, InterestsListDTO
+from backend.models.dtos.mapping_dto import TaskDTO
 from backend.models.dtos.project_dto import ProjectFavoritesDTO, ProjectSearchResultsDTO
 from backend.models.dtos.stats_dto import Pagination
 from backend.models.dtos.user_dto import (
@@ -41,6 +43,7 @@ from backend.models.postgis.user import (
     UserLevelVote,
 )
 from backend.models.postgis.utils import timestamp
+from backend.reference_data import reference_data
 from backend.services.messaging.smtp_service import SMTPService
 from backend.services.messaging.template_service import (
     get_txt_template,
@@ -51,6 +54,14 @@ from backend.services.mapping_levels import MappingLevelService
 from fastapi import HTTPException
 from backend.config import settings
 
+# Orderings of a user's task history, keyed by the sort_by query parameter
+USER_TASKS_ORDER_BY = {
+    "action_date": "last_updated",
+    "-action_date": "last_updated DESC",
+    "project_id": "project_id",
+    "-project_id": "project_id DESC",
+}
+
 
 class UserServiceError(Exception):
     """Custom Exception to notify callers an error occurred when in the User Service"""
@@ -69,6 +80,21 @@ class UserService:
 
         return user
 
+    @staticmethod
+    async def get_usernames_by_ids(
+        user_ids: Iterable[int], db: Database
+    ) -> Dict[int, str]:
+        """Gets the usernames of several users at once, unknown ids are left out"""
+        user_ids = [user_id for user_id in user_ids if user_id is not None]
+        if not user_ids:
+            return {}
+
+        rows = await db.fetch_all(
+            "SELECT id, username FROM users WHERE id = ANY(:user_ids)",
+            values={"user_ids": user_ids},
+        )
+        return {row["id"]: row["username"] for row in rows}
+
     @staticmethod
     async def get_user_by_username(username: str, db: Database) -> User:
         user = await User.get_by_username(username, db)
@@ -169,6 +195,20 @@ class UserService:
 
     @staticmethod
     async def get_and_save_stats(user_id: int, db: Database) -> dict:
+        topic_data = await UserService.fetch_stats(user_id)
+        if topic_data is None:
+            return {}
+
+        new_stats = await UserStats.update(user_id, topic_data, db)
+
+        return new_stats
+
+    @staticmethod
+    async def fetch_stats(user_id: int) -> Optional[dict]:
+        """
+        Fetches the user's ohsome topics along with their OSM changeset count.
+        Returns None, after logging the error, when either API doesn't answer with 200.
+        """
         hashtag = settings.DEFAULT_CHANGESET_COMMENT.replace("#", "")
         oh_some_url = (
             f"{settings.OHSOME_STATS_API_URL}/stats/user?"
@@ -180,11 +220,10 @@ class UserService:
         oh_some_headers = {"Authorization": f"Basic {settings.OHSOME_STATS_TOKEN}"}
         osm_headers = {"User-Agent": settings.OSM_USER_AGENT}
 
-        async with AsyncClient(timeout=10.0) as client:
-            oh_some_response = await client.get(oh_some_url, headers=oh_some_headers)
-            changeset_response = await client.get(
-                osm_user_details_url, headers=osm_headers
-            )
+        oh_some_response, changeset_response = await asyncio.gather(
+            http_client.get(oh_some_url, headers=oh_some_headers),
+            http_client.get(osm_user_details_url, headers=osm_headers),
+        )
 
         if oh_some_response.status_code != 200:
 
@@ -197,7 +236,7 @@ class UserService:
                 )
             )
             logger.exception(error_msg)
-            return {}
+            return None
 
         topic_data = oh_some_response.json()
 
@@ -211,17 +250,14 @@ class UserService:
                 )
             )
             logger.exception(error_msg)
-            return {}
+            return None
 
         changeset_data = changeset_response.json()
 
         topic_data["result"]["topics"]["changeset"] = {
             "value": changeset_data["user"]["changesets"]["count"],
         }
-
-        new_stats = await UserStats.update(user_id, topic_data, db)
-
-        return new_stats
+        return topic_data
 
     @staticmethod
     async def register_user(osm_id, username, changeset_count, picture_url, email, db):
@@ -458,111 +494,114 @@ class UserService:
         sort_by: str = None,
         db: Database = None,
     ) -> UserTaskDTOs:
-        # Base query to get the latest task history actions for a user
-        base_query = (
-            select(
-                TaskHistory.project_id.label("project_id"),
-                TaskHistory.task_id.label("task_id"),
-                func.max(TaskHistory.action_date).label("max"),
-            )
-            .where(TaskHistory.user_id == user_id)
-            .group_by(TaskHistory.task_id, TaskHistory.project_id)
-        )
-
+        """
+        Gets a page of the tasks the user acted on, with the date of their last action
+        and the number of comments on each task. A single query returns the page along
+        with the total count, so the history is only grouped once per request.
+        """
+        filters = ["user_id = :user_id"]
+        values = {
+            "user_id": user_id,
+            "limit": page_size,
+            "offset": (page - 1) * page_size,
+        }
         if task_status:
-            base_query = base_query.where(
-                TaskHistory.action_text == TaskStatus[task_status.upper()].name
-            )
-
+            filters.append("action_text = :action_text")
+            values["action_text"] = TaskStatus[task_status.upper()].name
         if start_date:
-            base_query = base_query.where(TaskHistory.action_date >= start_date)
-
+            filters.append("action_date >= :start_date")
+            values["start_date"] = start_date
         if end_date:
-            base_query = base_query.where(TaskHistory.action_date <= end_date)
-
-        task_id_list = base_query.alias("task_id_list")
+            filters.append("action_date <= :end_date")
+            values["end_date"] = end_date
+        if project_id:
+            filters.append("project_id = :project_id")
+            values["project_id"] = project_id
 
-        # Query to get the number of comments per task
-        comments_query = (
-            select(
-                TaskHistory.project_id,
-                TaskHistory.task_id,
-                func.count(TaskHistory.action).label("count"),
+        project_join = ""
+        if project_status:
+            project_join = (
+                "JOIN projects p ON p.id = t.project_id AND p.status = :project_status"
             )
-            .where(TaskHistory.action == "COMMENT")
-            .group_by(TaskHistory.task_id, TaskHistory.project_id)
-        ).alias("comments_query")
+            values["project_status"] = ProjectStatus[project_status.upper()].value
 
-        # Subquery for joining comments and task IDs
-        sq = (
-            select(
-                func.coalesce(comments_query.c.count, 0).label("comments"),
-                task_id_list.c.project_id,
-                task_id_list.c.task_id,
-                task_id_list.c.max,
-            )
-            .select_from(task_id_list)
-            .outerjoin(
-                comments_query,
-                and_(
-                    comments_query.c.task_id == task_id_list.c.task_id,
-                    comments_query.c.project_id == task_id_list.c.project_id,
-                ),
+        # Ties are broken by task so pages don't overlap
+        order_by = USER_TASKS_ORDER_BY.get(sort_by, "project_id")
+        query = f"""
+            WITH user_tasks AS (
+                SELECT project_id, task_id, MAX(action_date) AS last_updated
+                FROM task_history
+                WHERE {" AND ".join(filters)}
+                GROUP BY project_id, task_id
+            ),
+            page AS (
+                SELECT
+                    t.project_id,
+                    t.id AS task_id,
+                    t.task_status,
+                    t.locked_by,
+                    ut.last_updated,
+                    COUNT(*) OVER () AS total
+                FROM user_tasks ut
+                JOIN tasks t ON t.id = ut.task_id AND t.project_id = ut.project_id
+                {project_join}
+                ORDER BY {order_by}, task_id
+                LIMIT :limit OFFSET :offset
             )
-        ).alias("sq")
+            SELECT
+                page.*,
+                u.username AS lock_holder,
+                (
+                    SELECT COUNT(*) FROM task_history th
+                    WHERE th.project_id = page.project_id
+                        AND th.task_id = page.task_id
+                        AND th.action = 'COMMENT'
+                ) AS comments
+            FROM page
+            LEFT JOIN users u ON u.id = page.locked_by
+            ORDER BY {order_by}, task_id
+        """
+        rows = await db.fetch_all(query, values=values)
 
-        # Main task query joining with subquery
-        tasks_query = (
-            select(Task, sq.c.max, sq.c.comments)
-            .select_from(Task)
-            .join(
-                sq,
-                and_(
-                    Task.id == sq.c.task_id,
-                    Task.project_id == sq.c.project_id,
+        unlock_delta = await Task.auto_unlock_delta()
+        user_task_dtos = UserTaskDTOs()
+        user_task_dtos.user_tasks = [
+            TaskDTO(
+                task_id=row["task_id"],
+                project_id=row["project_id"],
+                task_status=TaskStatus(row["task_status"]).name,
+                lock_holder=row["lock_holder"],
+                task_history=[],
+                last_updated=row["last_updated"],
+                auto_unlock_seconds=(
+                    unlock_delta.total_seconds() if unlock_delta else None
                 ),
+                comments_number=row["comments"],
             )
-        )
-
-        if sort_by == "action_date":
-            tasks_query = tasks_query.order_by(sq.c.max)
-        elif sort_by == "-action_date":
-            tasks_query = tasks_query.order_by(desc(sq.c.max))
-        elif sort_by == "project_id":
-            tasks_query = tasks_query.order_by(sq.c.project_id)
-        elif sort_by == "-project_id":
-            tasks_query = tasks_query.order_by(desc(sq.c.project_id))
-
-        if project_status:
-            tasks_query = tasks_query.where(
-                and_(
-                    Task.project_id == Project.id,
-                    Project.status == ProjectStatus[project_status.upper()].value,
-                )
-            )
-
-        if project_id:
-            tasks_query = tasks_query.where(Task.project_id == project_id)
-        # Pagination
-        offset = (page - 1) * page_size
-        paginated_tasks_query = tasks_query.limit(page_size).offset(offset)
-
-        # Execute the query and fetch results
-        all_tasks = await db.fetch_all(tasks_query)
-        paginated_tasks = await db.fetch_all(paginated_tasks_query)
-
-        # Create list of task DTOs from the results
-        task_list = [
-            await Task.task_as_dto(
-                row, last_updated=row["max"], comments=row["comments"], db=db
-            )
-            for row in paginated_tasks
+            for row in rows
         ]
-
-        user_task_dtos = UserTaskDTOs()
-        user_task_dtos.user_tasks = task_list
+        if rows:
+            total = rows[0]["total"]
+        elif page > 1:
+            # The window count is lost when the page is past the end
+            total = await db.fetch_val(
+                f"""
+                SELECT COUNT(*) FROM (
+                    SELECT project_id, task_id FROM task_history
+                    WHERE {" AND ".join(filters)}
+                    GROUP BY project_id, task_id
+                ) ut
+                JOIN tasks t ON t.id = ut.task_id AND t.project_id = ut.project_id
+                {project_join}
+                """,
+                values={
+                    k: v for k, v in values.items() if k not in ("limit", "offset")
+                },
+            )
+        else:
+            total = 0
         user_task_dtos.pagination = Pagination.from_total_count(
-            page=int(page), per_page=int(page_size), total=len(all_tasks)
+            page=int(page), per_page=int(page_size), total=total
         )
         return user_task_dtos
 
@@ -650,15 +689,13 @@ class UserService:
             WITH max_action_text_per_minute AS (
                 SELECT
                     date_trunc('minute', action_date) AS trn,
-                    MAX(action_text) AS tm
+                    MAX(duration_seconds) AS tm
                 FROM task_history
                 WHERE user_id = :user_id
                 AND action = 'LOCKED_FOR_VALIDATION'
                 GROUP BY date_trunc('minute', action_date)
             )
-            SELECT
-                SUM(EXTRACT(EPOCH FROM to_timestamp(tm, 'HH24:MI:SS') - to_timestamp('00:00:00', 'HH24:MI:SS')))
-                AS total_time
+            SELECT SUM(tm) AS total_time
             FROM max_action_text_per_minute
         """
         result = await db.fetch_one(
@@ -670,12 +707,7 @@ class UserService:
 
         # Total mapping time
         total_mapping_time_query = """
-            SELECT SUM(
-                EXTRACT(
-                    EPOCH FROM to_timestamp(action_text, 'HH24:MI:SS') -
-                    to_timestamp('00:00:00', 'HH24:MI:SS')
-                )
-            ) AS total_mapping_time_seconds
+            SELECT SUM(duration_seconds) AS total_mapping_time_seconds
             FROM task_history
             WHERE user_id = :user_id
             AND action IN ('LOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_MAPPING')
@@ -706,7 +738,7 @@ class UserService:
         ):
             # Send user verification email if they are adding or changing their email address
             await SMTPService.send_verification_email(
-                user_dto.email_address.lower(), user.username
+                user_dto.email_address.lower(), user.username, db
             )
             await User.set_email_verified_status(user, is_verified=False, db=db)
             verification_email_sent = True
@@ -747,11 +779,12 @@ class UserService:
         return user_id == author_id
 
     @staticmethod
-    async def get_mapping_level(user_id: int, db: Database):
+    async def get_mapping_level(user_id: int, db: Database) -> MappingLevel:
         """Gets mapping level user is at"""
         user = await UserService.get_user_by_id(user_id, db)
+        levels = await reference_data.get(db)
 
-        return await MappingLevelService.get_by_id(user.mapping_level, db)
+        return levels.mapping_level(user.mapping_level)
 
     @staticmethod
     def is_user_validator(user_id: int) -> bool:
@@ -926,17 +959,9 @@ class UserService:
 
         dto = ProjectSearchResultsDTO()
 
-        project_ids = [project["id"] for project in recommended_projects]
-        contrib_counts = await ProjectSearchService.get_total_contributions(
-            project_ids, db
+        dto.results = await ProjectSearchService.create_result_dtos(
+            recommended_projects, preferred_locale, db
         )
-
-        dto.results = [
-            await ProjectSearchService.create_result_dto(
-                project, preferred_locale, contrib_count, db
-            )
-            for project, contrib_count in zip(recommended_projects, contrib_counts)
-        ]
         dto.pagination = None
 
         return dto
@@ -1029,7 +1054,7 @@ class UserService:
         :raises UserServiceError, NotFound
         """
         user = await UserService.get_user_by_username(username, db)
-        osm_dto = OSMService.get_osm_details_for_user(user.id)
+        osm_dto = await OSMService.get_osm_details_for_user(user.id)
         return osm_dto
 
     @staticmethod
@@ -1038,7 +1063,7 @@ class UserService:
     ):
         """Check user's mapping level and update if they have crossed threshold"""
         user = await UserService.get_user_by_id(user_id, db)
-        user_level = await MappingLevel.get_by_id(user.mapping_level, db)
+        levels = await reference_data.get(db)
 
         async with db.transaction():
             # Update user stats
@@ -1058,7 +1083,7 @@ class UserService:
             await user.assign_badges(assignable_ids, db)
 
             # Assign levels based on badges
-            next_level = await MappingLevel.get_next(user_level.ordering, db)
+            next_level = levels.next_mapping_level(user.mapping_level)
 
             if not next_level:
                 return  # User has achieved the highest level, no need to proceed
@@ -1100,8 +1125,8 @@ class UserService:
     @staticmethod
     async def next_level(user_id: int, db: Database) -> Optional[UserNextLevelDTO]:
         user = await UserService.get_user_by_id(user_id, db)
-        user_level = await MappingLevel.get_by_id(user.mapping_level, db)
-        next_level = await MappingLevel.get_next(user_level.ordering, db)
+        levels = await reference_data.get(db)
+        next_level = levels.next_mapping_level(user.mapping_level)
 
         if not next_level:
             return None
@@ -1135,21 +1160,7 @@ class UserService:
     async def notify_level_upgrade(
         user_id: int, username: str, level: str, db: Database
     ):
-        text_template = get_txt_template("level_upgrade_message_en.txt")
-
-        formatted_level = level.strip()
-
-        if not formatted_level.lower().endswith("mapper"):
-            formatted_level = f"{formatted_level} mapper"
-
-        replace_list = [
-            ["[USERNAME]", username],
-            ["[LEVEL]", formatted_level.capitalize()],
-            ["[ORG_CODE]", settings.ORG_CODE],
-        ]
-        text_template = template_var_replacing(text_template, replace_list)
-
-        subject = f"Congratulations🎉, You're now an {formatted_level.capitalize()}."
+        subject, text_template = UserService.level_upgrade_message(username, level)
         message_type = MessageType.SYSTEM.value
 
         insert_query = """
@@ -1169,21 +1180,34 @@ class UserService:
         )
 
     @staticmethod
-    async def refresh_mapper_level(db: Database) -> int:
-        """Helper function to run thru all users in the DB and update their mapper level"""
-        users = await User.get_all_users_not_paginated(db)
-        users_updated = 1
-        total_users = len(users)
+    def level_upgrade_message(username: str, level: str) -> Tuple[str, str]:
+        """Returns the subject and text congratulating the user on their new level"""
+        text_template = get_txt_template("level_upgrade_message_en.txt")
+
+        formatted_level = level.strip()
+
+        if not formatted_level.lower().endswith("mapper"):
+            formatted_level = f"{formatted_level} mapper"
 
-        for user in users:
-            await UserService.check_and_update_mapper_level(user.id, db)
+        replace_list = [
+            ["[USERNAME]", username],
+            ["[LEVEL]", formatted_level.capitalize()],
+            ["[ORG_CODE]", settings.ORG_CODE],
+        ]
+        text_template = template_var_replacing(text_template, replace_list)
 
-            if users_updated % 50 == 0:
-                print(f"{users_updated} users updated of {total_users}")
+        subject = f"Congratulations🎉, You're now an {formatted_level.capitalize()}."
+        return subject, text_template
 
-            users_updated += 1
+    @staticmethod
+    async def refresh_mapper_level(db: Database) -> int:
+        """Helper function to run thru all users in the DB and update their mapper level"""
+        from backend.services.users.mapper_level_refresh_service import (
+            MapperLevelRefreshService,
+        )
 
-        return users_updated
+        summary = await MapperLevelRefreshService.refresh(db)
+        return summary["processed"]
 
     @staticmethod
     async def register_user_with_email(user_dto: UserRegisterEmailDTO, db: Database):
@@ -24,6 +24,7 @@ from backend.models.postgis.project_info import ProjectInfo
 from backend.models.postgis.statuses import ValidatingNotAllowed
 from backend.models.postgis.task import (
     Task,
+    TaskAction,
     TaskHistory,
     TaskInvalidationHistory,
     TaskMappingIssue,
@@ -434,23 +435,14 @@ class ValidatorService:
     @staticmethod
     async def invalidate_all_tasks(project_id: int, user_id: int, db: Database):
         """Invalidates all validated tasks on a project."""
-        query = """
-            SELECT id, task_status FROM tasks
-            WHERE project_id = :project_id
-            AND task_status = :validated_status
-        """
-        validated_tasks = await db.fetch_all(
-            query=query,
-            values={
-                "project_id": project_id,
-                "validated_status": TaskStatus.VALIDATED.value,
-            },
+        await Task.transition_all_tasks(
+            project_id,
+            user_id,
+            [TaskStatus.VALIDATED],
+            TaskStatus.INVALIDATED,
+            db,
+            lock_action=TaskAction.LOCKED_FOR_VALIDATION,
         )
-        for task in validated_tasks:
-            await Task.lock_task_for_validating(task["id"], project_id, user_id, db)
-            await Task.unlock_task(
-                task["id"], project_id, user_id, TaskStatus.INVALIDATED, db
-            )
 
         # Reset counters for the project
         project_query = """
@@ -462,62 +454,16 @@ class ValidatorService:
 
     @staticmethod
     async def validate_all_tasks(project_id: int, user_id: int, db: Database):
-        """Validates all mapped tasks on a project using raw SQL queries"""
-
-        # Fetch tasks that are in the MAPPED state
-        query = """
-            SELECT id, task_status, mapped_by
-            FROM tasks
-            WHERE project_id = :project_id
-            AND task_status = :mapped_status
-        """
-        tasks_to_validate = await db.fetch_all(
-            query=query,
-            values={
-                "project_id": project_id,
-                "mapped_status": TaskStatus.MAPPED.value,
-            },
+        """Validates all mapped tasks on a project, keeping their mapper"""
+        await Task.transition_all_tasks(
+            project_id,
+            user_id,
+            [TaskStatus.MAPPED],
+            TaskStatus.VALIDATED,
+            db,
+            lock_action=TaskAction.LOCKED_FOR_VALIDATION,
         )
 
-        for task in tasks_to_validate:
-            task_id = task["id"]
-            mapped_by = (
-                task["mapped_by"] or user_id
-            )  # Ensure we set the 'mapped_by' value
-
-            # Lock the task for validation if it's not already locked
-            current_status = TaskStatus(task["task_status"])
-            if current_status not in [
-                TaskStatus.LOCKED_FOR_MAPPING,
-                TaskStatus.LOCKED_FOR_VALIDATION,
-            ]:
-                await Task.lock_task_for_validating(task_id, project_id, user_id, db)
-
-            # Unlock the task and set its status to VALIDATED
-            await Task.unlock_task(
-                task_id=task_id,
-                project_id=project_id,
-                user_id=user_id,
-                new_state=TaskStatus.VALIDATED,
-                db=db,
-            )
-
-            # Update the mapped_by field if necessary
-            update_mapped_by_query = """
-                UPDATE tasks
-                SET mapped_by = :mapped_by
-                WHERE id = :task_id
-                AND project_id = :project_id
-            """
-            await db.execute(
-                query=update_mapped_by_query,
-                values={
-                    "mapped_by": mapped_by,
-                    "task_id": task_id,
-                    "project_id": project_id,
-                },
-            )
-
         # Update the project's task counters using raw SQL
         project_update_query = """
             UPDATE projects
@@ -0,0 +1,245 @@
+"""Add global_stats homepage totals maintained by triggers on tasks, projects and users
+
+Revision ID: a0b5c6d7e8f9
+Revises: f9a4b5c6d7e8
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a0b5c6d7e8f9"
+down_revision = "f9a4b5c6d7e8"
+branch_labels = None
+depends_on = None
+
+TRIGGER_OPERATIONS = {
+    "tasks": ("INSERT", "UPDATE", "DELETE"),
+    "projects": ("INSERT", "UPDATE", "DELETE"),
+    "users": ("INSERT", "DELETE"),
+}
+TRANSITION_TABLES = {
+    "INSERT": "NEW TABLE AS new_{table}",
+    "UPDATE": "OLD TABLE AS old_{table} NEW TABLE AS new_{table}",
+    "DELETE": "OLD TABLE AS old_{table}",
+}
+
+
+def upgrade():
+    op.create_table(
+        "global_stats",
+        sa.Column("slot", sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column("total_projects", sa.BigInteger(), nullable=False),
+        sa.Column("total_mappers", sa.BigInteger(), nullable=False),
+        sa.Column("total_validators", sa.BigInteger(), nullable=False),
+        sa.Column("tasks_mapped", sa.BigInteger(), nullable=False),
+        sa.Column("tasks_validated", sa.BigInteger(), nullable=False),
+        sa.Column("total_area", sa.Float(), nullable=False),
+        sa.Column("total_mapped_area", sa.Float(), nullable=False),
+        sa.Column("total_validated_area", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("slot"),
+    )
+    # Totals go to the first slot, the other ones start at zero
+    op.execute(
+        """
+        INSERT INTO global_stats (
+            slot, total_projects, total_mappers, total_validators, tasks_mapped,
+            tasks_validated, total_area, total_mapped_area, total_validated_area
+        )
+        SELECT slot, 0, 0, 0, 0, 0, 0, 0, 0
+        FROM generate_series(0, 15) AS slot
+        """
+    )
+    op.execute(
+        """
+        UPDATE global_stats SET
+            total_projects = (SELECT COUNT(*) FROM projects),
+            total_mappers = (SELECT COUNT(*) FROM users),
+            total_validators = (
+                SELECT COUNT(DISTINCT validated_by) FROM tasks WHERE task_status = 4
+            ),
+            tasks_mapped = (SELECT COUNT(*) FROM tasks WHERE task_status IN (2, 4)),
+            tasks_validated = (SELECT COUNT(*) FROM tasks WHERE task_status = 4),
+            total_area = (
+                SELECT COALESCE(SUM(ST_Area(geometry::geography)), 0) / 1000000
+                FROM projects
+            ),
+            total_mapped_area = (
+                SELECT COALESCE(SUM(ST_Area(geometry::geography)), 0) / 1000000
+                FROM tasks WHERE task_status = 2
+            ),
+            total_validated_area = (
+                SELECT COALESCE(SUM(ST_Area(geometry::geography)), 0) / 1000000
+                FROM tasks WHERE task_status = 4
+            )
+        WHERE slot = 0
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION tasks_global_stats() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+
+            IF TG_OP = 'INSERT' THEN
+                delta_query := $q$SELECT 1 AS sign, task_status, validated_by, geometry FROM new_tasks$q$;
+
+            ELSIF TG_OP = 'DELETE' THEN
+                delta_query := $q$SELECT -1 AS sign, task_status, validated_by, geometry FROM old_tasks$q$;
+
+            ELSIF TG_OP = 'UPDATE' THEN
+                delta_query := $q$
+            SELECT d.*
+            FROM new_tasks n
+            JOIN old_tasks o ON o.id = n.id AND o.project_id = n.project_id
+            CROSS JOIN LATERAL (
+                VALUES
+                    (1, n.task_status, n.validated_by, n.geometry),
+                    (-1, o.task_status, o.validated_by, o.geometry)
+            ) AS d(sign, task_status, validated_by, geometry)
+            WHERE n.task_status IS DISTINCT FROM o.task_status
+            OR n.validated_by IS DISTINCT FROM o.validated_by
+            OR n.geometry IS DISTINCT FROM o.geometry
+        $q$;
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q$
+        , changes AS (
+            SELECT * FROM delta WHERE task_status IN (2, 4)
+        ),
+        validators AS (
+            SELECT validated_by AS user_id, SUM(sign) AS change
+            FROM changes
+            WHERE task_status = 4 AND validated_by IS NOT NULL
+            GROUP BY validated_by
+        ),
+        validator_change AS (
+            -- Users going from none to some validated tasks or back
+            SELECT COALESCE(SUM(
+                (c.validated > 0)::integer - (c.validated - v.change > 0)::integer
+            ), 0) AS change
+            FROM validators v
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*) AS validated FROM tasks t
+                WHERE t.validated_by = v.user_id AND t.task_status = 4
+            ) c
+        ),
+        totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS tasks_mapped,
+                COALESCE(SUM(sign) FILTER (
+                    WHERE task_status = 4
+                ), 0) AS tasks_validated,
+                COALESCE(SUM(sign * ST_Area(geometry::geography)) FILTER (
+                    WHERE task_status = 2
+                ), 0) / 1000000 AS mapped_area,
+                COALESCE(SUM(sign * ST_Area(geometry::geography)) FILTER (
+                    WHERE task_status = 4
+                ), 0) / 1000000 AS validated_area
+            FROM changes
+        )
+        UPDATE global_stats g
+        SET tasks_mapped = g.tasks_mapped + totals.tasks_mapped,
+            tasks_validated = g.tasks_validated + totals.tasks_validated,
+            total_mapped_area = g.total_mapped_area + totals.mapped_area,
+            total_validated_area = g.total_validated_area + totals.validated_area,
+            total_validators = g.total_validators + validator_change.change
+        FROM totals, validator_change
+        WHERE EXISTS (SELECT 1 FROM changes)
+
+                AND g.slot = mod(pg_backend_pid(), 16)$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION projects_global_stats() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+
+            IF TG_OP = 'INSERT' THEN
+                delta_query := $q$SELECT 1 AS sign, geometry FROM new_projects$q$;
+
+            ELSIF TG_OP = 'DELETE' THEN
+                delta_query := $q$SELECT -1 AS sign, geometry FROM old_projects$q$;
+
+            ELSIF TG_OP = 'UPDATE' THEN
+                delta_query := $q$
+            SELECT d.*
+            FROM new_projects n
+            JOIN old_projects o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (1, n.geometry), (-1, o.geometry)
+            ) AS d(sign, geometry)
+            WHERE n.geometry IS DISTINCT FROM o.geometry
+        $q$;
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q$
+        , totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS projects,
+                COALESCE(SUM(sign * ST_Area(geometry::geography)), 0) / 1000000 AS area
+            FROM delta
+        )
+        UPDATE global_stats g
+        SET total_projects = g.total_projects + totals.projects,
+            total_area = g.total_area + totals.area
+        FROM totals
+        WHERE EXISTS (SELECT 1 FROM delta)
+
+                AND g.slot = mod(pg_backend_pid(), 16)$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION users_global_stats() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+
+            IF TG_OP = 'INSERT' THEN
+                delta_query := $q$SELECT 1 AS sign FROM new_users$q$;
+
+            ELSIF TG_OP = 'DELETE' THEN
+                delta_query := $q$SELECT -1 AS sign FROM old_users$q$;
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q$
+        UPDATE global_stats g
+        SET total_mappers = g.total_mappers + (SELECT SUM(sign) FROM delta)
+        WHERE EXISTS (SELECT 1 FROM delta)
+
+                AND g.slot = mod(pg_backend_pid(), 16)$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table, operations in TRIGGER_OPERATIONS.items():
+        for operation in operations:
+            op.execute(
+                f"""
+                CREATE TRIGGER {table}_global_stats_{operation.lower()}
+                AFTER {operation} ON {table}
+                REFERENCING {TRANSITION_TABLES[operation].format(table=table)}
+                FOR EACH STATEMENT EXECUTE FUNCTION {table}_global_stats()
+                """
+            )
+
+
+def downgrade():
+    for table, operations in TRIGGER_OPERATIONS.items():
+        for operation in operations:
+            op.execute(
+                f"DROP TRIGGER IF EXISTS {table}_global_stats_{operation.lower()} "
+                f"ON {table}"
+            )
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_global_stats()")
+    op.drop_table("global_stats")
@@ -0,0 +1,109 @@
+"""Derive task versions from transaction ids so they follow commit order
+
+Revision ID: a6b1c2d3e4f5
+Revises: f5a0b1c2d3e4
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a6b1c2d3e4f5"
+down_revision = "f5a0b1c2d3e4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION next_task_version() RETURNS bigint AS $$
+        DECLARE
+            step integer := COALESCE(
+                NULLIF(current_setting('tm.task_version_step', true), ''), '0'
+            )::integer + 1;
+        BEGIN
+            PERFORM set_config('tm.task_version_step', step::text, true);
+            RETURN (pg_current_xact_id()::text::bigint << 20)
+                + LEAST(step, 1048575);
+        END;
+        $$ LANGUAGE plpgsql VOLATILE
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION task_version_watermark() RETURNS bigint AS $$
+            -- Our own transaction is left out of the running ones, it sees its changes
+            SELECT COALESCE(
+                (SELECT MIN(x.id::text::bigint) FROM pg_snapshot_xip(s.snapshot) x(id)),
+                pg_snapshot_xmax(s.snapshot)::text::bigint
+            ) << 20
+            FROM pg_current_snapshot() s(snapshot)
+        $$ LANGUAGE sql STABLE
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION tasks_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := next_task_version();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION task_history_bump_task_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE tasks t
+            SET version = next_task_version()
+            FROM (SELECT DISTINCT project_id, task_id FROM changed_history) h
+            WHERE t.project_id = h.project_id AND t.id = h.task_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.alter_column("tasks", "version", server_default=sa.text("next_task_version()"))
+    # Transaction ids are far above the sequence values handed out so far, so the
+    # versions clients hold are all older and their next poll returns every task
+    op.execute("UPDATE tasks SET version = next_task_version()")
+    op.execute("DROP SEQUENCE task_version_seq")
+
+
+def downgrade():
+    op.execute("CREATE SEQUENCE task_version_seq")
+    op.execute(
+        "SELECT setval('task_version_seq', COALESCE(MAX(version), 0) + 1) FROM tasks"
+    )
+    op.alter_column(
+        "tasks", "version", server_default=sa.text("nextval('task_version_seq')")
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION tasks_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('task_version_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION task_history_bump_task_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE tasks t
+            SET version = nextval('task_version_seq')
+            FROM (SELECT DISTINCT project_id, task_id FROM changed_history) h
+            WHERE t.project_id = h.project_id AND t.id = h.task_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute("DROP FUNCTION IF EXISTS task_version_watermark()")
+    op.execute("DROP FUNCTION IF EXISTS next_task_version()")
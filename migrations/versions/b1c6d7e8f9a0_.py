@@ -0,0 +1,303 @@
+"""Store geodesic areas in projects.area_km2 and tasks.area_km2
+
+Revision ID: b1c6d7e8f9a0
+Revises: a0b5c6d7e8f9
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b1c6d7e8f9a0"
+down_revision = "a0b5c6d7e8f9"
+branch_labels = None
+depends_on = None
+
+TABLES = ("projects", "tasks")
+
+TASKS_GLOBAL_STATS_FUNCTION = """
+        CREATE OR REPLACE FUNCTION tasks_global_stats() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+
+            IF TG_OP = 'INSERT' THEN
+                delta_query := $q$SELECT 1 AS sign, task_status, validated_by, area_km2 FROM new_tasks$q$;
+
+            ELSIF TG_OP = 'DELETE' THEN
+                delta_query := $q$SELECT -1 AS sign, task_status, validated_by, area_km2 FROM old_tasks$q$;
+
+            ELSIF TG_OP = 'UPDATE' THEN
+                delta_query := $q$
+            SELECT d.*
+            FROM new_tasks n
+            JOIN old_tasks o ON o.id = n.id AND o.project_id = n.project_id
+            CROSS JOIN LATERAL (
+                VALUES
+                    (1, n.task_status, n.validated_by, n.area_km2),
+                    (-1, o.task_status, o.validated_by, o.area_km2)
+            ) AS d(sign, task_status, validated_by, area_km2)
+            WHERE n.task_status IS DISTINCT FROM o.task_status
+            OR n.validated_by IS DISTINCT FROM o.validated_by
+            OR n.area_km2 IS DISTINCT FROM o.area_km2
+        $q$;
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q$
+        , changes AS (
+            SELECT * FROM delta WHERE task_status IN (2, 4)
+        ),
+        validators AS (
+            SELECT validated_by AS user_id, SUM(sign) AS change
+            FROM changes
+            WHERE task_status = 4 AND validated_by IS NOT NULL
+            GROUP BY validated_by
+        ),
+        validator_change AS (
+            -- Users going from none to some validated tasks or back
+            SELECT COALESCE(SUM(
+                (c.validated > 0)::integer - (c.validated - v.change > 0)::integer
+            ), 0) AS change
+            FROM validators v
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*) AS validated FROM tasks t
+                WHERE t.validated_by = v.user_id AND t.task_status = 4
+            ) c
+        ),
+        totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS tasks_mapped,
+                COALESCE(SUM(sign) FILTER (
+                    WHERE task_status = 4
+                ), 0) AS tasks_validated,
+                COALESCE(SUM(sign * area_km2) FILTER (
+                    WHERE task_status = 2
+                ), 0) AS mapped_area,
+                COALESCE(SUM(sign * area_km2) FILTER (
+                    WHERE task_status = 4
+                ), 0) AS validated_area
+            FROM changes
+        )
+        UPDATE global_stats g
+        SET tasks_mapped = g.tasks_mapped + totals.tasks_mapped,
+            tasks_validated = g.tasks_validated + totals.tasks_validated,
+            total_mapped_area = g.total_mapped_area + totals.mapped_area,
+            total_validated_area = g.total_validated_area + totals.validated_area,
+            total_validators = g.total_validators + validator_change.change
+        FROM totals, validator_change
+        WHERE EXISTS (SELECT 1 FROM changes)
+
+                AND g.slot = mod(pg_backend_pid(), 16)$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+"""
+PROJECTS_GLOBAL_STATS_FUNCTION = """
+        CREATE OR REPLACE FUNCTION projects_global_stats() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+
+            IF TG_OP = 'INSERT' THEN
+                delta_query := $q$SELECT 1 AS sign, area_km2 FROM new_projects$q$;
+
+            ELSIF TG_OP = 'DELETE' THEN
+                delta_query := $q$SELECT -1 AS sign, area_km2 FROM old_projects$q$;
+
+            ELSIF TG_OP = 'UPDATE' THEN
+                delta_query := $q$
+            SELECT d.*
+            FROM new_projects n
+            JOIN old_projects o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (1, n.area_km2), (-1, o.area_km2)
+            ) AS d(sign, area_km2)
+            WHERE n.area_km2 IS DISTINCT FROM o.area_km2
+        $q$;
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q$
+        , totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS projects,
+                COALESCE(SUM(sign * area_km2), 0) AS area
+            FROM delta
+        )
+        UPDATE global_stats g
+        SET total_projects = g.total_projects + totals.projects,
+            total_area = g.total_area + totals.area
+        FROM totals
+        WHERE EXISTS (SELECT 1 FROM delta)
+
+                AND g.slot = mod(pg_backend_pid(), 16)$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+"""
+PREVIOUS_TASKS_GLOBAL_STATS_FUNCTION = """
+        CREATE OR REPLACE FUNCTION tasks_global_stats() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+
+            IF TG_OP = 'INSERT' THEN
+                delta_query := $q$SELECT 1 AS sign, task_status, validated_by, geometry FROM new_tasks$q$;
+
+            ELSIF TG_OP = 'DELETE' THEN
+                delta_query := $q$SELECT -1 AS sign, task_status, validated_by, geometry FROM old_tasks$q$;
+
+            ELSIF TG_OP = 'UPDATE' THEN
+                delta_query := $q$
+            SELECT d.*
+            FROM new_tasks n
+            JOIN old_tasks o ON o.id = n.id AND o.project_id = n.project_id
+            CROSS JOIN LATERAL (
+                VALUES
+                    (1, n.task_status, n.validated_by, n.geometry),
+                    (-1, o.task_status, o.validated_by, o.geometry)
+            ) AS d(sign, task_status, validated_by, geometry)
+            WHERE n.task_status IS DISTINCT FROM o.task_status
+            OR n.validated_by IS DISTINCT FROM o.validated_by
+            OR n.geometry IS DISTINCT FROM o.geometry
+        $q$;
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q$
+        , changes AS (
+            SELECT * FROM delta WHERE task_status IN (2, 4)
+        ),
+        validators AS (
+            SELECT validated_by AS user_id, SUM(sign) AS change
+            FROM changes
+            WHERE task_status = 4 AND validated_by IS NOT NULL
+            GROUP BY validated_by
+        ),
+        validator_change AS (
+            -- Users going from none to some validated tasks or back
+            SELECT COALESCE(SUM(
+                (c.validated > 0)::integer - (c.validated - v.change > 0)::integer
+            ), 0) AS change
+            FROM validators v
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*) AS validated FROM tasks t
+                WHERE t.validated_by = v.user_id AND t.task_status = 4
+            ) c
+        ),
+        totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS tasks_mapped,
+                COALESCE(SUM(sign) FILTER (
+                    WHERE task_status = 4
+                ), 0) AS tasks_validated,
+                COALESCE(SUM(sign * ST_Area(geometry::geography)) FILTER (
+                    WHERE task_status = 2
+                ), 0) / 1000000 AS mapped_area,
+                COALESCE(SUM(sign * ST_Area(geometry::geography)) FILTER (
+                    WHERE task_status = 4
+                ), 0) / 1000000 AS validated_area
+            FROM changes
+        )
+        UPDATE global_stats g
+        SET tasks_mapped = g.tasks_mapped + totals.tasks_mapped,
+            tasks_validated = g.tasks_validated + totals.tasks_validated,
+            total_mapped_area = g.total_mapped_area + totals.mapped_area,
+            total_validated_area = g.total_validated_area + totals.validated_area,
+            total_validators = g.total_validators + validator_change.change
+        FROM totals, validator_change
+        WHERE EXISTS (SELECT 1 FROM changes)
+
+                AND g.slot = mod(pg_backend_pid(), 16)$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+"""
+PREVIOUS_PROJECTS_GLOBAL_STATS_FUNCTION = """
+        CREATE OR REPLACE FUNCTION projects_global_stats() RETURNS trigger AS $$
+        DECLARE
+            delta_query text;
+        BEGIN
+
+            IF TG_OP = 'INSERT' THEN
+                delta_query := $q$SELECT 1 AS sign, geometry FROM new_projects$q$;
+
+            ELSIF TG_OP = 'DELETE' THEN
+                delta_query := $q$SELECT -1 AS sign, geometry FROM old_projects$q$;
+
+            ELSIF TG_OP = 'UPDATE' THEN
+                delta_query := $q$
+            SELECT d.*
+            FROM new_projects n
+            JOIN old_projects o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES (1, n.geometry), (-1, o.geometry)
+            ) AS d(sign, geometry)
+            WHERE n.geometry IS DISTINCT FROM o.geometry
+        $q$;
+            END IF;
+            EXECUTE 'WITH delta AS (' || delta_query || ') ' || $q$
+        , totals AS (
+            SELECT
+                COALESCE(SUM(sign), 0) AS projects,
+                COALESCE(SUM(sign * ST_Area(geometry::geography)), 0) / 1000000 AS area
+            FROM delta
+        )
+        UPDATE global_stats g
+        SET total_projects = g.total_projects + totals.projects,
+            total_area = g.total_area + totals.area
+        FROM totals
+        WHERE EXISTS (SELECT 1 FROM delta)
+
+                AND g.slot = mod(pg_backend_pid(), 16)$q$;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column("area_km2", sa.Float(), nullable=True))
+        # The backfill leaves the counted totals unchanged, skip the transition
+        # tables of the whole table
+        op.execute(f"ALTER TABLE {table} DISABLE TRIGGER {table}_global_stats_update")
+        op.execute(
+            f"""
+            UPDATE {table}
+            SET area_km2 = ST_Area(geometry::geography) / 1000000
+            WHERE geometry IS NOT NULL
+            """
+        )
+        op.execute(f"ALTER TABLE {table} ENABLE TRIGGER {table}_global_stats_update")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION set_area_km2() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' OR NEW.geometry IS DISTINCT FROM OLD.geometry THEN
+                NEW.area_km2 := ST_Area(NEW.geometry::geography) / 1000000;
+            ELSE
+                NEW.area_km2 := OLD.area_km2;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in TABLES:
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_area_km2
+            BEFORE INSERT OR UPDATE OF geometry, area_km2 ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_area_km2()
+            """
+        )
+    op.execute(TASKS_GLOBAL_STATS_FUNCTION)
+    op.execute(PROJECTS_GLOBAL_STATS_FUNCTION)
+
+
+def downgrade():
+    op.execute(PREVIOUS_TASKS_GLOBAL_STATS_FUNCTION)
+    op.execute(PREVIOUS_PROJECTS_GLOBAL_STATS_FUNCTION)
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_area_km2 ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS set_area_km2()")
+    for table in TABLES:
+        op.drop_column(table, "area_km2")
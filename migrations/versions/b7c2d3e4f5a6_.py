@@ -0,0 +1,33 @@
+"""Keep the users whose stats failed on mapper level refresh runs to retry them
+
+Revision ID: b7c2d3e4f5a6
+Revises: a6b1c2d3e4f5
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "b7c2d3e4f5a6"
+down_revision = "a6b1c2d3e4f5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "mapper_level_refresh_runs",
+        sa.Column(
+            "failed_user_ids",
+            postgresql.ARRAY(sa.BigInteger()),
+            nullable=False,
+            server_default="{}",
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("mapper_level_refresh_runs", "failed_user_ids")
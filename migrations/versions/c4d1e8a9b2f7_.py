@@ -0,0 +1,68 @@
+"""Add project_activity_rollup table with per project task history aggregates
+
+Revision ID: c4d1e8a9b2f7
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4d1e8a9b2f7"
+down_revision = "a1b2c3d4e5f6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "project_activity_rollup",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("total_contributors", sa.Integer(), nullable=False),
+        sa.Column("mapping_seconds", sa.BigInteger(), nullable=False),
+        sa.Column("mapping_count", sa.Integer(), nullable=False),
+        sa.Column("validation_seconds", sa.BigInteger(), nullable=False),
+        sa.Column("validation_count", sa.Integer(), nullable=False),
+        sa.Column("comment_count", sa.Integer(), nullable=False),
+        sa.Column("last_activity", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO project_activity_rollup (
+            project_id, total_contributors, mapping_seconds, mapping_count,
+            validation_seconds, validation_count, comment_count, last_activity
+        )
+        SELECT
+            p.id,
+            COUNT(DISTINCT th.user_id) FILTER (WHERE th.action != 'COMMENT'),
+            COALESCE(SUM(
+                FLOOR(EXTRACT(EPOCH FROM TO_TIMESTAMP(th.action_text, 'HH24:MI:SS')::TIME))
+            ) FILTER (
+                WHERE th.action IN ('LOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_MAPPING')
+            ), 0),
+            COUNT(th.id) FILTER (
+                WHERE th.action IN ('LOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_MAPPING')
+            ),
+            COALESCE(SUM(
+                FLOOR(EXTRACT(EPOCH FROM TO_TIMESTAMP(th.action_text, 'HH24:MI:SS')::TIME))
+            ) FILTER (
+                WHERE th.action IN ('LOCKED_FOR_VALIDATION', 'AUTO_UNLOCKED_FOR_VALIDATION')
+            ), 0),
+            COUNT(th.id) FILTER (
+                WHERE th.action IN ('LOCKED_FOR_VALIDATION', 'AUTO_UNLOCKED_FOR_VALIDATION')
+            ),
+            COUNT(th.id) FILTER (WHERE th.action = 'COMMENT'),
+            MAX(th.action_date)
+        FROM projects p
+        LEFT JOIN task_history th ON th.project_id = p.id
+        GROUP BY p.id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("project_activity_rollup")
@@ -0,0 +1,49 @@
+"""Add project_contributors table so contributors are counted once per project
+
+Revision ID: c8d3e4f5a6b7
+Revises: b7c2d3e4f5a6
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c8d3e4f5a6b7"
+down_revision = "b7c2d3e4f5a6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "project_contributors",
+        sa.Column("project_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("project_id", "user_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO project_contributors (project_id, user_id)
+        SELECT DISTINCT project_id, user_id
+        FROM task_history
+        WHERE action != 'COMMENT' AND user_id IS NOT NULL
+        """
+    )
+    # Repair any drift of the counter from contributors counted twice
+    op.execute(
+        """
+        UPDATE project_activity_rollup r
+        SET total_contributors = (
+            SELECT COUNT(*) FROM project_contributors c
+            WHERE c.project_id = r.project_id
+        )
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("project_contributors")
@@ -0,0 +1,31 @@
+"""Add reverse_geocodes table storing the country of rounded project centroids
+
+Revision ID: d3e8f9a0b1c2
+Revises: c2d7e8f9a0b1
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d3e8f9a0b1c2"
+down_revision = "c2d7e8f9a0b1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "reverse_geocodes",
+        sa.Column("lat_key", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("lng_key", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("country", sa.String(), nullable=True),
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("lat_key", "lng_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("reverse_geocodes")
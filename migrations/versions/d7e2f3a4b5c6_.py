@@ -0,0 +1,50 @@
+"""Add task_history.duration_seconds and a partial index for lock actions
+
+Revision ID: d7e2f3a4b5c6
+Revises: c4d1e8a9b2f7
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d7e2f3a4b5c6"
+down_revision = "c4d1e8a9b2f7"
+branch_labels = None
+depends_on = None
+
+lock_actions = (
+    "'LOCKED_FOR_MAPPING', 'LOCKED_FOR_VALIDATION', "
+    "'AUTO_UNLOCKED_FOR_MAPPING', 'AUTO_UNLOCKED_FOR_VALIDATION'"
+)
+
+
+def upgrade():
+    op.add_column(
+        "task_history", sa.Column("duration_seconds", sa.Integer(), nullable=True)
+    )
+    # Durations were only ever written as 'HH:MM:SS' text, parse them once here
+    op.execute(
+        f"""
+        UPDATE task_history
+        SET duration_seconds = FLOOR(
+            EXTRACT(EPOCH FROM TO_TIMESTAMP(action_text, 'HH24:MI:SS')::TIME)
+        )
+        WHERE action IN ({lock_actions})
+        AND action_text IS NOT NULL
+        """
+    )
+    op.create_index(
+        "idx_task_history_lock_durations",
+        "task_history",
+        ["project_id", "action"],
+        unique=False,
+        postgresql_where=sa.text(f"action IN ({lock_actions})"),
+    )
+
+
+def downgrade():
+    op.drop_index("idx_task_history_lock_durations", table_name="task_history")
+    op.drop_column("task_history", "duration_seconds")
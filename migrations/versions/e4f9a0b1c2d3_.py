@@ -0,0 +1,39 @@
+"""Make task annotations unique per task and type so they can be upserted
+
+Revision ID: e4f9a0b1c2d3
+Revises: d3e8f9a0b1c2
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4f9a0b1c2d3"
+down_revision = "d3e8f9a0b1c2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the latest annotation where a task has several of the same type
+    op.execute(
+        """
+        DELETE FROM task_annotations a
+        USING task_annotations b
+        WHERE a.task_id = b.task_id
+            AND a.project_id = b.project_id
+            AND a.annotation_type = b.annotation_type
+            AND a.id < b.id
+        """
+    )
+    op.create_index(
+        "uq_task_annotations_task_type",
+        "task_annotations",
+        ["task_id", "project_id", "annotation_type"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("uq_task_annotations_task_type", table_name="task_annotations")
@@ -0,0 +1,28 @@
+"""Add a (project_id, action_date, id) index for the project activity feed
+
+Revision ID: e8f3a4b5c6d7
+Revises: d7e2f3a4b5c6
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e8f3a4b5c6d7"
+down_revision = "d7e2f3a4b5c6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "idx_task_history_project_id_action_date",
+        "task_history",
+        ["project_id", "action_date", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("idx_task_history_project_id_action_date", table_name="task_history")
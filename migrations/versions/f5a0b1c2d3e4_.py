@@ -0,0 +1,35 @@
+"""Add mapper_level_refresh_runs table checkpointing mapper level refreshes
+
+Revision ID: f5a0b1c2d3e4
+Revises: e4f9a0b1c2d3
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f5a0b1c2d3e4"
+down_revision = "e4f9a0b1c2d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mapper_level_refresh_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("only_missing", sa.Boolean(), nullable=False),
+        sa.Column("started", sa.DateTime(), nullable=False),
+        sa.Column("checkpointed", sa.DateTime(), nullable=False),
+        sa.Column("finished", sa.DateTime(), nullable=True),
+        sa.Column("last_user_id", sa.BigInteger(), nullable=False),
+        sa.Column("users_processed", sa.Integer(), nullable=False),
+        sa.Column("users_failed", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("mapper_level_refresh_runs")
@@ -0,0 +1,91 @@
+"""Add tasks.version, bumped by triggers on task and task history changes
+
+Revision ID: f9a4b5c6d7e8
+Revises: e8f3a4b5c6d7
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f9a4b5c6d7e8"
+down_revision = "e8f3a4b5c6d7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE SEQUENCE task_version_seq")
+    op.add_column("tasks", sa.Column("version", sa.BigInteger(), nullable=True))
+    op.execute("UPDATE tasks SET version = nextval('task_version_seq')")
+    op.alter_column(
+        "tasks",
+        "version",
+        nullable=False,
+        server_default=sa.text("nextval('task_version_seq')"),
+    )
+    op.create_index(
+        "idx_tasks_project_id_version",
+        "tasks",
+        ["project_id", "version"],
+        unique=False,
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION tasks_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('task_version_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_version
+        BEFORE UPDATE OF task_status, locked_by, mapped_by, validated_by, geometry
+        ON tasks
+        FOR EACH ROW EXECUTE FUNCTION tasks_bump_version()
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION task_history_bump_task_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE tasks t
+            SET version = nextval('task_version_seq')
+            FROM (SELECT DISTINCT project_id, task_id FROM changed_history) h
+            WHERE t.project_id = h.project_id AND t.id = h.task_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for operation, transition_table in (
+        ("INSERT", "NEW"),
+        ("UPDATE", "NEW"),
+        ("DELETE", "OLD"),
+    ):
+        op.execute(
+            f"""
+            CREATE TRIGGER task_history_{operation.lower()}_version
+            AFTER {operation} ON task_history
+            REFERENCING {transition_table} TABLE AS changed_history
+            FOR EACH STATEMENT EXECUTE FUNCTION task_history_bump_task_version()
+            """
+        )
+
+
+def downgrade():
+    for operation in ("insert", "update", "delete"):
+        op.execute(
+            f"DROP TRIGGER IF EXISTS task_history_{operation}_version ON task_history"
+        )
+    op.execute("DROP FUNCTION IF EXISTS task_history_bump_task_version()")
+    op.execute("DROP TRIGGER IF EXISTS tasks_version ON tasks")
+    op.execute("DROP FUNCTION IF EXISTS tasks_bump_version()")
+    op.drop_index("idx_tasks_project_id_version", table_name="tasks")
+    op.drop_column("tasks", "version")
+    op.execute("DROP SEQUENCE task_version_seq")
@@ -0,0 +1,116 @@
+"""
+Compares computing geodesic areas with ST_Area on every read with reading the
+stored area_km2 columns, for the project search CSV export and the project stats
+of the projects with the most complex AOIs.
+
+    python -m scripts.benchmarks.geodesic_area --iterations 20 --projects 10
+"""
+
+import argparse
+import asyncio
+
+from backend.models.dtos.project_dto import ProjectSearchDTO
+from backend.models.postgis.project import Project
+from backend.services.project_search_service import ProjectSearchService
+from scripts.benchmarks.utils import (
+    QueryCountingDatabase,
+    get_database,
+    measure,
+    print_results,
+)
+
+# Stored area reads and the expressions they replaced
+LEGACY_EXPRESSIONS = {
+    "COALESCE(p.area_km2, 0)": (
+        "COALESCE(ST_Area(p.geometry::geography) / 1000000, 0)"
+    ),
+    "area_km2 AS area": "ST_Area(geometry, TRUE) / 1000000 AS area",
+}
+
+
+class LegacyAreaDatabase(QueryCountingDatabase):
+    """Counts statements and computes the areas on the fly as before."""
+
+    @staticmethod
+    def _legacy(query: str) -> str:
+        for stored, legacy in LEGACY_EXPRESSIONS.items():
+            query = query.replace(stored, legacy)
+        return query
+
+    async def fetch_one(self, query, *args, **kwargs):
+        return await super().fetch_one(self._legacy(query), *args, **kwargs)
+
+    async def iterate(self, query, *args, **kwargs):
+        async for row in super().iterate(self._legacy(query), *args, **kwargs):
+            yield row
+
+
+async def main(iterations: int, projects: int):
+    database = get_database()
+    await database.connect()
+    try:
+        db = QueryCountingDatabase(database)
+        legacy_db = LegacyAreaDatabase(database)
+        project_ids = [
+            row["id"]
+            for row in await db.fetch_all(
+                """
+                SELECT id FROM projects
+                ORDER BY ST_NPoints(geometry) DESC
+                LIMIT :projects
+                """,
+                values={"projects": projects},
+            )
+        ]
+        query, params, header = await ProjectSearchService.create_csv_query(
+            ProjectSearchDTO(preferred_locale="en"), None, db
+        )
+
+        async def export_csv(db):
+            async for _ in ProjectSearchService.search_projects_as_csv(
+                query, params, header, db
+            ):
+                pass
+
+        async def project_stats(db):
+            for project_id in project_ids:
+                await Project.get_project_stats(project_id, db)
+
+        for project_id in project_ids:
+            legacy = await Project.get_project_stats(project_id, legacy_db)
+            stored = await Project.get_project_stats(project_id, db)
+            assert abs(legacy.area - stored.area) < 0.001, (
+                f"Stored area of project {project_id} differs from the computed one"
+            )
+
+        print(f"CSV export of all projects, {iterations} iterations")
+        print_results(
+            [
+                await measure(
+                    "ST_Area per row (before)", export_csv, legacy_db, iterations
+                ),
+                await measure("stored area_km2 (after)", export_csv, db, iterations),
+            ]
+        )
+        print(
+            f"\nStats of the {len(project_ids)} most complex projects, "
+            f"{iterations} iterations"
+        )
+        print_results(
+            [
+                await measure(
+                    "ST_Area per read (before)", project_stats, legacy_db, iterations
+                ),
+                await measure("stored area_km2 (after)", project_stats, db, iterations),
+            ]
+        )
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", "-n", type=int, default=20)
+    parser.add_argument("--projects", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.projects))
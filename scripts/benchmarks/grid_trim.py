@@ -0,0 +1,126 @@
+"""
+Compares the per-tile grid trimming with the vectorized one on synthetic grids.
+
+    python -m scripts.benchmarks.grid_trim --tiles 10000 100000 --iterations 5
+"""
+
+import argparse
+import json
+import math
+
+import geojson
+import shapely.geometry
+
+from backend.models.dtos.grid_dto import GridDTO
+from backend.services.grid.grid_service import GridService
+from scripts.benchmarks.utils import measure_cpu, print_results
+
+# Web Mercator size of a zoom 18 tile
+TILE_SIZE = 152.874
+
+
+def legacy_trim_grid_to_aoi(grid_dto: GridDTO) -> geojson.FeatureCollection:
+    """Grid trimming as it was before vectorizing: contains then intersection per tile."""
+    grid = geojson.loads(geojson.dumps(grid_dto.grid))
+    aoi = geojson.loads(geojson.dumps(grid_dto.area_of_interest))
+    aoi_multi_polygon = shapely.geometry.shape(
+        GridService.merge_to_multi_polygon(aoi, dissolve=True)
+    )
+    intersecting_features = []
+    for feature in grid["features"]:
+        tile = shapely.geometry.shape(feature["geometry"])
+        if aoi_multi_polygon.contains(tile):
+            intersecting_features.append(feature)
+        else:
+            intersection = aoi_multi_polygon.intersection(tile)
+            if intersection.is_empty or intersection.geom_type not in [
+                "Polygon",
+                "MultiPolygon",
+            ]:
+                continue
+            clipped_feature = GridService._update_feature(
+                grid_dto.clip_to_aoi, feature, intersection
+            )
+            intersecting_features.append(clipped_feature)
+    return geojson.FeatureCollection(intersecting_features)
+
+
+def synthetic_grid_dto(tiles: int, clip_to_aoi: bool) -> GridDTO:
+    """Square grid of the given number of tiles with a circular aoi inside it"""
+    side = math.ceil(math.sqrt(tiles))
+    features = []
+    for i in range(tiles):
+        x, y = i % side, i // side
+        minx, miny = 1274969.631568 + x * TILE_SIZE, 2828781.542271 + y * TILE_SIZE
+        ring = [
+            [minx, miny],
+            [minx, miny + TILE_SIZE],
+            [minx + TILE_SIZE, miny + TILE_SIZE],
+            [minx + TILE_SIZE, miny],
+            [minx, miny],
+        ]
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "MultiPolygon", "coordinates": [[ring]]},
+                "properties": {"x": x, "y": y, "zoom": 18, "isSquare": True},
+            }
+        )
+    radius = side * TILE_SIZE * 0.45
+    center = shapely.geometry.Point(
+        1274969.631568 + side * TILE_SIZE / 2, 2828781.542271 + side * TILE_SIZE / 2
+    )
+    aoi = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": shapely.geometry.mapping(center.buffer(radius, 64)),
+                "properties": {},
+            }
+        ],
+    }
+    return GridDTO(
+        area_of_interest=json.loads(json.dumps(aoi)),
+        grid={"type": "FeatureCollection", "features": features},
+        clip_to_aoi=clip_to_aoi,
+    )
+
+
+def main(tile_counts, iterations: int, clip_to_aoi: bool):
+    for tiles in tile_counts:
+        grid_dto = synthetic_grid_dto(tiles, clip_to_aoi)
+        legacy = legacy_trim_grid_to_aoi(grid_dto)
+        vectorized = GridService.trim_grid_to_aoi(grid_dto)
+        assert geojson.dumps(legacy, sort_keys=True) == geojson.dumps(
+            vectorized, sort_keys=True
+        ), "Vectorized grid differs from the per-tile one"
+
+        print(
+            f"Grid of {tiles} tiles, {len(vectorized['features'])} kept, "
+            f"clip_to_aoi={clip_to_aoi}, {iterations} iterations"
+        )
+        print_results(
+            [
+                measure_cpu(
+                    "per-tile (before)",
+                    lambda: legacy_trim_grid_to_aoi(grid_dto),
+                    iterations,
+                ),
+                measure_cpu(
+                    "vectorized (after)",
+                    lambda: GridService.trim_grid_to_aoi(grid_dto),
+                    iterations,
+                ),
+            ]
+        )
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tiles", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--iterations", "-n", type=int, default=5)
+    parser.add_argument("--clip-to-aoi", action="store_true")
+    args = parser.parse_args()
+    main(args.tiles, args.iterations, args.clip_to_aoi)
@@ -0,0 +1,123 @@
+"""
+Compares inserting the tasks of a new project one statement per task with the
+batched multi-row insert, for grids of 1k, 10k and 50k tasks. The tasks are added
+to an existing project inside a transaction that is rolled back.
+
+    python -m scripts.benchmarks.project_create --iterations 3 --sizes 1000 10000 50000
+"""
+
+import argparse
+import asyncio
+
+import geojson
+from geoalchemy2.shape import to_shape
+
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import Task
+from scripts.benchmarks.utils import (
+    QueryCountingDatabase,
+    get_database,
+    measure,
+    print_results,
+)
+
+TILE_SIZE = 0.01
+GRID_WIDTH = 250
+
+
+def synthetic_tasks(size: int, first_id: int) -> list:
+    """Builds square tasks laid out in rows like a project grid"""
+    tasks = []
+    for index in range(size):
+        x = (index % GRID_WIDTH) * TILE_SIZE
+        y = (index // GRID_WIDTH) * TILE_SIZE
+        ring = [
+            (x, y),
+            (x + TILE_SIZE, y),
+            (x + TILE_SIZE, y + TILE_SIZE),
+            (x, y + TILE_SIZE),
+            (x, y),
+        ]
+        feature = geojson.Feature(
+            geometry=geojson.MultiPolygon([[ring]]),
+            properties={"x": index, "y": index, "zoom": 14, "isSquare": True},
+        )
+        tasks.append(Task.from_geojson_feature(first_id + index, feature))
+    return tasks
+
+
+async def legacy_insert_tasks(project_id: int, tasks: list, ewkts: list, db):
+    """Task insertion as it was before batching: one statement per task."""
+    for task, ewkt in zip(tasks, ewkts):
+        await db.execute(
+            Task.__table__.insert().values(
+                id=task.id,
+                project_id=project_id,
+                x=task.x,
+                y=task.y,
+                zoom=task.zoom,
+                is_square=task.is_square,
+                task_status=TaskStatus.READY.value,
+                extra_properties=task.extra_properties,
+                geometry=ewkt,
+            )
+        )
+
+
+async def main(iterations: int, sizes: list, project_id: int):
+    database = get_database()
+    await database.connect()
+    try:
+        db = QueryCountingDatabase(database)
+        if project_id is None:
+            project_id = await db.fetch_val("SELECT MIN(id) FROM projects")
+        first_id = (
+            await db.fetch_val(
+                "SELECT COALESCE(MAX(id), 0) FROM tasks WHERE project_id = :project_id",
+                values={"project_id": project_id},
+            )
+            + 1
+        )
+
+        for size in sizes:
+            tasks = synthetic_tasks(size, first_id)
+            ewkts = [f"SRID=4326;{to_shape(task.geometry).wkt}" for task in tasks]
+
+            async def legacy(db):
+                transaction = await db.transaction()
+                try:
+                    await legacy_insert_tasks(project_id, tasks, ewkts, db)
+                finally:
+                    await transaction.rollback()
+
+            async def batched(db):
+                transaction = await db.transaction()
+                try:
+                    await Task.insert_tasks(project_id, tasks, db)
+                finally:
+                    await transaction.rollback()
+
+            print(
+                f"\n{size} tasks added to project {project_id}, {iterations} iterations"
+            )
+            print_results(
+                [
+                    await measure("per-task (before)", legacy, db, iterations),
+                    await measure("batched (after)", batched, db, iterations),
+                ]
+            )
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", "-n", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument(
+        "--project-id",
+        type=int,
+        help="Project the tasks are added to (default the first project)",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.sizes, args.project_id))
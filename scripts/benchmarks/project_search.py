@@ -0,0 +1,87 @@
+"""
+Compares the per-project search result assembly with the batched one.
+
+    python -m scripts.benchmarks.project_search --iterations 50
+"""
+
+import argparse
+import asyncio
+
+from backend.models.dtos.project_dto import ProjectSearchDTO
+from backend.models.postgis.project import Project, ProjectInfo
+from backend.services.project_search_service import ProjectSearchService
+from scripts.benchmarks.utils import (
+    QueryCountingDatabase,
+    get_database,
+    measure,
+    print_results,
+)
+
+
+async def legacy_create_result_dtos(projects, preferred_locale, db):
+    """Result assembly as it was before batching: four queries per project."""
+    results = []
+    for project in projects:
+        total_contributors = await Project.get_project_total_contributions(
+            project.id, db
+        )
+        project_info_dto = await ProjectInfo.get_dto_for_locale(
+            db, project.id, preferred_locale, project.default_locale
+        )
+        active_mappers = await Project.get_active_mappers(project.id, db)
+        campaigns = await Project.get_project_campaigns(project.id, db)
+        results.append(
+            ProjectSearchService._build_result_dto(
+                project, project_info_dto, active_mappers, total_contributors, campaigns
+            )
+        )
+    return results
+
+
+async def main(iterations: int, locale: str):
+    database = get_database()
+    await database.connect()
+    try:
+        db = QueryCountingDatabase(database)
+        search_dto = ProjectSearchDTO(
+            preferred_locale=locale, page=1, omit_map_results=True
+        )
+
+        async def fetch_page(db):
+            _, page, _ = await ProjectSearchService._filter_projects(
+                search_dto, None, db
+            )
+            return page
+
+        async def legacy(db):
+            page = await fetch_page(db)
+            await legacy_create_result_dtos(page, locale, db)
+
+        async def batched(db):
+            page = await fetch_page(db)
+            await ProjectSearchService.create_result_dtos(page, locale, db)
+
+        page = await fetch_page(db)
+        legacy_dtos = await legacy_create_result_dtos(page, locale, db)
+        batched_dtos = await ProjectSearchService.create_result_dtos(page, locale, db)
+        assert [dto.model_dump() for dto in legacy_dtos] == [
+            dto.model_dump() for dto in batched_dtos
+        ], "Batched results differ from the per-project ones"
+
+        print(f"Search page of {len(page)} projects, {iterations} iterations")
+        print_results(
+            [
+                await measure("per-project (before)", legacy, db, iterations),
+                await measure("batched (after)", batched, db, iterations),
+            ]
+        )
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", "-n", type=int, default=50)
+    parser.add_argument("--locale", default="en")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.locale))
@@ -0,0 +1,111 @@
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from databases import Database
+
+from backend.config import settings
+
+
+class QueryCountingDatabase:
+    """Wraps a database connection and counts the statements sent through it."""
+
+    def __init__(self, db):
+        self._db = db
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    async def fetch_all(self, *args, **kwargs):
+        self.count += 1
+        return await self._db.fetch_all(*args, **kwargs)
+
+    async def fetch_one(self, *args, **kwargs):
+        self.count += 1
+        return await self._db.fetch_one(*args, **kwargs)
+
+    async def fetch_val(self, *args, **kwargs):
+        self.count += 1
+        return await self._db.fetch_val(*args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        self.count += 1
+        return await self._db.execute(*args, **kwargs)
+
+    async def execute_many(self, *args, **kwargs):
+        self.count += 1
+        return await self._db.execute_many(*args, **kwargs)
+
+    async def iterate(self, *args, **kwargs):
+        self.count += 1
+        async for row in self._db.iterate(*args, **kwargs):
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of the samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def measure(
+    name: str,
+    func: Callable[[QueryCountingDatabase], Awaitable],
+    db: QueryCountingDatabase,
+    iterations: int,
+) -> dict:
+    """Runs func the given number of times and returns its query count and latencies"""
+    # Warm up connection pool and PostgreSQL caches
+    await func(db)
+
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        db.reset()
+        start = time.perf_counter()
+        await func(db)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries = db.count
+
+    return {
+        "name": name,
+        "queries": queries,
+        "p50": statistics.median(timings),
+        "p95": percentile(timings, 95),
+    }
+
+
+def measure_cpu(name: str, func: Callable[[], object], iterations: int) -> dict:
+    """Runs a function not touching the database and returns its latencies"""
+    func()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "name": name,
+        "queries": "-",
+        "p50": statistics.median(timings),
+        "p95": percentile(timings, 95),
+    }
+
+
+def print_results(results: List[dict]):
+    print(f"{'implementation':<32}{'queries':>10}{'p50 ms':>12}{'p95 ms':>12}")
+    for result in results:
+        print(
+            f"{result['name']:<32}{result['queries']:>10}"
+            f"{result['p50']:>12.2f}{result['p95']:>12.2f}"
+        )
+
+
+def get_database() -> Database:
+    return Database(settings.SQLALCHEMY_DATABASE_URI.unicode_string())
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import logging
+import argparse
+from typing import List, Optional
+
+from databases import Database
+from backend.models.postgis.project_activity_rollup import ProjectActivityRollup
+from backend.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROJECT_BATCH_SIZE = int(os.getenv("PROJECT_BATCH_SIZE", "500"))
+
+
+async def main(project_ids: Optional[List[int]], batch_size: int):
+    try:
+        db_url = settings.SQLALCHEMY_DATABASE_URI.unicode_string()
+        script_db = Database(db_url, min_size=1, max_size=2)
+        await script_db.connect()
+
+        async with script_db.connection() as conn:
+            if not project_ids:
+                rows = await conn.fetch_all("SELECT id FROM projects ORDER BY id")
+                project_ids = [row["id"] for row in rows]
+
+            total_projects = len(project_ids)
+            logger.info("Rebuilding activity rollup of %d projects", total_projects)
+
+            rows_written = 0
+            for start in range(0, total_projects, batch_size):
+                batch = project_ids[start : start + batch_size]
+                # One transaction per batch keeps locks on task_history short
+                async with conn.transaction():
+                    rows_written += await ProjectActivityRollup.refresh(conn, batch)
+                logger.info("%d/%d projects done", start + len(batch), total_projects)
+
+        logger.info(f"Finished. Wrote {rows_written} rollup rows.")
+
+    except Exception:
+        logger.exception("Error while backfilling project activity rollup")
+        raise
+    finally:
+        await script_db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rebuild project_activity_rollup from task_history"
+    )
+    parser.add_argument(
+        "--project-ids",
+        "-p",
+        type=int,
+        nargs="+",
+        help="Only rebuild the supplied projects (default all projects)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        "-b",
+        type=int,
+        default=DEFAULT_PROJECT_BATCH_SIZE,
+        help=f"Number of projects refreshed per transaction (default {DEFAULT_PROJECT_BATCH_SIZE})",
+    )
+
+    args = parser.parse_args()
+    if args.batch_size <= 0:
+        parser.error("--batch-size must be a positive integer")
+
+    asyncio.run(main(project_ids=args.project_ids, batch_size=args.batch_size))
@@ -7,8 +7,10 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.sql import text
 from httpx import ASGITransport, AsyncClient
 
+from backend.cache import cache
 from backend.config import test_settings as settings
 from backend.db import Base, db_connection
+from backend.reference_data import reference_data
 from backend.routes import add_api_end_points
 
 
@@ -70,6 +72,9 @@ async def db_connection_fixture(test_database):
     """Database connection fixture with automatic rollback"""
     test_db = Database(ASYNC_TEST_DB_URL, min_size=4, max_size=8, force_rollback=True)
     await test_db.connect()
+    # Cached reads would outlive the rolled back data of previous tests
+    await cache.clear()
+    reference_data.invalidate()
     try:
         yield test_db
     finally:
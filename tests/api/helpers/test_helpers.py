@@ -31,6 +31,7 @@ from backend.models.postgis.statuses import (
 from backend.models.postgis.task import Task
 from backend.models.postgis.team import Team, TeamMembers
 from backend.models.postgis.user import User
+from backend.reference_data import reference_data
 from backend.services.interests_service import Interest
 from backend.services.license_service import LicenseDTO, LicenseService
 from backend.services.mapping_issues_service import (
@@ -89,6 +90,7 @@ async def create_mapping_levels(db):
             """
         )
     )
+    reference_data.invalidate()
 
 
 def get_canned_osm_user_details():
@@ -232,6 +234,7 @@ async def get_or_create_levels(db):
             {"level_id": 3, "badge_id": 2},
         ],
     )
+    reference_data.invalidate()
 
 
 async def return_canned_user(db, username=TEST_USERNAME, id=TEST_USER_ID) -> User:
@@ -624,6 +627,7 @@ async def create_canned_interest(db, interest_id=111, name="test_interest"):
         """,
         {"id": interest_id, "name": name},
     )
+    reference_data.invalidate()
 
     interest = Interest(id=interest_id, name=name)
     return interest
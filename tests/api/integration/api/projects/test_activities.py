@@ -118,3 +118,45 @@ class TestProjectsActivitiesAPI:
         assert body["activity"][1]["taskId"] == 2
         assert body["activity"][1]["action"] == TaskAction.LOCKED_FOR_MAPPING.name
         assert body["activity"][1]["actionBy"] == self.test_author.username
+
+    async def test_cursor_pages_follow_each_other(self, client: AsyncClient):
+        await self.db.execute(
+            "UPDATE projects SET status = :status WHERE id = :id",
+            {"status": ProjectStatus.PUBLISHED.value, "id": int(self.test_project_id)},
+        )
+        for _ in range(12):
+            await Task.set_task_history(
+                2,
+                self.test_project_id,
+                self.test_author.id,
+                TaskAction.STATE_CHANGE,
+                self.db,
+                new_state=TaskStatus.MAPPED,
+            )
+
+        # Act
+        first = (await client.get(self.url, params={"cursor": ""})).json()
+        second = (
+            await client.get(
+                self.url, params={"cursor": first["pagination"]["nextCursor"]}
+            )
+        ).json()
+        by_page = (await client.get(self.url, params={"page": 1})).json()
+
+        # Assert
+        assert len(first["activity"]) == 10
+        assert first["pagination"]["hasNext"] is True
+        assert len(second["activity"]) == 2
+        assert second["pagination"]["hasNext"] is False
+        assert second["pagination"]["nextCursor"] is None
+        assert [a["historyId"] for a in first["activity"]] == [
+            a["historyId"] for a in by_page["activity"]
+        ]
+
+    async def test_returns_400_for_invalid_cursor(self, client: AsyncClient):
+        await self.db.execute(
+            "UPDATE projects SET status = :status WHERE id = :id",
+            {"status": ProjectStatus.PUBLISHED.value, "id": int(self.test_project_id)},
+        )
+        resp = await client.get(self.url, params={"cursor": "not-a-cursor"})
+        assert resp.status_code == 400
@@ -1,5 +1,7 @@
 # tests/api/integration/api/projects/test_projects_all_async.py
 import base64
+import csv
+import io
 from backend.exceptions import NotFound
 from backend.models.dtos.project_dto import ProjectDTO
 from backend.models.postgis.organisation import Organisation
@@ -1837,6 +1839,18 @@ class TestProjectsAllAPIAsync:
         assert resp2.status_code == 200
         assert resp2.json()["mapResults"]["type"] == "FeatureCollection"
 
+    async def test_download_as_csv_streams_matching_projects(self, client: AsyncClient):
+        resp = await client.get(self.url, params={"downloadAsCSV": "true"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/csv")
+        rows = list(csv.reader(io.StringIO(resp.text)))
+        assert rows[0][:2] == ["projectId", "name"]
+        assert "partnerNames" not in rows[0]
+        # only test_project_1 is published + public
+        assert len(rows) == 2
+        assert int(rows[1][0]) == self.test_project_1_id
+        assert rows[1][rows[0].index("status")] == ProjectStatus.PUBLISHED.name
+
 
 @pytest.mark.anyio
 class TestSearchProjectByBBOX:
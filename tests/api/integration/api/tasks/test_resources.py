@@ -75,6 +75,53 @@ class TestGetTasksQueriesJsonAPI:
         assert body["type"] == "FeatureCollection"
         assert len(body["features"]) == 4
 
+    async def test_returns_only_tasks_changed_since_version(self, client: AsyncClient):
+        # Arrange
+        everything = (await client.get(self.url, params={"since": 0})).json()
+        await Task.lock_task_for_mapping(
+            2, self.test_project_id, self.test_author.id, self.db
+        )
+
+        # Act
+        changes = (
+            await client.get(self.url, params={"since": everything["version"]})
+        ).json()
+        no_changes = (
+            await client.get(self.url, params={"since": changes["version"]})
+        ).json()
+
+        # Assert
+        assert len(everything["features"]) == 4
+        assert [f["properties"]["taskId"] for f in changes["features"]] == [2]
+        assert changes["features"][0]["properties"]["lockedBy"] == self.test_author.id
+        assert changes["version"] > everything["version"]
+        assert no_changes["features"] == []
+        assert no_changes["version"] == changes["version"]
+
+    async def test_version_does_not_move_past_running_transactions(
+        self, client: AsyncClient
+    ):
+        # Arrange: task 3 was written by a transaction newer than one still running
+        everything = (await client.get(self.url, params={"since": 0})).json()
+        await self.db.execute(
+            """
+            UPDATE tasks SET version = task_version_watermark() + 1
+            WHERE project_id = :project_id AND id = 3
+            """,
+            {"project_id": self.test_project_id},
+        )
+
+        # Act
+        first = (
+            await client.get(self.url, params={"since": everything["version"]})
+        ).json()
+        second = (await client.get(self.url, params={"since": first["version"]})).json()
+
+        # Assert: the task is sent until no older transaction can commit below it
+        assert [f["properties"]["taskId"] for f in first["features"]] == [3]
+        assert first["version"] == everything["version"]
+        assert [f["properties"]["taskId"] for f in second["features"]] == [3]
+
 
 @pytest.mark.anyio
 class TestTaskRestAPI:
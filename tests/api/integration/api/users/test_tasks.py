@@ -4,7 +4,7 @@ import pytest
 from httpx import AsyncClient
 
 from backend.services.users.authentication_service import AuthenticationService
-from backend.models.postgis.task import Task, TaskStatus
+from backend.models.postgis.task import Task, TaskAction, TaskStatus
 from backend.models.postgis.statuses import ProjectStatus
 
 from tests.api.helpers.test_helpers import create_canned_project
@@ -87,6 +87,54 @@ class TestUsersTasksAPI:
         assert body["pagination"]["perPage"] == 1
         assert body["pagination"]["hasNext"] is True
 
+    async def test_counts_comments_of_the_returned_tasks(self, client: AsyncClient):
+        """Test that the API returns the number of comments on each task"""
+        # Arrange
+        await self.change_task_status(1, TaskStatus.MAPPED, self.test_project_id)
+        await self.change_task_status(2, TaskStatus.MAPPED, self.test_project_id)
+        for comment in ("First", "Second"):
+            await Task.set_task_history(
+                1,
+                self.test_project_id,
+                self.test_author.id,
+                TaskAction.COMMENT,
+                self.db,
+                comment=comment,
+            )
+
+        # Act
+        resp = await client.get(
+            self.url,
+            headers={"Authorization": self.user_session_token},
+            params={"project_id": self.test_project_id, "sort_by": "action_date"},
+        )
+
+        # Assert
+        assert resp.status_code == 200
+        tasks = resp.json()["tasks"]
+        assert [(t["taskId"], t["numberOfComments"]) for t in tasks] == [
+            (2, 0),
+            (1, 2),
+        ]
+
+    async def test_returns_total_for_page_past_the_end(self, client: AsyncClient):
+        """Test that the API still returns the total when the page is empty"""
+        # Arrange
+        await self.change_task_status(1, TaskStatus.MAPPED, self.test_project_id)
+
+        # Act
+        resp = await client.get(
+            self.url,
+            headers={"Authorization": self.user_session_token},
+            params={"project_id": self.test_project_id, "page": 3},
+        )
+
+        # Assert
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["tasks"] == []
+        assert body["pagination"]["total"] == 1
+
     async def test_filters_by_project_if_project_id_passed(self, client: AsyncClient):
         """Test that the API filters by project if project_id is passed"""
         # Arrange
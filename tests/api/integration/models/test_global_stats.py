@@ -0,0 +1,46 @@
+import pytest
+
+from backend.models.postgis.global_stats import GlobalStats
+from backend.models.postgis.statuses import TaskStatus
+from backend.models.postgis.task import Task
+from tests.api.helpers.test_helpers import create_canned_project
+
+
+@pytest.mark.anyio
+class TestGlobalStats:
+    @pytest.fixture(autouse=True)
+    async def _setup(self, db_connection_fixture):
+        self.db = db_connection_fixture
+
+    async def test_triggers_keep_totals_in_sync_with_tables(self):
+        # Arrange
+        _, user, project_id = await create_canned_project(self.db)
+
+        # Act
+        await Task.lock_task_for_mapping(2, project_id, user.id, self.db)
+        await Task.unlock_task(2, project_id, user.id, TaskStatus.MAPPED, self.db)
+        await Task.lock_task_for_validating(1, project_id, user.id, self.db)
+        await Task.unlock_task(1, project_id, user.id, TaskStatus.VALIDATED, self.db)
+        totals = await GlobalStats.get(self.db)
+
+        # Assert
+        assert await GlobalStats.reconcile(self.db, dry_run=True) == {}
+        assert totals["total_projects"] == 1
+        assert totals["tasks_validated"] == 2
+        assert totals["total_validated_area"] > 0
+
+    async def test_reconcile_fixes_drift(self):
+        # Arrange
+        await create_canned_project(self.db)
+        await self.db.execute(
+            "UPDATE global_stats SET tasks_mapped = tasks_mapped + 5 WHERE slot = 3"
+        )
+
+        # Act
+        drift = await GlobalStats.reconcile(self.db)
+
+        # Assert
+        stored, actual = drift["tasks_mapped"]
+        assert stored == actual + 5
+        assert (await GlobalStats.get(self.db))["tasks_mapped"] == actual
+        assert await GlobalStats.reconcile(self.db, dry_run=True) == {}
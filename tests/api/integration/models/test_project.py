@@ -145,3 +145,71 @@ class TestProject:
         )
         assert project.status == ProjectStatus[test_project_dto.project_status].value
         assert test_project_dto.project_info.name == TEST_PROJECT_NAME
+
+    async def test_refresh_task_counters_reports_and_fixes_drift(self):
+        project, author, project_id = await create_canned_project(self.db)
+        await self.db.execute(
+            "UPDATE projects SET total_tasks = total_tasks + 5 WHERE id = :id",
+            {"id": project_id},
+        )
+
+        drifted = await Project.refresh_task_counters(self.db, dry_run=True)
+        drift = next(row for row in drifted if row["project_id"] == project_id)
+        assert drift["stored_total_tasks"] == drift["total_tasks"] + 5
+
+        await Project.refresh_task_counters(self.db)
+        assert await Project.refresh_task_counters(self.db, dry_run=True) == []
+
+    async def test_stored_areas_follow_geometry_changes(self):
+        project, author, project_id = await create_canned_project(self.db)
+        area_query = """
+            SELECT
+                area_km2,
+                ST_Area(geometry::geography) / 1000000 AS computed_area
+            FROM projects
+            WHERE id = :id
+        """
+
+        stored = await self.db.fetch_one(area_query, {"id": project_id})
+        assert stored["area_km2"] == pytest.approx(stored["computed_area"])
+        stale_tasks = await self.db.fetch_val(
+            """
+            SELECT COUNT(*) FROM tasks
+            WHERE project_id = :id
+            AND area_km2 IS DISTINCT FROM ST_Area(geometry::geography) / 1000000
+            """,
+            {"id": project_id},
+        )
+        assert stale_tasks == 0
+
+        await self.db.execute(
+            """
+            UPDATE projects
+            SET geometry = ST_Multi(ST_Buffer(geometry, 0.01)), area_km2 = 0
+            WHERE id = :id
+            """,
+            {"id": project_id},
+        )
+        updated = await self.db.fetch_one(area_query, {"id": project_id})
+        assert updated["area_km2"] > stored["area_km2"]
+        assert updated["area_km2"] == pytest.approx(updated["computed_area"])
+
+    async def test_get_project_titles_falls_back_to_default_locale(self):
+        project, author, project_id = await create_canned_project(self.db)
+        await self.db.execute(
+            """
+            INSERT INTO project_info (project_id, locale, name)
+            VALUES (:id, 'fr', 'Projet test'), (:id, 'de', '')
+            """,
+            {"id": project_id},
+        )
+
+        titles = {
+            locale: await Project.get_project_titles(self.db, [project_id], locale)
+            for locale in ("fr", "de", "es", None)
+        }
+
+        assert titles["fr"] == {project_id: "Projet test"}
+        assert titles["de"] == {project_id: TEST_PROJECT_NAME}
+        assert titles["es"] == {project_id: TEST_PROJECT_NAME}
+        assert titles[None] == {project_id: TEST_PROJECT_NAME}
@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+from backend.models.postgis.project import Project
+from backend.models.postgis.project_activity_rollup import ProjectActivityRollup
+from backend.models.postgis.task import Task, TaskAction, TaskHistory
+from backend.models.postgis.utils import duration_to_seconds
+from tests.api.helpers.test_helpers import (
+    create_canned_project,
+    create_canned_user,
+    return_canned_user,
+)
+
+
+def test_duration_to_seconds_parses_lock_durations():
+    assert duration_to_seconds(None) == 0
+    assert duration_to_seconds("00:00:00") == 0
+    assert duration_to_seconds("01:02:03") == 3723
+    assert duration_to_seconds("00:10:05.987654") == 605
+    assert duration_to_seconds("02:00") == 7200
+
+
+@pytest.mark.anyio
+class TestProjectActivityRollup:
+    @pytest.fixture(autouse=True)
+    async def _setup(self, db_connection_fixture):
+        self.db = db_connection_fixture
+
+    async def _snapshot(self, project_id):
+        row = await ProjectActivityRollup.get(project_id, self.db)
+        return {key: row[key] for key in row.keys()}
+
+    async def test_incremental_updates_match_full_refresh(self):
+        # Arrange
+        _, user, project_id = await create_canned_project(self.db)
+
+        # Act
+        await Task.set_task_history(
+            2, project_id, user.id, TaskAction.LOCKED_FOR_MAPPING, self.db
+        )
+        await TaskHistory.update_task_locked_with_duration(
+            2, project_id, TaskAction.LOCKED_FOR_MAPPING, user.id, self.db
+        )
+        await Task.set_task_history(
+            2, project_id, user.id, TaskAction.COMMENT, self.db, comment="Done"
+        )
+        await Task.set_task_history(
+            2, project_id, user.id, TaskAction.LOCKED_FOR_VALIDATION, self.db
+        )
+        await Task.clear_task_lock(2, project_id, self.db)
+        incremental = await self._snapshot(project_id)
+        await ProjectActivityRollup.refresh(self.db, [project_id])
+        refreshed = await self._snapshot(project_id)
+
+        # Assert
+        assert incremental == refreshed
+        assert incremental["mapping_count"] >= 1
+        assert incremental["comment_count"] >= 1
+        assert await Project.get_project_total_contributions(project_id, self.db) == (
+            incremental["total_contributors"]
+        )
+
+    async def test_contributor_is_counted_once_when_first_actions_race(self):
+        # Arrange: two first actions recorded before either sees the other's history
+        _, user, project_id = await create_canned_project(self.db)
+        await ProjectActivityRollup.refresh(self.db, [project_id])
+        before = await self._snapshot(project_id)
+        other_user_id = user.id + 1
+        other_user = await return_canned_user(self.db, "Racing mapper", other_user_id)
+        await create_canned_user(self.db, other_user)
+
+        # Act
+        for action in ("LOCKED_FOR_MAPPING", "LOCKED_FOR_VALIDATION"):
+            await ProjectActivityRollup.record_history(
+                project_id, other_user_id, action, datetime.datetime.utcnow(), self.db
+            )
+
+        # Assert
+        after = await self._snapshot(project_id)
+        assert after["total_contributors"] == before["total_contributors"] + 1
@@ -26,7 +26,7 @@ class TestSplitService:
         expected = geojson.loads(json.dumps(get_canned_json("split_task.json")))
 
         # act
-        result = await SplitService._create_split_tasks(x, y, zoom, task_stub, self.db)
+        result = SplitService._create_split_tasks(x, y, zoom, task_stub)
 
         # assert
         assert result == expected
@@ -37,9 +37,7 @@ class TestSplitService:
 
         # Act / Assert
         with pytest.raises(SplitServiceError):
-            await SplitService._create_split_tasks(
-                "foo", "bar", "dum", task_stub, self.db
-            )
+            SplitService._create_split_tasks("foo", "bar", "dum", task_stub)
 
     async def test_split_non_square_task(self):
         # Lock task for mapping
@@ -52,9 +50,7 @@ class TestSplitService:
         expected = geojson.loads(
             json.dumps(get_canned_json("non_square_split_results.json"))
         )
-        result = await SplitService._create_split_tasks(
-            task.x, task.y, task.zoom, task, self.db
-        )
+        result = SplitService._create_split_tasks(task.x, task.y, task.zoom, task)
 
         # Compare geometries more flexibly since precision may vary
         assert len(result) == len(expected)
@@ -64,3 +60,36 @@ class TestSplitService:
                 result_feature["geometry"]["type"]
                 == expected_feature["geometry"]["type"]
             )
+
+    @pytest.mark.parametrize(
+        "x, y, zoom", [(0, 0, 1), (2020, 2798, 12), (130945, 87317, 18), (7, 1, 3)]
+    )
+    async def test_create_square_matches_postgis_transform(self, x, y, zoom):
+        # arrange
+        max_extent = 156543.0339 * 256 / 2
+        step = max_extent / (2 ** (zoom - 1))
+        xmin, ymin = x * step - max_extent, y * step - max_extent
+        xmax, ymax = xmin + step, ymin + step
+        square_wkt = (
+            f"MULTIPOLYGON((({xmin!r} {ymin!r},{xmax!r} {ymin!r},{xmax!r} {ymax!r},"
+            f"{xmin!r} {ymax!r},{xmin!r} {ymin!r})))"
+        )
+
+        # act
+        result = SplitService._create_square(x, y, zoom)
+        corner = SplitService._mercator_to_lon_lat(xmax, ymax)
+        postgis = await self.db.fetch_one(
+            """
+            SELECT
+                ST_AsGeoJSON(
+                    ST_Transform(ST_SetSRID(ST_GeomFromText(:square), 3857), 4326)
+                ) AS square,
+                ST_X(ST_Transform(ST_SetSRID(ST_MakePoint(:x, :y), 3857), 4326)) AS lon,
+                ST_Y(ST_Transform(ST_SetSRID(ST_MakePoint(:x, :y), 3857), 4326)) AS lat
+            """,
+            values={"square": square_wkt, "x": xmax, "y": ymax},
+        )
+
+        # assert
+        assert result == geojson.loads(postgis["square"])
+        assert corner == pytest.approx((postgis["lon"], postgis["lat"]), abs=1e-9)
@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+import pytest
+
+from backend.models.postgis.email_outbox import EMAIL_RETRY_BASE_SECONDS
+from backend.models.postgis.statuses import EmailOutboxStatus
+from backend.services.messaging.email_queue_service import EmailQueueService
+
+
+class RecordingMailer:
+    """Stands in for the SMTP connection, failing the first sends if asked to"""
+
+    opened = 0
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    async def __aenter__(self):
+        RecordingMailer.opened += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def send(self, message):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Connection refused")
+        self.sent.append(message)
+
+
+def email(number: int) -> dict:
+    return {
+        "to_address": f"user{number}@example.com",
+        "subject": f"Subject {number}",
+        "html_body": f"<p>Body {number}</p>",
+        "text_body": f"Body {number}",
+    }
+
+
+@pytest.mark.anyio
+class TestEmailQueueService:
+    @pytest.fixture(autouse=True)
+    async def _setup(self, db_connection_fixture):
+        self.db = db_connection_fixture
+        RecordingMailer.opened = 0
+
+    async def _outbox(self):
+        return await self.db.fetch_all(
+            """
+            SELECT to_address, status, attempts, next_attempt_at, created, last_error
+            FROM email_outbox ORDER BY id
+            """
+        )
+
+    async def test_drain_sends_queued_emails_over_one_connection(self):
+        # Arrange
+        await EmailQueueService.enqueue([email(1), email(2), email(3)], self.db)
+        mailer = RecordingMailer()
+
+        # Act
+        counts = await EmailQueueService.drain(self.db, lambda: mailer)
+
+        # Assert
+        assert counts == {"sent": 3, "retried": 0, "failed": 0}
+        assert RecordingMailer.opened == 1
+        assert [message["To"] for message in mailer.sent] == [
+            "user1@example.com",
+            "user2@example.com",
+            "user3@example.com",
+        ]
+        assert mailer.sent[0].get_body(("plain",)).get_content().strip() == "Body 1"
+        outbox = await self._outbox()
+        assert {row["status"] for row in outbox} == {EmailOutboxStatus.SENT.value}
+        assert await EmailQueueService.drain(self.db, RecordingMailer) == {
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+        }
+
+    @patch(
+        "backend.services.messaging.email_queue_service.settings.EMAIL_QUEUE_MAX_ATTEMPTS",
+        2,
+    )
+    async def test_failed_emails_are_retried_with_backoff_then_given_up(self):
+        # Arrange
+        await EmailQueueService.enqueue([email(1), email(2)], self.db)
+
+        # Act: the first email fails, the second one goes through
+        counts = await EmailQueueService.drain(self.db, lambda: RecordingMailer(1))
+
+        # Assert: the failure is rescheduled and not retried before its backoff
+        assert counts == {"sent": 1, "retried": 1, "failed": 0}
+        failed, sent = await self._outbox()
+        assert failed["status"] == EmailOutboxStatus.PENDING.value
+        assert failed["attempts"] == 1
+        assert failed["last_error"] == "Connection refused"
+        backoff = (failed["next_attempt_at"] - failed["created"]).total_seconds()
+        assert backoff >= EMAIL_RETRY_BASE_SECONDS
+        assert sent["status"] == EmailOutboxStatus.SENT.value
+        assert (await EmailQueueService.drain(self.db, RecordingMailer))["sent"] == 0
+
+        # Act: the retry fails again once due, using up the attempts
+        await self.db.execute(
+            "UPDATE email_outbox SET next_attempt_at = created WHERE status = :pending",
+            values={"pending": EmailOutboxStatus.PENDING.value},
+        )
+        counts = await EmailQueueService.drain(self.db, lambda: RecordingMailer(1))
+
+        # Assert
+        assert counts == {"sent": 0, "retried": 0, "failed": 1}
+        failed, _ = await self._outbox()
+        assert failed["status"] == EmailOutboxStatus.FAILED.value
+        assert failed["attempts"] == 2
@@ -6,7 +6,7 @@ from unittest.mock import patch, AsyncMock, MagicMock
 import pytest
 
 from backend.models.postgis.message import Message
-from backend.models.postgis.statuses import EncouragingEmailType
+from backend.models.postgis.statuses import EmailOutboxStatus, EncouragingEmailType
 from backend.services.messaging.smtp_service import SMTPService
 from backend.services.users.user_service import UserService
 from tests.api.helpers.test_helpers import return_canned_user, create_canned_user
@@ -142,18 +142,30 @@ class TestSMTPService:
         assert query["username"] == [test_user]
         assert query.get("token")  # token must exist
 
-    async def test_send_message_sends_mail_if_sender_is_defined(self):
+    async def test_send_message_queues_mail_if_sender_is_defined(self):
         original_sender = settings.MAIL_DEFAULT_SENDER
         settings.MAIL_DEFAULT_SENDER = MagicMock()
 
         try:
             # should not raise
             await SMTPService._send_message(
-                self.to_address, self.subject, self.content, self.content
+                self.to_address, self.subject, self.content, db=self.db
             )
         finally:
             settings.MAIL_DEFAULT_SENDER = original_sender
 
+        queued = await self.db.fetch_all(
+            "SELECT to_address, subject, text_body, status FROM email_outbox"
+        )
+        assert [dict(row) for row in queued] == [
+            {
+                "to_address": self.to_address,
+                "subject": self.subject,
+                "text_body": self.content,
+                "status": EmailOutboxStatus.PENDING.value,
+            }
+        ]
+
     @patch(
         "backend.services.messaging.smtp_service.settings.MAIL_DEFAULT_SENDER",
         None,
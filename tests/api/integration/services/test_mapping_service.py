@@ -2,6 +2,9 @@ import datetime
 import xml.etree.ElementTree as ET
 from unittest.mock import patch
 
+from geoalchemy2 import WKBElement
+from geoalchemy2.shape import to_shape
+
 from backend.models.dtos.mapping_dto import ExtendLockTimeDTO
 from backend.services.project_service import ProjectService
 import pytest
@@ -24,14 +27,10 @@ class TestMappingService:
             await create_canned_project(self.db)
         )
 
-    @patch.object(Task, "get_tasks")
-    async def test_generate_gpx(self, mock_task):
+    async def test_generate_gpx(self):
         # Arrange
         project_id = self.test_project_id
-        task_ids_str = "1,2"
-        # grab a representative task from the persisted project (keeps original behaviour)
-        task = await Task.get(1, self.test_project_id, self.db)
-        mock_task.return_value = [task]
+        task_ids_str = "1"
 
         timestamp = datetime.datetime(2017, 4, 13)
 
@@ -87,13 +86,9 @@ class TestMappingService:
             assert "lat" in wpt.attrib
             assert "lon" in wpt.attrib
 
-    @patch.object(Task, "get_tasks")
-    async def test_generate_osm_xml(self, mock_task):
+    async def test_generate_osm_xml(self):
         # Arrange
         task_ids_str = "1"
-        task_1 = await Task.get(1, self.test_project_id, self.db)
-        task_2 = await Task.get(2, self.test_project_id, self.db)
-        mock_task.return_value = [task_1]
 
         # Act & Assert for single task
         xml = await MappingService.generate_osm_xml(
@@ -114,7 +109,6 @@ class TestMappingService:
 
         # Multiple tasks
         task_ids_str = "1,2"
-        mock_task.return_value = [task_1, task_2]
         xml = await MappingService.generate_osm_xml(
             self.test_project_id, task_ids_str, self.db
         )
@@ -131,6 +125,50 @@ class TestMappingService:
         ways = root.findall("./way")
         assert len(ways) == 2
 
+    @patch("backend.services.mapping_service.EXPORT_CHUNK_SIZE", 1)
+    async def test_streamed_osm_xml_matches_element_tree_document(self):
+        # Arrange: the document as built in memory before exports were streamed
+        root = ET.Element(
+            "osm",
+            attrib=dict(version="0.6", upload="never", creator=ORG_NAME),
+        )
+        fake_id = -1
+        tasks = await Task.get_tasks(self.test_project_id, [1, 2], self.db)
+        for task in sorted(tasks, key=lambda task: task["id"]):
+            task_geom = to_shape(WKBElement(task["geometry"], srid=4326))
+            way = ET.SubElement(
+                root,
+                "way",
+                attrib=dict(id=str(task["id"] * -1), action="modify", visible="true"),
+            )
+            for poly in task_geom.geoms:
+                for point in poly.exterior.coords:
+                    ET.SubElement(
+                        root,
+                        "node",
+                        attrib=dict(
+                            action="modify",
+                            visible="true",
+                            id=str(fake_id),
+                            lon=str(point[0]),
+                            lat=str(point[1]),
+                        ),
+                    )
+                    ET.SubElement(way, "nd", attrib=dict(ref=str(fake_id)))
+                    fake_id -= 1
+
+        # Act
+        chunks = [
+            chunk
+            async for chunk in MappingService.stream_osm_xml(
+                self.test_project_id, [1, 2], self.db
+            )
+        ]
+
+        # Assert
+        assert len(chunks) == 4
+        assert b"".join(chunks) == ET.tostring(root, encoding="utf8")
+
     async def test_map_all_sets_counters_correctly(self):
         if self.skip_tests:
             pytest.skip("skipping mapping heavy tests")
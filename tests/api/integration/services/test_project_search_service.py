@@ -6,6 +6,7 @@ from backend.models.postgis.project import ProjectInfo, Project
 from backend.models.dtos.project_dto import ProjectSearchBBoxDTO
 from backend.models.postgis.user import User
 from tests.backend.helpers.test_helpers import get_canned_json
+from tests.api.helpers.test_helpers import create_canned_project
 from unittest.mock import patch, MagicMock, AsyncMock
 from shapely.geometry import Polygon, box
 import shapely.wkt
@@ -142,3 +143,36 @@ class TestProjectSearchService:
         area = await ProjectSearchService._get_area_sqm(polygon, db=self.db)
         # assert
         assert area == pytest.approx(28276407740.2797, abs=1e-3)
+
+    async def test_create_result_dtos_matches_per_project_lookups(self):
+        # arrange
+        _, _, project_id = await create_canned_project(self.db)
+        query, params = await ProjectSearchService.create_search_query(self.db)
+        query += " AND p.id = :project_id"
+        projects = await self.db.fetch_all(query, {**params, "project_id": project_id})
+        # act
+        results = await ProjectSearchService.create_result_dtos(projects, "en", self.db)
+        # assert
+        assert len(results) == 1
+        result = results[0]
+        project_info = await ProjectInfo.get_dto_for_locale(
+            self.db, project_id, "en", "en"
+        )
+        assert result.project_id == project_id
+        assert result.name == project_info.name
+        assert result.locale == project_info.locale
+        assert result.active_mappers == await Project.get_active_mappers(
+            project_id, self.db
+        )
+        assert result.total_contributors == (
+            await Project.get_project_total_contributions(project_id, self.db)
+        )
+        assert result.campaigns == await Project.get_project_campaigns(
+            project_id, self.db
+        )
+
+    async def test_create_result_dtos_returns_empty_list_for_empty_page(self):
+        # act
+        results = await ProjectSearchService.create_result_dtos([], "en", self.db)
+        # assert
+        assert results == []
@@ -0,0 +1,119 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from backend.services.task_annotations_service import (
+    InvalidTaskIdError,
+    TaskAnnotationsService,
+)
+from tests.api.helpers.test_helpers import create_canned_project
+
+ANNOTATION_TYPE = "building_area_diff"
+
+
+def annotation(task_id, properties=None, source="ML model"):
+    return {
+        "taskId": task_id,
+        "annotationSource": source,
+        "properties": properties or {"area": task_id},
+    }
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.anyio
+class TestTaskAnnotationsService:
+    @pytest.fixture(autouse=True)
+    async def _setup(self, db_connection_fixture):
+        self.db = db_connection_fixture
+        _, _, self.test_project_id = await create_canned_project(self.db)
+
+    async def _annotations(self):
+        rows = await self.db.fetch_all(
+            """
+            SELECT task_id, CAST(properties AS text) AS properties, annotation_source
+            FROM task_annotations
+            WHERE project_id = :project_id ORDER BY task_id
+            """,
+            values={"project_id": self.test_project_id},
+        )
+        return [
+            (row["task_id"], json.loads(row["properties"]), row["annotation_source"])
+            for row in rows
+        ]
+
+    async def test_add_or_update_annotations_upserts_all_tasks(self):
+        # Arrange
+        await TaskAnnotationsService.add_or_update_annotations(
+            [annotation(1), annotation(2)],
+            self.test_project_id,
+            ANNOTATION_TYPE,
+            self.db,
+        )
+
+        # Act: task 2 is updated, task 3 added and only its last annotation kept
+        await TaskAnnotationsService.add_or_update_annotations(
+            [annotation(2, {"area": 20}), annotation(3), annotation(3, {"area": 30})],
+            self.test_project_id,
+            ANNOTATION_TYPE,
+            self.db,
+        )
+
+        # Assert
+        assert await self._annotations() == [
+            (1, {"area": 1}, "ML model"),
+            (2, {"area": 20}, "ML model"),
+            (3, {"area": 30}, "ML model"),
+        ]
+
+    async def test_add_or_update_annotations_writes_nothing_for_invalid_payload(self):
+        # Act / Assert
+        with pytest.raises(InvalidTaskIdError):
+            await TaskAnnotationsService.add_or_update_annotations(
+                [annotation(1), annotation(999)],
+                self.test_project_id,
+                ANNOTATION_TYPE,
+                self.db,
+            )
+        with pytest.raises(ValueError):
+            await TaskAnnotationsService.add_or_update_annotations(
+                [annotation(1), {"taskId": "2", "properties": {}}],
+                self.test_project_id,
+                ANNOTATION_TYPE,
+                self.db,
+            )
+        assert await self._annotations() == []
+
+    @patch("backend.services.task_annotations_service.ANNOTATION_CHUNK_SIZE", 2)
+    async def test_add_or_update_annotations_stream_reads_lines_across_chunks(self):
+        # Arrange: lines split over arbitrary byte chunks, without a final newline
+        body = "\n".join(json.dumps(annotation(task_id)) for task_id in (1, 2, 3))
+        body = body.encode()
+
+        # Act
+        count = await TaskAnnotationsService.add_or_update_annotations_stream(
+            stream(body[:10], body[10:70], body[70:]),
+            self.test_project_id,
+            ANNOTATION_TYPE,
+            self.db,
+        )
+
+        # Assert
+        assert count == 3
+        assert [task_id for task_id, _, _ in await self._annotations()] == [1, 2, 3]
+
+    @patch("backend.services.task_annotations_service.ANNOTATION_CHUNK_SIZE", 1)
+    async def test_add_or_update_annotations_stream_rolls_back_on_invalid_line(self):
+        # Arrange
+        body = f"{json.dumps(annotation(1))}\n{json.dumps(annotation(2))}\nnot json\n"
+
+        # Act / Assert
+        with pytest.raises(ValueError):
+            await TaskAnnotationsService.add_or_update_annotations_stream(
+                stream(body.encode()), self.test_project_id, ANNOTATION_TYPE, self.db
+            )
+        assert await self._annotations() == []
@@ -0,0 +1,169 @@
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from backend.models.postgis.mapper_level_refresh import MapperLevelRefreshRun
+from backend.services.users.mapper_level_refresh_service import (
+    MapperLevelRefreshAborted,
+    MapperLevelRefreshService,
+)
+from backend.services.users.user_service import UserService
+from tests.api.helpers.test_helpers import create_canned_user, return_canned_user
+
+# Changesets of the test users, badge 1 needs 250 and badge 2 500
+CHANGESETS = {1001: 600, 1002: 10, 1003: 300}
+
+
+async def fetch_stats(user_id: int) -> dict:
+    return {"result": {"topics": {"changeset": {"value": CHANGESETS[user_id]}}}}
+
+
+@pytest.mark.anyio
+@patch(
+    "backend.services.users.mapper_level_refresh_service.REFRESH_RETRY_DELAY_SECONDS",
+    0,
+)
+class TestMapperLevelRefreshService:
+    @pytest.fixture(autouse=True)
+    async def _setup(self, db_connection_fixture):
+        self.db = db_connection_fixture
+        for user_id in CHANGESETS:
+            user = await return_canned_user(self.db, f"Mapper {user_id}", user_id)
+            await create_canned_user(self.db, user)
+
+    async def _users(self):
+        rows = await self.db.fetch_all(
+            """
+            SELECT
+                u.id,
+                u.mapping_level,
+                ARRAY(
+                    SELECT badge_id FROM user_mapping_badge b
+                    WHERE b.user_id = u.id ORDER BY badge_id
+                ) AS badges,
+                EXISTS (SELECT 1 FROM user_stats s WHERE s.user_id = u.id) AS has_stats,
+                (SELECT COUNT(*) FROM messages m WHERE m.to_user_id = u.id) AS messages
+            FROM users u
+            WHERE u.id = ANY(:user_ids)
+            ORDER BY u.id
+            """,
+            values={"user_ids": list(CHANGESETS)},
+        )
+        return [
+            (
+                row["id"],
+                row["mapping_level"],
+                row["badges"],
+                row["has_stats"],
+                row["messages"],
+            )
+            for row in rows
+        ]
+
+    async def test_refresh_assigns_badges_and_levels_in_bulk(self):
+        # Arrange: the stats of the last user can't be fetched
+        async def fetch_or_fail(user_id):
+            if user_id == 1003:
+                raise httpx.ConnectError("Connection refused")
+            return await fetch_stats(user_id)
+
+        # Act
+        with patch.object(
+            UserService, "fetch_stats", AsyncMock(side_effect=fetch_or_fail)
+        ):
+            summary = await MapperLevelRefreshService.refresh(self.db, batch_size=3)
+
+        # Assert: levels go up one step per refresh, as for a single user
+        assert summary["processed"] == 3
+        assert summary["failed"] == 1
+        assert summary["failed_user_ids"] == [1003]
+        assert await self._users() == [
+            (1001, 2, [1, 2], True, 1),
+            (1002, 1, [], True, 0),
+            (1003, 1, [], False, 0),
+        ]
+        run = await MapperLevelRefreshRun.get_unfinished(False, self.db)
+        assert run is None
+
+    async def test_failed_users_are_retried_before_the_run_finishes(self):
+        # Arrange: the stats of a user fail once
+        attempts = []
+
+        async def fail_first_run(user_id):
+            attempts.append(user_id)
+            if user_id == 1002 and attempts.count(1002) <= 2:
+                raise httpx.ConnectError("Connection refused")
+            return await fetch_stats(user_id)
+
+        # Act
+        with patch.object(
+            UserService, "fetch_stats", AsyncMock(side_effect=fail_first_run)
+        ):
+            summary = await MapperLevelRefreshService.refresh(self.db, batch_size=2)
+
+        # Assert
+        assert summary["failed"] == 0
+        assert summary["failed_user_ids"] == []
+        assert (await self._users())[1] == (1002, 1, [], True, 0)
+        run = await self.db.fetch_one(
+            "SELECT * FROM mapper_level_refresh_runs WHERE id = :id",
+            values={"id": summary["run_id"]},
+        )
+        assert run["users_failed"] == 0
+        assert run["failed_user_ids"] == []
+
+    async def test_batch_without_any_stats_stops_the_run(self):
+        # Arrange: the stats API goes down after the first batch
+        async def fetch_or_fail(user_id):
+            if user_id == 1003:
+                raise httpx.ConnectError("Connection refused")
+            return await fetch_stats(user_id)
+
+        fetch = AsyncMock(side_effect=fetch_or_fail)
+        with patch.object(UserService, "fetch_stats", fetch):
+            with pytest.raises(MapperLevelRefreshAborted):
+                await MapperLevelRefreshService.refresh(self.db, batch_size=2)
+        run = await MapperLevelRefreshRun.get_unfinished(False, self.db)
+        assert run["last_user_id"] == 1002
+
+        # Act
+        fetch = AsyncMock(side_effect=fetch_stats)
+        with patch.object(UserService, "fetch_stats", fetch):
+            summary = await MapperLevelRefreshService.refresh(self.db, batch_size=2)
+
+        # Assert: the resumed run fetches the batch it stopped at
+        assert [call.args for call in fetch.await_args_list] == [(1003,)]
+        assert summary == {**summary, "run_id": run["id"], "failed": 0}
+        assert (await self._users())[2] == (1003, 2, [1], True, 1)
+
+    async def test_refresh_resumes_after_last_committed_batch(self):
+        # Arrange: the run stops while writing its second batch
+        checkpoint = MapperLevelRefreshRun.checkpoint
+        calls = []
+
+        async def checkpoint_then_crash(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("Worker killed")
+            await checkpoint(*args)
+
+        fetch = AsyncMock(side_effect=fetch_stats)
+        with patch.object(UserService, "fetch_stats", fetch), patch.object(
+            MapperLevelRefreshRun, "checkpoint", checkpoint_then_crash
+        ):
+            with pytest.raises(RuntimeError):
+                await MapperLevelRefreshService.refresh(self.db, batch_size=2)
+        run = await MapperLevelRefreshRun.get_unfinished(False, self.db)
+        assert run["last_user_id"] == 1002
+        assert (await self._users())[2] == (1003, 1, [], False, 0)
+
+        # Act
+        fetch.reset_mock()
+        with patch.object(UserService, "fetch_stats", fetch):
+            summary = await MapperLevelRefreshService.refresh(self.db, batch_size=2)
+
+        # Assert: only the rolled back batch is fetched again
+        assert [call.args for call in fetch.await_args_list] == [(1003,)]
+        assert summary == {**summary, "run_id": run["id"], "processed": 1}
+        assert (await self._users())[2] == (1003, 2, [1], True, 1)
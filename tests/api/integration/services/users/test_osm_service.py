@@ -13,7 +13,7 @@ class TestOsmService:
 
     async def test_get_osm_details_for_user_returns_user_details_if_valid_user_id(self):
         # Act
-        dto = OSMService.get_osm_details_for_user(13526430)
+        dto = await OSMService.get_osm_details_for_user(13526430)
 
         # Assert
         assert dto.account_created == "2021-06-10T01:27:18Z"
@@ -63,18 +63,14 @@ class TestUserService:
 
     @patch.object(UserService, "notify_level_upgrade", new_callable=AsyncMock)
     @patch.object(MappingLevel, "all_badges_satisfied", new_callable=AsyncMock)
-    @patch.object(MappingLevel, "get_next", new_callable=AsyncMock)
     @patch.object(MappingBadge, "available_badges_for_user", new_callable=AsyncMock)
     @patch.object(UserService, "get_and_save_stats", new_callable=AsyncMock)
-    @patch.object(MappingLevel, "get_by_id", new_callable=AsyncMock)
     @patch.object(UserService, "get_user_by_id", new_callable=AsyncMock)
     async def test_mapper_level_updates_correctly(
         self,
         mock_user_get,
-        mock_get_by_id,
         mock_get_stats,
         mock_available_badges,
-        mock_get_next,
         mock_all_badges_satisfied,
         mock_notify,
     ):
@@ -88,19 +84,6 @@ class TestUserService:
         user.set_mapping_level = AsyncMock()
 
         mock_user_get.return_value = user
-
-        beginner = AsyncMock()
-        beginner.id = 1
-        beginner.ordering = 1
-
-        intermediate = AsyncMock()
-        intermediate.id = 2
-        intermediate.name = "INTERMEDIATE"
-        intermediate.ordering = 2
-        intermediate.approvals_required = 0
-
-        mock_get_by_id.return_value = beginner
-        mock_get_next.return_value = intermediate
         mock_all_badges_satisfied.return_value = True
 
         mock_get_stats.return_value = {"changeset_count": 350}
@@ -108,7 +91,10 @@ class TestUserService:
 
         await UserService.check_and_update_mapper_level(12, db=self.db)
 
-        user.set_mapping_level.assert_awaited_once_with(intermediate, self.db)
+        # The next level comes from the reference data
+        user.set_mapping_level.assert_awaited_once()
+        intermediate, db = user.set_mapping_level.await_args.args
+        assert (intermediate.id, intermediate.name, db) == (2, "INTERMEDIATE", self.db)
         mock_notify.assert_awaited_once_with(12, "Test User", "INTERMEDIATE", self.db)
 
     async def test_update_user_updates_user_details(self):
@@ -82,8 +82,10 @@ class TestProject:
         # Arrange
         test_project, _author_id, project_id = await create_canned_project(self.db)
         # Act
-        test_project.set_country_info()
+        await test_project.set_country_info(self.db)
         # Assert
         assert test_project.country is not None
         assert len(test_project.country) > 0, "Nominatim may have given a bad response"
         assert test_project.country == ["United Kingdom"]
+        stored = await self.db.fetch_all("SELECT country FROM reverse_geocodes")
+        assert [row["country"] for row in stored] == ["United Kingdom"]
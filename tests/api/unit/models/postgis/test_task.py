@@ -261,4 +261,100 @@ class TestTask:
             query, {"task_id": task_id, "project_id": self.project_id}
         )
         assert task_history["action_text"] == lock_duration
+        assert task_history["duration_seconds"] == 7200
         assert task_history["user_id"] == user_id
+
+    async def test_auto_unlock_all_tasks_unlocks_expired_locks(self):
+        """Test that expired locks are auto-unlocked and the task status restored."""
+        task_id = self.ready_task.id
+        await Task.lock_task_for_mapping(
+            task_id, self.project_id, self.user.id, self.db
+        )
+        await self.db.execute(
+            """
+            UPDATE task_history
+            SET action_date = action_date - INTERVAL '1 day'
+            WHERE task_id = :task_id AND project_id = :project_id
+            """,
+            {"task_id": task_id, "project_id": self.project_id},
+        )
+
+        unlocked = await Task.auto_unlock_all_tasks(self.db, [self.project_id])
+
+        task = await Task.get(task_id, self.project_id, self.db)
+        last_action = await self.db.fetch_one(
+            """
+            SELECT action, duration_seconds FROM task_history
+            WHERE task_id = :task_id AND project_id = :project_id
+            ORDER BY action_date DESC
+            LIMIT 1
+            """,
+            {"task_id": task_id, "project_id": self.project_id},
+        )
+        expiry_delta = await Task.auto_unlock_delta()
+        assert unlocked == {"history_rows": 1, "tasks": 1, "projects": 1}
+        assert task.task_status == TaskStatus.READY.value
+        assert task.locked_by is None
+        assert last_action["action"] == TaskAction.AUTO_UNLOCKED_FOR_MAPPING.name
+        assert last_action["duration_seconds"] == int(expiry_delta.total_seconds())
+
+    async def test_insert_tasks_writes_every_batch(self):
+        """Test that tasks inserted in several batches keep their values and geometry."""
+        features = [
+            geojson.Feature(
+                geometry=geojson.MultiPolygon(
+                    [[[(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]]]
+                ),
+                properties={"x": i, "y": i, "zoom": 12, "isSquare": i % 2 == 0},
+            )
+            for i in range(5)
+        ]
+        tasks = [
+            Task.from_geojson_feature(task_id, feature)
+            for task_id, feature in enumerate(features, start=5)
+        ]
+
+        await Task.insert_tasks(self.project_id, tasks, self.db, batch_size=2)
+
+        rows = await self.db.fetch_all(
+            """
+            SELECT id, x, is_square, task_status, ST_AsText(geometry) AS wkt
+            FROM tasks
+            WHERE project_id = :project_id AND id >= 5
+            ORDER BY id
+            """,
+            {"project_id": self.project_id},
+        )
+        assert [row["id"] for row in rows] == [5, 6, 7, 8, 9]
+        assert [row["is_square"] for row in rows] == [True, False, True, False, True]
+        assert all(row["task_status"] == TaskStatus.READY.value for row in rows)
+        assert rows[0]["wkt"] == "MULTIPOLYGON(((0 0,1 0,1 1,0 1,0 0)))"
+
+    async def test_transition_all_tasks_locks_and_unlocks_each_task(self):
+        """Test that a bulk transition writes the lock and state change history."""
+        transitioned = await Task.transition_all_tasks(
+            self.project_id,
+            self.user.id,
+            [TaskStatus.READY],
+            TaskStatus.MAPPED,
+            self.db,
+            lock_action=TaskAction.LOCKED_FOR_MAPPING,
+        )
+
+        task = await Task.get(self.ready_task.id, self.project_id, self.db)
+        history = await self.db.fetch_all(
+            """
+            SELECT action, action_text FROM task_history
+            WHERE task_id = :task_id AND project_id = :project_id
+            ORDER BY action_date DESC
+            """,
+            {"task_id": self.ready_task.id, "project_id": self.project_id},
+        )
+        assert transitioned == 1
+        assert task.task_status == TaskStatus.MAPPED.value
+        assert task.mapped_by == self.user.id
+        assert task.locked_by is None
+        assert history[0]["action"] == TaskAction.STATE_CHANGE.name
+        assert history[0]["action_text"] == TaskStatus.MAPPED.name
+        assert history[1]["action"] == TaskAction.LOCKED_FOR_MAPPING.name
+        assert history[1]["action_text"] is not None
@@ -139,6 +139,52 @@ class TestGridService:
         # Assert
         assert_deep_almost_equal(expected, result)
 
+    async def test_trim_grid_to_aoi_leaves_grid_untouched(self):
+        # Arrange
+        grid_json = get_canned_json("test_grid.json")
+        grid_dto = GridDTO(**grid_json)
+        grid_dto.clip_to_aoi = True
+        original_grid = json.dumps(grid_dto.grid)
+
+        # Act
+        result = GridService.trim_grid_to_aoi(grid_dto)
+
+        # Assert
+        assert json.dumps(grid_dto.grid) == original_grid
+        assert len(result["features"]) < len(grid_dto.grid["features"])
+
+    async def test_trim_grid_to_aoi_keeps_z_values(self):
+        # Arrange: the same grid and aoi with z values on every position
+        def add_z(coordinates):
+            if isinstance(coordinates[0], (int, float)):
+                return [*coordinates, 10.0]
+            return [add_z(part) for part in coordinates]
+
+        grid_json = get_canned_json("test_grid.json")
+        grid_dto = GridDTO(**grid_json)
+        grid_dto.clip_to_aoi = False
+        grid_3d_dto = GridDTO(**json.loads(json.dumps(grid_json)))
+        grid_3d_dto.clip_to_aoi = False
+        for feature in grid_3d_dto.grid["features"]:
+            geometry = feature["geometry"]
+            geometry["coordinates"] = add_z(geometry["coordinates"])
+        for feature in grid_3d_dto.area_of_interest["features"]:
+            geometry = feature["geometry"]
+            geometry["coordinates"] = add_z(geometry["coordinates"])
+
+        # Act
+        result = GridService.trim_grid_to_aoi(grid_dto)
+        result_3d = GridService.trim_grid_to_aoi(grid_3d_dto)
+
+        # Assert: contained and partially intersecting tiles are both kept in 3D
+        assert len(result_3d["features"]) == len(result["features"])
+        for feature, feature_3d in zip(result["features"], result_3d["features"]):
+            assert shape(feature_3d["geometry"]).has_z
+            assert [
+                position[:2]
+                for position in feature_3d["geometry"]["coordinates"][0][0]
+            ] == feature["geometry"]["coordinates"][0][0]
+
     async def test_tasks_from_aoi_features(self):
         # Arrange
         grid_json = get_canned_json("test_arbitrary.json")
@@ -0,0 +1,161 @@
+import pytest
+
+from backend.cache import (
+    Cache,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    project_cache_tags,
+    project_tag,
+)
+
+
+class InMemoryRedis:
+    """Stand-in for the subset of the Redis client used by the cache backend"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def sadd(self, key, member):
+        self.values.setdefault(key, set()).add(member)
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def smembers(self, key):
+        return set(self.values.get(key, ()))
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+def key_builder(func, project_id, db=None):
+    return f"{func.__name__}:{project_id}"
+
+
+@pytest.mark.anyio
+class TestCache:
+    def _cached_stats(self, cache):
+        calls = []
+
+        @cache.cached(
+            "project_stats", ttl=60, key_builder=key_builder, tags=project_cache_tags
+        )
+        async def get_project_stats(project_id, db=None):
+            calls.append(project_id)
+            return {"project_id": project_id}
+
+        return get_project_stats, calls
+
+    async def test_memory_backend_counts_hits_misses_and_evictions(self):
+        # Arrange
+        cache = Cache(MemoryCacheBackend(maxsize=2))
+        get_project_stats, calls = self._cached_stats(cache)
+
+        # Act
+        await get_project_stats(1)
+        await get_project_stats(1)
+        await get_project_stats(2)
+        await get_project_stats(3)
+        await get_project_stats(1)
+
+        # Assert
+        assert calls == [1, 2, 3, 1]
+        assert cache.get_stats() == {
+            "project_stats": {
+                "hits": 1,
+                "misses": 4,
+                "evictions": 2,
+                "invalidations": 0,
+            }
+        }
+
+    @pytest.mark.parametrize(
+        "backend",
+        [
+            lambda: MemoryCacheBackend(maxsize=10),
+            lambda: RedisCacheBackend(InMemoryRedis()),
+        ],
+    )
+    async def test_invalidation_drops_tagged_entries(self, backend):
+        # Arrange
+        cache = Cache(backend())
+        get_project_stats, calls = self._cached_stats(cache)
+        await get_project_stats(1)
+        await get_project_stats(2)
+
+        # Act
+        await cache.invalidate(project_tag(1))
+        await get_project_stats(1)
+        await get_project_stats(2)
+
+        # Assert
+        assert calls == [1, 2, 1]
+        assert cache.get_stats()["project_stats"]["invalidations"] == 1
+
+    @pytest.mark.parametrize(
+        "backend, cached",
+        [
+            (MemoryCacheBackend(maxsize=10), False),
+            (RedisCacheBackend(InMemoryRedis()), True),
+        ],
+    )
+    async def test_shared_only_skips_per_worker_backends(self, backend, cached):
+        # Arrange
+        cache = Cache(backend)
+        calls = []
+
+        @cache.cached(
+            "project_summary", ttl=60, key_builder=key_builder, shared_only=True
+        )
+        async def get_project_summary(project_id, db=None):
+            calls.append(project_id)
+            return {"project_id": project_id}
+
+        # Act
+        await get_project_summary(1)
+        await get_project_summary(1)
+
+        # Assert
+        assert calls == ([1] if cached else [1, 1])
+
+    async def test_get_many_loads_missing_keys_in_one_call(self):
+        # Arrange
+        cache = Cache(MemoryCacheBackend(maxsize=10))
+        loads = []
+
+        async def load_titles(keys):
+            loads.append(keys)
+            return {key: f"Project {key}" for key in keys if key != 3}
+
+        async def get_titles(keys):
+            return await cache.get_many(
+                "project_title",
+                keys,
+                load_titles,
+                ttl=60,
+                tags=lambda key: [project_tag(key)],
+            )
+
+        # Act
+        first = await get_titles([1, 2, 1, 3])
+        second = await get_titles([1, 2, 3])
+        await cache.invalidate(project_tag(2))
+        await get_titles([1, 2])
+
+        # Assert
+        assert first == {1: "Project 1", 2: "Project 2"}
+        assert second == first
+        assert loads == [[1, 2, 3], [3], [2]]
+        assert cache.get_stats()["project_title"] == {
+            "hits": 3,
+            "misses": 5,
+            "evictions": 0,
+            "invalidations": 1,
+        }
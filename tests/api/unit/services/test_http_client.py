@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.http_client import CircuitOpenError, HTTPClientPool
+
+HOST = "nominatim.example.com"
+URL = f"https://{HOST}/reverse"
+
+
+def pool_answering(*status_codes):
+    """Pool whose client for HOST answers with the status codes in turn"""
+    answers = iter(status_codes)
+
+    def handler(request):
+        return httpx.Response(next(answers), json={})
+
+    pool = HTTPClientPool(
+        timeout=1,
+        max_connections_per_host=2,
+        circuit_threshold=2,
+        circuit_reset_after=60,
+    )
+    pool.clients[HOST] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pool.clients_loop = asyncio.get_running_loop()
+    return pool
+
+
+@pytest.mark.anyio
+class TestHTTPClientPool:
+    async def test_circuit_opens_after_consecutive_failures(self):
+        pool = pool_answering(503, 200, 502, 500)
+
+        assert (await pool.get(URL)).status_code == 503
+        assert (await pool.get(URL)).status_code == 200
+        assert (await pool.get(URL)).status_code == 502
+        assert (await pool.get(URL)).status_code == 500
+        with pytest.raises(CircuitOpenError):
+            await pool.get(URL)
+
+        stats = pool.get_stats()[HOST]
+        assert stats["requests"] == 4
+        assert stats["failures"] == 3
+        assert stats["rejected"] == 1
+        assert stats["circuit"] == "open"
+        await pool.close()
+
+    async def test_trial_request_closes_circuit_after_reset(self):
+        pool = pool_answering(500, 500, 404)
+        await pool.get(URL)
+        await pool.get(URL)
+        breaker = pool.breakers[HOST]
+        breaker.opened_at -= 60
+
+        # Client errors don't count against the host
+        assert breaker.state == "half-open"
+        assert (await pool.get(URL)).status_code == 404
+        assert breaker.state == "closed"
+        await pool.close()
+
+    async def test_circuit_open_error_is_a_request_error(self):
+        # Callers already handling httpx.RequestError handle rejections too
+        assert issubclass(CircuitOpenError, httpx.RequestError)
@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+import pytest
+
+from backend.models.dtos.licenses_dto import LicenseDTO
+from backend.reference_data import (
+    ReferenceData,
+    ReferenceDataRegistry,
+    reference_data,
+)
+from backend.services.license_service import LicenseService
+from backend.services.task_event_service import InMemoryTaskEventBackend
+from tests.api.helpers.test_helpers import create_canned_license, get_or_create_levels
+
+
+@pytest.mark.anyio
+class TestReferenceData:
+    @pytest.fixture(autouse=True)
+    async def _setup(self, db_connection_fixture):
+        self.db = db_connection_fixture
+        await get_or_create_levels(self.db)
+
+    async def test_levels_are_indexed_and_ordered(self):
+        # Act
+        data = await ReferenceData.load(self.db)
+
+        # Assert
+        assert [level.name for level in data.mapping_levels] == [
+            "BEGINNER",
+            "INTERMEDIATE",
+            "ADVANCED",
+        ]
+        assert data.mapping_level(2).name == "INTERMEDIATE"
+        assert data.next_mapping_level(1).id == 2
+        assert data.next_mapping_level(3) is None
+        assert data.level_badges[3] == frozenset({2})
+        assert data.mapping_badges[1].name == "INTERMEDIATE_internal"
+        with pytest.raises(TypeError):
+            data.licenses[1] = None
+
+    async def test_registry_reloads_after_a_change(self):
+        # Arrange
+        registry = ReferenceDataRegistry(InMemoryTaskEventBackend())
+        await registry.start(self.db)
+        loaded = await registry.get(self.db)
+        await self.db.execute("INSERT INTO interests (name) VALUES ('roads')")
+
+        # Act
+        cached = await registry.get(self.db)
+        await registry.changed(self.db)
+        reloaded = await registry.get(self.db)
+        await registry.stop()
+
+        # Assert: reads are served from memory until a write is published
+        assert cached is loaded
+        assert not loaded.interests
+        assert [row["name"] for row in reloaded.interests.values()] == ["roads"]
+
+    async def test_load_racing_a_change_is_not_kept(self):
+        # Arrange
+        registry = ReferenceDataRegistry(InMemoryTaskEventBackend())
+        load = ReferenceData.load
+
+        async def load_then_change(db):
+            data = await load(db)
+            registry.invalidate()
+            return data
+
+        # Act
+        with patch.object(ReferenceData, "load", load_then_change):
+            await registry.get(self.db)
+
+        # Assert
+        assert registry.data is None
+
+    async def test_license_writes_refresh_the_registry(self):
+        # Arrange
+        license_id = await create_canned_license(self.db)
+        assert (
+            await LicenseService.get_license_as_dto(license_id, self.db)
+        ).name == "test_license"
+
+        # Act
+        await LicenseService.update_license(
+            LicenseDTO(name="renamed", description="", plainText=""),
+            license_id,
+            self.db,
+        )
+
+        # Assert
+        assert (await reference_data.get(self.db)).licenses[license_id][
+            "name"
+        ] == "renamed"
+        licenses = await LicenseService.get_all_licenses(self.db)
+        assert [dto.name for dto in licenses.licenses] == ["renamed"]
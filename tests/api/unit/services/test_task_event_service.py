@@ -0,0 +1,67 @@
+import pytest
+
+from backend.models.postgis.statuses import TaskStatus
+from backend.services.task_event_service import (
+    SUBSCRIBER_QUEUE_SIZE,
+    InMemoryTaskEventBackend,
+    TaskEventHub,
+)
+
+
+@pytest.mark.anyio
+class TestTaskEventHub:
+    @pytest.fixture(autouse=True)
+    async def setup_hub(self):
+        self.hub = TaskEventHub(InMemoryTaskEventBackend())
+        await self.hub.start()
+        yield
+        await self.hub.stop()
+
+    async def test_subscribers_only_receive_events_of_their_project(self):
+        # Arrange
+        async with self.hub.subscribe(1) as queue, self.hub.subscribe(2) as other:
+            # Act
+            await self.hub.publish(1, 5, TaskStatus.LOCKED_FOR_MAPPING, 7, None)
+
+            # Assert
+            assert queue.get_nowait() == {
+                "projectId": 1,
+                "taskId": 5,
+                "taskStatus": "LOCKED_FOR_MAPPING",
+                "lockedBy": 7,
+            }
+            assert other.empty()
+        assert self.hub.subscribers == {}
+
+    async def test_batched_events_reach_their_projects(self):
+        # Arrange
+        async with self.hub.subscribe(1) as queue, self.hub.subscribe(2) as other:
+            # Act
+            await self.hub.publish_many(
+                [
+                    (1, 5, TaskStatus.READY, None),
+                    (2, 6, TaskStatus.MAPPED, None),
+                ],
+                None,
+            )
+
+            # Assert
+            assert queue.get_nowait()["taskId"] == 5
+            assert queue.empty()
+            assert other.get_nowait() == {
+                "projectId": 2,
+                "taskId": 6,
+                "taskStatus": "MAPPED",
+                "lockedBy": None,
+            }
+
+    async def test_slow_subscriber_is_asked_to_resync(self):
+        # Arrange
+        async with self.hub.subscribe(1) as queue:
+            # Act
+            for task_id in range(SUBSCRIBER_QUEUE_SIZE + 1):
+                await self.hub.publish(1, task_id, TaskStatus.MAPPED, None, None)
+
+            # Assert
+            assert queue.qsize() == 1
+            assert queue.get_nowait() == {"projectId": 1, "resync": True}
@@ -1,8 +1,17 @@
+from unittest.mock import patch
+
 import pytest
 from backend.exceptions import NotFound
 from backend.models.dtos.team_dto import TeamSearchDTO
+from backend.models.postgis.statuses import TeamMemberFunctions
 from backend.services.team_service import TeamService
-from tests.api.helpers.test_helpers import create_canned_team, create_canned_user
+from tests.api.helpers.test_helpers import (
+    add_user_to_team,
+    create_canned_team,
+    create_canned_user,
+    return_canned_team,
+    return_canned_user,
+)
 
 
 @pytest.mark.anyio
@@ -34,6 +43,60 @@ class TestTeamService:
         assert result.teams[0].name == self.test_team.name
         assert result.teams[0].organisation_id == self.test_team.organisation_id
 
+    async def test_search_team_members_query_count_does_not_grow_with_teams(self):
+        """Test members of all teams on a page are fetched with the same queries."""
+        manager = self.test_user
+        member = await create_canned_user(
+            self.db, await return_canned_user(self.db, "Team Member", 1111)
+        )
+        await add_user_to_team(
+            self.test_team, manager, TeamMemberFunctions.MANAGER.value, True, self.db
+        )
+        await add_user_to_team(
+            self.test_team, member, TeamMemberFunctions.MEMBER.value, True, self.db
+        )
+        team_search_dto = TeamSearchDTO(
+            user_id=manager.id,
+            organisation=self.test_team.organisation_id,
+            full_members_list=False,
+            paginate=True,
+        )
+
+        async def count_search_queries():
+            with patch.object(
+                self.db, "fetch_all", wraps=self.db.fetch_all
+            ) as fetch_all, patch.object(
+                self.db, "fetch_one", wraps=self.db.fetch_one
+            ) as fetch_one, patch.object(
+                self.db, "fetch_val", wraps=self.db.fetch_val
+            ) as fetch_val:
+                result = await TeamService.get_all_teams(team_search_dto, self.db)
+            queries = fetch_all.call_count + fetch_one.call_count
+            return result, queries + fetch_val.call_count
+
+        _, single_team_queries = await count_search_queries()
+        for name in ("Second Team", "Third Team"):
+            team = await create_canned_team(
+                self.db, await return_canned_team(self.db, name)
+            )
+            await add_user_to_team(
+                team, manager, TeamMemberFunctions.MANAGER.value, True, self.db
+            )
+            await add_user_to_team(
+                team, member, TeamMemberFunctions.MEMBER.value, True, self.db
+            )
+        result, three_teams_queries = await count_search_queries()
+
+        assert len(result.teams) == 3
+        assert three_teams_queries == single_team_queries
+        for team in result.teams:
+            assert [m.username for m in team.members] == [
+                member.username,
+                manager.username,
+            ]
+            assert team.members_count == 1
+            assert team.managers_count == 1
+
     async def test_get_team_as_dto(self):
         """Test fetching a team as DTO."""
         result = await TeamService.get_team_as_dto(
@@ -21,6 +21,7 @@ from backend.models.postgis.user import (
 )
 from backend.models.postgis.mapping_level import MappingLevel
 from backend.models.postgis.mapping_badge import MappingBadge
+from backend.reference_data import reference_data
 from backend.models.dtos.mapping_badge_dto import MappingBadgeCreateDTO
 from backend.models.dtos.mapping_level_dto import MappingLevelCreateDTO, AssociatedBadge
 
@@ -265,6 +266,7 @@ class TestUserService:
         await self.db.execute(
             "UPDATE mapping_levels SET approvals_required = 1 WHERE id = 2"
         )
+        reference_data.invalidate()
 
         # Act
         await UserService.check_and_update_mapper_level(self.test_user.id, self.db)